@@ -0,0 +1,499 @@
+"""
+Benchmark the catalog, the command generation, the bag search, the time index, the storage
+totals, the bag replay, the table export and the list rendering at scale.
+Run from the repository root with `python -m benchmarks.runBenchmarks`.
+
+Every run is stored in benchmarks/results/ and compared against the previous run.
+The rendering benchmarks need a display, e.g. `xvfb-run python -m benchmarks.runBenchmarks`,
+and the table export benchmark needs numpy and pyarrow. The exported tables are checked against
+the messages of a synthetic bag before the export is timed.
+"""
+
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+import os
+import csv
+import sys
+import json
+import time
+import shutil
+import argparse
+import tempfile
+import datetime
+import statistics
+import subprocess
+
+from src.constants import Constants
+from src.logic.bagReader import Message
+from src.logic.bagReplay import BagReplay
+from src.logic.bagMetadata import BagMetadata
+from src.logic.bagSearch import BagSearchIndex
+from src.logic.bagTimeIndex import BagTimeIndex
+from src.logic.fileSystemInterface import FileSystemInterface
+from src.logic.storageStats import StorageStats
+from src.logic.tableExport import checkTableFormat, exportTables
+from src.logic.rosCommandGenerator import generateRosBagRecordArgs, generateRosBagRecordCommand
+from .syntheticBags import (
+    bagNames,
+    childFrame,
+    createBagDirectory,
+    createOdometryBag,
+    createTwistBag,
+    odometryFrame,
+    topicNames,
+)
+
+EXPORT_CHECK_SIZE = 1000
+# small batches, so the rows of a batch have different lengths and span several batches
+EXPORT_CHECK_BATCH_SIZE = 300
+
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.realpath(__file__)), "results")
+
+Results = Dict[str, Dict[str, float]]
+
+
+def timeIt(
+    func: Callable[[], Any], repeat: int, setup: Optional[Callable[[], Any]] = None
+) -> float:
+    """
+    Run func repeat times and return the median duration in milliseconds
+
+    parameters
+    ----------
+    func: Callable[[], Any]
+        The measured function
+    repeat: int
+        Number of measurements
+    setup: Optional[Callable[[], Any]]
+        Run before every measurement, not measured
+    """
+
+    samples = []
+    for _ in range(repeat):
+        if setup is not None:
+            setup()
+        start = time.perf_counter()
+        func()
+        samples.append(time.perf_counter() - start)
+    return statistics.median(samples) * 1000
+
+
+def benchmarkCatalog(size: int, repeat: int, results: Results) -> None:
+    """
+    Benchmark loadDescriptionJson, addBag and removeBag on a directory with size bags
+    """
+
+    bagDir = os.path.join(tempfile.mkdtemp(prefix="rosbag_benchmark_"), "")
+    Constants.BAG_DIR_PATH = bagDir
+    jsonPath = os.path.join(bagDir, Constants.JSON_FILE_NAME)
+    try:
+        names = createBagDirectory(bagDir, size)
+        catalog = FileSystemInterface()
+
+        results.setdefault("catalog.loadDescriptionJson.cold", {})[str(size)] = timeIt(
+            catalog.loadDescriptionJson, repeat, lambda: os.remove(jsonPath)
+        )
+        results.setdefault("catalog.loadDescriptionJson.warm", {})[str(size)] = timeIt(
+            catalog.loadDescriptionJson, repeat
+        )
+
+        newNames = iter(bagNames(repeat, seed=1))
+        results.setdefault("catalog.addBag", {})[str(size)] = timeIt(
+            lambda: catalog.addBag(next(newNames), "benchmark"), repeat
+        )
+
+        removedNames = iter(names)
+        results.setdefault("catalog.removeBag", {})[str(size)] = timeIt(
+            lambda: catalog.removeBag(next(removedNames)), repeat
+        )
+    finally:
+        shutil.rmtree(bagDir)
+
+
+def benchmarkCommand(size: int, repeat: int, results: Results) -> None:
+    """
+    Benchmark generateRosBagRecordCommand with size topics
+    """
+
+    topics = topicNames(size)
+    results.setdefault("command.generate", {})[str(size)] = timeIt(
+        lambda: generateRosBagRecordCommand(topics, "benchmark", {"-d": "1m"}), repeat
+    )
+
+    selected = topics[1:]
+    results.setdefault("command.generateArgs.exclude", {})[str(size)] = timeIt(
+        lambda: generateRosBagRecordArgs(selected, "benchmark", {}, "", frozenset(topics)), repeat
+    )
+
+
+def syntheticMetadata(names: List[str]) -> Dict[str, BagMetadata]:
+    """
+    Metadata of synthetic bags, each with 10 of 40 topics
+    """
+
+    topics = topicNames(40)
+    return {
+        name: BagMetadata(
+            index, 0, 0, index * 10**9, topics[index % 30 : index % 30 + 10], list(range(1, 11))
+        )
+        for index, name in enumerate(names)
+    }
+
+
+def benchmarkSearch(size: int, repeat: int, results: Results) -> None:
+    """
+    Benchmark indexing size bags, a new search, the keystrokes refining it and a sort change
+    """
+
+    names = bagNames(size)
+    bags = {
+        name: {"name": name, "description": f"run {index % 97} on track"}
+        for index, name in enumerate(names)
+    }
+    metadata = syntheticMetadata(names)
+
+    index = BagSearchIndex()
+    results.setdefault("search.build", {})[str(size)] = timeIt(
+        lambda: index.build(bags, metadata), repeat
+    )
+    results.setdefault("search.query", {})[str(size)] = timeIt(
+        lambda: index.search("lidar"), repeat, lambda: index.build(bags, metadata)
+    )
+
+    def typeQuery() -> None:
+        query = "slam run 4"
+        for end in range(1, len(query) + 1):
+            index.search(query[:end])
+
+    results.setdefault("search.keystrokes", {})[str(size)] = timeIt(
+        typeQuery, repeat, lambda: index.build(bags, metadata)
+    )
+    results.setdefault("search.order", {})[str(size)] = timeIt(
+        lambda: index.order("size", descending=True), repeat
+    )
+
+
+def benchmarkTimeIndex(size: int, repeat: int, results: Results) -> None:
+    """
+    Benchmark indexing the times of size bags, recorded one per minute for up to 20 minutes,
+    and finding the bags that cover a time on a topic
+    """
+
+    names = bagNames(size)
+    topics = topicNames(40)
+    metadata = {
+        name: BagMetadata(
+            0, 0, (index * 60 + 1) * 10**9, (index * 60 + 1 + index % 1200) * 10**9, topics, []
+        )
+        for index, name in enumerate(names)
+    }
+
+    def build() -> BagTimeIndex:
+        index = BagTimeIndex(lambda names: metadata)
+        index.invalidate(names, [])
+        index.refresh()
+        return index
+
+    results.setdefault("timeIndex.build", {})[str(size)] = timeIt(build, repeat)
+    index = build()
+    middle = size * 30 * 10**9
+    results.setdefault("timeIndex.covering", {})[str(size)] = timeIt(
+        lambda: index.covering(middle, [topics[0]]), repeat
+    )
+
+
+def benchmarkStorage(size: int, repeat: int, results: Results) -> None:
+    """
+    Benchmark the disk usage totals of size bags, computed once and then kept up to date
+    """
+
+    names = bagNames(size)
+    bags = {
+        name: {"name": name.split("_")[0], "timestamp": "2023-01-01T00:00:00"} for name in names
+    }
+    metadata = syntheticMetadata(names)
+
+    stats = StorageStats()
+    results.setdefault("storage.build", {})[str(size)] = timeIt(
+        lambda: stats.build(bags, metadata), repeat
+    )
+
+    def updateBag() -> None:
+        stats.remove(names[0])
+        stats.add(names[0], bags[names[0]], metadata[names[0]])
+
+    results.setdefault("storage.update", {})[str(size)] = timeIt(updateBag, repeat)
+    results.setdefault("storage.usage.topic", {})[str(size)] = timeIt(
+        lambda: stats.usage("topic"), repeat
+    )
+
+
+class SyntheticBag:  # pylint: disable=R0903
+    """
+    Bag of size messages of one topic, one every millisecond
+    """
+
+    isCdr = True
+
+    def __init__(self, size: int) -> None:
+        self.size = size
+
+    def messages(self, topics: List[str], startTime: int = 0) -> Iterator[Message]:
+        """
+        The messages in time order
+        """
+        for index in range(self.size):
+            yield topics[0], startTime + index * 1_000_000, b"\0" * 64
+
+
+def benchmarkReplay(size: int, results: Results) -> None:
+    """
+    Replay size messages at 1 kHz at 5x, and report how late the messages were published in
+    milliseconds, rather than a duration
+    """
+
+    replay = BagReplay(SyntheticBag(size), ["/points"], lambda *_: None, rate=5.0)  # type: ignore
+    replay.start()
+    replay.wait()
+    stats = replay.stats
+    results.setdefault("replay.drift.max", {})[str(size)] = stats.maxDrift * 1000
+    results.setdefault("replay.drift.mean", {})[str(size)] = stats.meanDrift * 1000
+
+
+def benchmarkTableExport(size: int, repeat: int, results: Results) -> None:
+    """
+    Benchmark the export of size Twist messages to Parquet
+    """
+
+    directory = tempfile.mkdtemp()
+    try:
+        bagPath = os.path.join(directory, "twist")
+        tablesPath = os.path.join(directory, "tables")
+        createTwistBag(bagPath, size)
+        results.setdefault("export.parquet", {})[str(size)] = timeIt(
+            lambda: exportTables(bagPath, tablesPath, "parquet"),
+            repeat,
+            lambda: shutil.rmtree(tablesPath, ignore_errors=True),
+        )
+    finally:
+        shutil.rmtree(directory)
+
+
+def checkTableExport() -> None:
+    """
+    Export an Odometry bag to every table format and compare the tables with its messages
+
+    raises
+    ------
+    RuntimeError
+        If a table does not hold the messages of the bag
+    """
+
+    # pylint: disable=C0415
+    import pyarrow.ipc
+    import pyarrow.parquet
+
+    directory = tempfile.mkdtemp()
+    try:
+        bagPath = os.path.join(directory, "odom")
+        createOdometryBag(bagPath, EXPORT_CHECK_SIZE)
+        tables: Dict[str, Dict[str, List[Any]]] = {}
+        for tableFormat in ("parquet", "arrow", "csv"):
+            tablesPath = os.path.join(directory, tableFormat)
+            exportTables(bagPath, tablesPath, tableFormat, batchSize=EXPORT_CHECK_BATCH_SIZE)
+            path = os.path.join(tablesPath, f"odom.{tableFormat}")
+            if tableFormat == "parquet":
+                tables[tableFormat] = pyarrow.parquet.read_table(path).to_pydict()
+            elif tableFormat == "arrow":
+                with pyarrow.ipc.open_file(path) as reader:
+                    tables[tableFormat] = reader.read_all().to_pydict()
+            else:
+                with open(path, newline="", encoding="utf-8") as file:
+                    rows = list(csv.DictReader(file))
+                tables[tableFormat] = {key: [row[key] for row in rows] for key in rows[0]}
+    finally:
+        shutil.rmtree(directory)
+
+    errors = [
+        f"{tableFormat} row {index}"
+        for tableFormat, table in tables.items()
+        for index in range(EXPORT_CHECK_SIZE)
+        if len(table["header.frame_id"]) != EXPORT_CHECK_SIZE
+        or _odometryRow(table, index) != _expectedOdometryRow(index)
+    ]
+    if errors:
+        raise RuntimeError(f"The exported tables do not match the bag: {', '.join(errors[:5])}")
+
+
+def _odometryRow(table: Dict[str, List[Any]], index: int) -> List[Any]:
+    return [
+        int(table["header.stamp.sec"][index]),
+        int(table["header.stamp.nanosec"][index]),
+        table["header.frame_id"][index],
+        table["child_frame_id"][index],
+        float(table["pose.pose.position.y"][index]),
+        float(table["pose.covariance.35"][index]),
+        float(table["twist.twist.linear.x"][index]),
+        float(table["twist.twist.angular.z"][index]),
+    ]
+
+
+def _expectedOdometryRow(index: int) -> List[Any]:
+    return [
+        index,
+        index * 7,
+        odometryFrame(index),
+        childFrame(index),
+        2.0 * index,
+        0.5,
+        index / 10,
+        -1.0,
+    ]
+
+
+def benchmarkRendering(size: int, repeat: int, results: Results) -> None:
+    """
+    Benchmark populating the topic check list and the bag list with size items
+    """
+
+    # pylint: disable=C0415
+    import customtkinter as ctk
+    from src.components.scrollableCheckBoxFrame import ScrollableCheckBoxFrame
+    from src.components.scrollableLabelButtonFrame import ScrollableLabelButtonFrame
+
+    root = ctk.CTk()
+    try:
+        topics = topicNames(size)
+        checkBoxes = ScrollableCheckBoxFrame(root, items=[])
+
+        def populateTopics() -> None:
+            checkBoxes.addItems(topics)
+            root.update_idletasks()
+
+        results.setdefault("render.topicList", {})[str(size)] = timeIt(
+            populateTopics, repeat, checkBoxes.removeAllItems
+        )
+
+        bags = {
+            name: {"name": name.split("_")[0], "date": name.split("_")[1][:10], "description": ""}
+            for name in bagNames(size)
+        }
+        bagList = ScrollableLabelButtonFrame(root, {}, print, print)
+
+        def populateBags() -> None:
+            bagList.addItems(bags)
+            root.update_idletasks()
+
+        results.setdefault("render.bagList", {})[str(size)] = timeIt(
+            populateBags, repeat, bagList.clear
+        )
+    finally:
+        root.destroy()
+
+
+def loadPreviousResults() -> Optional[Dict[str, Any]]:
+    """
+    Load the most recent stored run
+    """
+
+    if not os.path.isdir(RESULTS_DIR):
+        return None
+
+    runs = sorted(name for name in os.listdir(RESULTS_DIR) if name.endswith(".json"))
+    if not runs:
+        return None
+
+    with open(os.path.join(RESULTS_DIR, runs[-1]), "r", encoding="utf-8") as file:
+        previous: Dict[str, Any] = json.load(file)
+    return previous
+
+
+def storeResults(results: Results) -> str:
+    """
+    Store the results of this run with the commit they were measured on
+
+    returns
+    -------
+    str
+        Path of the stored file
+    """
+
+    try:
+        commit = subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"], text=True, stderr=subprocess.DEVNULL
+        ).strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = ""
+
+    os.makedirs(RESULTS_DIR, exist_ok=True)
+    now = datetime.datetime.now()
+    path = os.path.join(RESULTS_DIR, f"{now.strftime('%Y-%m-%d-%H-%M-%S')}.json")
+    with open(path, "w", encoding="utf-8") as file:
+        json.dump({"date": now.isoformat(), "commit": commit, "results": results}, file, indent=4)
+    return path
+
+
+def printResults(results: Results, previous: Optional[Dict[str, Any]]) -> None:
+    """
+    Print the results next to the previous run
+    """
+
+    previousResults = previous["results"] if previous else {}
+    for case, sizes in results.items():
+        for size, duration in sizes.items():
+            line = f"{case:<36}{size:>8}{duration:>12.3f} ms"
+            before = previousResults.get(case, {}).get(size)
+            if before:
+                line += f"{(duration - before) / before * 100:>+10.1f}%"
+            print(line)
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    """
+    Run the benchmarks
+    """
+
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "--sizes", type=int, nargs="+", default=[100, 1000, 10000], help="catalog sizes"
+    )
+    parser.add_argument(
+        "--render-sizes", type=int, nargs="+", default=[100, 1000], help="rendered list sizes"
+    )
+    parser.add_argument("-n", "--repeat", type=int, default=5, help="measurements per case")
+    parser.add_argument("--no-store", action="store_true", help="do not store the results")
+    args = parser.parse_args(argv)
+
+    try:
+        checkTableFormat("parquet")
+        isExportAvailable = True
+    except ValueError as err:
+        sys.stderr.write(f"{err}, skipping the table export benchmarks\n")
+        isExportAvailable = False
+    if isExportAvailable:
+        checkTableExport()
+
+    results: Results = {}
+    for size in args.sizes:
+        benchmarkCatalog(size, args.repeat, results)
+        benchmarkCommand(size, args.repeat, results)
+        benchmarkSearch(size, args.repeat, results)
+        benchmarkTimeIndex(size, args.repeat, results)
+        benchmarkStorage(size, args.repeat, results)
+        benchmarkReplay(size, results)
+        if isExportAvailable:
+            benchmarkTableExport(size, args.repeat, results)
+
+    if os.environ.get("DISPLAY"):
+        for size in args.render_sizes:
+            benchmarkRendering(size, args.repeat, results)
+    else:
+        sys.stderr.write("No display available, skipping the rendering benchmarks\n")
+
+    printResults(results, loadPreviousResults())
+    if not args.no_store:
+        print(f"Results stored in {storeResults(results)}")
+
+
+if __name__ == "__main__":
+    main()
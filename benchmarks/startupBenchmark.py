@@ -0,0 +1,74 @@
+"""
+Measure the time to first paint of the GUI.
+Run from the repository root with `python -m benchmarks.startupBenchmark`, a display is needed
+"""
+
+import time
+
+START = time.perf_counter()
+
+# pylint: disable=C0413
+import os
+import sys
+import argparse
+import statistics
+import subprocess
+
+
+def measureOnce() -> None:
+    """
+    Start the GUI, print the time to first paint and to the record page being ready, then exit
+    The record page is built once the catalog is loaded in the background
+    """
+
+    # pylint: disable=C0415
+    from src.view import RosBagClientGui
+    from src.presenter import RosBagPresenter
+
+    importDone = time.perf_counter()
+    view = RosBagClientGui()
+    presenter = RosBagPresenter(view)
+    presenter.run()
+    view.update_idletasks()
+    firstPaint = time.perf_counter()
+
+    while presenter.recordPresenter is None:
+        view.update()
+    view.update_idletasks()
+    recordPageReady = time.perf_counter()
+
+    view.destroy()
+    print(f"{importDone - START} {firstPaint - START} {recordPageReady - START}")
+
+
+def main() -> None:
+    """
+    Run the measurement in fresh interpreters and print the median of each stage
+    """
+
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("-n", "--runs", type=int, default=5, help="number of runs")
+    parser.add_argument("--once", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.once:
+        measureOnce()
+        return
+
+    if not os.environ.get("DISPLAY"):
+        sys.exit("No display available, run under Xvfb e.g. `xvfb-run python -m ...`")
+
+    samples = []
+    for _ in range(args.runs):
+        output = subprocess.check_output(
+            [sys.executable, "-m", "benchmarks.startupBenchmark", "--once"], text=True
+        )
+        samples.append([float(value) for value in output.split()])
+
+    for index, stage in enumerate(["imports", "first paint", "record page ready"]):
+        median = statistics.median(sample[index] for sample in samples)
+        print(f"{stage:<20} {median * 1000:8.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,165 @@
+"""
+Generate synthetic bag directories for the benchmarks
+"""
+
+from typing import Iterable, List, Tuple
+
+import os
+import random
+import struct
+import sqlite3
+import datetime
+
+
+def bagNames(count: int, seed: int = 0) -> List[str]:
+    """
+    Generate bag names in the format written by the recorder
+
+    parameters
+    ----------
+    count: int
+        Number of names to generate
+    seed: int
+        Seed of the random prefixes and timestamps
+
+    returns
+    -------
+    List[str]
+        Unique bag names
+    """
+
+    rand = random.Random(seed)
+    prefixes = ["perception", "slam", "control", "planning", "lidar", "endurance", "skidpad"]
+    start = datetime.datetime(2023, 1, 1)
+
+    names = []
+    for index in range(count):
+        stamp = start + datetime.timedelta(seconds=index * 60 + rand.randint(0, 59))
+        names.append(f"{rand.choice(prefixes)}_{stamp.strftime('%d-%m-%Y-%H-%M-%S')}.bag")
+    return names
+
+
+def createBagDirectory(path: str, count: int) -> List[str]:
+    """
+    Fill a directory with empty bag files
+
+    returns
+    -------
+    List[str]
+        The created bag names
+    """
+
+    os.makedirs(path, exist_ok=True)
+    names = bagNames(count)
+    for name in names:
+        with open(os.path.join(path, name), "wb"):
+            pass
+    return names
+
+
+def topicNames(count: int) -> List[str]:
+    """
+    Generate topic names spread over the usual namespaces
+    """
+
+    namespaces = ["perception", "slam", "supervisor", "control", "planning", "lidar", "camera"]
+    return [f"/{namespaces[index % len(namespaces)]}/topic_{index}" for index in range(count)]
+
+
+def createTwistBag(path: str, count: int) -> None:
+    """
+    Write a rosbag2 directory with count geometry_msgs/msg/Twist messages on /cmd_vel, one
+    every millisecond
+    """
+
+    _writeRosbag2(
+        path,
+        "/cmd_vel",
+        "geometry_msgs/msg/Twist",
+        (
+            (index * 1_000_000, b"\0\x01\0\0" + struct.pack("<6d", index, 0, 0, 0, 0, 1))
+            for index in range(count)
+        ),
+    )
+
+
+def createOdometryBag(path: str, count: int) -> None:
+    """
+    Write a rosbag2 directory with count nav_msgs/msg/Odometry messages on /odom, one every
+    millisecond. The frame ids change length, message i has:
+    stamp (i, 7 i), frame_id odometryFrame(i), child_frame_id childFrame(i),
+    position (i, 2 i, 0), twist linear x i / 10, and covariances of 0.5 and 0.25
+    """
+
+    _writeRosbag2(
+        path,
+        "/odom",
+        "nav_msgs/msg/Odometry",
+        ((index * 1_000_000, _odometry(index)) for index in range(count)),
+    )
+
+
+def odometryFrame(index: int) -> str:
+    """
+    frame_id of the message index of createOdometryBag
+    """
+    return "odom" + "x" * (index % 3)
+
+
+def childFrame(index: int) -> str:
+    """
+    child_frame_id of the message index of createOdometryBag
+    """
+    return "base_link" if index % 2 else "bl"
+
+
+def _odometry(index: int) -> bytes:
+    """
+    Little endian CDR Odometry, aligned from the end of the encapsulation header
+    """
+
+    data = bytearray()
+
+    def align(size: int) -> None:
+        data.extend(b"\0" * (-len(data) % size))
+
+    def string(text: str) -> None:
+        encoded = text.encode("utf-8") + b"\0"
+        align(4)
+        data.extend(struct.pack("<I", len(encoded)) + encoded)
+
+    def doubles(*values: float) -> None:
+        align(8)
+        data.extend(struct.pack(f"<{len(values)}d", *values))
+
+    data.extend(struct.pack("<iI", index, index * 7))
+    string(odometryFrame(index))
+    string(childFrame(index))
+    doubles(index, 2 * index, 0, 0, 0, 0, 1)
+    doubles(*[0.5] * 36)
+    doubles(index / 10, 0, 0, 0, 0, -1)
+    doubles(*[0.25] * 36)
+    return b"\0\x01\0\0" + bytes(data)
+
+
+def _writeRosbag2(
+    path: str, topic: str, messageType: str, messages: Iterable[Tuple[int, bytes]]
+) -> None:
+    """
+    Write a single topic rosbag2 directory with the sqlite3 storage
+    """
+
+    os.makedirs(path)
+    with sqlite3.connect(os.path.join(path, os.path.basename(path) + "_0.db3")) as database:
+        database.execute(
+            "CREATE TABLE topics(id INTEGER PRIMARY KEY, name TEXT, type TEXT,"
+            " serialization_format TEXT, offered_qos_profiles TEXT)"
+        )
+        database.execute(
+            "CREATE TABLE messages(id INTEGER PRIMARY KEY, topic_id INTEGER,"
+            " timestamp INTEGER, data BLOB)"
+        )
+        database.execute("INSERT INTO topics VALUES (1, ?, ?, 'cdr', '')", (topic, messageType))
+        database.executemany(
+            "INSERT INTO messages(topic_id, timestamp, data) VALUES (1, ?, ?)", messages
+        )
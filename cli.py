@@ -0,0 +1,10 @@
+"""
+This file is used to run the program without a display.
+"""
+
+import sys
+
+import src.cli.cliMain
+
+if __name__ == "__main__":
+    sys.exit(src.cli.cliMain.main())
@@ -0,0 +1,557 @@
+"""
+Recorder agent: runs the recorder on the machine holding the bags, and exposes it to a GUI
+on another machine through a JSON HTTP API. Status, recorder output and catalog changes are
+streamed as server-sent events on /events.
+
+    GET    /status           {"recording", "bagName", "elapsed", "exitCode"}
+    GET    /topics           {"topics", "details"}, details has the type, publishers and QoS
+    POST   /record           {"name", "bagName", "args"}, args are the recorder arguments after -o
+    POST   /stop
+    POST   /preflight        {"topics", "duration"}
+    GET    /bags             the catalog
+    POST   /bags             {"name", "description", "gaps"}
+    DELETE /bags/<name>      moves the bag to the trash of the agent
+    GET    /files/<name>     {"isDirectory", "chunkSize", "files"}, the sha256 of every chunk
+    GET    /files/<name>/<path>  content of a file of the bag, supports Range requests
+    GET    /events           text/event-stream of log, status and catalog events
+"""
+
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+import os
+import re
+import hmac
+import hashlib
+import json
+import queue
+import threading
+import urllib.parse
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from ..constants import Constants
+from ..logic.bagRecorder import BagRecorder
+from ..logic.bagTrash import TrashReaper
+from ..logic.fileSystemInterface import FileSystemInterface
+from ..logic.recorderBackend import LocalBackend
+
+PUMP_PERIOD_S = 0.1
+KEEPALIVE_S = 15.0
+
+# recorder arguments a client may pass, anything else is rejected
+ALLOWED_OPTIONS = {
+    "-a",
+    "--all",
+    "-e",
+    "--regex",
+    "-x",
+    "--exclude",
+    "-d",
+    "--max-bag-duration",
+    "-b",
+    "--max-bag-size",
+    "-s",
+    "--storage",
+    "--compression-mode",
+    "--compression-format",
+    "--max-cache-size",
+}
+NAME_PATTERN = re.compile(r"^[a-zA-Z0-9_.-]+$")
+RANGE_PATTERN = re.compile(r"^bytes=(\d+)-(\d*)$")
+
+Event = Tuple[str, Dict[str, Any]]
+
+
+class AgentError(Exception):
+    """
+    A request the agent refuses, with the HTTP status to answer
+    """
+
+    def __init__(self, status: int, message: str) -> None:
+        super().__init__(message)
+        self.status = status
+
+
+class EventHub:
+    """
+    Fan out events to the connected /events streams
+    """
+
+    def __init__(self) -> None:
+        self._subscribers: List["queue.Queue[Event]"] = []
+        self._lock = threading.Lock()
+
+    def subscribe(self) -> "queue.Queue[Event]":
+        """
+        Register a stream, it gets every event published after this call
+        """
+
+        subscriber: "queue.Queue[Event]" = queue.Queue()
+        with self._lock:
+            self._subscribers.append(subscriber)
+        return subscriber
+
+    def unsubscribe(self, subscriber: "queue.Queue[Event]") -> None:
+        """
+        Forget a closed stream
+        """
+        with self._lock:
+            self._subscribers.remove(subscriber)
+
+    def publish(self, kind: str, data: Dict[str, Any]) -> None:
+        """
+        Send an event to every stream
+        """
+        with self._lock:
+            for subscriber in self._subscribers:
+                subscriber.put((kind, data))
+
+
+class RecorderAgent:  # pylint: disable=R0902
+    """
+    The recorder, the catalog and the event streams served by the agent
+    """
+
+    def __init__(self, token: str = "") -> None:
+        self.token = token
+        self.backend = LocalBackend()
+        self.catalog = FileSystemInterface()
+        self.events = EventHub()
+        self.recorder: Optional[BagRecorder] = None
+
+        self._lock = threading.Lock()
+        self._stopEvent = threading.Event()
+        self._checksums: Dict[Tuple[str, int, int], List[str]] = {}
+        self._watcher = self.backend.watchCatalog(self._onCatalogChanged)
+        self._reaper = TrashReaper(self.catalog.trash)
+
+    def start(self) -> None:
+        """
+        Start watching the bags directory, reaping the trash and forwarding the recorder output
+        """
+        self._watcher.start()
+        self._reaper.start()
+        threading.Thread(target=self._pumpOutput, name="agentOutput", daemon=True).start()
+
+    def stop(self) -> None:
+        """
+        Stop the recorder and the background threads
+        """
+
+        self._stopEvent.set()
+        self._watcher.stop()
+        self._reaper.stop()
+        with self._lock:
+            if self.recorder is not None and self.recorder.isAlive:
+                self.recorder.stop()
+
+    @property
+    def isStopping(self) -> bool:
+        """
+        True once stop was called, the event streams close
+        """
+        return self._stopEvent.is_set()
+
+    def status(self) -> Dict[str, Any]:
+        """
+        State of the recorder
+        """
+
+        with self._lock:
+            recorder = self.recorder
+        isRecording = recorder is not None and recorder.isAlive
+        return {
+            "recording": isRecording,
+            "bagName": recorder.bagName if recorder else "",
+            "elapsed": recorder.elapsed if recorder and isRecording else 0.0,
+            "exitCode": recorder.exitCode if recorder else None,
+        }
+
+    def record(self, name: str, bagName: str, args: List[str]) -> Dict[str, Any]:
+        """
+        Start recording to name in the bags directory of the agent
+        """
+
+        _checkBagName(name)
+        _checkBagName(bagName)
+        for arg in args:
+            if arg.startswith("-") and arg not in ALLOWED_OPTIONS:
+                raise AgentError(400, f"Option {arg} is not allowed")
+
+        with self._lock:
+            if self.recorder is not None and self.recorder.isAlive:
+                raise AgentError(409, f"Already recording {self.recorder.bagName}")
+
+            output = os.path.join(Constants.BAG_DIR_PATH, name)
+            recorder = self.backend.createRecorder(
+                ["ros2", "bag", "record", "-o", output] + args, bagName
+            )
+            try:
+                recorder.start()
+            except OSError as err:
+                raise AgentError(500, f"Could not start the recorder: {err}") from err
+            self.recorder = recorder
+
+        status = self.status()
+        self.events.publish("status", status)
+        return status
+
+    def stopRecording(self) -> Dict[str, Any]:
+        """
+        Stop the current recording
+        """
+
+        with self._lock:
+            if self.recorder is None or not self.recorder.isAlive:
+                raise AgentError(409, "Not recording")
+            self.recorder.stop()
+        return self.status()
+
+    def manifest(self, name: str) -> Dict[str, Any]:
+        """
+        Files of a bag with the checksum of each of their chunks, used to resume transfers.
+        The checksums are kept until the file changes.
+        """
+
+        root = self.resolveFile(name, "")
+        isDirectory = os.path.isdir(root)
+        if isDirectory:
+            paths = sorted(
+                os.path.relpath(os.path.join(directory, fileName), root)
+                for directory, _, fileNames in os.walk(root)
+                for fileName in fileNames
+            )
+        else:
+            paths = [""]
+
+        files = []
+        for path in paths:
+            fullPath = os.path.join(root, path) if isDirectory else root
+            stat = os.stat(fullPath)
+            key = (fullPath, stat.st_size, stat.st_mtime_ns)
+            with self._lock:
+                chunks = self._checksums.get(key)
+            if chunks is None:
+                chunks = _chunkChecksums(fullPath)
+                with self._lock:
+                    self._checksums[key] = chunks
+            files.append({"path": path, "size": stat.st_size, "chunks": chunks})
+
+        return {
+            "isDirectory": isDirectory,
+            "chunkSize": Constants.TRANSFER_CHUNK_BYTES,
+            "files": files,
+        }
+
+    def resolveFile(self, name: str, relativePath: str) -> str:
+        """
+        Path of a file of a bag, paths outside of the bag are refused
+        """
+
+        _checkBagName(name)
+        root = os.path.realpath(os.path.join(Constants.BAG_DIR_PATH, name))
+        path = os.path.realpath(os.path.join(root, relativePath)) if relativePath else root
+        if path != root and not path.startswith(root + os.sep):
+            raise AgentError(400, f"Invalid path {relativePath}")
+        if not os.path.exists(path):
+            raise AgentError(404, f"No file {relativePath or name}")
+        return path
+
+    def _pumpOutput(self) -> None:
+        """
+        Publish the recorder output, and a status event when the recorder exits
+        """
+
+        wasRecording = False
+        while not self._stopEvent.wait(PUMP_PERIOD_S):
+            with self._lock:
+                recorder = self.recorder
+            if recorder is None or recorder.outputReader is None:
+                continue
+
+            for line in recorder.outputReader.drain():
+                self.events.publish("log", {"line": line})
+
+            isRecording = recorder.isAlive
+            if wasRecording and not isRecording:
+                self.events.publish("status", self.status())
+            wasRecording = isRecording
+
+    def _onCatalogChanged(self, names: Set[str]) -> None:
+        added, removed = self.catalog.applyChanges(names)
+        self.events.publish("catalog", {"names": sorted(names), "added": added, "removed": removed})
+
+    def handle(self, method: str, path: str, body: Dict[str, Any]) -> Any:
+        """
+        Answer an API request
+
+        raises
+        ------
+        AgentError
+            If the request is refused
+        """
+
+        # pylint: disable=R0911
+        route = (method, path.split("/")[1] if "/" in path else path)
+        if route == ("GET", "status"):
+            return self.status()
+        if route == ("GET", "topics"):
+            try:
+                topics = self.backend.discoverTopics()
+                return {
+                    "topics": [topic.name for topic in topics],
+                    "details": [topic._asdict() for topic in topics],
+                }
+            except ConnectionError as err:
+                raise AgentError(502, str(err)) from err
+        if route == ("POST", "record"):
+            return self.record(body.get("name", ""), body.get("bagName", ""), body.get("args", []))
+        if route == ("POST", "stop"):
+            return self.stopRecording()
+        if route == ("POST", "preflight"):
+            report = self.backend.preflight(
+                Constants.BAG_DIR_PATH, body.get("topics", []), body.get("duration")
+            )
+            return report._asdict()
+        if route == ("GET", "bags"):
+            self.catalog.loadDescriptionJson()
+            return self.catalog.bagDescription
+        if route == ("POST", "bags"):
+            # only the bags of the bags directory are registered
+            name = body["name"]
+            self.resolveFile(name, "")
+            self.catalog.addBag(name, body.get("description", ""), body.get("gaps"))
+            return {}
+        if route == ("GET", "files"):
+            return self.manifest(_pathName(path))
+        if route == ("DELETE", "bags"):
+            name = _pathName(path)
+            _checkBagName(name)
+            if name not in self.catalog.bagDescription:
+                raise AgentError(404, f"No bag named {name}")
+            self.catalog.removeBag(name)
+            self._reaper.wake()
+            return {}
+        raise AgentError(404, f"No route {method} {path}")
+
+    def isAuthorized(self, header: Optional[str]) -> bool:
+        """
+        Check the bearer token of a request, every request is allowed if the agent has no token
+        """
+
+        if not self.token:
+            return True
+        return hmac.compare_digest(header or "", f"Bearer {self.token}")
+
+
+class AgentRequestHandler(BaseHTTPRequestHandler):
+    """
+    HTTP front of a RecorderAgent
+    """
+
+    # pylint: disable=C0103
+
+    server: "AgentServer"
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self) -> None:
+        """
+        Answer a GET request, /events is streamed
+        """
+        if self.path == "/events":
+            self._stream()
+        elif self.path.startswith("/files/") and self.path.count("/") > 2:
+            self._sendFile()
+        else:
+            self._answer("GET")
+
+    def do_POST(self) -> None:
+        """
+        Answer a POST request
+        """
+        self._answer("POST")
+
+    def do_DELETE(self) -> None:
+        """
+        Answer a DELETE request
+        """
+        self._answer("DELETE")
+
+    def log_message(self, format: str, *args: Any) -> None:  # pylint: disable=W0622
+        """
+        Keep the requests out of the agent output
+        """
+
+    def _answer(self, method: str) -> None:
+        agent = self.server.agent
+        length = int(self.headers.get("Content-Length", 0))
+        raw = self.rfile.read(length) if length else b""
+
+        if not agent.isAuthorized(self.headers.get("Authorization")):
+            self._send(401, {"error": "Unauthorized"})
+            return
+
+        try:
+            body = json.loads(raw) if raw else {}
+            self._send(200, agent.handle(method, self.path, body))
+        except AgentError as err:
+            self._send(err.status, {"error": str(err)})
+        except (ValueError, KeyError) as err:
+            self._send(400, {"error": f"Invalid request: {err}"})
+        except OSError as err:
+            self._send(500, {"error": str(err)})
+
+    def _send(self, status: int, payload: Any) -> None:
+        data = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _sendFile(self) -> None:
+        """
+        Send a file of a bag, or the requested range of it, without copying it in memory
+        """
+
+        agent = self.server.agent
+        if not agent.isAuthorized(self.headers.get("Authorization")):
+            self._send(401, {"error": "Unauthorized"})
+            return
+
+        try:
+            _, _, name, relativePath = self.path.split("/", 3)
+            path = agent.resolveFile(urllib.parse.unquote(name), urllib.parse.unquote(relativePath))
+            if os.path.isdir(path):
+                raise AgentError(400, f"{relativePath} is a directory")
+            size = os.path.getsize(path)
+            start, end = _parseRange(self.headers.get("Range"), size)
+        except AgentError as err:
+            self._send(err.status, {"error": str(err)})
+            return
+
+        with open(path, "rb") as file:
+            self.send_response(206 if self.headers.get("Range") else 200)
+            self.send_header("Content-Type", "application/octet-stream")
+            self.send_header("Content-Length", str(end - start))
+            self.send_header("Accept-Ranges", "bytes")
+            if self.headers.get("Range"):
+                self.send_header("Content-Range", f"bytes {start}-{end - 1}/{size}")
+            self.end_headers()
+            try:
+                self.connection.sendfile(file, start, end - start)
+            except (BrokenPipeError, ConnectionResetError):
+                self.close_connection = True  # pylint: disable=W0201
+
+    def _stream(self) -> None:
+        agent = self.server.agent
+        if not agent.isAuthorized(self.headers.get("Authorization")):
+            self._send(401, {"error": "Unauthorized"})
+            return
+
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Cache-Control", "no-cache")
+        self.send_header("Connection", "close")
+        self.end_headers()
+        self.close_connection = True  # pylint: disable=W0201
+
+        subscriber = agent.events.subscribe()
+        try:
+            self._write("status", agent.status())
+            while not agent.isStopping:
+                try:
+                    kind, data = subscriber.get(timeout=KEEPALIVE_S)
+                except queue.Empty:
+                    self.wfile.write(b": keepalive\n\n")
+                    self.wfile.flush()
+                    continue
+                self._write(kind, data)
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+        finally:
+            agent.events.unsubscribe(subscriber)
+
+    def _write(self, kind: str, data: Dict[str, Any]) -> None:
+        self.wfile.write(f"event: {kind}\ndata: {json.dumps(data)}\n\n".encode("utf-8"))
+        self.wfile.flush()
+
+
+class AgentServer(ThreadingHTTPServer):  # pylint: disable=R0901
+    """
+    Threaded HTTP server holding the agent
+    """
+
+    daemon_threads = True
+
+    def __init__(self, address: Tuple[str, int], agent: RecorderAgent) -> None:
+        super().__init__(address, AgentRequestHandler)
+        self.agent = agent
+
+
+def _pathName(path: str) -> str:
+    """
+    The bag name of a /route/<name> path
+
+    raises
+    ------
+    AgentError
+        If the path has no name
+    """
+
+    parts = path.split("/", 2)
+    if len(parts) < 3 or not parts[2]:
+        raise AgentError(400, f"No bag name in {path}")
+    return urllib.parse.unquote(parts[2])
+
+
+def _checkBagName(name: str) -> None:
+    """
+    Refuse the names that are not a plain file name of the bags directory
+
+    raises
+    ------
+    AgentError
+        If name is not a bag name
+    """
+
+    if not isinstance(name, str) or not NAME_PATTERN.match(name) or name in (".", ".."):
+        raise AgentError(400, f"Invalid bag name {name}")
+
+
+def _chunkChecksums(path: str) -> List[str]:
+    """
+    sha256 of every chunk of a file
+    """
+
+    checksums = []
+    with open(path, "rb") as file:
+        while True:
+            data = file.read(Constants.TRANSFER_CHUNK_BYTES)
+            if not data:
+                break
+            checksums.append(hashlib.sha256(data).hexdigest())
+    return checksums
+
+
+def _parseRange(header: Optional[str], size: int) -> Tuple[int, int]:
+    """
+    Start and end of the requested range, the end is excluded
+
+    raises
+    ------
+    AgentError
+        If the range is malformed or outside of the file
+    """
+
+    if not header:
+        return 0, size
+
+    match = RANGE_PATTERN.match(header.strip())
+    if match is None:
+        raise AgentError(416, f"Unsupported range {header}")
+
+    start = int(match.group(1))
+    end = min(int(match.group(2)) + 1, size) if match.group(2) else size
+    if start >= end:
+        raise AgentError(416, f"Range {header} outside of the file")
+    return start, end
@@ -0,0 +1,112 @@
+"""
+Headless implementation of the bag list page view
+"""
+
+from typing import AbstractSet, Any, Callable, Dict, List, Optional, Protocol, Set
+
+from .headlessLoop import HeadlessLoop
+
+
+class BagListPresenter(Protocol):
+    """
+    Bag List Presenter protocol
+    """
+
+    # pylint: disable=C0116
+
+    def handlePlayBag(self, name: str, event: Optional[Any] = None) -> None:
+        ...
+
+    def handleDeleteBag(self, name: str, event: Optional[Any] = None) -> None:
+        ...
+
+    def handleDownloadBag(self, name: str, event: Optional[Any] = None) -> None:
+        ...
+
+
+class BagListCliView:
+    """
+    Bag list view that keeps the bags in memory for the command line to print
+    """
+
+    # pylint: disable=W0613
+
+    def __init__(self, loop: HeadlessLoop) -> None:
+        self.loop = loop
+        self.bagsDescription: Dict[str, Any] = {}
+        self.matches: Optional[Set[str]] = None
+        self.transferStatus = ""
+        self.previews: Dict[str, str] = {}
+        self.bulkStatus = ""
+
+    def buildGUI(self, presenter: BagListPresenter, bagsDescription: Dict[str, Any]) -> None:
+        """
+        Nothing to build, only keep the initial bag list
+        """
+        self.bagsDescription = dict(bagsDescription)
+
+    def clearBagList(self) -> None:
+        """
+        Clear the bag list
+        """
+        self.bagsDescription = {}
+
+    def addBags(self, bagsDescription: Dict[str, Any]) -> None:
+        """
+        Add bags to the bag list
+        """
+        self.bagsDescription.update(bagsDescription)
+
+    def removeBags(self, names: List[str]) -> None:
+        """
+        Remove bags from the bag list
+        """
+        for name in names:
+            self.bagsDescription.pop(name, None)
+
+    def sortBags(self, names: List[str]) -> None:
+        """
+        Reorder the bag list
+        """
+        self.bagsDescription = {
+            name: self.bagsDescription[name] for name in names if name in self.bagsDescription
+        }
+
+    def filterBags(self, names: AbstractSet[str]) -> None:
+        """
+        Keep the names of the bags to show
+        """
+        self.matches = set(names)
+
+    def shownBags(self) -> Dict[str, Any]:
+        """
+        The bags matching the search, in the sort order
+        """
+
+        if self.matches is None:
+            return dict(self.bagsDescription)
+        return {name: bag for name, bag in self.bagsDescription.items() if name in self.matches}
+
+    def setTransferStatus(self, text: str) -> None:
+        """
+        Keep the progress of the downloads
+        """
+        self.transferStatus = text
+
+    def setPreview(self, name: str, text: str, thumbnail: str) -> None:
+        """
+        Keep the preview of a bag
+        """
+        self.previews[name] = text
+
+    def setBulkStatus(self, text: str) -> None:
+        """
+        Keep the progress of the bulk operation
+        """
+        self.bulkStatus = text
+
+    def after(self, time: int, func: Callable[..., None]) -> None:
+        """
+        Schedule func on the headless loop
+        """
+        self.loop.after(time, func)
@@ -0,0 +1,728 @@
+"""
+Headless command line front end, reuses the page presenters without importing any GUI module.
+"""
+
+from typing import Any, Dict, List, Optional, Tuple
+
+import os
+import sys
+import json
+import signal
+import argparse
+import datetime
+import threading
+
+import psutil
+from .headlessLoop import HeadlessLoop
+from .recordCliView import RecordCliView
+from .bagListCliView import BagListCliView
+from .storageCliView import StorageCliView
+from ..constants import Constants
+from ..logic.bagReader import BagFormatError, openBag
+from ..logic.bagReplay import BagReplay, createPublisher
+from ..logic.bagSearch import SORT_COLUMNS
+from ..logic.bagTimeIndex import BagSpan, formatTime, parseTime
+from ..logic.bagTrash import BagTrash
+from ..logic.storageStats import STORAGE_VIEWS
+from ..logic.tableExport import TABLE_FORMATS
+from ..logic.bagTransfer import BagTransfer, parseRate
+from ..logic.bagMetadata import bagSize
+from ..logic.fileSystemInterface import FileSystemInterface
+from ..logic.profiler import PROFILER
+from ..logic.recorderBackend import LocalBackend, createBackend
+from ..logic.remoteBackend import RemoteBackend
+from ..logic.recordingProfiles import ProfileStore
+from ..pages.recordFrame.recordPresenter import RecordPresenter
+from ..pages.bagListFrame.bagListPresenter import BagListPresenter
+from ..pages.storageFrame.storagePresenter import StoragePresenter
+
+POLL_PERIOD_MS = 200
+TRANSFER_POLL_PERIOD_MS = 1000
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """
+    Entry point of the command line interface
+
+    parameters
+    ----------
+    argv: Optional[List[str]]
+        Command line arguments, defaults to sys.argv[1:]
+
+    returns
+    -------
+    int
+        The exit code
+    """
+
+    args = _buildParser().parse_args(argv)
+    if args.profile:
+        PROFILER.enable(args.profile)
+
+    try:
+        return int(args.func(args))
+    except ConnectionError as err:
+        # raised by the remote backend when the recorder agent is unreachable
+        sys.stderr.write(f"{err}\n")
+        return 1
+
+
+def _buildParser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="rosbag-client", description=__doc__)
+    parser.add_argument(
+        "--profile", metavar="TRACE", default="", help="write timing spans to a Chrome trace file"
+    )
+    parser.add_argument(
+        "--agent",
+        metavar="URL",
+        default="",
+        help="record and manage the bags of the recorder agent at URL",
+    )
+    subparsers = parser.add_subparsers(required=True, metavar="command")
+
+    recordParser = subparsers.add_parser("record", help="record a bag until stopped")
+    recordParser.add_argument("prefix", help="prefix of the bag name")
+    recordParser.add_argument("topics", nargs="*", help="topics to record")
+    recordParser.add_argument(
+        "-s",
+        "--select",
+        default="none",
+        help="select discovered topics: all, a recording profile or a name to match",
+    )
+    recordParser.add_argument("-d", "--duration", default="", help="e.g. 30, 1m, 2h")
+    recordParser.add_argument("-m", "--description", default="", help="bag description")
+    recordParser.add_argument(
+        "--no-preflight", action="store_true", help="skip the output disk check"
+    )
+    recordParser.add_argument(
+        "--restarts",
+        type=int,
+        default=None,
+        help="restart a failed or stalled recorder into a new segment up to RESTARTS times",
+    )
+    recordParser.add_argument(
+        "--snapshot",
+        nargs="?",
+        const="",
+        default=None,
+        metavar="TRIGGER",
+        help="buffer the topics in memory and write a bag when a message is received on "
+        "TRIGGER or on SIGUSR1",
+    )
+    recordParser.set_defaults(func=_record)
+
+    scheduleParser = subparsers.add_parser("schedule", help="run the scheduled recordings")
+    scheduleParser.add_argument("jobs", nargs="*", help="jobs to run, defaults to all of them")
+    scheduleParser.add_argument("--file", default="", help="schedule file")
+    scheduleParser.set_defaults(func=_schedule)
+
+    profilesParser = subparsers.add_parser("profiles", help="list the recording profiles")
+    profilesParser.set_defaults(func=_profiles)
+
+    stopParser = subparsers.add_parser("stop", help="stop the running recordings")
+    stopParser.set_defaults(func=_stop)
+
+    _addListParsers(subparsers)
+
+    storageParser = subparsers.add_parser("storage", help="show the disk usage of the bags")
+    storageParser.add_argument(
+        "--by", choices=STORAGE_VIEWS, default="prefix", help="usage by prefix, day or topic"
+    )
+    storageParser.add_argument("--top", type=int, default=0, help="only the first TOP rows")
+    storageParser.set_defaults(func=_storage)
+
+    _addPlayParser(subparsers)
+    _addBulkParsers(subparsers)
+
+    pullParser = subparsers.add_parser("pull", help="download a bag of the recorder agent")
+    pullParser.add_argument("name", help="name of the bag as listed by the agent")
+    pullParser.add_argument(
+        "--limit", default=Constants.TRANSFER_LIMIT, help="bandwidth limit, e.g. 500K, 10M"
+    )
+    pullParser.add_argument(
+        "--workers", type=int, default=Constants.TRANSFER_WORKERS, help="parallel range requests"
+    )
+    pullParser.set_defaults(func=_pull)
+
+    agentParser = subparsers.add_parser("agent", help="serve the recorder to remote clients")
+    agentParser.add_argument("--host", default="127.0.0.1", help="address to listen on")
+    agentParser.add_argument(
+        "--port", type=int, default=Constants.AGENT_PORT, help="port to listen on"
+    )
+    agentParser.set_defaults(func=_agent)
+
+    return parser
+
+
+def _addListParsers(subparsers: "argparse._SubParsersAction[argparse.ArgumentParser]") -> None:
+    """
+    The listing of the bags and the details of a bag
+    """
+
+    listParser = subparsers.add_parser("list", help="list the available bags")
+    listParser.add_argument("--json", action="store_true", help="print the catalog as json")
+    listParser.add_argument(
+        "--search", default="", help="only the bags with words starting with every word of SEARCH"
+    )
+    listParser.add_argument("--sort", choices=SORT_COLUMNS, default="date", help="sort order")
+    listParser.add_argument("--reverse", action="store_true", help="sort in descending order")
+    _addTimeArguments(listParser, "only the bags recorded from WINDOW seconds before to after AT")
+    listParser.add_argument(
+        "--topics", nargs="+", help="with --at, only the bags that recorded one of TOPICS"
+    )
+    listParser.set_defaults(func=_list)
+
+    infoParser = subparsers.add_parser("info", help="show the details of a bag")
+    infoParser.add_argument("name", help="name of the bag as listed")
+    infoParser.set_defaults(func=_info)
+
+
+def _addTimeArguments(parser: argparse.ArgumentParser, description: str) -> None:
+    """
+    The --at and --window arguments of the commands that find the bags of a time window
+    """
+
+    parser.add_argument("--at", metavar="TIME", help=description + ", e.g. 2026-10-19T14:03:12")
+    parser.add_argument(
+        "--window",
+        type=float,
+        default=Constants.TIME_WINDOW_S,
+        help=f"seconds around AT, {Constants.TIME_WINDOW_S:g} by default",
+    )
+
+
+def _addPlayParser(subparsers: "argparse._SubParsersAction[argparse.ArgumentParser]") -> None:
+    """
+    The replay of a bag
+    """
+
+    playParser = subparsers.add_parser("play", help="replay a bag on its topics")
+    playParser.add_argument(
+        "name", nargs="?", help="name of the bag as listed, defaults to the bag recorded at AT"
+    )
+    playParser.add_argument("topics", nargs="*", help="topics to replay, defaults to all")
+    _addTimeArguments(playParser, "start the replay WINDOW seconds before AT")
+    playParser.add_argument(
+        "-r", "--rate", type=float, default=Constants.REPLAY_RATE, help="e.g. 2 for twice as fast"
+    )
+    playParser.add_argument(
+        "--dry-run", action="store_true", help="schedule the messages without publishing them"
+    )
+    playParser.set_defaults(func=_play)
+
+
+def _addBulkParsers(subparsers: "argparse._SubParsersAction[argparse.ArgumentParser]") -> None:
+    """
+    The commands applied to a selection of bags, and the trash of the deleted bags
+    """
+
+    deleteParser = subparsers.add_parser("delete", help="move bags to the trash")
+    deleteParser.add_argument("names", nargs="+", help="names of the bags as listed")
+    deleteParser.set_defaults(
+        func=_bulk, action="delete", to="", tableFormat="", topics=None, at=None
+    )
+
+    for action, verb in (
+        ("move", "move bags to another directory"),
+        ("compress", "archive bags as .tar.gz in another directory, then delete them"),
+        ("export", "copy bags to another directory"),
+    ):
+        bulkParser = subparsers.add_parser(action, help=verb)
+        bulkParser.add_argument("names", nargs="+", help="names of the bags as listed")
+        bulkParser.add_argument("--to", required=True, help="destination directory")
+        bulkParser.set_defaults(func=_bulk, action=action, tableFormat="", topics=None, at=None)
+
+    convertParser = subparsers.add_parser(
+        "convert", help="write the numeric topics of bags as tables, one file per topic"
+    )
+    convertParser.add_argument(
+        "names", nargs="*", help="names of the bags as listed, defaults to the bags of the window"
+    )
+    convertParser.add_argument(
+        "--to", required=True, help="destination directory, a directory is created per bag"
+    )
+    convertParser.add_argument(
+        "--format",
+        dest="tableFormat",
+        choices=TABLE_FORMATS,
+        default=Constants.EXPORT_FORMAT,
+        help="format of the tables, parquet by default",
+    )
+    convertParser.add_argument(
+        "--topics", nargs="+", help="topics to convert, every supported topic by default"
+    )
+    _addTimeArguments(convertParser, "only the messages from WINDOW seconds before to after AT")
+    convertParser.set_defaults(func=_bulk, action="convert")
+
+    trashParser = subparsers.add_parser("trash", help="list, restore or empty the deleted bags")
+    trashParser.add_argument(
+        "--restore", nargs="+", default=[], metavar="NAME", help="move bags back from the trash"
+    )
+    trashParser.add_argument(
+        "--empty", action="store_true", help="delete the bags of the trash for good"
+    )
+    trashParser.set_defaults(func=_trash)
+
+
+def _record(args: argparse.Namespace) -> int:
+    loop = HeadlessLoop()
+    view = RecordCliView(
+        loop, args.prefix, args.duration, args.description, args.select, args.snapshot
+    )
+    backend = createBackend(args.agent)
+    presenter = RecordPresenter(view, backend.createCatalog(), backend=backend)
+    presenter.preflightEnabled = not args.no_preflight
+    if args.restarts is not None:
+        presenter.maxRestarts = args.restarts
+
+    if args.select != "none":
+        presenter.run()
+        loop.run()
+        presenter.handleCheckTopicsByDropDownList()
+    else:
+        view.buildGUI(presenter, [])
+    view.checkTopics(args.topics)
+
+    presenter.handleStartRecord()
+    isSnapshot = presenter.snapshotRecorder is not None
+
+    def stop(*_: Any) -> None:
+        # not SIG_IGN, a recorder still starting would inherit it and ignore its interrupt
+        signal.signal(signal.SIGINT, lambda *_: None)
+        signal.signal(signal.SIGTERM, lambda *_: None)
+        # poll quits once the recorder stopped and the bags are registered
+        presenter.handleStopRecord()
+
+    def poll() -> None:
+        if presenter.isRecording:
+            loop.after(POLL_PERIOD_MS, poll)
+        else:
+            # the recorder could not start, or the recording ended
+            loop.quit()
+
+    signal.signal(signal.SIGINT, stop)
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGUSR1, lambda *_: presenter.handleSnapshotTrigger())
+    loop.after(POLL_PERIOD_MS, poll)
+    loop.run()
+
+    if presenter.recorder is None and not isSnapshot:
+        sys.stderr.write(view.command + "\n")
+        return 1
+    if presenter.recordingFailure:
+        return 1
+
+    return 0
+
+
+def _schedule(args: argparse.Namespace) -> int:
+    # pylint: disable=C0415
+    from ..logic.recordingScheduler import RecordingScheduler, loadSchedule
+
+    jobs = loadSchedule(args.file)
+    if args.jobs:
+        jobs = [job for job in jobs if job.name in args.jobs]
+    if not jobs:
+        sys.stderr.write(f"No scheduled recording in {args.file or Constants.SCHEDULE_PATH}\n")
+        return 1
+
+    loop = HeadlessLoop()
+    backend = createBackend(args.agent)
+    model = backend.createCatalog()
+    scheduler = RecordingScheduler(loop, jobs, print, model.addBag, backend=backend)
+
+    def stop(*_: Any) -> None:
+        signal.signal(signal.SIGINT, lambda *_: None)
+        signal.signal(signal.SIGTERM, lambda *_: None)
+        scheduler.stop()
+        # poll quits once the last recorder started is stopped and its bag registered
+        loop.after(POLL_PERIOD_MS, poll)
+
+    def poll() -> None:
+        if scheduler.isStarting or scheduler.finishingCount:
+            loop.after(POLL_PERIOD_MS, poll)
+        else:
+            loop.quit()
+
+    signal.signal(signal.SIGINT, stop)
+    signal.signal(signal.SIGTERM, stop)
+    scheduler.start()
+    loop.run()
+
+    return 0
+
+
+def _profiles(_: argparse.Namespace) -> int:
+    for profile in ProfileStore().profiles.values():
+        print(f"{profile.name:<20} include: {' '.join(profile.include)}")
+        if profile.exclude:
+            print(f"{'':<20} exclude: {' '.join(profile.exclude)}")
+        if profile.options:
+            options = " ".join(f"{key} {value}" for key, value in profile.options.items())
+            print(f"{'':<20} options: {options}")
+        if profile.outputRoot:
+            print(f"{'':<20} output:  {profile.outputRoot}")
+    return 0
+
+
+def _stop(args: argparse.Namespace) -> int:
+    backend = createBackend(args.agent)
+    if isinstance(backend, RemoteBackend):
+        try:
+            backend.client.request("POST", "/stop")
+        except ConnectionError as err:
+            sys.stderr.write(f"{err}\n")
+            return 1
+        print("Stopped 1 recording(s)")
+        return 0
+
+    stopped = 0
+    for proc in psutil.process_iter(["cmdline"]):
+        cmdline = proc.info["cmdline"] or []
+        if _isRecordCommand(cmdline):
+            proc.send_signal(signal.SIGINT)
+            stopped += 1
+
+    print(f"Stopped {stopped} recording(s)")
+    return 0
+
+
+def _isRecordCommand(cmdline: List[str]) -> bool:
+    """
+    Check if the command line is a ros2 bag record writing to the bags directory
+    """
+
+    if "bag" not in cmdline or "record" not in cmdline or "-o" not in cmdline:
+        return False
+
+    outputIndex = cmdline.index("-o") + 1
+    return outputIndex < len(cmdline) and cmdline[outputIndex].startswith(Constants.BAG_DIR_PATH)
+
+
+def _loadBags(agent: str) -> Dict[str, Any]:
+    loop = HeadlessLoop()
+    view = BagListCliView(loop)
+    backend = createBackend(agent)
+    BagListPresenter(view, backend.createCatalog(), backend).run()
+    loop.run()
+    return view.bagsDescription
+
+
+def _list(args: argparse.Namespace) -> int:
+    loop = HeadlessLoop()
+    view = BagListCliView(loop)
+    backend = createBackend(args.agent)
+    presenter = BagListPresenter(view, backend.createCatalog(), backend)
+    presenter.run()
+    loop.run()
+
+    presenter.handleSort(args.sort, args.reverse)
+    presenter.handleSearch(args.search)
+    bags = view.shownBags()
+
+    spans: Dict[str, BagSpan] = {}
+    if args.at:
+        try:
+            spans = {
+                span.name: span
+                for span in presenter.model.timeIndex.overlapping(*_timeWindow(args), args.topics)
+                if span.name in bags
+            }
+        except ValueError as err:
+            sys.stderr.write(f"{err}\n")
+            return 1
+        # in recording order
+        bags = {name: bags[name] for name in spans}
+
+    if args.json:
+        print(json.dumps(bags, indent=4))
+        return 0
+
+    for name, bag in bags.items():
+        if name in spans:
+            recorded = f"{formatTime(spans[name].startTime)} - {formatTime(spans[name].endTime)}"
+            print(f"{name:<40} {recorded:<43} {bag['description']}")
+        else:
+            print(f"{name:<40} {bag['date']:<12} {bag['description']}")
+    return 0
+
+
+def _timeWindow(args: argparse.Namespace) -> Tuple[int, int]:
+    """
+    The time window of the --at and --window arguments, in nanoseconds since the epoch
+
+    raises
+    ------
+    ValueError
+        If --at is not a time
+    """
+
+    time = parseTime(args.at)
+    window = int(args.window * 1e9)
+    return time - window, time + window
+
+
+def _info(args: argparse.Namespace) -> int:
+    # pylint: disable=C0415
+    from ..logic.bagPreview import loadPreview
+
+    bags = _loadBags(args.agent)
+    if args.name not in bags:
+        sys.stderr.write(f"No bag named {args.name}\n")
+        return 1
+
+    path = os.path.join(Constants.BAG_DIR_PATH, args.name)
+    print(f"name:        {bags[args.name]['name']}")
+    print(f"date:        {bags[args.name]['date']}")
+    if bags[args.name].get("timestamp"):
+        print(f"recorded:    {bags[args.name]['timestamp'].replace('T', ' ')}")
+    if bags[args.name].get("split") is not None:
+        print(f"split:       {bags[args.name]['split']}")
+    print(f"description: {bags[args.name]['description']}")
+    print(f"path:        {path}")
+    if isinstance(createBackend(args.agent), LocalBackend):
+        print(f"size:        {bagSize(path)} bytes")
+        try:
+            preview = loadPreview(path)
+        except (BagFormatError, OSError) as err:
+            print(f"preview:     {err}")
+            return 0
+        print(f"duration:    {preview.duration:.1f} s")
+        if preview.thumbnail:
+            print(f"thumbnail:   {preview.thumbnail}")
+        print(preview.sparklines())
+    return 0
+
+
+def _storage(args: argparse.Namespace) -> int:
+    loop = HeadlessLoop()
+    view = StorageCliView(loop)
+    backend = createBackend(args.agent)
+    presenter = StoragePresenter(view, backend.createCatalog(), backend)
+    presenter.run()
+    loop.run()
+
+    presenter.handleSelectView(args.by)
+    header, *rows = view.lines
+    if args.top:
+        rows = rows[: args.top]
+    print(view.status)
+    print("\n".join([header] + rows))
+    return 0
+
+
+def _play(args: argparse.Namespace) -> int:
+    if not isinstance(createBackend(args.agent), LocalBackend):
+        sys.stderr.write("Cannot replay the bags of a recorder agent, pull them first\n")
+        return 1
+
+    try:
+        name, topics, startTime = _playTarget(args)
+        bag = openBag(os.path.join(Constants.BAG_DIR_PATH, name))
+        topics = topics or list(bag.index().topics)
+        publisher = None if args.dry_run else createPublisher(bag, topics)
+    except (OSError, ValueError) as err:
+        # a BagFormatError is a ValueError
+        sys.stderr.write(f"Cannot replay: {err}\n")
+        return 1
+    except ImportError:
+        sys.stderr.write("Publishing needs rclpy, --dry-run only schedules the messages\n")
+        return 1
+
+    replay = BagReplay(
+        bag, topics, publisher.publish if publisher else lambda *_: None, args.rate, startTime
+    )
+    loop = HeadlessLoop()
+
+    def poll() -> None:
+        if replay.isAlive:
+            print(replay.stats.describe())
+            loop.after(TRANSFER_POLL_PERIOD_MS, poll)
+
+    signal.signal(signal.SIGINT, lambda *_: replay.stop())
+    signal.signal(signal.SIGTERM, lambda *_: replay.stop())
+    replay.start()
+    loop.after(TRANSFER_POLL_PERIOD_MS, poll)
+    loop.run()
+    replay.wait()
+    if publisher is not None:
+        publisher.close()
+
+    stats = replay.stats
+    print(f"Replayed {name}: {stats.describe()}")
+    if replay.error is not None:
+        sys.stderr.write(f"Replay stopped: {replay.error}\n")
+        return 1
+    if stats.late:
+        sys.stderr.write(
+            f"{stats.late} messages were late, the replay cannot sustain {args.rate}x\n"
+        )
+        return 1
+    return 0
+
+
+def _playTarget(args: argparse.Namespace) -> Tuple[str, List[str], int]:
+    """
+    The bag, topics and start time of a replay, with --at the bag recorded at that time on
+    the topics unless a bag is named
+
+    raises
+    ------
+    ValueError
+        If no bag is named or recorded at the time
+    """
+
+    name, topics = args.name, list(args.topics)
+    if name is not None and name.startswith("/"):
+        # with --at the bag can be left out, the first argument is then a topic
+        name, topics = None, [name] + topics
+
+    if not args.at:
+        if name is None:
+            raise ValueError("Name a bag, or a time with --at")
+        return name, topics, 0
+
+    startTime, _ = _timeWindow(args)
+    if name is None:
+        time = parseTime(args.at)
+        spans = FileSystemInterface().timeIndex.covering(time, topics or None)
+        if not spans:
+            raise ValueError(f"No bag recorded at {formatTime(time)}")
+        name = spans[0].name
+    return name, topics, max(startTime, 0)
+
+
+def _bulk(args: argparse.Namespace) -> int:
+    loop = HeadlessLoop()
+    view = BagListCliView(loop)
+    backend = createBackend(args.agent)
+    presenter = BagListPresenter(view, backend.createCatalog(), backend)
+    presenter.run()
+    loop.run()
+
+    names, timeRange = args.names, None
+    if args.at:
+        try:
+            timeRange = _timeWindow(args)
+        except ValueError as err:
+            sys.stderr.write(f"{err}\n")
+            return 1
+        names = names or [
+            span.name for span in presenter.model.timeIndex.overlapping(*timeRange, args.topics)
+        ]
+        if not names:
+            sys.stderr.write(f"No bag recorded around {args.at}\n")
+            return 1
+    elif not names:
+        sys.stderr.write("Name the bags, or a time with --at\n")
+        return 1
+
+    missing = [name for name in names if name not in view.bagsDescription]
+    if missing:
+        sys.stderr.write(f"No bag named {', '.join(missing)}\n")
+        return 1
+
+    presenter.handleBulkAction(
+        args.action,
+        names,
+        os.path.abspath(args.to) if args.to else "",
+        args.tableFormat or Constants.EXPORT_FORMAT,
+        args.topics,
+        timeRange,
+    )
+    loop.run()
+
+    result = presenter.bulkResult
+    if result is None:
+        sys.stderr.write(f"{view.bulkStatus}\n")
+        return 1
+    for name, error in result.errors.items():
+        sys.stderr.write(f"{name}: {error}\n")
+    print(result.describe())
+
+    if result.action == "delete" and presenter.canUndo:
+        # no reaper runs after the command, apply the trash policy now
+        presenter.model.trash.reap()
+    return 1 if result.errors else 0
+
+
+def _trash(args: argparse.Namespace) -> int:
+    if isinstance(createBackend(args.agent), RemoteBackend):
+        sys.stderr.write("The recorder agent empties its own trash\n")
+        return 1
+
+    if args.restore:
+        loop = HeadlessLoop()
+        view = BagListCliView(loop)
+        presenter = BagListPresenter(view, FileSystemInterface())
+        presenter.handleRestoreBags(args.restore)
+        loop.run()
+
+        result = presenter.bulkResult
+        if result is None:
+            sys.stderr.write(f"{view.bulkStatus}\n")
+            return 1
+        for name, error in result.errors.items():
+            sys.stderr.write(f"{name}: {error}\n")
+        print(result.describe())
+        return 1 if result.errors else 0
+
+    trash = BagTrash()
+    if args.empty:
+        purged = trash.reap(maxAge=-1)
+        print(f"Deleted {len(purged)} bags for good")
+        return 0
+
+    for trashed in trash.list():
+        deletedAt = datetime.datetime.fromtimestamp(trashed.deletedAt).strftime("%d-%m-%Y %H:%M")
+        print(f"{trashed.name:<40} deleted {deletedAt}  {trash.size(trashed)} bytes")
+    return 0
+
+
+def _pull(args: argparse.Namespace) -> int:
+    backend = createBackend(args.agent)
+    if not isinstance(backend, RemoteBackend):
+        sys.stderr.write("pull needs a recorder agent, use --agent or ROSBAG_AGENT_URL\n")
+        return 1
+
+    transfer = BagTransfer(
+        backend.client, args.name, FileSystemInterface(), args.workers, parseRate(args.limit)
+    )
+    loop = HeadlessLoop()
+
+    def poll() -> None:
+        print(transfer.progress.describe())
+        if not transfer.isFinished:
+            loop.after(TRANSFER_POLL_PERIOD_MS, poll)
+
+    signal.signal(signal.SIGINT, lambda *_: transfer.cancel())
+    signal.signal(signal.SIGTERM, lambda *_: transfer.cancel())
+    transfer.start()
+    loop.after(TRANSFER_POLL_PERIOD_MS, poll)
+    loop.run()
+
+    return 0 if transfer.progress.state == "done" else 1
+
+
+def _agent(args: argparse.Namespace) -> int:
+    # pylint: disable=C0415
+    from ..agent.recorderAgent import AgentServer, RecorderAgent
+
+    agent = RecorderAgent(Constants.AGENT_TOKEN)
+    server = AgentServer((args.host, args.port), agent)
+
+    def stop(*_: Any) -> None:
+        signal.signal(signal.SIGINT, signal.SIG_IGN)
+        signal.signal(signal.SIGTERM, signal.SIG_IGN)
+        agent.stop()
+        # shutdown waits for serve_forever, which runs on this thread
+        threading.Thread(target=server.shutdown, daemon=True).start()
+
+    signal.signal(signal.SIGINT, stop)
+    signal.signal(signal.SIGTERM, stop)
+    agent.start()
+    print(f"Recorder agent listening on http://{args.host}:{args.port}")
+    sys.stdout.flush()
+    server.serve_forever()
+    server.server_close()
+    return 0
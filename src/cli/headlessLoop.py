@@ -0,0 +1,58 @@
+"""
+Minimal event loop used in place of the Tk mainloop when running without a display
+"""
+
+from typing import Any, Callable, List, Tuple
+
+import heapq
+import itertools
+import time
+
+
+class HeadlessLoop:
+    """
+    Single threaded event loop that mimics the `after` scheduling of Tk widgets
+    """
+
+    def __init__(self) -> None:
+        self._queue: List[Tuple[float, int, Callable[..., Any]]] = []
+        self._counter = itertools.count()
+        self._running = False
+
+    def after(self, time: int, func: Callable[..., Any]) -> None:  # pylint: disable=W0621
+        """
+        Schedule func to be called after the given time
+
+        parameters
+        ----------
+        time: int
+            Delay in milliseconds
+        func: Callable[..., Any]
+            Callback to run
+        """
+        heapq.heappush(self._queue, (_now() + time / 1000, next(self._counter), func))
+
+    def quit(self) -> None:
+        """
+        Stop the loop after the current callback returns
+        """
+        self._running = False
+
+    def run(self) -> None:
+        """
+        Run scheduled callbacks until quit is called or nothing is left to run
+        """
+
+        self._running = True
+        while self._running and self._queue:
+            deadline, _, func = self._queue[0]
+            delay = deadline - _now()
+            if delay > 0:
+                time.sleep(delay)
+                continue
+            heapq.heappop(self._queue)
+            func()
+
+
+def _now() -> float:
+    return time.monotonic()
@@ -0,0 +1,206 @@
+"""
+Headless implementation of the record page view
+"""
+
+from typing import Any, Callable, List, Optional, Protocol, Set
+
+import sys
+
+from .headlessLoop import HeadlessLoop
+
+
+class RecordPresenter(Protocol):  # pylint: disable=R0903
+    """
+    Record Presenter protocol
+    """
+
+    # pylint: disable=C0116
+
+    def handleGenerateCommand(self, event: Optional[Any] = None) -> None:
+        ...
+
+
+class RecordCliView:
+    """
+    Record view that writes to stdout instead of drawing widgets
+    """
+
+    # pylint: disable=R0902,R0904,W0613
+
+    def __init__(  # pylint: disable=R0913
+        self,
+        loop: HeadlessLoop,
+        prefix: str,
+        duration: str = "",
+        description: str = "",
+        selection: str = "none",
+        trigger: Optional[str] = None,
+    ) -> None:
+        self.loop = loop
+        self.description = description
+        self.isRecording = False
+
+        self._prefix = prefix
+        self._duration = duration
+        self._selection = selection
+        self._trigger = trigger
+        self._command = ""
+        self._topics: List[str] = []
+        self._checked: List[str] = []
+
+    def buildGUI(self, presenter: RecordPresenter, rosTopics: List[str]) -> None:
+        """
+        Nothing to build, only keep the initial topic list
+        """
+        self.addTopicsToCheckList(rosTopics)
+
+    @property
+    def prefix(self) -> str:
+        """
+        The bag name prefix given on the command line
+        """
+        return self._prefix
+
+    @property
+    def durationOption(self) -> str:
+        """
+        The record duration given on the command line
+        """
+        return self._duration
+
+    @property
+    def numberOption(self) -> str:
+        """
+        Not applicable for ROS2
+        """
+        return ""
+
+    @property
+    def selectedTopicTypeOption(self) -> str:
+        """
+        The topic selection given on the command line
+        """
+        return self._selection
+
+    @property
+    def snapshotMode(self) -> bool:
+        """
+        True if a snapshot trigger was given on the command line
+        """
+        return self._trigger is not None
+
+    @property
+    def triggerTopic(self) -> str:
+        """
+        The snapshot trigger topic given on the command line
+        """
+        return self._trigger or ""
+
+    @property
+    def checkedTopics(self) -> List[str]:
+        """
+        The topics selected for recording
+        """
+        return list(self._checked)
+
+    @property
+    def command(self) -> str:
+        """
+        The last generated command, or the last validation message
+        """
+        return self._command
+
+    @property
+    def topics(self) -> List[str]:
+        """
+        All the known topics
+        """
+        return list(self._topics)
+
+    def after(self, time: int, func: Callable[..., None]) -> None:
+        """
+        Schedule func on the headless loop
+        """
+        self.loop.after(time, func)
+
+    def checkTopics(self, topics: List[str]) -> None:
+        """
+        Check the given topics, adding the ones that were not discovered
+        """
+
+        for topic in topics:
+            if topic not in self._topics:
+                self._topics.append(topic)
+            if topic not in self._checked:
+                self._checked.append(topic)
+
+    def setCheckedTopics(self, topics: Set[str]) -> None:
+        """
+        Check exactly the given topics
+        """
+        self._checked = [topic for topic in self._topics if topic in topics]
+
+    def setTopicSelectOptions(self, names: List[str]) -> None:
+        """
+        Nothing to show, the selection is given on the command line
+        """
+
+    def setScheduleActive(self, isActive: bool) -> None:
+        """
+        Nothing to show, the schedule is run with the schedule command
+        """
+
+    def updateTerminalResponse(self, response: str) -> None:
+        """
+        Print the response to stdout
+        """
+        sys.stdout.write(response)
+
+    def updateCommandResponse(self, command: str) -> None:
+        """
+        Keep the generated command
+        """
+        self._command = command
+
+    def scrollDownTerminalResponse(self) -> None:
+        """
+        Flush stdout
+        """
+        sys.stdout.flush()
+
+    def disableUiOnRecord(self) -> None:
+        """
+        Mark the view as recording
+        """
+        self.isRecording = True
+
+    def enableUiOnStopRecord(self) -> None:
+        """
+        Mark the view as not recording
+        """
+        self.isRecording = False
+
+    def emptyTopicCheckList(self) -> None:
+        """
+        Forget all the known topics
+        """
+        self._topics = []
+        self._checked = []
+
+    def addTopicsToCheckList(self, topics: List[str]) -> None:
+        """
+        Add topics to the known topics
+        """
+        self._topics.extend(topic for topic in topics if topic not in self._topics)
+
+    def openDescriptionDialog(self) -> Optional[str]:
+        """
+        The description given on the command line
+        """
+        return self.description
+
+    def openProfileNameDialog(self) -> Optional[str]:
+        """
+        Profiles are not saved from the command line
+        """
+        return None
@@ -0,0 +1,64 @@
+"""
+Headless implementation of the storage page view
+"""
+
+from typing import Any, Callable, List, Optional, Protocol, Tuple
+
+from .headlessLoop import HeadlessLoop
+from ..logic.storageStats import UsageRow, formatGrowth, formatUsage
+
+
+class StoragePresenter(Protocol):
+    """
+    Storage Presenter protocol
+    """
+
+    # pylint: disable=C0116
+
+    def handleSelectView(self, name: str) -> None:
+        ...
+
+    def handleRefresh(self, event: Optional[Any] = None) -> None:
+        ...
+
+
+class StorageCliView:
+    """
+    Storage view that keeps the last table for the command line to print
+    """
+
+    # pylint: disable=W0613
+
+    def __init__(self, loop: HeadlessLoop) -> None:
+        self.loop = loop
+        self.lines: List[str] = []
+        self.status = ""
+
+    def buildGUI(self, presenter: StoragePresenter) -> None:
+        """
+        Nothing to build
+        """
+
+    def updateUsage(self, dimension: str, rows: List[UsageRow], totalSize: int) -> None:
+        """
+        Keep the usage table
+        """
+        self.lines = formatUsage(dimension, rows, totalSize)
+
+    def updateGrowth(self, growth: List[Tuple[str, int]]) -> None:
+        """
+        Keep the growth table
+        """
+        self.lines = formatGrowth(growth)
+
+    def updateStatus(self, status: str) -> None:
+        """
+        Keep the status message
+        """
+        self.status = status
+
+    def after(self, time: int, func: Callable[..., None]) -> None:
+        """
+        Schedule func on the headless loop
+        """
+        self.loop.after(time, func)
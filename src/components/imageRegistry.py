@@ -0,0 +1,46 @@
+"""
+Shared registry of the images used by the widgets, every image is loaded from disk once
+"""
+
+from typing import Optional, Tuple
+
+import os
+import functools
+import customtkinter as ctk
+
+from PIL import Image
+from ..constants import Constants
+
+
+@functools.lru_cache(maxsize=None)
+def getImage(
+    lightName: str, darkName: Optional[str] = None, size: Tuple[int, int] = (20, 20)
+) -> ctk.CTkImage:
+    """
+    Get a CTkImage from the images directory, images are created on first use and then shared
+
+    parameters
+    ----------
+    lightName: str
+        Name of the image file used in light mode, without the extension
+    darkName: Optional[str]
+        Name of the image file used in dark mode, defaults to lightName
+    size: Tuple[int, int]
+        Size of the image
+
+    returns
+    -------
+    ctk.CTkImage
+        The cached image
+    """
+
+    return ctk.CTkImage(
+        light_image=_openImage(lightName),
+        dark_image=_openImage(darkName or lightName),
+        size=size,
+    )
+
+
+@functools.lru_cache(maxsize=None)
+def _openImage(name: str) -> Image.Image:
+    return Image.open(os.path.join(Constants.IMAGE_PATH, f"{name}.png"))
@@ -2,7 +2,7 @@
 Scrollable frame with checkboxes for topic list
 """
 
-from typing import List, Optional, Any, Union, Callable
+from typing import Dict, List, Optional, Any, Union, Callable, Set
 
 import customtkinter as ctk
 
@@ -23,6 +23,8 @@ class ScrollableCheckBoxFrame(ctk.CTkScrollableFrame):  # type: ignore # pylint:
 
         self.command = command
         self.checkboxList: List[ctk.CTkCheckBox] = []
+        self.checkboxByName: Dict[str, ctk.CTkCheckBox] = {}
+        self.checkedNames: Set[str] = set()
         for _, item in enumerate(items):
             self.addItem(item)
 
@@ -32,10 +34,10 @@ class ScrollableCheckBoxFrame(ctk.CTkScrollableFrame):  # type: ignore # pylint:
         """
 
         checkbox = ctk.CTkCheckBox(self, text=item)
-        if self.command is not None:
-            checkbox.configure(command=self.command)
+        checkbox.configure(command=lambda: self._onToggle(item))
         checkbox.grid(row=len(self.checkboxList), column=0, pady=(0, 10), sticky="w")
         self.checkboxList.append(checkbox)
+        self.checkboxByName[item] = checkbox
 
     def addItems(self, items: List[str]) -> None:
         """
@@ -54,11 +56,13 @@ class ScrollableCheckBoxFrame(ctk.CTkScrollableFrame):  # type: ignore # pylint:
         """
         Remove a checkbox from the frame
         """
-        for checkbox in self.checkboxList:
-            if item == checkbox.cget("text"):
-                checkbox.destroy()
-                self.checkboxList.remove(checkbox)
-                return
+        checkbox = self.checkboxByName.pop(item, None)
+        if checkbox is None:
+            return
+
+        checkbox.destroy()
+        self.checkboxList.remove(checkbox)
+        self.checkedNames.discard(item)
 
     def removeAllItems(self) -> None:
         """
@@ -68,34 +72,61 @@ class ScrollableCheckBoxFrame(ctk.CTkScrollableFrame):  # type: ignore # pylint:
         for checkbox in self.checkboxList:
             checkbox.destroy()
         self.checkboxList = []
+        self.checkboxByName = {}
+        self.checkedNames = set()
+
+    def getItems(self) -> List[str]:
+        """
+        Get all the items of the frame
+        """
+        return list(self.checkboxByName.keys())
 
     def getCheckedItems(self) -> List[str]:
         """
         Get the checked items from the frame
         """
-        return [checkbox.cget("text") for checkbox in self.checkboxList if checkbox.get() == 1]
+        return [item for item in self.checkboxByName if item in self.checkedNames]
+
+    def setCheckedItems(self, items: Set[str]) -> None:
+        """
+        Check exactly the given items, only the checkboxes that change state are touched
+        """
+
+        items = items & self.checkboxByName.keys()
+        for item in items - self.checkedNames:
+            self.checkboxByName[item].select()
+        for item in self.checkedNames - items:
+            self.checkboxByName[item].deselect()
+        self.checkedNames = items
 
     def selectContainingName(self, name: str) -> None:
         """
         Select the checkbox containing the name
         """
 
-        for checkbox in self.checkboxList:
-            if name in checkbox.cget("text"):
-                checkbox.select()
+        self.setCheckedItems(
+            self.checkedNames | {item for item in self.checkboxByName if name in item}
+        )
 
     def deselectAll(self) -> None:
         """
         Deselect all checkboxes
         """
 
-        for checkbox in self.checkboxList:
-            checkbox.deselect()
+        self.setCheckedItems(set())
 
     def selectAll(self) -> None:
         """
         Select all checkboxes
         """
 
-        for checkbox in self.checkboxList:
-            checkbox.select()
+        self.setCheckedItems(set(self.checkboxByName.keys()))
+
+    def _onToggle(self, item: str) -> None:
+        if self.checkboxByName[item].get() == 1:
+            self.checkedNames.add(item)
+        else:
+            self.checkedNames.discard(item)
+
+        if self.command is not None:
+            self.command()
@@ -2,17 +2,17 @@
 Scrollable frame with labels and buttons for bag list
 """
 
-from typing import Optional, Any, Union, Callable, Tuple, List, Dict
+from typing import AbstractSet, Optional, Any, Union, Callable, Tuple, List, Dict, Set
 from tkinter import ttk
 
-import os
 import customtkinter as ctk
 
 from PIL import Image
-from ..constants import Constants
 
+from .imageRegistry import getImage
 
-class ScrollableLabelButtonFrame(ctk.CTkScrollableFrame):  # type: ignore # pylint: disable=R0901
+
+class ScrollableLabelButtonFrame(ctk.CTkScrollableFrame):  # type: ignore # pylint: disable=R0901,R0902
     """
     Scrollable frame with labels and buttons for bag list
     """
@@ -23,29 +23,28 @@ class ScrollableLabelButtonFrame(ctk.CTkScrollableFrame):  # type: ignore # pyli
         bagDescription: Dict[str, Any],
         playCommand: Callable[[str], Any],
         deleteCommand: Callable[[str], Any],
+        downloadCommand: Optional[Callable[[str], Any]] = None,
         **kwargs: Optional[Any],
     ) -> None:
         super().__init__(master, **kwargs)
-        self.grid_columnconfigure((0, 1, 3, 4), weight=0)
-        self.grid_columnconfigure((2), weight=1)
-
-        self.trashImage = ctk.CTkImage(
-            light_image=Image.open(os.path.join(Constants.IMAGE_PATH, "trash_dark.png")),
-            dark_image=Image.open(os.path.join(Constants.IMAGE_PATH, "trash_dark.png")),
-            size=(20, 20),
-        )
+        self.grid_columnconfigure((0, 1, 2, 4, 5, 6), weight=0)
+        self.grid_columnconfigure((3), weight=1)
 
-        self.playImage = ctk.CTkImage(
-            light_image=Image.open(os.path.join(Constants.IMAGE_PATH, "play_dark.png")),
-            dark_image=Image.open(os.path.join(Constants.IMAGE_PATH, "play_dark.png")),
-            size=(20, 20),
-        )
+        self.trashImage = getImage("trash_dark")
+        self.playImage = getImage("play_dark")
 
         self.playCommand = playCommand
         self.deleteCommand = deleteCommand
+        self.downloadCommand = downloadCommand
+        self.keysList: List[str] = []
         self.labelsList: List[Tuple[ctk.CTkLabel, ctk.CTkLabel, ctk.CTkLabel]] = []
-        self.buttonList: List[Tuple[ctk.CTkButton, ctk.CTkButton]] = []
+        self.buttonList: List[Tuple[ctk.CTkButton, ...]] = []
         self.sepratorList: List[ttk.Separator] = []
+        self.rows: Dict[str, int] = {}
+        self.previewLabels: Dict[str, ctk.CTkLabel] = {}
+        self.checkBoxes: Dict[str, ctk.CTkCheckBox] = {}
+        self.hiddenKeys: Set[str] = set()
+        self.nextRow = 0
 
         self.addItems(bagDescription)
 
@@ -53,18 +52,23 @@ class ScrollableLabelButtonFrame(ctk.CTkScrollableFrame):  # type: ignore # pyli
         """
         Add a label and button to the frame
         """
-        row = len(self.labelsList) * 2
+        row = self.nextRow
+        # labels, preview and separator
+        self.nextRow += 3
+
+        checkBox = ctk.CTkCheckBox(self, text="", width=24)
+        checkBox.grid(row=row, column=0, padx=(5, 0), pady=(0, 10), sticky="w")
 
         itemLabel = ctk.CTkLabel(self, text=item, padx=5, anchor="w", width=200)
-        itemLabel.grid(row=row, column=0, padx=(0, 10), pady=(0, 10), sticky="w")
+        itemLabel.grid(row=row, column=1, padx=(0, 10), pady=(0, 10), sticky="w")
 
         timestampLabel = ctk.CTkLabel(self, text=timestamp, padx=5, anchor="w", width=100)
-        timestampLabel.grid(row=row, column=1, padx=(0, 10), pady=(0, 10), sticky="w")
+        timestampLabel.grid(row=row, column=2, padx=(0, 10), pady=(0, 10), sticky="w")
 
         descriptionLabel = ctk.CTkLabel(self, text=description, padx=5, anchor="w")
         descriptionLabel.grid(
             row=row,
-            column=2,
+            column=3,
             padx=(0, 10),
             pady=(0, 10),
             sticky="we",
@@ -72,37 +76,60 @@ class ScrollableLabelButtonFrame(ctk.CTkScrollableFrame):  # type: ignore # pyli
 
         deleteButton = ctk.CTkButton(self, text="", width=50, height=24, image=self.trashImage)
         deleteButton.configure(command=lambda: self.deleteCommand(key))
-        deleteButton.grid(row=row, column=3, pady=(0, 10), padx=5)
+        deleteButton.grid(row=row, column=4, pady=(0, 10), padx=5)
 
         playButton = ctk.CTkButton(self, text="", width=50, height=24, image=self.playImage)
         playButton.configure(command=lambda: self.playCommand(key))
-        playButton.grid(row=row, column=4, pady=(0, 10), padx=5)
+        playButton.grid(row=row, column=5, pady=(0, 10), padx=5)
+
+        buttons: Tuple[ctk.CTkButton, ...] = (deleteButton, playButton)
+        if self.downloadCommand is not None:
+            buttons += (self._addDownloadButton(key, row, self.downloadCommand),)
 
         styl = ttk.Style()
         styl.configure("TSeparator", background="grey")
 
         separator = ttk.Separator(self, orient="horizontal", style="TSeparator")
-        separator.grid(row=row + 1, column=0, columnspan=5, sticky="we", pady=(0, 5))
+        separator.grid(row=row + 2, column=0, columnspan=7, sticky="we", pady=(0, 5))
 
+        self.keysList.append(key)
+        self.rows[key] = row
+        self.checkBoxes[key] = checkBox
         self.labelsList.append((itemLabel, timestampLabel, descriptionLabel))
-        self.buttonList.append((deleteButton, playButton))
+        self.buttonList.append(buttons)
         self.sepratorList.append(separator)
 
-    def removeItem(self, item: str) -> None:
+    def _addDownloadButton(
+        self, key: str, row: int, downloadCommand: Callable[[str], Any]
+    ) -> ctk.CTkButton:
+        downloadButton = ctk.CTkButton(self, text="Get", width=50, height=24)
+        downloadButton.configure(command=lambda: downloadCommand(key))
+        downloadButton.grid(row=row, column=6, pady=(0, 10), padx=5)
+        return downloadButton
+
+    def removeItem(self, key: str) -> None:
         """
-        Remove a label and button from the frame
+        Remove the label and buttons of a bag from the frame
         """
-        for labels, buttons, seprator in zip(self.labelsList, self.buttonList, self.sepratorList):
-            if item == labels[0].cget("text"):
-                for label in labels:
-                    label.destroy()
-                for button in buttons:
-                    button.destroy()
-                seprator.destroy()
-                self.labelsList.remove(labels)
-                self.buttonList.remove(buttons)
-                self.sepratorList.remove(seprator)
-                return
+        if key not in self.keysList:
+            return
+
+        index = self.keysList.index(key)
+        for label in self.labelsList[index]:
+            label.destroy()
+        for button in self.buttonList[index]:
+            button.destroy()
+        self.sepratorList[index].destroy()
+
+        if key in self.previewLabels:
+            self.previewLabels.pop(key).destroy()
+        self.checkBoxes.pop(key).destroy()
+        del self.rows[key]
+        self.hiddenKeys.discard(key)
+        del self.keysList[index]
+        del self.labelsList[index]
+        del self.buttonList[index]
+        del self.sepratorList[index]
 
     def clear(self) -> None:
         """
@@ -115,9 +142,19 @@ class ScrollableLabelButtonFrame(ctk.CTkScrollableFrame):  # type: ignore # pyli
             for button in buttons:
                 button.destroy()
             seprator.destroy()
+        for previewLabel in self.previewLabels.values():
+            previewLabel.destroy()
+        for checkBox in self.checkBoxes.values():
+            checkBox.destroy()
+        self.previewLabels.clear()
+        self.checkBoxes.clear()
+        self.hiddenKeys.clear()
+        self.rows.clear()
+        self.keysList.clear()
         self.labelsList.clear()
         self.buttonList.clear()
         self.sepratorList.clear()
+        self.nextRow = 0
 
     def addItems(self, items: Dict[str, Any]) -> None:
         """
@@ -125,3 +162,129 @@ class ScrollableLabelButtonFrame(ctk.CTkScrollableFrame):  # type: ignore # pyli
         """
         for key, value in items.items():
             self.addItem(key, value["name"], value["date"], value["description"])
+
+    def setPreview(self, key: str, text: str, thumbnail: str) -> None:
+        """
+        Show the preview of a bag under its labels, the thumbnail is the path of an image or empty
+        """
+
+        if key not in self.rows:
+            return
+
+        image = None
+        if thumbnail:
+            try:
+                pilImage = Image.open(thumbnail)
+                image = ctk.CTkImage(light_image=pilImage, dark_image=pilImage, size=pilImage.size)
+            except OSError:
+                image = None
+
+        previewLabel = ctk.CTkLabel(
+            self,
+            text=text,
+            image=image,
+            compound="left",
+            anchor="w",
+            justify="left",
+            font=("Courier", 11),
+        )
+        previewLabel.grid(
+            row=self.rows[key] + 1, column=1, columnspan=6, padx=(5, 10), pady=(0, 5), sticky="w"
+        )
+
+        if key in self.previewLabels:
+            self.previewLabels[key].destroy()
+        self.previewLabels[key] = previewLabel
+        if key in self.hiddenKeys:
+            previewLabel.grid_remove()
+
+    def sortItems(self, keys: List[str]) -> None:
+        """
+        Move the rows in the order of keys, only the rows that change place are gridded again
+        """
+
+        indexes = {key: index for index, key in enumerate(self.keysList)}
+        row = 0
+        for key in keys:
+            if key not in indexes:
+                continue
+            if self.rows[key] != row:
+                self.rows[key] = row
+                if key not in self.hiddenKeys:
+                    self._gridRow(key, indexes[key])
+            row += 3
+        self.nextRow = row
+
+    def filterItems(self, keys: AbstractSet[str]) -> None:
+        """
+        Show the rows of keys only. The rows keep their place, so refining a search only
+        hides the rows that stopped matching.
+        """
+
+        indexes = {key: index for index, key in enumerate(self.keysList)}
+        hiddenKeys = set(indexes) - keys
+        for key in hiddenKeys - self.hiddenKeys:
+            for widget, _ in self._rowWidgets(key, indexes[key]):
+                widget.grid_remove()
+        for key in self.hiddenKeys - hiddenKeys:
+            self._gridRow(key, indexes[key])
+        self.hiddenKeys = hiddenKeys
+
+    def _rowWidgets(self, key: str, index: int) -> List[Tuple[Any, int]]:
+        """
+        The widgets of a row with their row offset
+        """
+
+        widgets: List[Tuple[Any, int]] = [(self.checkBoxes[key], 0)]
+        widgets += [(label, 0) for label in self.labelsList[index]]
+        widgets += [(button, 0) for button in self.buttonList[index]]
+        widgets.append((self.sepratorList[index], 2))
+        if key in self.previewLabels:
+            widgets.append((self.previewLabels[key], 1))
+        return widgets
+
+    def _gridRow(self, key: str, index: int) -> None:
+        for widget, offset in self._rowWidgets(key, index):
+            widget.grid(row=self.rows[key] + offset)
+
+    def selectedKeys(self) -> List[str]:
+        """
+        Keys of the checked rows, the rows hidden by a search are left out
+        """
+
+        return [
+            key
+            for key in self.keysList
+            if key not in self.hiddenKeys and self.checkBoxes[key].get()
+        ]
+
+    def selectAll(self, isSelected: bool) -> None:
+        """
+        Check or uncheck all the rows shown
+        """
+
+        for key, checkBox in self.checkBoxes.items():
+            if isSelected and key not in self.hiddenKeys:
+                checkBox.select()
+            else:
+                checkBox.deselect()
+
+    def visibleKeys(self) -> List[str]:
+        """
+        Keys of the rows scrolled into view, and of the rows of the next screen
+        """
+
+        canvas = self._parent_canvas  # pylint: disable=W0212
+        height = self.winfo_height()
+        top, bottom = canvas.yview()
+        low = top * height
+        high = (2 * bottom - top) * height
+
+        visibleKeys = []
+        for key, labels in zip(self.keysList, self.labelsList):
+            if key in self.hiddenKeys:
+                continue
+            rowTop = labels[0].winfo_y()
+            if low <= rowTop + labels[0].winfo_height() and rowTop <= high:
+                visibleKeys.append(key)
+        return visibleKeys
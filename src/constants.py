@@ -15,6 +15,54 @@ class Constants:  # pylint: disable=R0903
     IMAGE_PATH = os.path.join(os.path.dirname(os.path.realpath(__file__)), "images")
     BAG_DIR_PATH = os.path.expanduser("~/bags/")
     JSON_FILE_NAME = "description.json"
+    PROFILES_PATH = os.environ.get(
+        "ROSBAG_PROFILES", os.path.expanduser("~/.config/rosbag_client/profiles.json")
+    )
+    AGENT_URL = os.environ.get("ROSBAG_AGENT_URL", "")
+    AGENT_TOKEN = os.environ.get("ROSBAG_AGENT_TOKEN", "")
+    AGENT_PORT = 8765
+    TRANSFER_CHUNK_BYTES = 8 * 1024 * 1024
+    TRANSFER_WORKERS = 4
+    BULK_WORKERS = 4
+    TRANSFER_LIMIT = os.environ.get("ROSBAG_TRANSFER_LIMIT", "")
+    SCHEDULE_PATH = os.environ.get(
+        "ROSBAG_SCHEDULE", os.path.expanduser("~/.config/rosbag_client/schedule.json")
+    )
+    DISCOVERY_WAIT_S = 0.5
+    QOS_OVERRIDE_DEPTH = 100
+    QOS_OVERRIDES_DIR = os.environ.get(
+        "ROSBAG_QOS_OVERRIDES", os.path.expanduser("~/.cache/rosbag_client/qos")
+    )
+    RECORDER_STALL_S = float(os.environ.get("ROSBAG_RECORDER_STALL_S", "60"))
+    RECORDER_RESTARTS = int(os.environ.get("ROSBAG_RECORDER_RESTARTS", "0"))
+    REPLAY_RATE = float(os.environ.get("ROSBAG_REPLAY_RATE", "1"))
+    REPLAY_LATE_S = 0.01
+    REPLAY_PREFETCH = 2000
+    REPLAY_LOOKAHEAD = 100
+    # the replay waits for subscribers of every topic up to this time before publishing
+    REPLAY_WAIT_S = float(os.environ.get("ROSBAG_REPLAY_WAIT_S", "2"))
+    EXPORT_FORMAT = os.environ.get("ROSBAG_EXPORT_FORMAT", "parquet")
+    EXPORT_BATCH_SIZE = 65536
+    TIME_WINDOW_S = float(os.environ.get("ROSBAG_TIME_WINDOW_S", "30"))
+    SNAPSHOT_BEFORE_S = 30.0
+    SNAPSHOT_AFTER_S = 30.0
+    SNAPSHOT_MAX_BYTES = int(os.environ.get("ROSBAG_SNAPSHOT_MEMORY_MB", "1024")) * 1024 * 1024
+    PREVIEW_CACHE_PATH = os.environ.get(
+        "ROSBAG_PREVIEW_CACHE", os.path.expanduser("~/.cache/rosbag_client/previews")
+    )
+    PREVIEW_WORKERS = 2
+    METADATA_CACHE_PATH = os.environ.get(
+        "ROSBAG_METADATA_CACHE", os.path.expanduser("~/.cache/rosbag_client/metadata.json")
+    )
+    TRASH_MAX_AGE_S = float(os.environ.get("ROSBAG_TRASH_DAYS", "7")) * 24 * 3600
+    TRASH_MAX_BYTES = int(float(os.environ.get("ROSBAG_TRASH_MAX_GB", "50")) * 1024**3)
+    TRASH_MIN_FREE_BYTES = int(float(os.environ.get("ROSBAG_TRASH_MIN_FREE_GB", "10")) * 1024**3)
+    TRASH_REAP_PERIOD_S = 60.0
+    TERMINAL_MAX_LINES = 5000
+    TERMINAL_SPILL_PATH = os.environ.get("ROSBAG_TERMINAL_LOG", "")
+    TRACE_PATH = os.environ.get(
+        "ROSBAG_PROFILE_TRACE", os.path.expanduser("~/rosbag_client_trace.json")
+    )
 
 
 class Pages(Enum):
@@ -24,3 +72,5 @@ class Pages(Enum):
 
     RECORD = 1
     AVAILABLE_BAGS = 2
+    PROFILER = 3
+    STORAGE = 4
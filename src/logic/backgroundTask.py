@@ -0,0 +1,197 @@
+"""
+Run blocking work off the GUI thread and hand the result back through `after`.
+The presenters express their I/O as coroutines, run by a single asyncio event loop in a worker
+thread, and await the blocking calls through runBlocking, which runs them in a thread pool. The
+results come back through a queue per scheduler, polled with `after` only while coroutines of
+that scheduler are pending: a handler never waits for I/O, and a headless loop ends once the
+work is done.
+"""
+
+from typing import Any, Callable, Coroutine, Dict, Optional, Protocol, TypeVar
+
+import queue
+import asyncio
+import functools
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+
+T = TypeVar("T")
+
+POLL_PERIOD_MS = 20
+
+_EXECUTOR = ThreadPoolExecutor(max_workers=4, thread_name_prefix="background")
+
+
+class Scheduler(Protocol):  # pylint: disable=R0903
+    """
+    Anything that can schedule a callback on the GUI thread, e.g. a Tk widget
+    """
+
+    # pylint: disable=C0116
+
+    def after(self, time: int, func: Callable[..., None]) -> Any:
+        ...
+
+
+class _EventLoopThread:  # pylint: disable=R0903
+    """
+    The event loop shared by the presenters, started with the first coroutine
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    @property
+    def loop(self) -> asyncio.AbstractEventLoop:
+        """
+        The running event loop
+        """
+
+        with self._lock:
+            if self._loop is None:
+                loop = asyncio.new_event_loop()
+                loop.set_default_executor(_EXECUTOR)
+                threading.Thread(target=loop.run_forever, name="eventLoop", daemon=True).start()
+                self._loop = loop
+            return self._loop
+
+
+class _ResultPump:
+    """
+    Results of the coroutines of a scheduler, delivered on the thread of the scheduler
+    """
+
+    def __init__(self, scheduler: Scheduler) -> None:
+        self.scheduler = scheduler
+        # callbacks queued by the event loop thread
+        self.results: "queue.SimpleQueue[Callable[[], None]]" = queue.SimpleQueue()
+        self.pendingCount = 0
+        self.isPolling = False
+
+    def add(self) -> None:
+        """
+        Count a new coroutine, and poll until its result is delivered
+        """
+
+        self.pendingCount += 1
+        if not self.isPolling:
+            self.isPolling = True
+            self.scheduler.after(POLL_PERIOD_MS, self.poll)
+
+    def poll(self) -> None:
+        """
+        Deliver the results received since the last poll
+        """
+
+        try:
+            while True:
+                try:
+                    deliver = self.results.get_nowait()
+                except queue.Empty:
+                    break
+                self.pendingCount -= 1
+                deliver()
+        finally:
+            # a callback that raised does not stop the delivery of the other results
+            if self.pendingCount > 0:
+                self.scheduler.after(POLL_PERIOD_MS, self.poll)
+            else:
+                self.isPolling = False
+
+
+_EVENT_LOOP = _EventLoopThread()
+_PUMPS: Dict[int, _ResultPump] = {}
+_PUMPS_LOCK = threading.Lock()
+
+
+async def runBlocking(func: Callable[..., T], *args: Any) -> T:
+    """
+    Await a blocking call, run in the thread pool
+    """
+    return await asyncio.get_running_loop().run_in_executor(
+        _EXECUTOR, functools.partial(func, *args)
+    )
+
+
+def runCoroutine(
+    scheduler: Scheduler,
+    coroutine: Coroutine[Any, Any, T],
+    onDone: Callable[[T], None],
+    onError: Optional[Callable[[BaseException], None]] = None,
+) -> "Future[T]":
+    """
+    Run coroutine on the event loop, then call onDone or onError from the scheduler thread
+
+    parameters
+    ----------
+    scheduler: Scheduler
+        Used to poll the results, callbacks run on the thread that owns it
+    coroutine: Coroutine[Any, Any, T]
+        The work, must not touch any widget
+    onDone: Callable[[T], None]
+        Called with the result of the coroutine
+    onError: Optional[Callable[[BaseException], None]]
+        Called with the exception raised by the coroutine, the exception is raised again if
+        None
+
+    returns
+    -------
+    Future[T]
+        The future of the coroutine, cancelling it skips the callbacks
+    """
+
+    with _PUMPS_LOCK:
+        pump = _PUMPS.setdefault(id(scheduler), _ResultPump(scheduler))
+    future = asyncio.run_coroutine_threadsafe(coroutine, _EVENT_LOOP.loop)
+    pump.add()
+    future.add_done_callback(
+        lambda done: pump.results.put(functools.partial(_deliver, done, onDone, onError))
+    )
+    return future
+
+
+def _deliver(
+    future: "Future[T]",
+    onDone: Callable[[T], None],
+    onError: Optional[Callable[[BaseException], None]],
+) -> None:
+    if future.cancelled():
+        return
+
+    error = future.exception()
+    if error is None:
+        onDone(future.result())
+    elif onError is not None:
+        onError(error)
+    else:
+        raise error
+
+
+def runInBackground(
+    scheduler: Scheduler,
+    task: Callable[[], T],
+    onDone: Callable[[T], None],
+    onError: Optional[Callable[[BaseException], None]] = None,
+) -> "Future[T]":
+    """
+    Run task in a worker thread, then call onDone or onError from the scheduler thread, see
+    runCoroutine
+
+    parameters
+    ----------
+    scheduler: Scheduler
+        Used to poll the task, callbacks run on the thread that owns it
+    task: Callable[[], T]
+        The blocking work, must not touch any widget
+    onDone: Callable[[T], None]
+        Called with the result of the task
+    onError: Optional[Callable[[BaseException], None]]
+        Called with the exception raised by the task, the exception is raised again if None
+
+    returns
+    -------
+    Future[T]
+        The future of the task
+    """
+    return runCoroutine(scheduler, runBlocking(task), onDone, onError)
@@ -0,0 +1,249 @@
+"""
+Watch the bags directory for added and removed entries, and for the files added to or removed
+from its rosbag2 directories.
+Uses inotify when available, and falls back to polling the directory content.
+"""
+
+from typing import Callable, Dict, Optional, Set
+
+import os
+import time
+import errno
+import ctypes
+import ctypes.util
+import select
+import functools
+import struct
+import threading
+import traceback
+
+DEBOUNCE_S = 0.5
+POLL_PERIOD_S = 2.0
+
+_IN_CLOSE_WRITE = 0x008
+_IN_MOVED_FROM = 0x040
+_IN_MOVED_TO = 0x080
+_IN_CREATE = 0x100
+_IN_DELETE = 0x200
+_IN_IGNORED = 0x8000
+_IN_ISDIR = 0x40000000
+_IN_MASK = _IN_CLOSE_WRITE | _IN_MOVED_FROM | _IN_MOVED_TO | _IN_CREATE | _IN_DELETE
+_EVENT_HEADER = struct.Struct("iIII")
+
+
+class BagDirectoryWatcher:  # pylint: disable=R0902
+    """
+    Report the names of the entries that changed in a directory from a background thread.
+    A file added to or removed from a subdirectory, e.g. a storage file or the metadata of a
+    rosbag2 bag, is reported as a change of the subdirectory.
+    Bursts of events are debounced, the callback gets every name touched during the burst.
+    An error raised by the callback is printed, the watcher keeps running.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        onChange: Callable[[Set[str]], None],
+        debounce: float = DEBOUNCE_S,
+        usePolling: bool = False,
+    ) -> None:
+        self.path = path
+        self.onChange = onChange
+        self.debounce = debounce
+
+        self._stopEvent = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._inotifyFd = -1 if usePolling else _openInotify(path)
+        # the subdirectory of each inotify watch, the directory itself is ""
+        self._watches: Dict[int, str] = {}
+        # the modification time of each entry when polling, 0 for the files
+        self._snapshot: Dict[str, int] = {}
+
+    @property
+    def usesInotify(self) -> bool:
+        """
+        True if the directory is watched with inotify, False if it is polled
+        """
+        return self._inotifyFd >= 0
+
+    def start(self) -> None:
+        """
+        Start watching in a daemon thread
+        """
+
+        if self.usesInotify:
+            self._watches[_addWatch(self._inotifyFd, self.path)] = ""
+            for name in os.listdir(self.path):
+                self._watchSubdirectory(name)
+        else:
+            self._snapshot = self._listEntries()
+
+        self._thread = threading.Thread(target=self._run, name="bagDirectoryWatcher", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        """
+        Stop watching and wait for the thread to exit
+        """
+
+        self._stopEvent.set()
+        if self._thread is not None:
+            self._thread.join()
+        if self.usesInotify:
+            os.close(self._inotifyFd)
+            self._inotifyFd = -1
+
+    def _run(self) -> None:
+        pending: Set[str] = set()
+        lastEvent = 0.0
+
+        while not self._stopEvent.is_set():
+            timeout = self.debounce if pending else 1.0
+            names = self._readInotify(timeout) if self.usesInotify else self._poll(timeout)
+
+            if names:
+                pending |= names
+                lastEvent = time.monotonic()
+            elif pending and time.monotonic() - lastEvent >= self.debounce:
+                try:
+                    self.onChange(pending)
+                except Exception:  # pylint: disable=W0703
+                    # e.g. an entry that cannot be parsed, the next changes are still reported
+                    traceback.print_exc()
+                pending = set()
+
+    def _readInotify(self, timeout: float) -> Set[str]:
+        ready, _, _ = select.select([self._inotifyFd], [], [], timeout)
+        if not ready:
+            return set()
+
+        try:
+            buffer = os.read(self._inotifyFd, 64 * 1024)
+        except BlockingIOError:
+            return set()
+
+        names = set()
+        offset = 0
+        while offset < len(buffer):
+            watch, mask, _, length = _EVENT_HEADER.unpack_from(buffer, offset)
+            offset += _EVENT_HEADER.size
+            name = os.fsdecode(buffer[offset : offset + length].rstrip(b"\0"))
+            offset += length
+
+            subdirectory = self._watches.get(watch)
+            if mask & _IN_IGNORED:
+                # the subdirectory was removed or moved away
+                self._watches.pop(watch, None)
+            elif subdirectory:
+                names.add(subdirectory)
+            elif subdirectory is not None and name:
+                names.add(name)
+                if mask & _IN_ISDIR and mask & (_IN_CREATE | _IN_MOVED_TO):
+                    self._watchSubdirectory(name)
+        return names
+
+    def _watchSubdirectory(self, name: str) -> None:
+        path = os.path.join(self.path, name)
+        # hidden entries, like the trash, are not bags
+        if name.startswith(".") or not os.path.isdir(path):
+            return
+
+        try:
+            watch = _addWatch(self._inotifyFd, path)
+        except OSError:
+            return
+        if watch >= 0:
+            self._watches[watch] = name
+
+    def _poll(self, timeout: float) -> Set[str]:
+        if self._stopEvent.wait(min(timeout, POLL_PERIOD_S)):
+            return set()
+
+        snapshot = self._listEntries()
+        changed = {
+            name
+            for name in snapshot.keys() | self._snapshot.keys()
+            if snapshot.get(name) != self._snapshot.get(name)
+        }
+        self._snapshot = snapshot
+        return changed
+
+    def _listEntries(self) -> Dict[str, int]:
+        # the modification time of a directory changes when a file is added to or removed
+        # from it, hidden entries like the trash are not bags
+        entries = {}
+        try:
+            with os.scandir(self.path) as iterator:
+                for entry in iterator:
+                    try:
+                        isWatched = entry.is_dir() and not entry.name.startswith(".")
+                        entries[entry.name] = entry.stat().st_mtime_ns if isWatched else 0
+                    except FileNotFoundError:
+                        continue
+        except FileNotFoundError:
+            pass
+        return entries
+
+
+@functools.lru_cache(maxsize=None)
+def _loadLibc() -> Optional[ctypes.CDLL]:
+    libcName = ctypes.util.find_library("c")
+    if libcName is None:
+        return None
+
+    try:
+        return ctypes.CDLL(libcName, use_errno=True)
+    except OSError:
+        return None
+
+
+def _openInotify(path: str) -> int:
+    """
+    Open an inotify descriptor, the watches are added by the watcher
+
+    returns
+    -------
+    int
+        The descriptor, or -1 if inotify is not available or cannot watch path
+    """
+
+    libc = _loadLibc()
+    if libc is None:
+        return -1
+
+    try:
+        inotifyFd: int = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+    except AttributeError:
+        return -1
+    if inotifyFd < 0:
+        return -1
+
+    try:
+        _addWatch(inotifyFd, path)
+    except OSError as err:
+        os.close(inotifyFd)
+        if err.errno not in (errno.ENOSPC, errno.EACCES, errno.ENOENT):
+            raise
+        return -1
+
+    return inotifyFd
+
+
+def _addWatch(inotifyFd: int, path: str) -> int:
+    """
+    Watch path with inotifyFd, watching a path again returns its watch descriptor
+
+    raises
+    ------
+    OSError
+        If the watch cannot be added, e.g. errno.ENOSPC when out of watches
+    """
+
+    libc = _loadLibc()
+    if libc is None:
+        raise OSError(errno.ENOSYS, os.strerror(errno.ENOSYS), path)
+    watch: int = libc.inotify_add_watch(inotifyFd, os.fsencode(path), _IN_MASK)
+    if watch < 0:
+        error = ctypes.get_errno()
+        raise OSError(error, os.strerror(error), path)
+    return watch
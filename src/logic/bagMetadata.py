@@ -0,0 +1,118 @@
+"""
+Metadata of the bags read from the bags themselves: size, start and end times and topics.
+The metadata is cached by modification time, so a bag is only opened again once it changed.
+"""
+
+from typing import Dict, Iterable, List, NamedTuple
+
+import os
+import json
+import struct
+import sqlite3
+import threading
+
+from .bagReader import BagFormatError, openBag
+from ..constants import Constants
+
+
+class BagMetadata(NamedTuple):
+    """
+    What the catalog does not store about a bag, read from the bag itself.
+    Times are in nanoseconds, 0 if the bag cannot be read. messageCounts holds the number of
+    messages of each topic of topics.
+    """
+
+    size: int
+    modified: int
+    startTime: int
+    endTime: int
+    topics: List[str]
+    messageCounts: List[int]
+
+    @property
+    def duration(self) -> float:
+        """
+        Duration of the bag in seconds
+        """
+        return (self.endTime - self.startTime) / 1e9
+
+
+def loadBagMetadata(
+    names: Iterable[str], complete: bool = True, cachePath: str = Constants.METADATA_CACHE_PATH
+) -> Dict[str, BagMetadata]:
+    """
+    Metadata of the bags in the bags directory. The bags that did not change since they were
+    cached are not opened, and the rosbag2 directories not walked: their modification time
+    changes when a file is added, e.g. the metadata written when the recording ends.
+
+    parameters
+    ----------
+    names: Iterable[str]
+        Names of the bags
+    complete: bool
+        True if names are all the bags, the other bags are dropped from the cache
+    cachePath: str
+        Path of the metadata cache
+    """
+
+    try:
+        with open(cachePath, "r", encoding="utf-8") as file:
+            cached = {name: BagMetadata(*values) for name, values in json.load(file).items()}
+    except (OSError, ValueError, TypeError):
+        cached = {}
+
+    metadata: Dict[str, BagMetadata] = {}
+    for name in names:
+        path = os.path.join(Constants.BAG_DIR_PATH, name)
+        try:
+            stat = os.stat(path)
+            isDirectory = os.path.isdir(path)
+            previous = cached.get(name)
+            if previous is not None and previous.modified == stat.st_mtime_ns:
+                if isDirectory or previous.size == stat.st_size:
+                    metadata[name] = previous
+                    continue
+            size = bagSize(path) if isDirectory else stat.st_size
+        except OSError:
+            continue
+        metadata[name] = _readMetadata(path, size, stat.st_mtime_ns)
+
+    updated = metadata if complete else {**cached, **metadata}
+    if updated != cached:
+        os.makedirs(os.path.dirname(cachePath), exist_ok=True)
+        # the pages load the metadata from different threads
+        tmpPath = f"{cachePath}.{threading.get_ident()}.tmp"
+        with open(tmpPath, "w", encoding="utf-8") as file:
+            json.dump({name: list(values) for name, values in updated.items()}, file)
+        os.replace(tmpPath, cachePath)
+
+    return metadata
+
+
+def _readMetadata(path: str, size: int, modified: int) -> BagMetadata:
+    try:
+        bagIndex = openBag(path).index()
+    except (BagFormatError, OSError, struct.error, sqlite3.Error, KeyError):
+        return BagMetadata(size, modified, 0, 0, [], [])
+    return BagMetadata(
+        size,
+        modified,
+        bagIndex.startTime,
+        bagIndex.endTime,
+        list(bagIndex.topics),
+        [topic.messageCount for topic in bagIndex.topics.values()],
+    )
+
+
+def bagSize(path: str) -> int:
+    """
+    Size in bytes of a bag file, or of all the files of a rosbag2 directory
+    """
+
+    if not os.path.isdir(path):
+        return os.path.getsize(path)
+    return sum(
+        os.path.getsize(os.path.join(directory, name))
+        for directory, _, names in os.walk(path)
+        for name in names
+    )
@@ -0,0 +1,70 @@
+"""
+Parse the names given to the bags by the recorder: {prefix}_{dd-mm-yyyy-HH-MM-SS}.bag, where the
+prefix may hold underscores, a split bag ends with _{index}, and a rosbag2 directory has no
+extension.
+"""
+
+from typing import NamedTuple, Optional
+
+import re
+import datetime
+import functools
+
+BAG_NAME_PATTERN = re.compile(
+    r"^(?P<prefix>.*)_"
+    r"(?P<day>\d{2})-(?P<month>\d{2})-(?P<year>\d{4})"
+    r"(?:-(?P<hour>\d{2})-(?P<minute>\d{2})-(?P<second>\d{2}))?"
+    r"(?:_(?P<split>\d+))?"
+    r"(?:\.bag)?$"
+)
+
+
+class ParsedBagName(NamedTuple):
+    """
+    Parts of a bag name, timestamp is None if the name holds no valid date
+    """
+
+    prefix: str
+    timestamp: Optional[datetime.datetime]
+    splitIndex: Optional[int]
+
+
+@functools.lru_cache(maxsize=65536)
+def parseBagName(bagName: str) -> ParsedBagName:
+    """
+    Parse a bag name, names that do not follow the recorder format keep their whole name as
+    prefix
+
+    parameters
+    ----------
+    bagName : str
+        Name of the bag file or directory
+
+    returns
+    -------
+    ParsedBagName
+        The prefix, the time the recording started and the split index of the bag
+    """
+
+    match = BAG_NAME_PATTERN.match(bagName)
+    if match is None:
+        return ParsedBagName(_stripExtension(bagName), None, None)
+
+    try:
+        timestamp = datetime.datetime(
+            int(match["year"]),
+            int(match["month"]),
+            int(match["day"]),
+            int(match["hour"] or 0),
+            int(match["minute"] or 0),
+            int(match["second"] or 0),
+        )
+    except ValueError:
+        return ParsedBagName(_stripExtension(bagName), None, None)
+
+    splitIndex = int(match["split"]) if match["split"] is not None else None
+    return ParsedBagName(match["prefix"], timestamp, splitIndex)
+
+
+def _stripExtension(bagName: str) -> str:
+    return bagName[: -len(".bag")] if bagName.endswith(".bag") else bagName
@@ -0,0 +1,281 @@
+"""
+Previews of the bags for the bags list: the message rate of the busiest topics as sparklines
+and a thumbnail of a camera topic. Previews are computed from the bag index by a pool of worker
+processes and cached on disk by bag digest, so a bag is only read once.
+"""
+
+from typing import TYPE_CHECKING, Any, List, NamedTuple, Optional, Set, Tuple
+
+import io
+import os
+import json
+import queue
+import struct
+import sqlite3
+import hashlib
+import multiprocessing
+from concurrent.futures import Future, ProcessPoolExecutor
+
+from .bagReader import Bag, BagFormatError, BagIndex, MessageCursor, isImageType, openBag
+from ..constants import Constants
+
+if TYPE_CHECKING:
+    from PIL import Image
+
+PREVIEW_BUCKETS = 24
+PREVIEW_TOPICS = 3
+THUMBNAIL_SIZE = (96, 72)
+DIGEST_SAMPLE_SIZE = 64 * 1024
+SPARK_LEVELS = "▁▂▃▄▅▆▇█"
+
+# encoding: (PIL mode, PIL raw mode)
+_IMAGE_MODES = {
+    "rgb8": ("RGB", "RGB"),
+    "bgr8": ("RGB", "BGR"),
+    "rgba8": ("RGBA", "RGBA"),
+    "bgra8": ("RGBA", "BGRA"),
+    "mono8": ("L", "L"),
+    "8UC1": ("L", "L"),
+}
+
+
+class TopicRate(NamedTuple):
+    """
+    Message rate of a topic over the bag, in messages per second for each time bucket
+    """
+
+    name: str
+    messageCount: int
+    rates: List[float]
+
+
+class BagPreview(NamedTuple):
+    """
+    Preview of a bag, thumbnail is the path of the cached image or empty
+    """
+
+    digest: str
+    duration: float
+    topics: List[TopicRate]
+    thumbnail: str
+
+    def sparklines(self) -> str:
+        """
+        One sparkline per topic with its average rate
+        """
+
+        lines = []
+        for topic in self.topics:
+            average = topic.messageCount / self.duration if self.duration > 0 else 0.0
+            lines.append(f"{sparkline(topic.rates)} {average:7.1f} Hz  {topic.name}")
+        return "\n".join(lines)
+
+
+def loadPreview(path: str, cacheRoot: str = Constants.PREVIEW_CACHE_PATH) -> BagPreview:
+    """
+    Preview of the bag at path, computed unless it is in the cache
+
+    raises
+    ------
+    BagFormatError
+        If the bag cannot be read
+    """
+
+    digest = bagDigest(path)
+    cachePath = os.path.join(cacheRoot, digest + ".json")
+    try:
+        with open(cachePath, "r", encoding="utf-8") as file:
+            cached = json.load(file)
+        return BagPreview(
+            cached["digest"],
+            cached["duration"],
+            [TopicRate(*topic) for topic in cached["topics"]],
+            cached["thumbnail"],
+        )
+    except (OSError, ValueError, KeyError):
+        pass
+
+    os.makedirs(cacheRoot, exist_ok=True)
+    preview = computePreview(path, digest, cacheRoot)
+    with open(cachePath + ".tmp", "w", encoding="utf-8") as file:
+        json.dump(preview._asdict(), file)
+    os.replace(cachePath + ".tmp", cachePath)
+    return preview
+
+
+def computePreview(path: str, digest: str, cacheRoot: str) -> BagPreview:
+    """
+    Read the rates of the busiest topics from the bag index, and the thumbnail of the first
+    camera topic from the message in the middle of the bag
+    """
+
+    try:
+        bag = openBag(path)
+        bagIndex = bag.index()
+        counts = bag.messageCounts(PREVIEW_BUCKETS)
+    except (OSError, struct.error, sqlite3.Error, KeyError) as err:
+        raise BagFormatError(f"Cannot read {path}: {err}") from err
+
+    bucketDuration = bagIndex.duration / PREVIEW_BUCKETS
+    busiest = sorted(bagIndex.topics.values(), key=lambda topic: -topic.messageCount)[
+        :PREVIEW_TOPICS
+    ]
+    topics = [
+        TopicRate(
+            topic.name,
+            topic.messageCount,
+            [count / bucketDuration if bucketDuration > 0 else 0.0 for count in counts[topic.name]],
+        )
+        for topic in busiest
+    ]
+
+    thumbnail = os.path.join(cacheRoot, digest + ".png")
+    if not _writeThumbnail(bag, bagIndex, thumbnail):
+        thumbnail = ""
+
+    return BagPreview(digest, bagIndex.duration, topics, thumbnail)
+
+
+def bagDigest(path: str) -> str:
+    """
+    Digest of a bag file or directory from the size, the modification time and the first and
+    last bytes of its files, without reading the whole bag
+    """
+
+    if os.path.isdir(path):
+        files = sorted(
+            os.path.join(directory, name) for directory, _, names in os.walk(path) for name in names
+        )
+    else:
+        files = [path]
+
+    digest = hashlib.sha256()
+    for file in files:
+        stat = os.stat(file)
+        digest.update(f"{os.path.relpath(file, path)}:{stat.st_size}:{stat.st_mtime_ns}".encode())
+        with open(file, "rb") as content:
+            digest.update(content.read(DIGEST_SAMPLE_SIZE))
+            content.seek(max(stat.st_size - DIGEST_SAMPLE_SIZE, 0))
+            digest.update(content.read(DIGEST_SAMPLE_SIZE))
+    return digest.hexdigest()
+
+
+def sparkline(values: List[float]) -> str:
+    """
+    Unicode sparkline of values, scaled to the largest value
+    """
+
+    highest = max(values, default=0.0)
+    if highest <= 0:
+        return SPARK_LEVELS[0] * len(values)
+    return "".join(
+        SPARK_LEVELS[min(int(value / highest * len(SPARK_LEVELS)), len(SPARK_LEVELS) - 1)]
+        for value in values
+    )
+
+
+def _writeThumbnail(bag: Bag, bagIndex: BagIndex, path: str) -> bool:
+    """
+    Save a thumbnail of the first image topic, False if the bag has no image to show
+    """
+
+    imageTopics = [topic for topic in bagIndex.topics.values() if isImageType(topic.type)]
+    if not imageTopics or not imageTopics[0].messageCount:
+        return False
+
+    topic = imageTopics[0]
+    middle = bagIndex.startTime + (bagIndex.endTime - bagIndex.startTime) // 2
+    try:
+        for _, _, data in bag.messages([topic.name], middle):
+            image = _decodeImage(data, topic.type, bag.isCdr)
+            if image is None:
+                return False
+            image.thumbnail(THUMBNAIL_SIZE)
+            image.save(path + ".tmp", "PNG")
+            os.replace(path + ".tmp", path)
+            return True
+    except (OSError, ValueError, struct.error, IndexError, sqlite3.Error):
+        pass
+    return False
+
+
+def _decodeImage(data: bytes, messageType: str, isCdr: bool) -> Optional["Image.Image"]:
+    # PIL is only loaded by the preview workers, not by the headless commands
+    # pylint: disable=C0415
+    from PIL import Image
+
+    cursor = MessageCursor(data, isCdr)
+    cursor.header()
+
+    if messageType.endswith("CompressedImage"):
+        cursor.string()
+        return Image.open(io.BytesIO(cursor.uint8Array()))
+
+    height = cursor.uint32()
+    width = cursor.uint32()
+    encoding = cursor.string()
+    cursor.uint8()
+    step = cursor.uint32()
+    if encoding not in _IMAGE_MODES:
+        return None
+
+    mode, rawMode = _IMAGE_MODES[encoding]
+    return Image.frombuffer(mode, (width, height), cursor.uint8Array(), "raw", rawMode, step, 1)
+
+
+class PreviewService:
+    """
+    Compute the previews in worker processes, the results are collected by drain
+    """
+
+    def __init__(self, workers: int = Constants.PREVIEW_WORKERS) -> None:
+        self.workers = workers
+        self.requested: Set[str] = set()
+        self.pending = 0
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._results: "queue.Queue[Tuple[str, Optional[BagPreview], str]]" = queue.Queue()
+
+    def request(self, name: str, path: str) -> None:
+        """
+        Compute the preview of a bag, once per bag
+        """
+
+        if name in self.requested:
+            return
+        self.requested.add(name)
+
+        if self._executor is None:
+            # the workers only import the bag readers, not the GUI
+            self._executor = ProcessPoolExecutor(
+                self.workers, mp_context=multiprocessing.get_context("spawn")
+            )
+        self.pending += 1
+        future = self._executor.submit(loadPreview, path)
+        future.add_done_callback(lambda done: self._onDone(name, done))
+
+    def drain(self) -> List[Tuple[str, Optional[BagPreview], str]]:
+        """
+        Take the previews computed so far, with the error for the bags that cannot be read
+        """
+
+        results = []
+        while not self._results.empty():
+            results.append(self._results.get_nowait())
+            self.pending -= 1
+        return results
+
+    def shutdown(self) -> None:
+        """
+        Stop the worker processes
+        """
+
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
+
+    def _onDone(self, name: str, future: "Future[Any]") -> None:
+        try:
+            self._results.put((name, future.result(), ""))
+        except Exception as err:  # pylint: disable=W0703
+            # errors of the workers are shown in place of the preview
+            self._results.put((name, None, str(err)))
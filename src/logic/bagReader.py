@@ -0,0 +1,462 @@
+"""
+Read the index and the messages of a bag without a ROS installation.
+Supports rosbag v2.0 files (.bag) and rosbag2 directories stored as sqlite3 (.db3).
+Timestamps are in nanoseconds.
+"""
+
+from typing import BinaryIO, Dict, Iterator, List, NamedTuple, Optional, Protocol, Tuple
+
+import os
+import re
+import bz2
+import glob
+import struct
+import sqlite3
+
+ROS1_MAGIC = b"#ROSBAG V2.0\n"
+
+OP_MESSAGE_DATA = 0x02
+OP_BAG_HEADER = 0x03
+OP_CHUNK = 0x05
+OP_CHUNK_INFO = 0x06
+OP_CONNECTION = 0x07
+
+_SPLIT_INDEX = re.compile(r"_(\d+)\.db3$")
+
+# (topic, timestamp, serialized message)
+Message = Tuple[str, int, bytes]
+
+
+class BagFormatError(ValueError):
+    """
+    The bag is not in a supported format, or is corrupted
+    """
+
+
+class TopicInfo(NamedTuple):
+    """
+    A topic recorded in a bag
+    """
+
+    name: str
+    type: str
+    messageCount: int
+
+
+class BagIndex(NamedTuple):
+    """
+    Time range and topics of a bag
+    """
+
+    startTime: int
+    endTime: int
+    topics: Dict[str, TopicInfo]
+
+    @property
+    def duration(self) -> float:
+        """
+        Duration of the bag in seconds
+        """
+        return (self.endTime - self.startTime) / 1e9
+
+
+class Bag(Protocol):
+    """
+    Bag Protocol, see openBag
+    """
+
+    # pylint: disable=C0116
+
+    isCdr: bool
+
+    def index(self) -> BagIndex:
+        ...
+
+    def messageCounts(self, buckets: int) -> Dict[str, List[float]]:
+        ...
+
+    def messages(self, topics: List[str], startTime: int = 0) -> Iterator[Message]:
+        ...
+
+    def offeredQos(self) -> Dict[str, str]:
+        ...
+
+
+class Ros1Bag:
+    """
+    A rosbag v2.0 file, the index at the end of the file is read without reading the chunks
+    """
+
+    isCdr = False
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self.connections: Dict[int, Tuple[str, str]] = {}
+        # (position, start time, end time, message count per connection) of every chunk
+        self.chunks: List[Tuple[int, int, int, Dict[int, int]]] = []
+
+        with open(path, "rb") as file:
+            if file.read(len(ROS1_MAGIC)) != ROS1_MAGIC:
+                raise BagFormatError(f"{path} is not a rosbag v2.0 file")
+            self._readIndex(file)
+
+    def index(self) -> BagIndex:
+        """
+        Time range and topics of the bag
+        """
+
+        counts: Dict[str, int] = {}
+        for _, _, _, chunkCounts in self.chunks:
+            for connection, count in chunkCounts.items():
+                topic = self.connections[connection][0]
+                counts[topic] = counts.get(topic, 0) + count
+
+        topics = {
+            topic: TopicInfo(topic, messageType, counts.get(topic, 0))
+            for topic, messageType in self.connections.values()
+        }
+        if not self.chunks:
+            return BagIndex(0, 0, topics)
+        return BagIndex(
+            min(chunk[1] for chunk in self.chunks), max(chunk[2] for chunk in self.chunks), topics
+        )
+
+    def messageCounts(self, buckets: int) -> Dict[str, List[float]]:
+        """
+        Messages of each topic per time bucket, the messages of a chunk are spread over its
+        time range
+        """
+
+        bagIndex = self.index()
+        span = max(bagIndex.endTime - bagIndex.startTime, 1)
+        counts = {topic: [0.0] * buckets for topic in bagIndex.topics}
+
+        for _, start, end, chunkCounts in self.chunks:
+            first = min((start - bagIndex.startTime) * buckets // span, buckets - 1)
+            last = min((end - bagIndex.startTime) * buckets // span, buckets - 1)
+            for connection, count in chunkCounts.items():
+                topicCounts = counts[self.connections[connection][0]]
+                for bucket in range(first, last + 1):
+                    topicCounts[bucket] += count / (last - first + 1)
+
+        return counts
+
+    def offeredQos(self) -> Dict[str, str]:
+        """
+        ROS 1 bags do not record the QoS of the publishers
+        """
+        return {}
+
+    def messages(self, topics: List[str], startTime: int = 0) -> Iterator[Message]:
+        """
+        Messages of topics in time order within each chunk, chunks ending before startTime
+        are skipped
+        """
+
+        connections = {
+            connection for connection, (topic, _) in self.connections.items() if topic in topics
+        }
+        with open(self.path, "rb") as file:
+            for position, _, end, chunkCounts in self.chunks:
+                if end < startTime or not connections.intersection(chunkCounts):
+                    continue
+                for connection, time, data in self._readChunk(file, position):
+                    if connection in connections and time >= startTime:
+                        yield self.connections[connection][0], time, data
+
+    def _readIndex(self, file: BinaryIO) -> None:
+        header, _ = _readRecord(file)
+        if _op(header) != OP_BAG_HEADER:
+            raise BagFormatError(f"{self.path} has no bag header")
+
+        indexPosition = struct.unpack("<Q", header[b"index_pos"])[0]
+        connectionCount = struct.unpack("<I", header[b"conn_count"])[0]
+        chunkCount = struct.unpack("<I", header[b"chunk_count"])[0]
+        if indexPosition == 0:
+            raise BagFormatError(f"{self.path} is not indexed, it was not closed properly")
+
+        file.seek(indexPosition)
+        for _ in range(connectionCount):
+            header, data = _readRecord(file)
+            connection = struct.unpack("<I", header[b"conn"])[0]
+            fields = _parseHeader(data)
+            self.connections[connection] = (
+                header[b"topic"].decode("utf-8"),
+                fields[b"type"].decode("utf-8"),
+            )
+
+        for _ in range(chunkCount):
+            header, data = _readRecord(file)
+            chunkCounts: Dict[int, int] = dict(struct.iter_unpack("<II", data))  # type: ignore
+            self.chunks.append(
+                (
+                    struct.unpack("<Q", header[b"chunk_pos"])[0],
+                    _time(header[b"start_time"]),
+                    _time(header[b"end_time"]),
+                    chunkCounts,
+                )
+            )
+
+    def _readChunk(self, file: BinaryIO, position: int) -> Iterator[Tuple[int, int, bytes]]:
+        file.seek(position)
+        header, data = _readRecord(file)
+        compression = header[b"compression"].decode("utf-8")
+        if compression == "bz2":
+            data = bz2.decompress(data)
+        elif compression == "lz4":
+            try:
+                import lz4.frame  # pylint: disable=C0415
+            except ImportError as err:
+                raise BagFormatError("lz4 compressed bags need the lz4 package") from err
+            data = lz4.frame.decompress(data)
+        elif compression != "none":
+            raise BagFormatError(f"Unsupported chunk compression {compression}")
+
+        offset = 0
+        while offset < len(data):
+            headerLength = struct.unpack_from("<I", data, offset)[0]
+            recordHeader = _parseHeader(data[offset + 4 : offset + 4 + headerLength])
+            offset += 4 + headerLength
+            dataLength = struct.unpack_from("<I", data, offset)[0]
+            offset += 4
+            if _op(recordHeader) == OP_MESSAGE_DATA:
+                yield (
+                    struct.unpack("<I", recordHeader[b"conn"])[0],
+                    _time(recordHeader[b"time"]),
+                    data[offset : offset + dataLength],
+                )
+            offset += dataLength
+
+
+class Rosbag2Bag:
+    """
+    A rosbag2 directory (or a single .db3 file) written by the sqlite3 storage plugin
+    """
+
+    isCdr = True
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        if os.path.isdir(path):
+            # the splits in the order they were written, <name>_10.db3 after <name>_9.db3
+            self.databases = sorted(glob.glob(os.path.join(path, "*.db3")), key=_splitOrder)
+        else:
+            self.databases = [path]
+        if not self.databases:
+            raise BagFormatError(f"{path} has no sqlite3 storage file")
+
+    def index(self) -> BagIndex:
+        """
+        Time range and topics of the bag
+        """
+
+        starts: List[int] = []
+        ends: List[int] = []
+        topics: Dict[str, TopicInfo] = {}
+        for database in self.databases:
+            with self._connect(database) as connection:
+                start, end = connection.execute(
+                    "SELECT MIN(timestamp), MAX(timestamp) FROM messages"
+                ).fetchone()
+                if start is not None:
+                    starts.append(start)
+                    ends.append(end)
+
+                for name, messageType, count in connection.execute(
+                    "SELECT topics.name, topics.type, COUNT(messages.id) FROM topics "
+                    "LEFT JOIN messages ON messages.topic_id = topics.id GROUP BY topics.id"
+                ):
+                    previous = topics.get(name)
+                    topics[name] = TopicInfo(
+                        name, messageType, count + (previous.messageCount if previous else 0)
+                    )
+
+        return BagIndex(min(starts, default=0), max(ends, default=0), topics)
+
+    def messageCounts(self, buckets: int) -> Dict[str, List[float]]:
+        """
+        Messages of each topic per time bucket
+        """
+
+        bagIndex = self.index()
+        span = max(bagIndex.endTime - bagIndex.startTime, 1)
+        counts = {topic: [0.0] * buckets for topic in bagIndex.topics}
+
+        for database in self.databases:
+            with self._connect(database) as connection:
+                rows = connection.execute(
+                    "SELECT topics.name, MIN((messages.timestamp - ?) * ? / ?, ? - 1) AS bucket, "
+                    "COUNT(*) FROM messages JOIN topics ON messages.topic_id = topics.id "
+                    "GROUP BY topics.name, bucket",
+                    (bagIndex.startTime, buckets, span, buckets),
+                )
+                for name, bucket, count in rows:
+                    counts[name][bucket] += count
+
+        return counts
+
+    def messages(self, topics: List[str], startTime: int = 0) -> Iterator[Message]:
+        """
+        Messages of topics in time order within each storage file, from startTime
+        """
+
+        marks = ",".join("?" * len(topics))
+        for database in self.databases:
+            with self._connect(database) as connection:
+                yield from connection.execute(
+                    "SELECT topics.name, messages.timestamp, messages.data FROM messages "
+                    "JOIN topics ON messages.topic_id = topics.id "
+                    f"WHERE topics.name IN ({marks}) AND messages.timestamp >= ? "
+                    "ORDER BY messages.timestamp",
+                    (*topics, startTime),
+                )
+
+    def offeredQos(self) -> Dict[str, str]:
+        """
+        The offered_qos_profiles of each topic, the QoS of its publishers during the recording
+        as YAML, empty for the bags written before it was recorded
+        """
+
+        profiles: Dict[str, str] = {}
+        for database in self.databases:
+            with self._connect(database) as connection:
+                try:
+                    rows = connection.execute("SELECT name, offered_qos_profiles FROM topics")
+                except sqlite3.OperationalError:
+                    return profiles
+                for name, profile in rows:
+                    if profile and name not in profiles:
+                        profiles[name] = profile
+        return profiles
+
+    def _connect(self, database: str) -> sqlite3.Connection:
+        try:
+            return sqlite3.connect(f"file:{database}?mode=ro", uri=True)
+        except sqlite3.Error as err:
+            raise BagFormatError(f"Cannot open {database}: {err}") from err
+
+
+def openBag(path: str) -> Bag:
+    """
+    Open a bag of any supported format
+
+    raises
+    ------
+    BagFormatError
+        If the format of the bag is not supported
+    """
+
+    if os.path.isdir(path) or path.endswith(".db3"):
+        return Rosbag2Bag(path)
+    return Ros1Bag(path)
+
+
+def isImageType(messageType: str) -> bool:
+    """
+    True for sensor_msgs Image and CompressedImage, with the ROS 1 or ROS 2 type name
+    """
+    return messageType.replace("/msg/", "/") in ("sensor_msgs/Image", "sensor_msgs/CompressedImage")
+
+
+class MessageCursor:
+    """
+    Read the fields of a serialized message, in the ROS 1 format or in CDR
+    """
+
+    def __init__(self, data: bytes, isCdr: bool) -> None:
+        self.data = data
+        self.isCdr = isCdr
+        # CDR aligns the fields from the end of the 4 bytes encapsulation header
+        self.offset = 4 if isCdr else 0
+        self.origin = self.offset
+
+    def uint8(self) -> int:
+        """
+        Read an uint8
+        """
+
+        value: int = self.data[self.offset]
+        self.offset += 1
+        return value
+
+    def uint32(self) -> int:
+        """
+        Read an uint32, aligned in CDR
+        """
+
+        if self.isCdr:
+            self.offset += -(self.offset - self.origin) % 4
+        value: int = struct.unpack_from("<I", self.data, self.offset)[0]
+        self.offset += 4
+        return value
+
+    def string(self) -> str:
+        """
+        Read a string, CDR strings end with a null character
+        """
+
+        length = self.uint32()
+        value = self.data[self.offset : self.offset + length]
+        self.offset += length
+        return value.rstrip(b"\0").decode("utf-8", "replace")
+
+    def uint8Array(self) -> bytes:
+        """
+        Read an uint8 sequence
+        """
+
+        length = self.uint32()
+        value = self.data[self.offset : self.offset + length]
+        self.offset += length
+        return value
+
+    def header(self) -> None:
+        """
+        Skip a std_msgs/Header, ROS 1 headers start with a sequence number
+        """
+
+        if not self.isCdr:
+            self.uint32()
+        self.uint32()
+        self.uint32()
+        self.string()
+
+
+def _readRecord(file: BinaryIO) -> Tuple[Dict[bytes, bytes], bytes]:
+    lengthBytes = file.read(4)
+    if len(lengthBytes) < 4:
+        raise BagFormatError("Unexpected end of the bag")
+    header = _parseHeader(file.read(struct.unpack("<I", lengthBytes)[0]))
+    dataLength = struct.unpack("<I", file.read(4))[0]
+    return header, file.read(dataLength)
+
+
+def _parseHeader(data: bytes) -> Dict[bytes, bytes]:
+    fields = {}
+    offset = 0
+    while offset < len(data):
+        length = struct.unpack_from("<I", data, offset)[0]
+        name, _, value = data[offset + 4 : offset + 4 + length].partition(b"=")
+        fields[name] = value
+        offset += 4 + length
+    return fields
+
+
+def _op(header: Dict[bytes, bytes]) -> Optional[int]:
+    return header[b"op"][0] if b"op" in header else None
+
+
+def _time(value: bytes) -> int:
+    seconds, nanoseconds = struct.unpack("<II", value)
+    return int(seconds * 1_000_000_000 + nanoseconds)
+
+
+def _splitOrder(path: str) -> Tuple[str, int]:
+    """
+    Sort key of the storage files of a split rosbag2 bag, by split index
+    """
+
+    match = _SPLIT_INDEX.search(path)
+    if match is None:
+        return path, -1
+    return path[: match.start()], int(match[1])
@@ -0,0 +1,83 @@
+"""
+Run a ros2 bag record process and stop it
+"""
+
+from typing import Any, List, Optional
+
+import time
+import signal
+import subprocess
+
+import psutil
+from .outputReader import OutputReader
+from .profiler import PROFILER
+
+
+class BagRecorder:
+    """
+    A ros2 bag record process writing one bag, its output is collected by an OutputReader
+    """
+
+    def __init__(self, args: List[str], bagName: str) -> None:
+        self.args = list(args)
+        self.bagName = bagName
+        self.proc: Any = None
+        self.outputReader: Optional[OutputReader] = None
+        self.startTime = 0.0
+
+    def start(self) -> None:
+        """
+        Launch the recorder
+        """
+
+        with PROFILER.span("subprocess ros2 bag record"):
+            self.proc = subprocess.Popen(  # pylint: disable=R1732
+                self.args, stderr=subprocess.STDOUT, stdout=subprocess.PIPE
+            )
+        self.startTime = time.monotonic()
+        self.outputReader = OutputReader(self.proc.stdout)
+
+    @property
+    def isAlive(self) -> bool:
+        """
+        True while the recorder process runs
+        """
+        return self.proc is not None and self.proc.poll() is None
+
+    @property
+    def exitCode(self) -> Optional[int]:
+        """
+        Exit code of the recorder, None while it runs, negative if it was killed by a signal
+        """
+        return None if self.proc is None else self.proc.poll()
+
+    @property
+    def elapsed(self) -> float:
+        """
+        Seconds since the recorder was started
+        """
+        return time.monotonic() - self.startTime
+
+    def stop(self) -> None:
+        """
+        Interrupt the recorder, and the processes it spawned with the same command.
+        A recorder that already exited is not signaled.
+        """
+
+        if not self.isAlive:
+            return
+
+        with PROFILER.span("process scan"):
+            for proc in psutil.process_iter(["cmdline"]):
+                if proc.pid != self.proc.pid and set(self.args[1:]).issubset(
+                    proc.info["cmdline"] or []
+                ):
+                    proc.send_signal(signal.SIGINT)
+
+        self.proc.send_signal(signal.SIGINT)
+
+    def wait(self) -> None:
+        """
+        Wait for the recorder to exit
+        """
+        self.proc.wait()
@@ -0,0 +1,321 @@
+"""
+Time accurate replay of a bag. A reader thread prefetches the messages into a bounded queue,
+and a player thread publishes them in time order from a heap, each at the time given by its
+timestamp, the start of the replay and the rate, against a monotonic clock. A message published
+later than its time is counted as late, so a replay that cannot sustain its rate is reported.
+"""
+
+from typing import Callable, Dict, List, NamedTuple, Optional, Tuple
+
+import time
+import heapq
+import queue
+import threading
+
+from .bagReader import Bag, BagFormatError, Message
+from .profiler import PROFILER
+from .topicDiscovery import (
+    SUBSCRIPTION_DEPTH,
+    TopicInfo,
+    TopicQos,
+    messageClass,
+    parseOfferedQos,
+    qosOverride,
+    qosProfile,
+)
+from ..constants import Constants
+
+# end of the messages of the reader thread
+_END = None
+
+
+class ReplayStats(NamedTuple):
+    """
+    Progress of a replay, the drifts are the delays of the messages after their time and
+    elapsed the time from the first to the last message published, in seconds
+    """
+
+    published: int
+    late: int
+    maxDrift: float
+    meanDrift: float
+    bagTime: float
+    elapsed: float
+
+    @property
+    def achievedRate(self) -> float:
+        """
+        Bag seconds replayed per second
+        """
+        return self.bagTime / self.elapsed if self.elapsed > 0 else 0.0
+
+    def describe(self) -> str:
+        """
+        One line summary of the replay
+        """
+        return (
+            f"{self.published} messages, {self.late} late, "
+            f"drift max {self.maxDrift * 1000:.1f} ms mean {self.meanDrift * 1000:.1f} ms, "
+            f"{self.achievedRate:.2f}x"
+        )
+
+
+class BagReplay:  # pylint: disable=R0902
+    """
+    Replay the messages of topics of a bag through publish, from startTime at rate times the
+    recorded speed
+    Messages are read in time order within a chunk or a storage file, the heap restores the
+    time order across them within its lookahead.
+    """
+
+    def __init__(  # pylint: disable=R0913
+        self,
+        bag: Bag,
+        topics: List[str],
+        publish: Callable[[str, int, bytes], None],
+        rate: float = 1.0,
+        startTime: int = 0,
+        lateThreshold: float = Constants.REPLAY_LATE_S,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        if rate <= 0:
+            raise ValueError(f"Invalid replay rate {rate}")
+
+        self.bag = bag
+        self.topics = topics
+        self.publish = publish
+        self.rate = rate
+        self.startTime = startTime
+        self.lateThreshold = lateThreshold
+        self.clock = clock
+        self.error: Optional[BaseException] = None
+
+        self._prefetch: "queue.Queue[Optional[Message]]" = queue.Queue(Constants.REPLAY_PREFETCH)
+        self._stopEvent = threading.Event()
+        self._threads: List[threading.Thread] = []
+        self._lock = threading.Lock()
+        self._published = 0
+        self._late = 0
+        self._maxDrift = 0.0
+        self._totalDrift = 0.0
+        self._bagTime = 0.0
+        self._startClock = 0.0
+        self._lastClock = 0.0
+
+    def start(self) -> None:
+        """
+        Start the reader and the player threads
+        """
+
+        self._startClock = self.clock()
+        self._threads = [
+            threading.Thread(target=self._read, name="replayReader", daemon=True),
+            threading.Thread(target=self._play, name="replayPlayer", daemon=True),
+        ]
+        for thread in self._threads:
+            thread.start()
+
+    @property
+    def isAlive(self) -> bool:
+        """
+        True until every message is published or the replay is stopped
+        """
+        return any(thread.is_alive() for thread in self._threads)
+
+    def stop(self) -> None:
+        """
+        Stop publishing, returns once the threads exited
+        """
+
+        self._stopEvent.set()
+        self.wait()
+
+    def wait(self) -> None:
+        """
+        Wait for the replay to end
+        """
+
+        for thread in self._threads:
+            thread.join()
+
+    @property
+    def stats(self) -> ReplayStats:
+        """
+        Statistics of the messages published so far
+        """
+
+        with self._lock:
+            return ReplayStats(
+                self._published,
+                self._late,
+                self._maxDrift,
+                self._totalDrift / self._published if self._published else 0.0,
+                self._bagTime,
+                self._lastClock - self._startClock,
+            )
+
+    def _read(self) -> None:
+        try:
+            with PROFILER.span("replay read"):
+                for message in self.bag.messages(self.topics, self.startTime):
+                    if not self._put(message):
+                        return
+        except (OSError, BagFormatError) as err:
+            self.error = err
+        self._put(_END)
+
+    def _put(self, message: Optional[Message]) -> bool:
+        """
+        Queue a message for the player, False if the replay was stopped meanwhile
+        """
+
+        while not self._stopEvent.is_set():
+            try:
+                self._prefetch.put(message, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _play(self) -> None:
+        heap: List[Tuple[int, int, str, bytes]] = []
+        sequence = 0
+        isEnd = False
+        firstTime: Optional[int] = None
+
+        while not self._stopEvent.is_set():
+            # keep the heap full so messages read out of order are published in order
+            while not isEnd and len(heap) < Constants.REPLAY_LOOKAHEAD:
+                try:
+                    message = self._prefetch.get(block=not heap, timeout=0.1)
+                except queue.Empty:
+                    break
+                if message is _END:
+                    isEnd = True
+                    break
+                topic, timestamp, data = message
+                heapq.heappush(heap, (timestamp, sequence, topic, data))
+                sequence += 1
+
+            if not heap:
+                if isEnd:
+                    return
+                continue
+
+            timestamp, _, topic, data = heapq.heappop(heap)
+            if firstTime is None:
+                # the replay starts with its first message, not with the prefetch
+                firstTime = timestamp
+                with self._lock:
+                    self._startClock = self.clock()
+            bagTime = (timestamp - firstTime) / 1e9
+            due = self._startClock + bagTime / self.rate
+
+            # sleep in steps so stop is not delayed by a long silence in the bag
+            delay = due - self.clock()
+            while delay > 0 and not self._stopEvent.wait(min(delay, 0.1)):
+                delay = due - self.clock()
+            if self._stopEvent.is_set():
+                return
+
+            now = self.clock()
+            drift = max(0.0, now - due)
+            try:
+                self.publish(topic, timestamp, data)
+            except Exception as err:  # pylint: disable=W0703
+                # e.g. an rclpy error, the reader stops too instead of waiting on a full queue
+                self.error = err
+                self._stopEvent.set()
+                return
+            with self._lock:
+                self._lastClock = now
+                self._published += 1
+                self._totalDrift += drift
+                self._maxDrift = max(self._maxDrift, drift)
+                if drift > self.lateThreshold:
+                    self._late += 1
+                self._bagTime = bagTime
+
+
+class RosPublisher:
+    """
+    Publish serialized messages on the ROS 2 graph, needs rclpy
+    Each topic is published with the QoS of its publishers during the recording, e.g. latched
+    for /tf_static, and the publisher waits for the subscribers of every topic up to waitTime
+    seconds so the first messages are not published to nobody
+    """
+
+    def __init__(
+        self,
+        topicTypes: Dict[str, str],
+        topicQos: Optional[Dict[str, Tuple[TopicQos, ...]]] = None,
+        waitTime: float = 0.0,
+    ) -> None:
+        """
+        raises
+        ------
+        ImportError
+            If rclpy is not available
+        """
+
+        # pylint: disable=C0415
+        import rclpy
+
+        self._context = rclpy.Context()
+        rclpy.init(context=self._context)
+        self._node = rclpy.create_node("rosbag_client_replay", context=self._context)
+        self._publishers = {}
+        for topic, topicType in topicTypes.items():
+            offered = (topicQos or {}).get(topic, ())
+            qos = qosOverride(TopicInfo(topic, topicType, len(offered), offered))
+            self._publishers[topic] = self._node.create_publisher(
+                messageClass(topicType),
+                topic,
+                SUBSCRIPTION_DEPTH if qos is None else qosProfile(qos),
+            )
+        self._waitForSubscribers(waitTime)
+
+    def _waitForSubscribers(self, waitTime: float) -> None:
+        deadline = time.monotonic() + waitTime
+        while time.monotonic() < deadline and any(
+            publisher.get_subscription_count() == 0 for publisher in self._publishers.values()
+        ):
+            time.sleep(0.05)
+
+    def publish(self, topic: str, timestamp: int, data: bytes) -> None:  # pylint: disable=W0613
+        """
+        Publish a serialized message
+        """
+        self._publishers[topic].publish(data)
+
+    def close(self) -> None:
+        """
+        Destroy the publishers and the node
+        """
+
+        self._node.destroy_node()
+        self._context.try_shutdown()
+
+
+def createPublisher(bag: Bag, topics: List[str]) -> RosPublisher:
+    """
+    Publisher of topics of a bag
+
+    raises
+    ------
+    BagFormatError
+        If the messages of the bag are not CDR serialized, e.g. a ROS 1 bag
+    ImportError
+        If rclpy is not available
+    """
+
+    if not bag.isCdr:
+        raise BagFormatError("Only rosbag2 bags can be published on ROS 2")
+
+    bagTopics = bag.index().topics
+    offeredQos = bag.offeredQos()
+    return RosPublisher(
+        {topic: bagTopics[topic].type for topic in topics},
+        {topic: parseOfferedQos(offeredQos.get(topic, "")) for topic in topics},
+        Constants.REPLAY_WAIT_S,
+    )
@@ -0,0 +1,237 @@
+"""
+Search and sort the bag catalog.
+Every sortable column keeps a presorted list of the bags, and the bag names, descriptions and
+topic names are tokenized into an inverted index. A query that extends a previous one (one more
+character, one more word) only filters the result of that query instead of the whole catalog.
+"""
+
+from typing import Any, Dict, FrozenSet, List, NamedTuple, Optional, Set, Tuple
+
+import re
+import bisect
+import functools
+import threading
+from collections import OrderedDict
+
+from .bagMetadata import BagMetadata
+
+SORT_COLUMNS = ("name", "date", "size", "duration", "topics")
+HISTORY_SIZE = 32
+# cost of checking the words of a bag against the cost of a set intersection per bag
+FILTER_COST = 20
+
+_TOKEN = re.compile(r"[a-z0-9]+")
+
+
+class BagRecord(NamedTuple):
+    """
+    A bag as indexed, text holds the words of the bag each preceded by a null character
+    """
+
+    name: str
+    sortKeys: Dict[str, Any]
+    words: FrozenSet[str]
+    text: str
+
+
+def tokenize(text: str) -> List[str]:
+    """
+    Lower case words of text, topic names are split on their namespaces
+    """
+    return _TOKEN.findall(text.lower())
+
+
+class BagSearchIndex:
+    """
+    Inverted index and sort index of the catalog, safe to update from the watcher thread
+    """
+
+    def __init__(self) -> None:
+        self.records: Dict[str, BagRecord] = {}
+
+        self._lock = threading.RLock()
+        self._postings: Dict[str, Set[str]] = {}
+        self._vocabulary: List[str] = []
+        self._isVocabularyDirty = False
+        self._sorted: Dict[str, List[Tuple[Any, str]]] = {column: [] for column in SORT_COLUMNS}
+        self._history: "OrderedDict[Tuple[str, ...], FrozenSet[str]]" = OrderedDict()
+
+    def build(self, bags: Dict[str, Any], metadata: Dict[str, BagMetadata]) -> None:
+        """
+        Index the whole catalog
+
+        parameters
+        ----------
+        bags: Dict[str, Any]
+            The catalog entries by bag name
+        metadata: Dict[str, BagMetadata]
+            Metadata of the bags, see loadBagMetadata
+        """
+
+        records = {name: _createRecord(name, bags[name], metadata.get(name)) for name in bags}
+        with self._lock:
+            self.records = records
+            self._postings = {}
+            for record in records.values():
+                self._addPostings(record)
+            self._sorted = {
+                column: sorted((record.sortKeys[column], name) for name, record in records.items())
+                for column in SORT_COLUMNS
+            }
+            self._isVocabularyDirty = True
+            self._history.clear()
+
+    def add(self, name: str, entry: Dict[str, Any], metadata: Optional[BagMetadata]) -> None:
+        """
+        Index a new bag, or update an indexed one
+        """
+
+        record = _createRecord(name, entry, metadata)
+        with self._lock:
+            if name in self.records:
+                self.remove(name)
+            self.records[name] = record
+            self._addPostings(record)
+            for column in SORT_COLUMNS:
+                bisect.insort(self._sorted[column], (record.sortKeys[column], name))
+            self._isVocabularyDirty = True
+            self._history.clear()
+
+    def remove(self, name: str) -> None:
+        """
+        Forget a bag
+        """
+
+        with self._lock:
+            record = self.records.pop(name, None)
+            if record is None:
+                return
+            for token in record.words:
+                postings = self._postings[token]
+                postings.discard(name)
+                if not postings:
+                    del self._postings[token]
+                    self._isVocabularyDirty = True
+            for column in SORT_COLUMNS:
+                sortedBags = self._sorted[column]
+                del sortedBags[bisect.bisect_left(sortedBags, (record.sortKeys[column], name))]
+            self._history.clear()
+
+    def search(self, query: str) -> FrozenSet[str]:
+        """
+        Names of the bags matching every word of query, a word matches the beginning of a word
+        of the bag name, description or topics. The result of the longest previous query that
+        query refines is narrowed instead of the whole index.
+        """
+
+        tokens = tuple(tokenize(query))
+        with self._lock:
+            if not tokens:
+                return frozenset(self.records)
+            if tokens in self._history:
+                self._history.move_to_end(tokens)
+                return self._history[tokens]
+
+            previous = self._refinedQuery(tokens)
+            if previous is None:
+                result = frozenset(self.records)
+                remaining = list(tokens)
+            else:
+                result = self._history[previous]
+                remaining = [
+                    token
+                    for index, token in enumerate(tokens)
+                    if index >= len(previous) or token != previous[index]
+                ]
+
+            # the longest words are the most selective
+            for token in sorted(remaining, key=len, reverse=True):
+                result = self._narrow(result, token)
+
+            self._history[tokens] = result
+            if len(self._history) > HISTORY_SIZE:
+                self._history.popitem(last=False)
+            return result
+
+    def order(self, column: str, descending: bool = False) -> List[str]:
+        """
+        All the bag names sorted by column
+        """
+
+        with self._lock:
+            names = [name for _, name in self._sorted[column]]
+        if descending:
+            names.reverse()
+        return names
+
+    def _addPostings(self, record: BagRecord) -> None:
+        for token in record.words:
+            postings = self._postings.get(token)
+            if postings is None:
+                postings = self._postings[token] = set()
+                self._isVocabularyDirty = True
+            postings.add(record.name)
+
+    def _narrow(self, names: FrozenSet[str], prefix: str) -> FrozenSet[str]:
+        """
+        The bags of names with a word starting with prefix. The words starting with prefix are
+        a range of the sorted vocabulary, their postings are intersected with names unless
+        checking the words of every bag of names is cheaper.
+        """
+
+        if self._isVocabularyDirty:
+            self._vocabulary = sorted(self._postings)
+            self._isVocabularyDirty = False
+
+        start = bisect.bisect_left(self._vocabulary, prefix)
+        end = bisect.bisect_left(self._vocabulary, prefix + "\uffff")
+        postings = [self._postings[token] for token in self._vocabulary[start:end]]
+
+        if len(names) == len(self.records):
+            return frozenset().union(*postings)
+
+        intersectionCost = sum(min(len(names), len(tokenNames)) for tokenNames in postings)
+        if intersectionCost < len(names) * FILTER_COST:
+            matches: Set[str] = set()
+            for tokenNames in postings:
+                matches |= names & tokenNames
+            return frozenset(matches)
+
+        needle = "\0" + prefix
+        return frozenset(name for name in names if needle in self.records[name].text)
+
+    def _refinedQuery(self, tokens: Tuple[str, ...]) -> Optional[Tuple[str, ...]]:
+        """
+        The most recent previous query whose result contains the result of tokens
+        """
+
+        for previous in reversed(self._history):
+            if len(previous) <= len(tokens) and all(
+                tokens[index].startswith(token) for index, token in enumerate(previous)
+            ):
+                return previous
+        return None
+
+
+def _createRecord(name: str, entry: Dict[str, Any], metadata: Optional[BagMetadata]) -> BagRecord:
+    topics = metadata.topics if metadata else []
+    words = set(tokenize(entry.get("name", "") + " " + entry.get("description", "")))
+    for topic in topics:
+        words.update(_topicWords(topic))
+
+    sortKeys = {
+        "name": entry.get("name", name).lower(),
+        "date": entry.get("timestamp", ""),
+        "size": metadata.size if metadata else 0,
+        "duration": metadata.duration if metadata else 0.0,
+        "topics": len(topics),
+    }
+    return BagRecord(name, sortKeys, frozenset(words), "\0" + "\0".join(words))
+
+
+@functools.lru_cache(maxsize=4096)
+def _topicWords(topic: str) -> Tuple[str, ...]:
+    """
+    Words of a topic name, the same topics are recorded in most bags
+    """
+    return tuple(tokenize(topic))
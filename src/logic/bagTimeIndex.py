@@ -0,0 +1,190 @@
+"""
+Index of the start and end times of the bags, to find the bags that cover a time or a time
+window without opening them.
+The bags are layered by duration, layer k holding the bags that last at most 2^k seconds, each
+layer sorted by start time. A bag of layer k that covers a time t started in [t - 2^k, t], so a
+query is a binary search per layer and only reads the bags that started shortly before the
+window, whatever the size of the catalog.
+"""
+
+from typing import Callable, Dict, FrozenSet, Iterable, List, NamedTuple, Optional, Tuple
+
+import bisect
+import datetime
+import threading
+
+from .bagMetadata import BagMetadata, loadBagMetadata
+
+# duration of the shortest layer in nanoseconds
+LAYER_BASE_NS = 1_000_000_000
+# sorts after every bag name starting at the same time
+_LAST_NAME = "\U0010ffff"
+
+
+class BagSpan(NamedTuple):
+    """
+    Recording interval of a bag, in nanoseconds since the epoch, and its topics
+    """
+
+    name: str
+    startTime: int
+    endTime: int
+    topics: FrozenSet[str]
+
+
+class BagTimeIndex:
+    """
+    Time index of the catalog, kept up to date by the catalog: removed bags are dropped at
+    once, added or updated bags are read from the metadata cache at the next query
+    """
+
+    def __init__(
+        self,
+        loadMetadata: Callable[[List[str]], Dict[str, BagMetadata]] = lambda names: (
+            loadBagMetadata(names, complete=False)
+        ),
+    ) -> None:
+        self.loadMetadata = loadMetadata
+        self.spans: Dict[str, BagSpan] = {}
+
+        self._lock = threading.RLock()
+        self._pending: Dict[str, None] = {}
+        self._layers: List[List[Tuple[int, str]]] = []
+
+    def invalidate(self, added: Iterable[str], removed: Iterable[str]) -> None:
+        """
+        Record a change of the catalog, never reads a bag
+
+        parameters
+        ----------
+        added: Iterable[str]
+            Names of the bags added or updated, their times are read at the next query
+        removed: Iterable[str]
+            Names of the bags removed
+        """
+
+        with self._lock:
+            for name in removed:
+                self._pending.pop(name, None)
+                self._remove(name)
+            for name in added:
+                self._pending[name] = None
+
+    def refresh(self) -> None:
+        """
+        Read the times of the bags added since the last query
+        """
+
+        with self._lock:
+            if not self._pending:
+                return
+            names = list(self._pending)
+            self._pending.clear()
+            metadata = self.loadMetadata(names)
+            for name in names:
+                self._remove(name)
+            touched = {
+                self._add(name, metadata[name])
+                for name in names
+                if name in metadata and metadata[name].startTime > 0
+            }
+            # a single sort of each layer, a whole catalog is not inserted bag by bag
+            for layer in touched:
+                self._layers[layer].sort()
+
+    def overlapping(
+        self, startTime: int, endTime: int, topics: Optional[Iterable[str]] = None
+    ) -> List[BagSpan]:
+        """
+        Bags recorded during part of a time window, in start time order
+
+        parameters
+        ----------
+        startTime: int
+            Start of the window, in nanoseconds since the epoch
+        endTime: int
+            End of the window, startTime for the bags covering a single time
+        topics: Optional[Iterable[str]]
+            Only the bags that recorded one of these topics, defaults to every bag
+        """
+
+        wanted = None if topics is None else frozenset(topics)
+        self.refresh()
+        with self._lock:
+            spans = []
+            for layer, starts in enumerate(self._layers):
+                low = bisect.bisect_left(starts, (startTime - (LAYER_BASE_NS << layer), ""))
+                high = bisect.bisect_right(starts, (endTime, _LAST_NAME))
+                for _, name in starts[low:high]:
+                    span = self.spans[name]
+                    if span.endTime >= startTime and (wanted is None or span.topics & wanted):
+                        spans.append(span)
+        return sorted(spans, key=lambda span: (span.startTime, span.name))
+
+    def covering(self, time: int, topics: Optional[Iterable[str]] = None) -> List[BagSpan]:
+        """
+        Bags recorded at a time, in nanoseconds since the epoch, see overlapping
+        """
+        return self.overlapping(time, time, topics)
+
+    def _add(self, name: str, metadata: BagMetadata) -> int:
+        """
+        Append the bag to its layer, returns the layer, left to sort
+        """
+
+        span = BagSpan(
+            name,
+            metadata.startTime,
+            max(metadata.startTime, metadata.endTime),
+            frozenset(metadata.topics),
+        )
+        layer = _layer(span.endTime - span.startTime)
+        while len(self._layers) <= layer:
+            self._layers.append([])
+        self._layers[layer].append((span.startTime, name))
+        self.spans[name] = span
+        return layer
+
+    def _remove(self, name: str) -> None:
+        span = self.spans.pop(name, None)
+        if span is None:
+            return
+        starts = self._layers[_layer(span.endTime - span.startTime)]
+        index = bisect.bisect_left(starts, (span.startTime, name))
+        del starts[index]
+
+
+def _layer(duration: int) -> int:
+    """
+    The smallest k such that duration is at most 2^k seconds
+    """
+    return (max(duration - 1, 0) // LAYER_BASE_NS).bit_length()
+
+
+def parseTime(text: str) -> int:
+    """
+    Time in nanoseconds since the epoch from seconds since the epoch, or an ISO 8601 date and
+    time, in local time unless it has a UTC offset, e.g. 2026-10-19 14:03:12
+
+    raises
+    ------
+    ValueError
+        If text is not a time
+    """
+
+    text = text.strip()
+    try:
+        return int(float(text) * 1e9)
+    except ValueError:
+        pass
+    try:
+        return int(datetime.datetime.fromisoformat(text).timestamp() * 1e9)
+    except ValueError as err:
+        raise ValueError(f"Invalid time {text}, expected e.g. 2026-10-19T14:03:12") from err
+
+
+def formatTime(time: int) -> str:
+    """
+    Local ISO 8601 time of a time in nanoseconds since the epoch
+    """
+    return datetime.datetime.fromtimestamp(time / 1e9).isoformat(sep=" ", timespec="seconds")
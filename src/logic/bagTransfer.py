@@ -0,0 +1,376 @@
+"""
+Download a bag from a recorder agent into the local bags directory.
+The bag is fetched in chunks with parallel range requests, every chunk is checked against the
+checksum manifest of the agent and recorded in a state file, so an interrupted transfer resumes
+with the missing chunks only. The bag is moved into the bags directory once it is complete.
+"""
+
+from typing import Any, Dict, List, NamedTuple, Optional, Set
+
+import os
+import json
+import time
+import shutil
+import hashlib
+import threading
+import urllib.parse
+from concurrent.futures import ThreadPoolExecutor
+
+from .diskPreflight import formatRate, formatSize
+from .fileSystemInterface import FileSystemInterface
+from .remoteBackend import AgentClient
+from .profiler import PROFILER
+from ..constants import Constants
+
+PARTIAL_DIR_NAME = ".partial"
+BURST_S = 0.25
+READ_BLOCK_SIZE = 256 * 1024
+CHUNK_RETRIES = 3
+MANIFEST_TIMEOUT_S = 600.0
+CHUNK_TIMEOUT_S = 60.0
+
+_RATE_UNITS = {"K": 1e3, "M": 1e6, "G": 1e9}
+
+
+class TransferCancelled(Exception):
+    """
+    Raised in the workers once the transfer is cancelled
+    """
+
+
+class TransferProgress(NamedTuple):
+    """
+    State of a transfer, sizes are in bytes and the rate in bytes per second
+    """
+
+    name: str
+    state: str
+    doneBytes: int
+    totalBytes: int
+    rate: float
+    error: str
+
+    def describe(self) -> str:
+        """
+        One line summary of the transfer
+        """
+
+        if self.state == "failed":
+            return f"{self.name}: failed, {self.error}"
+        percent = 100 * self.doneBytes / self.totalBytes if self.totalBytes else 0
+        summary = f"{self.name}: {self.state} {percent:.0f}% of {formatSize(self.totalBytes)}"
+        if self.state == "running":
+            summary += f" at {formatRate(self.rate)}"
+        return summary
+
+
+class TokenBucket:  # pylint: disable=R0903
+    """
+    Bandwidth limit shared by the workers of a transfer, a rate of 0 means no limit
+    """
+
+    def __init__(self, rate: float) -> None:
+        self.rate = rate
+        self.tokens = 0.0
+        self.last = time.monotonic()
+        self._lock = threading.Lock()
+
+    def consume(self, amount: int) -> None:
+        """
+        Take amount bytes from the bucket, sleeping while the bucket is in debt
+        """
+
+        if self.rate <= 0:
+            return
+
+        with self._lock:
+            now = time.monotonic()
+            self.tokens = min(self.rate * BURST_S, self.tokens + (now - self.last) * self.rate)
+            self.last = now
+            self.tokens -= amount
+            delay = -self.tokens / self.rate
+
+        if delay > 0:
+            time.sleep(delay)
+
+
+class BagTransfer:  # pylint: disable=R0902
+    """
+    Download of one bag of a recorder agent, run in a background thread by start
+    """
+
+    def __init__(
+        self,
+        client: AgentClient,
+        name: str,
+        catalog: FileSystemInterface,
+        workers: int = Constants.TRANSFER_WORKERS,
+        bandwidthLimit: float = 0.0,
+    ) -> None:
+        self.client = client
+        self.name = name
+        self.catalog = catalog
+        self.workers = workers
+        self.bucket = TokenBucket(bandwidthLimit)
+
+        self.partialPath = os.path.join(Constants.BAG_DIR_PATH, PARTIAL_DIR_NAME, name)
+        self.statePath = self.partialPath + ".json"
+        self.finalPath = os.path.join(Constants.BAG_DIR_PATH, name)
+
+        self._lock = threading.Lock()
+        self._cancelEvent = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._progress = TransferProgress(name, "pending", 0, 0, 0.0, "")
+        self._manifest: Dict[str, Any] = {}
+        self._done: Dict[str, Set[int]] = {}
+        self._receivedBytes = 0
+        self._resumedBytes = 0
+        self._startTime = 0.0
+
+    def start(self) -> None:
+        """
+        Start the download in a background thread
+        """
+
+        self._thread = threading.Thread(target=self._run, name=f"transfer {self.name}", daemon=True)
+        self._thread.start()
+
+    def cancel(self) -> None:
+        """
+        Stop the download, the chunks already received are kept for the next transfer
+        """
+        self._cancelEvent.set()
+
+    def wait(self) -> None:
+        """
+        Wait for the download to finish, fail or be cancelled
+        """
+        if self._thread is not None:
+            self._thread.join()
+
+    @property
+    def progress(self) -> TransferProgress:
+        """
+        The current state of the download
+        """
+
+        with self._lock:
+            progress = self._progress._replace(doneBytes=self._resumedBytes + self._receivedBytes)
+        if progress.state == "running":
+            elapsed = time.monotonic() - self._startTime
+            rate = self._receivedBytes / elapsed if elapsed > 0 else 0.0
+            progress = progress._replace(rate=rate)
+        return progress
+
+    @property
+    def isFinished(self) -> bool:
+        """
+        True once the download is done, failed or cancelled
+        """
+        return self.progress.state in ("done", "failed", "cancelled")
+
+    def _run(self) -> None:
+        try:
+            with PROFILER.span("bag transfer"):
+                self._transfer()
+            self._setState("done")
+        except TransferCancelled:
+            self._setState("cancelled")
+        except (ConnectionError, OSError, ValueError) as err:
+            self._setState("failed", str(err))
+
+    def _transfer(self) -> None:
+        if os.path.exists(self.finalPath):
+            raise ValueError(f"{self.name} is already in the bags directory")
+
+        manifest = self.client.request(
+            "GET", "/files/" + urllib.parse.quote(self.name, safe=""), timeout=MANIFEST_TIMEOUT_S
+        )
+        files: List[Dict[str, Any]] = manifest["files"]
+        chunkSize: int = manifest["chunkSize"]
+        isDirectory: bool = manifest["isDirectory"]
+
+        self._prepare(manifest)
+        with self._lock:
+            self._progress = self._progress._replace(
+                state="running",
+                totalBytes=sum(file["size"] for file in files),
+            )
+        self._startTime = time.monotonic()
+
+        pending = [
+            (file, index)
+            for file in files
+            for index in range(len(file["chunks"]))
+            if index not in self._done[file["path"]]
+        ]
+        with ThreadPoolExecutor(self.workers, thread_name_prefix="transfer") as executor:
+            futures = [
+                executor.submit(self._fetchChunk, file, index, chunkSize, isDirectory)
+                for file, index in pending
+            ]
+            try:
+                for future in futures:
+                    future.result()
+            except BaseException:
+                self._cancelEvent.set()
+                for future in futures:
+                    future.cancel()
+                raise
+
+        self._complete(files, isDirectory)
+
+    def _prepare(self, manifest: Dict[str, Any]) -> None:
+        """
+        Create the partial files, and keep the chunks of a previous transfer that still match
+        the manifest
+        """
+
+        state: Dict[str, Any] = {}
+        try:
+            with open(self.statePath, "r", encoding="utf-8") as stateFile:
+                state = json.load(stateFile)
+        except (OSError, ValueError):
+            pass
+        if state.get("manifest") != manifest:
+            # the bag changed on the agent since the previous transfer
+            state = {"manifest": manifest, "done": {}}
+            if os.path.isdir(self.partialPath):
+                shutil.rmtree(self.partialPath)
+        if manifest["isDirectory"]:
+            os.makedirs(self.partialPath, exist_ok=True)
+
+        for file in manifest["files"]:
+            path = self._localPath(file["path"], manifest["isDirectory"])
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, "ab") as partial:
+                partial.truncate(file["size"])
+
+            done = set(state["done"].get(file["path"], []))
+            with open(path, "rb") as partial:
+                for index in sorted(done):
+                    partial.seek(index * manifest["chunkSize"])
+                    data = partial.read(manifest["chunkSize"])
+                    if hashlib.sha256(data).hexdigest() != file["chunks"][index]:
+                        done.discard(index)
+                    else:
+                        self._resumedBytes += len(data)
+            self._done[file["path"]] = done
+
+        self._manifest = manifest
+        self._saveState()
+
+    def _fetchChunk(
+        self, file: Dict[str, Any], index: int, chunkSize: int, isDirectory: bool
+    ) -> None:
+        offset = index * chunkSize
+        length = min(chunkSize, file["size"] - offset)
+        path = "/files/" + urllib.parse.quote(self.name, safe="") + "/"
+        path += urllib.parse.quote(file["path"])
+
+        for attempt in range(CHUNK_RETRIES):
+            try:
+                data = self._readRange(path, offset, length)
+            except ConnectionError:
+                if attempt == CHUNK_RETRIES - 1:
+                    raise
+                continue
+            if hashlib.sha256(data).hexdigest() == file["chunks"][index]:
+                break
+            with self._lock:
+                self._receivedBytes -= len(data)
+            if attempt == CHUNK_RETRIES - 1:
+                raise ValueError(f"Checksum mismatch in {file['path']} at {offset}")
+
+        descriptor = os.open(self._localPath(file["path"], isDirectory), os.O_WRONLY)
+        try:
+            os.pwrite(descriptor, data, offset)
+        finally:
+            os.close(descriptor)
+
+        with self._lock:
+            self._done[file["path"]].add(index)
+            self._saveState()
+
+    def _readRange(self, path: str, offset: int, length: int) -> bytes:
+        headers = {"Range": f"bytes={offset}-{offset + length - 1}"}
+        blocks: List[bytes] = []
+        try:
+            with self.client.open("GET", path, headers=headers, timeout=CHUNK_TIMEOUT_S) as reply:
+                while True:
+                    if self._cancelEvent.is_set():
+                        raise TransferCancelled()
+                    block = reply.read(READ_BLOCK_SIZE)
+                    if not block:
+                        break
+                    self.bucket.consume(len(block))
+                    blocks.append(block)
+                    with self._lock:
+                        self._receivedBytes += len(block)
+        except BaseException as err:
+            # the bytes of an interrupted chunk are received again
+            with self._lock:
+                self._receivedBytes -= sum(len(block) for block in blocks)
+            if isinstance(err, OSError):
+                raise ConnectionError(f"Transfer of {self.name} interrupted: {err}") from err
+            raise
+
+        data = b"".join(blocks)
+        if len(data) != length:
+            raise ConnectionError(f"Short read in {path}: {len(data)} of {length} bytes")
+        return data
+
+    def _complete(self, files: List[Dict[str, Any]], isDirectory: bool) -> None:
+        """
+        Flush the bag and move it into the bags directory in one rename
+        """
+
+        for file in files:
+            descriptor = os.open(self._localPath(file["path"], isDirectory), os.O_RDONLY)
+            try:
+                os.fsync(descriptor)
+            finally:
+                os.close(descriptor)
+
+        os.replace(self.partialPath, self.finalPath)
+        os.remove(self.statePath)
+
+        try:
+            description = self.client.request("GET", "/bags").get(self.name, {})["description"]
+        except (ConnectionError, KeyError):
+            description = ""
+        self.catalog.addBag(self.name, description)
+
+    def _localPath(self, relativePath: str, isDirectory: bool) -> str:
+        if not isDirectory:
+            return self.partialPath
+        return os.path.join(self.partialPath, relativePath)
+
+    def _saveState(self) -> None:
+        """
+        Write the received chunks next to the partial bag, replaced in one rename
+        """
+
+        state = {
+            "manifest": self._manifest,
+            "done": {path: sorted(done) for path, done in self._done.items()},
+        }
+        with open(self.statePath + ".tmp", "w", encoding="utf-8") as file:
+            json.dump(state, file)
+        os.replace(self.statePath + ".tmp", self.statePath)
+
+    def _setState(self, state: str, error: str = "") -> None:
+        with self._lock:
+            self._progress = self._progress._replace(state=state, error=error, rate=0.0)
+
+
+def parseRate(value: str) -> float:
+    """
+    Parse a bandwidth limit such as 500K, 10M or 1G into bytes per second, 0 if it is empty
+    """
+
+    if not value:
+        return 0.0
+
+    multiplier = _RATE_UNITS.get(value[-1].upper(), 1)
+    return float(value.rstrip("kKmMgG")) * multiplier
@@ -0,0 +1,272 @@
+"""
+Soft delete of the bags. A deleted bag is renamed into the trash directory of its bags
+directory, which takes the same time whatever the size of the bag and can be undone. A reaper
+thread frees the space of the trash by age and total size, and right away when the disk is
+almost full.
+"""
+
+from typing import Any, Dict, List, NamedTuple, Optional
+
+import os
+import json
+import time
+import shutil
+import threading
+
+from .profiler import PROFILER
+from ..constants import Constants
+
+TRASH_DIR_NAME = ".trash"
+ENTRY_SUFFIX = ".json"
+PURGING_SUFFIX = ".purging"
+
+
+class TrashedBag(NamedTuple):
+    """
+    A bag in the trash, trashName is its name in the trash directory
+    """
+
+    trashName: str
+    name: str
+    deletedAt: float
+    entry: Dict[str, Any]
+
+
+class BagTrash:
+    """
+    The trash of a bags directory, on the same file system so a delete is a rename
+    """
+
+    def __init__(self, root: str = Constants.BAG_DIR_PATH) -> None:
+        self.root = root
+        self.path = os.path.join(root, TRASH_DIR_NAME)
+        self._lock = threading.Lock()
+        self._sizes: Dict[str, int] = {}
+
+    def moveToTrash(self, name: str, entry: Dict[str, Any]) -> TrashedBag:
+        """
+        Move a bag into the trash with its catalog entry
+
+        parameters
+        ----------
+        name: str
+            Name of the bag in the bags directory
+        entry: Dict[str, Any]
+            Catalog entry of the bag, restored with it
+
+        raises
+        ------
+        OSError
+            If the bag cannot be renamed
+        """
+
+        os.makedirs(self.path, exist_ok=True)
+        deletedAt = time.time()
+        trashName = f"{time.time_ns()}-{name}"
+        entryPath = os.path.join(self.path, trashName + ENTRY_SUFFIX)
+
+        with self._lock:
+            with open(entryPath, "w", encoding="utf-8") as file:
+                json.dump({"name": name, "deletedAt": deletedAt, "entry": entry}, file)
+            try:
+                os.rename(os.path.join(self.root, name), os.path.join(self.path, trashName))
+            except OSError:
+                os.remove(entryPath)
+                raise
+        return TrashedBag(trashName, name, deletedAt, entry)
+
+    def list(self) -> List[TrashedBag]:
+        """
+        The bags in the trash, oldest first
+        """
+
+        try:
+            fileNames = os.listdir(self.path)
+        except FileNotFoundError:
+            return []
+
+        trashed = []
+        for fileName in fileNames:
+            if not fileName.endswith(ENTRY_SUFFIX):
+                continue
+            trashName = fileName[: -len(ENTRY_SUFFIX)]
+            try:
+                with open(os.path.join(self.path, fileName), "r", encoding="utf-8") as file:
+                    data = json.load(file)
+            except (OSError, ValueError):
+                continue
+            trashed.append(TrashedBag(trashName, data["name"], data["deletedAt"], data["entry"]))
+        return sorted(trashed, key=lambda bag: bag.deletedAt)
+
+    def restore(self, name: str) -> TrashedBag:
+        """
+        Move the last deleted bag named name back into the bags directory
+
+        raises
+        ------
+        FileNotFoundError
+            If no bag of that name is in the trash
+        FileExistsError
+            If a bag of that name is in the bags directory
+        """
+
+        candidates = [bag for bag in self.list() if bag.name == name]
+        if not candidates:
+            raise FileNotFoundError(f"No bag named {name} in the trash")
+        if os.path.exists(os.path.join(self.root, name)):
+            raise FileExistsError(f"{name} is already in the bags directory")
+
+        trashed = candidates[-1]
+        with self._lock:
+            if not os.path.exists(os.path.join(self.path, trashed.trashName + ENTRY_SUFFIX)):
+                raise FileNotFoundError(f"{name} was purged from the trash")
+            os.rename(os.path.join(self.path, trashed.trashName), os.path.join(self.root, name))
+            os.remove(os.path.join(self.path, trashed.trashName + ENTRY_SUFFIX))
+        return trashed
+
+    def purge(self, trashed: TrashedBag) -> None:
+        """
+        Delete a bag of the trash for good. The bag is renamed first, so it cannot be restored
+        while its files are deleted.
+        """
+
+        path = os.path.join(self.path, trashed.trashName)
+        with self._lock:
+            os.remove(path + ENTRY_SUFFIX)
+            if not os.path.lexists(path):
+                return
+            os.rename(path, path + PURGING_SUFFIX)
+            self._sizes.pop(trashed.trashName, None)
+        removePath(path + PURGING_SUFFIX)
+
+    def size(self, trashed: TrashedBag) -> int:
+        """
+        Disk space used by a bag of the trash in bytes, 0 if it is gone
+        """
+
+        if trashed.trashName not in self._sizes:
+            try:
+                self._sizes[trashed.trashName] = diskUsage(
+                    os.path.join(self.path, trashed.trashName)
+                )
+            except OSError:
+                return 0
+        return self._sizes[trashed.trashName]
+
+    def reap(
+        self,
+        maxAge: float = Constants.TRASH_MAX_AGE_S,
+        maxBytes: int = Constants.TRASH_MAX_BYTES,
+        minFreeBytes: int = Constants.TRASH_MIN_FREE_BYTES,
+    ) -> List[TrashedBag]:
+        """
+        Purge the bags deleted more than maxAge seconds ago, then the oldest bags until the
+        trash holds at most maxBytes and the disk has minFreeBytes free
+
+        returns
+        -------
+        List[TrashedBag]
+            The purged bags
+        """
+
+        if not os.path.isdir(self.path):
+            return []
+
+        # bags left by a purge that was interrupted
+        for fileName in os.listdir(self.path):
+            if fileName.endswith(PURGING_SUFFIX):
+                removePath(os.path.join(self.path, fileName))
+
+        trashed = self.list()
+        purged = []
+        now = time.time()
+        totalBytes = sum(self.size(bag) for bag in trashed)
+
+        for bag in trashed:
+            isTooOld = now - bag.deletedAt > maxAge
+            isTooLarge = totalBytes > maxBytes
+            isDiskFull = shutil.disk_usage(self.root).free < minFreeBytes
+            if not (isTooOld or isTooLarge or isDiskFull):
+                break
+
+            totalBytes -= self.size(bag)
+            try:
+                self.purge(bag)
+            except OSError:
+                continue
+            purged.append(bag)
+        return purged
+
+
+def diskUsage(path: str) -> int:
+    """
+    Disk space allocated to a file, or to all the files of a directory, in bytes. This is the
+    space freed by deleting it, unlike the size of sparse or preallocated files.
+    """
+
+    if not os.path.isdir(path):
+        return os.stat(path).st_blocks * 512
+    return sum(
+        os.stat(os.path.join(directory, name)).st_blocks * 512
+        for directory, _, names in os.walk(path)
+        for name in names
+    )
+
+
+def removePath(path: str) -> None:
+    """
+    Delete a bag file or rosbag2 directory for good
+    """
+
+    with PROFILER.span("bag remove"):
+        if os.path.isdir(path):
+            shutil.rmtree(path)
+        else:
+            os.remove(path)
+
+
+class TrashReaper:
+    """
+    Reap the trash from a background thread, periodically and whenever wake is called
+    """
+
+    def __init__(self, trash: BagTrash, period: float = Constants.TRASH_REAP_PERIOD_S) -> None:
+        self.trash = trash
+        self.period = period
+        self._wakeEvent = threading.Event()
+        self._stopEvent = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        """
+        Start reaping in a daemon thread
+        """
+
+        self._thread = threading.Thread(target=self._run, name="trashReaper", daemon=True)
+        self._thread.start()
+
+    def wake(self) -> None:
+        """
+        Reap now, e.g. after a delete
+        """
+        self._wakeEvent.set()
+
+    def stop(self) -> None:
+        """
+        Stop the thread
+        """
+
+        self._stopEvent.set()
+        self._wakeEvent.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def _run(self) -> None:
+        while not self._stopEvent.is_set():
+            try:
+                self.trash.reap()
+            except OSError:
+                # the bags directory may be unmounted, try again at the next period
+                pass
+            self._wakeEvent.wait(self.period)
+            self._wakeEvent.clear()
@@ -0,0 +1,247 @@
+"""
+Delete, move, compress, export or convert to tables many bags at once.
+The bags are processed by a pool of worker threads, and the catalog is updated once with all
+the bags that left the bags directory, so the json file is written once and the bag list is
+updated once.
+"""
+
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+
+import os
+import json
+import shutil
+import tarfile
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from .bagReader import BagFormatError
+from .bagTrash import removePath
+from .fileSystemInterface import FileSystemInterface
+from .profiler import PROFILER
+from .tableExport import checkTableFormat, exportTables
+from ..constants import Constants
+
+BULK_ACTIONS = ("delete", "move", "compress", "export", "convert")
+# actions that take the bags out of the bags directory
+REMOVING_ACTIONS = ("delete", "move", "compress")
+# actions that only need the catalog, available for the bags of a recorder agent
+REMOTE_ACTIONS = ("delete",)
+
+
+class BulkProgress(NamedTuple):
+    """
+    Number of bags processed so far
+    """
+
+    action: str
+    doneCount: int
+    totalCount: int
+
+    def describe(self) -> str:
+        """
+        One line summary of the operation
+        """
+        return f"{self.action.capitalize()}: {self.doneCount}/{self.totalCount} bags"
+
+
+class BulkResult(NamedTuple):
+    """
+    Outcome of a bulk operation, the names of the bags processed and the errors by bag name
+    """
+
+    action: str
+    names: List[str]
+    errors: Dict[str, str]
+
+    def describe(self) -> str:
+        """
+        One line summary of the outcome
+        """
+
+        summary = f"{self.action.capitalize()}: {len(self.names)} bags done"
+        if self.errors:
+            name, error = next(iter(self.errors.items()))
+            summary += f", {len(self.errors)} failed ({name}: {error})"
+        return summary
+
+
+class BulkOperation:  # pylint: disable=R0902
+    """
+    One action applied to a selection of bags, the blocking work is done by run
+    """
+
+    def __init__(  # pylint: disable=R0913
+        self,
+        catalog: FileSystemInterface,
+        action: str,
+        names: List[str],
+        destination: str = "",
+        workers: int = Constants.BULK_WORKERS,
+        tableFormat: str = Constants.EXPORT_FORMAT,
+        topics: Optional[List[str]] = None,
+        timeRange: Optional[Tuple[int, int]] = None,
+    ) -> None:
+        """
+        parameters
+        ----------
+        catalog: FileSystemInterface
+            The catalog of the bags
+        action: str
+            One of BULK_ACTIONS
+        names: List[str]
+            Names of the bags
+        destination: str
+            Directory the bags are moved, compressed, exported or converted to, unused to delete
+        workers: int
+            Number of bags processed at once
+        tableFormat: str
+            Format of the tables to convert to, one of TABLE_FORMATS
+        topics: Optional[List[str]]
+            Topics to convert, defaults to every topic of a supported type
+        timeRange: Optional[Tuple[int, int]]
+            Only convert the messages of this time window, see exportTables
+
+        raises
+        ------
+        ValueError
+            If the action is unknown, needs a destination that is not a directory, or the
+            table format cannot be written
+        """
+
+        if action not in BULK_ACTIONS:
+            raise ValueError(f"Unknown action {action}, expected one of {', '.join(BULK_ACTIONS)}")
+        if action != "delete" and not os.path.isdir(destination):
+            raise ValueError(f"{destination or 'No destination'} is not a directory")
+        if action == "convert":
+            checkTableFormat(tableFormat)
+
+        self.catalog = catalog
+        self.action = action
+        self.names = list(dict.fromkeys(names))
+        self.destination = destination
+        self.workers = workers
+        self.tableFormat = tableFormat
+        self.topics = topics
+        self.timeRange = timeRange
+
+        self._lock = threading.Lock()
+        self._doneCount = 0
+
+    @property
+    def progress(self) -> BulkProgress:
+        """
+        The number of bags processed so far
+        """
+
+        with self._lock:
+            return BulkProgress(self.action, self._doneCount, len(self.names))
+
+    def run(self) -> BulkResult:
+        """
+        Apply the action to every bag, then commit the catalog once
+
+        returns
+        -------
+        BulkResult
+            The bags processed, and the errors of the others
+        """
+
+        done: List[str] = []
+        errors: Dict[str, str] = {}
+        with PROFILER.span(f"bulk {self.action}"):
+            with ThreadPoolExecutor(self.workers, thread_name_prefix="bulk") as executor:
+                futures = {executor.submit(self._apply, name): name for name in self.names}
+                for future in as_completed(futures):
+                    name = futures[future]
+                    try:
+                        future.result()
+                        done.append(name)
+                    except (OSError, ConnectionError, tarfile.TarError, BagFormatError) as err:
+                        errors[name] = str(err)
+                    with self._lock:
+                        self._doneCount += 1
+
+            # keep the order of the selection
+            doneNames = set(done)
+            done = [name for name in self.names if name in doneNames]
+            if self.action in ("move", "export"):
+                self._exportDescriptions(done)
+            if self.action in REMOVING_ACTIONS:
+                self.catalog.forgetBags(done)
+
+        return BulkResult(self.action, done, errors)
+
+    def _apply(self, name: str) -> None:
+        path = os.path.join(Constants.BAG_DIR_PATH, name)
+        target = os.path.join(self.destination, name)
+        if self.action in ("move", "export") and os.path.exists(target):
+            raise FileExistsError(f"{target} already exists")
+
+        if self.action == "delete":
+            self.catalog.deleteBagFiles(name)
+        elif self.action == "move":
+            shutil.move(path, target)
+        elif self.action == "export":
+            if os.path.isdir(path):
+                shutil.copytree(path, target)
+            else:
+                shutil.copy2(path, target)
+        elif self.action == "convert":
+            self._convert(name, path)
+        else:
+            self._compress(name, path)
+
+    def _compress(self, name: str, path: str) -> None:
+        """
+        Archive the bag into {destination}/{name}.tar.gz, the bag is deleted once the archive
+        is complete, not moved to the trash, so compressing frees its space right away
+        """
+
+        archivePath = os.path.join(self.destination, name + ".tar.gz")
+        if os.path.exists(archivePath):
+            raise FileExistsError(f"{archivePath} already exists")
+
+        try:
+            with tarfile.open(archivePath + ".tmp", "w:gz") as archive:
+                archive.add(path, arcname=name)
+            os.replace(archivePath + ".tmp", archivePath)
+        except BaseException:
+            if os.path.exists(archivePath + ".tmp"):
+                os.remove(archivePath + ".tmp")
+            raise
+        removePath(path)
+
+    def _convert(self, name: str, path: str) -> None:
+        """
+        Write the topics of the bag as tables into {destination}/{bag name without .bag}
+        """
+
+        tablesPath = os.path.join(self.destination, os.path.splitext(name)[0])
+        if os.path.exists(tablesPath):
+            raise FileExistsError(f"{tablesPath} already exists")
+        exportTables(path, tablesPath, self.tableFormat, self.topics, self.timeRange)
+
+    def _exportDescriptions(self, names: List[str]) -> None:
+        """
+        Merge the descriptions of the bags into the description file of the destination, so
+        a bags directory there lists them with their descriptions
+        """
+
+        if not names:
+            return
+
+        jsonPath = os.path.join(self.destination, Constants.JSON_FILE_NAME)
+        try:
+            with open(jsonPath, "r", encoding="utf-8") as file:
+                descriptions: Dict[str, Any] = json.load(file)
+        except (OSError, ValueError):
+            descriptions = {}
+
+        with self.catalog.lock:
+            for name in names:
+                if name in self.catalog.bagDescription:
+                    descriptions[name] = self.catalog.bagDescription[name]
+
+        with open(jsonPath + ".tmp", "w", encoding="utf-8") as file:
+            json.dump(descriptions, file, indent=4)
+        os.replace(jsonPath + ".tmp", jsonPath)
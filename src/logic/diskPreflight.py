@@ -0,0 +1,328 @@
+"""
+Pre-flight check of the output disk before a recording starts.
+The sustained write throughput of the disk is measured once per device with a short probe,
+and compared with the projected bandwidth of the recorded topics and the free space.
+The topics are measured together by the discovery node with rclpy, otherwise by ros2 topic bw.
+"""
+
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+import os
+import re
+import mmap
+import time
+import shutil
+import signal
+import threading
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+
+from .profiler import PROFILER
+from .topicDiscovery import TopicDiscovery
+
+PROBE_SIZE = 32 * 1024 * 1024
+PROBE_BLOCK_SIZE = 1024 * 1024
+BANDWIDTH_WINDOW_S = 2.0
+# ros2 topic bw takes a few seconds to start and print its first measure
+BANDWIDTH_CLI_WINDOW_S = 6.0
+BANDWIDTH_EXIT_TIMEOUT_S = 2.0
+BANDWIDTH_CACHE_TTL_S = 60.0
+BANDWIDTH_WORKERS = 16
+
+THROUGHPUT_MARGIN = 1.5
+SPACE_MARGIN = 1.2
+MIN_RECORDING_TIME_S = 10 * 60
+
+_UNITS = {"B": 1, "KB": 1e3, "MB": 1e6, "GB": 1e9}
+_BANDWIDTH_LINE = re.compile(r"([\d.]+)\s*(B|KB|MB|GB)/s")
+
+_lock = threading.Lock()
+_throughputByDevice: Dict[int, float] = {}
+_bandwidthByTopic: Dict[str, Tuple[float, float]] = {}
+
+
+class PreflightReport(NamedTuple):
+    """
+    Result of the pre-flight check, rates are in bytes per second
+    """
+
+    throughput: float
+    bandwidth: float
+    freeSpace: int
+    errors: List[str]
+    warnings: List[str]
+
+    @property
+    def passed(self) -> bool:
+        """
+        True if nothing blocks the recording
+        """
+        return not self.errors
+
+
+def runPreflight(
+    outputRoot: str,
+    topics: List[str],
+    duration: Optional[float],
+    discovery: Optional[TopicDiscovery] = None,
+) -> PreflightReport:
+    """
+    Check that the disk of outputRoot can keep up with the topics for the whole recording
+
+    parameters
+    ----------
+    outputRoot: str
+        Directory the bag is written to, it does not have to exist yet
+    topics: List[str]
+        The recorded topics
+    duration: Optional[float]
+        Duration of the recording in seconds, None if it is recorded until stopped
+    discovery: Optional[TopicDiscovery]
+        Measures the topics with its node, see measureTopicBandwidth
+
+    returns
+    -------
+    PreflightReport
+        The measured rates, the blocking errors and the warnings
+    """
+
+    directory = _existingDirectory(outputRoot)
+    freeSpace = shutil.disk_usage(directory).free
+
+    try:
+        throughput = measureWriteThroughput(directory)
+    except OSError as err:
+        return PreflightReport(0.0, 0.0, freeSpace, [f"Cannot write to {directory}: {err}"], [])
+
+    bandwidth = sum(measureTopicBandwidth(topics, discovery).values())
+
+    errors: List[str] = []
+    warnings: List[str] = []
+
+    if bandwidth > throughput:
+        errors.append(
+            f"The disk writes {formatRate(throughput)} but the topics publish "
+            f"{formatRate(bandwidth)}, messages would be dropped"
+        )
+    elif bandwidth * THROUGHPUT_MARGIN > throughput:
+        warnings.append(
+            f"The disk writes {formatRate(throughput)}, close to the "
+            f"{formatRate(bandwidth)} published by the topics"
+        )
+
+    if duration is not None:
+        needed = bandwidth * duration
+        if needed > freeSpace:
+            errors.append(
+                f"The recording needs {formatSize(needed)} "
+                f"but only {formatSize(freeSpace)} are free"
+            )
+        elif needed * SPACE_MARGIN > freeSpace:
+            warnings.append(
+                f"The recording needs {formatSize(needed)}, {formatSize(freeSpace)} are free"
+            )
+    elif bandwidth > 0 and freeSpace / bandwidth < MIN_RECORDING_TIME_S:
+        warnings.append(f"The disk is full in {int(freeSpace / bandwidth)} s at this bandwidth")
+
+    return PreflightReport(throughput, bandwidth, freeSpace, errors, warnings)
+
+
+def measureWriteThroughput(directory: str, size: int = PROBE_SIZE) -> float:
+    """
+    Measure the sustained write throughput of the device holding directory.
+    The probe bypasses the page cache with O_DIRECT when the file system allows it,
+    otherwise the probe file is synced before the clock stops.
+    The result is cached for the device.
+
+    parameters
+    ----------
+    directory: str
+        An existing writable directory
+    size: int
+        Number of bytes written by the probe
+
+    returns
+    -------
+    float
+        The throughput in bytes per second
+    """
+
+    device = os.stat(directory).st_dev
+    with _lock:
+        if device in _throughputByDevice:
+            return _throughputByDevice[device]
+
+    path = os.path.join(directory, f".preflight_{os.getpid()}")
+    try:
+        with PROFILER.span("disk write probe"):
+            try:
+                elapsed = _writeProbe(path, size, getattr(os, "O_DIRECT", 0))
+            except OSError:
+                elapsed = _writeProbe(path, size, 0)
+    finally:
+        if os.path.exists(path):
+            os.remove(path)
+
+    throughput = size / max(elapsed, 1e-9)
+    with _lock:
+        _throughputByDevice[device] = throughput
+    return throughput
+
+
+def _writeProbe(path: str, size: int, flags: int) -> float:
+    """
+    Write size bytes to path and return the time it took in seconds
+    """
+
+    # mmap gives a page aligned buffer, as required by O_DIRECT
+    block = mmap.mmap(-1, PROBE_BLOCK_SIZE)
+    block.write(os.urandom(PROBE_BLOCK_SIZE))
+    probeFd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC | flags, 0o600)
+    try:
+        start = time.perf_counter()
+        for _ in range(size // PROBE_BLOCK_SIZE):
+            os.writev(probeFd, [block])
+        os.fsync(probeFd)
+        return time.perf_counter() - start
+    finally:
+        os.close(probeFd)
+        block.close()
+
+
+def measureTopicBandwidth(
+    topics: List[str], discovery: Optional[TopicDiscovery] = None
+) -> Dict[str, float]:
+    """
+    Measure the bandwidth of the topics, all at once by the node of the discovery when rclpy is
+    available, otherwise with ros2 topic bw in parallel.
+    The measures are cached for BANDWIDTH_CACHE_TTL_S seconds.
+
+    parameters
+    ----------
+    topics: List[str]
+        The topics to measure
+    discovery: Optional[TopicDiscovery]
+        The discovery whose node subscribes to the topics, ros2 topic bw is used if None
+
+    returns
+    -------
+    Dict[str, float]
+        The bandwidth of each topic in bytes per second, 0 if nothing was received
+    """
+
+    now = time.monotonic()
+    bandwidths: Dict[str, float] = {}
+    with _lock:
+        for topic in topics:
+            cached = _bandwidthByTopic.get(topic)
+            if cached is not None and now - cached[1] < BANDWIDTH_CACHE_TTL_S:
+                bandwidths[topic] = cached[0]
+
+    missing = [topic for topic in topics if topic not in bandwidths]
+    if missing:
+        with PROFILER.span("topic bandwidth"):
+            measured = _measureWithNode(missing, discovery)
+            if measured is None:
+                with ThreadPoolExecutor(min(len(missing), BANDWIDTH_WORKERS)) as executor:
+                    measured = dict(zip(missing, executor.map(_measureBandwidth, missing)))
+
+        with _lock:
+            for topic, bandwidth in measured.items():
+                _bandwidthByTopic[topic] = (bandwidth, now)
+        bandwidths.update(measured)
+
+    return bandwidths
+
+
+def _measureWithNode(
+    topics: List[str], discovery: Optional[TopicDiscovery]
+) -> Optional[Dict[str, float]]:
+    """
+    Measure the topics with the discovery node, None without rclpy
+    """
+
+    if discovery is None:
+        return None
+    try:
+        return discovery.measureBandwidth(topics, BANDWIDTH_WINDOW_S)
+    except ImportError:
+        return None
+    except OSError:
+        # the graph cannot be queried, nothing can be received either
+        return dict.fromkeys(topics, 0.0)
+
+
+def _measureBandwidth(topic: str) -> float:
+    """
+    Listen to a topic with ros2 topic bw for BANDWIDTH_CLI_WINDOW_S seconds, then interrupt it
+    so that it flushes its output
+    """
+
+    try:
+        proc = subprocess.Popen(  # pylint: disable=R1732
+            ["ros2", "topic", "bw", topic],
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+            text=True,
+            env=dict(os.environ, PYTHONUNBUFFERED="1"),
+        )
+    except OSError:
+        return 0.0
+
+    try:
+        out, _ = proc.communicate(timeout=BANDWIDTH_CLI_WINDOW_S)
+    except subprocess.TimeoutExpired:
+        proc.send_signal(signal.SIGINT)
+        try:
+            out, _ = proc.communicate(timeout=BANDWIDTH_EXIT_TIMEOUT_S)
+        except subprocess.TimeoutExpired:
+            proc.kill()
+            out, _ = proc.communicate()
+
+    matches = _BANDWIDTH_LINE.findall(out or "")
+    if not matches:
+        return 0.0
+
+    value, unit = matches[-1]
+    return float(value) * _UNITS[unit]
+
+
+def parseDuration(value: str) -> Optional[float]:
+    """
+    Parse a duration option such as 30, 5m or 2h into seconds, None if it is empty
+    """
+
+    if not value:
+        return None
+
+    multiplier = {"m": 60, "h": 3600}.get(value[-1].lower(), 1)
+    return float(value.rstrip("mhMH")) * multiplier
+
+
+def _existingDirectory(path: str) -> str:
+    """
+    The closest existing directory to path, the output root is only created by the recorder
+    """
+
+    path = os.path.abspath(path)
+    while not os.path.isdir(path):
+        path = os.path.dirname(path)
+    return path
+
+
+def formatRate(rate: float) -> str:
+    """
+    Human readable rate in bytes per second
+    """
+    return formatSize(rate) + "/s"
+
+
+def formatSize(size: float) -> str:
+    """
+    Human readable size in bytes
+    """
+    for unit in ["B", "KB", "MB", "GB"]:
+        if size < 1000:
+            return f"{size:.1f} {unit}"
+        size /= 1000
+    return f"{size:.1f} TB"
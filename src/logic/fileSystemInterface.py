@@ -2,11 +2,21 @@
 Interface with the file system to read and write bags, list available bags, and delete bags.
 """
 
-from typing import List, Dict, Any, Tuple
+from typing import Callable, Iterable, List, Dict, Any, Optional, Tuple, Set
 
 import os
 import json
+import glob
+import struct
+import sqlite3
+import datetime
+import threading
 from ..constants import Constants
+from .bagName import parseBagName
+from .bagTrash import BagTrash
+from .bagReader import BagFormatError, openBag
+from .bagTimeIndex import BagTimeIndex
+from .profiler import traced
 
 
 class FileSystemInterface:
@@ -16,13 +26,22 @@ class FileSystemInterface:
 
     def __init__(self) -> None:
         self.bagDescription: Dict[str, Any] = {}
+        self.lock = threading.RLock()
+        self.trash = BagTrash(Constants.BAG_DIR_PATH)
+        # called with the added or updated entries and the removed names after every change
+        self.changeCallbacks: List[Callable[[Dict[str, Any], List[str]], None]] = []
+        # start and end times of the bags, follows every change of the catalog
+        self.timeIndex = BagTimeIndex()
 
         if not os.path.exists(Constants.BAG_DIR_PATH):
             os.makedirs(Constants.BAG_DIR_PATH)
 
         self.loadDescriptionJson()
 
-    def addBag(self, name: str, description: str) -> None:
+    @traced
+    def addBag(
+        self, name: str, description: str, gaps: Optional[List[Dict[str, str]]] = None
+    ) -> None:
         """
         Add bag to the json list
 
@@ -32,18 +51,33 @@ class FileSystemInterface:
             name of the bag as ros saves it
         description: str
             description of the bag
+        gaps: Optional[List[Dict[str, str]]]
+            intervals the recording was interrupted, see RecordingGap
         """
-        parsedBagName = self._parsebagName(name)
-        self.bagDescription[name] = {
-            "description": description,
-            "name": parsedBagName[0],
-            "date": parsedBagName[1],
-        }
-        self.writeJsonToFile()
+        with self.lock:
+            entry = self.bagDescription[name] = self._createEntry(name, description, gaps)
+            self.writeJsonToFile()
+        self.notifyChanges({name: entry}, [])
+
+    @traced
+    def addBags(self, entries: Dict[str, Any]) -> None:
+        """
+        Add bags to the json list with their entries, with a single write of the json file
 
+        Parameters
+        ----------
+        entries: Dict[str, Any]
+            entries of the bags by name, as created by addBag
+        """
+        with self.lock:
+            self.bagDescription.update(entries)
+            self.writeJsonToFile()
+        self.notifyChanges(entries, [])
+
+    @traced
     def removeBag(self, name: str) -> None:
         """
-        remove bag from the json list and deletes it from the file system if it exists
+        remove bag from the json list and moves it to the trash if it exists
 
         Parameters
         ----------
@@ -51,47 +85,177 @@ class FileSystemInterface:
             name of the bag as ros saves it
         """
 
-        self.bagDescription.pop(name)
-        os.remove(os.path.join(Constants.BAG_DIR_PATH, name))
-        self.writeJsonToFile()
+        with self.lock:
+            self.deleteBagFiles(name)
+            self.forgetBags([name])
+
+    def deleteBagFiles(self, name: str) -> None:
+        """
+        Move the bag file or rosbag2 directory to the trash, whatever its size this is a
+        rename. The catalog is not changed.
+
+        Parameters
+        ----------
+        name: str
+            name of the bag as ros saves it
+        """
+
+        if os.path.lexists(os.path.join(Constants.BAG_DIR_PATH, name)):
+            with self.lock:
+                entry = self.bagDescription.get(name, {})
+            self.trash.moveToTrash(name, entry)
 
+    @traced
+    def forgetBags(self, names: Iterable[str]) -> None:
+        """
+        Remove bags from the catalog with a single write of the json file, the files are not
+        changed
+
+        Parameters
+        ----------
+        names: Iterable[str]
+            names of the bags as ros saves them
+        """
+
+        with self.lock:
+            removed = [name for name in names if self.bagDescription.pop(name, None) is not None]
+            self.writeJsonToFile()
+        self.notifyChanges({}, removed)
+
+    @traced
+    def restoreBags(self, names: Iterable[str]) -> Tuple[Dict[str, Any], Dict[str, str]]:
+        """
+        Move deleted bags back from the trash and add them to the catalog with the entries
+        they had, with a single write of the json file
+
+        Parameters
+        ----------
+        names: Iterable[str]
+            names of the deleted bags
+
+        Returns
+        -------
+        Tuple[Dict[str, Any], Dict[str, str]]
+            The restored bags with their entries, and the errors of the others by bag name
+        """
+
+        restored: Dict[str, Any] = {}
+        errors: Dict[str, str] = {}
+
+        # the watcher sees the restored bags once the lock is released, they are in the catalog
+        with self.lock:
+            for name in names:
+                try:
+                    trashed = self.trash.restore(name)
+                except OSError as err:
+                    errors[name] = str(err)
+                    continue
+                restored[name] = trashed.entry or self._createEntry(name, "")
+            if restored:
+                self.addBags(restored)
+
+        return restored, errors
+
+    @traced
+    def applyChanges(self, names: Set[str]) -> Tuple[Dict[str, Any], List[str]]:
+        """
+        Update the catalog for directory entries that were created or deleted,
+        without rescanning the whole directory
+
+        Parameters
+        ----------
+        names: Set[str]
+            names of the directory entries that changed
+
+        Returns
+        -------
+        Tuple[Dict[str, Any], List[str]]
+            The added bags with their description, and the names of the removed bags
+        """
+
+        added: Dict[str, Any] = {}
+        removed: List[str] = []
+
+        with self.lock:
+            for name in names:
+                isBag = isBagPath(os.path.join(Constants.BAG_DIR_PATH, name))
+                if isBag and name not in self.bagDescription:
+                    added[name] = self.bagDescription[name] = self._createEntry(name, "")
+                elif not isBag and name in self.bagDescription:
+                    self.bagDescription.pop(name)
+                    removed.append(name)
+
+            if added or removed:
+                self.writeJsonToFile()
+
+        self.notifyChanges(added, removed)
+        return added, removed
+
+    def notifyChanges(self, added: Dict[str, Any], removed: List[str]) -> None:
+        """
+        Update the time index and call the change callbacks, from the thread that changed
+        the catalog
+
+        Parameters
+        ----------
+        added: Dict[str, Any]
+            the added or updated bags with their entries
+        removed: List[str]
+            names of the removed bags
+        """
+
+        if not added and not removed:
+            return
+        self.timeIndex.invalidate(added, removed)
+        for callback in list(self.changeCallbacks):
+            callback(added, removed)
+
+    @traced
     def writeJsonToFile(self) -> None:
         """
         writes self.description to the json file
         """
-        j = json.dumps(self.bagDescription, indent=4)
+        with self.lock:
+            j = json.dumps(self.bagDescription, indent=4)
 
         with open(
             os.path.join(Constants.BAG_DIR_PATH, Constants.JSON_FILE_NAME), "w", encoding="utf-8"
         ) as file:
             file.write(j)
 
+    @traced
     def loadDescriptionJson(self) -> None:
         """
         Load json file from the directory into self.bagDescription
         """
 
-        bagsName = self._loadBagFileNames()
-
-        try:
-            with open(
-                os.path.join(Constants.BAG_DIR_PATH, Constants.JSON_FILE_NAME),
-                "r",
-                encoding="utf-8",
-            ) as file:
-                self.bagDescription = json.loads(file.read())
-        except IOError:
-            with open(
-                os.path.join(Constants.BAG_DIR_PATH, Constants.JSON_FILE_NAME),
-                "w",
-                encoding="utf-8",
-            ) as file:
+        with self.lock:
+            previous = self.bagDescription
+            bagsName = self._loadBagFileNames()
+
+            try:
+                with open(
+                    os.path.join(Constants.BAG_DIR_PATH, Constants.JSON_FILE_NAME),
+                    "r",
+                    encoding="utf-8",
+                ) as file:
+                    self.bagDescription = json.loads(file.read())
+            except IOError:
+                with open(
+                    os.path.join(Constants.BAG_DIR_PATH, Constants.JSON_FILE_NAME),
+                    "w",
+                    encoding="utf-8",
+                ) as file:
+                    self.bagDescription = {}
+            except json.decoder.JSONDecodeError:
                 self.bagDescription = {}
-        except json.decoder.JSONDecodeError:
-            self.bagDescription = {}
 
-        self._syncFilesWithJson(bagsName)
+            self._syncFilesWithJson(bagsName)
+            added, removed = diffCatalogs(previous, self.bagDescription)
 
+        self.notifyChanges(added, removed)
+
+    @traced
     def _loadBagFileNames(self) -> List[str]:
         """
         Load the content of a directory.
@@ -105,52 +269,100 @@ class FileSystemInterface:
         fileNames = []
 
         for file in os.listdir(Constants.BAG_DIR_PATH):
-            if file.endswith(".bag"):
+            if isBagPath(os.path.join(Constants.BAG_DIR_PATH, file)):
                 fileNames.append(file)
 
         return fileNames
 
+    @traced
     def _syncFilesWithJson(self, bagsName: List[str]) -> None:
         """
         Sync the content of the self.bagDescription with the given bagsName
 
         if bagName is not in self.bagDescription, add it with no description
         if self.bagDescription contain a name not in bagName. remove it.
+        Entries written before the timestamps were stored are parsed again.
         """
 
         for bagName in bagsName:
             if bagName not in self.bagDescription:
-                parsedBagName = self._parsebagName(bagName)
-                self.bagDescription[bagName] = {
-                    "description": "",
-                    "date": parsedBagName[1],
-                    "name": parsedBagName[0],
-                }
+                self.bagDescription[bagName] = self._createEntry(bagName, "")
+            elif "timestamp" not in self.bagDescription[bagName]:
+                description = self.bagDescription[bagName].get("description", "")
+                self.bagDescription[bagName] = self._createEntry(bagName, description)
 
+        bagsNameSet = set(bagsName)
         for bagName in list(self.bagDescription.keys()):
-            if bagName not in bagsName:
+            if bagName not in bagsNameSet:
                 self.bagDescription.pop(bagName)
 
         self.writeJsonToFile()
 
-    def _parsebagName(self, bagName: str) -> Tuple[str, str]:
+    def _createEntry(
+        self, bagName: str, description: str, gaps: Optional[List[Dict[str, str]]] = None
+    ) -> Dict[str, Any]:
+        """
+        Create the json entry of a bag, the timestamp is an ISO 8601 string that sorts in time
+        order. Bags not named by the recorder are dated by the bag itself. Only the bags whose
+        recording was interrupted have gaps.
         """
-        Given a bag name with the following format {prefix}_{timestamp}.bag
 
-        it returns prefix and timestamp as date dd-mm-yyy
+        parsedBagName = parseBagName(bagName)
+        timestamp = parsedBagName.timestamp or self._readTimestamp(bagName)
+        entry: Dict[str, Any] = {
+            "description": description,
+            "name": parsedBagName.prefix,
+            "date": timestamp.strftime("%d-%m-%Y"),
+            "timestamp": timestamp.isoformat(),
+            "split": parsedBagName.splitIndex,
+        }
+        if gaps:
+            entry["gaps"] = gaps
+        return entry
 
-        Returns
-        -------
-        Tuple[str, str]
-            Tuple of prefix name of the bag and the date in the format dd-mm-yyyy
+    def _readTimestamp(self, bagName: str) -> datetime.datetime:
+        """
+        Start time of the recording from the bag index, or the modification time of the bag
+        if it cannot be read
         """
 
-        parsedNameList = bagName.split(".")[0].split("_")
-        prefix = parsedNameList[0]
-        date = parsedNameList[1].split("-")
+        path = os.path.join(Constants.BAG_DIR_PATH, bagName)
+        try:
+            startTime = openBag(path).index().startTime
+            if startTime > 0:
+                return datetime.datetime.fromtimestamp(startTime / 1e9)
+        except (BagFormatError, OSError, struct.error, sqlite3.Error, KeyError):
+            pass
+
+        try:
+            return datetime.datetime.fromtimestamp(os.path.getmtime(path))
+        except OSError:
+            return datetime.datetime.fromtimestamp(0)
+
+
+def diffCatalogs(
+    previous: Dict[str, Any], current: Dict[str, Any]
+) -> Tuple[Dict[str, Any], List[str]]:
+    """
+    The bags added to or updated in current, and the names of the bags removed from previous
+    """
 
-        day = date[0]
-        month = date[1]
-        year = date[2]
+    added = {name: entry for name, entry in current.items() if previous.get(name) != entry}
+    removed = [name for name in previous if name not in current]
+    return added, removed
+
+
+def isBagPath(path: str) -> bool:
+    """
+    True for a rosbag file, or a rosbag2 directory with its metadata or storage files.
+    Hidden entries, like the trash, are not bags.
+    """
 
-        return prefix, f"{day}-{month}-{year}"
+    if os.path.basename(os.path.normpath(path)).startswith("."):
+        return False
+    if os.path.isdir(path):
+        return os.path.exists(os.path.join(path, "metadata.yaml")) or bool(
+            glob.glob(os.path.join(glob.escape(path), "*.db3"))
+            or glob.glob(os.path.join(glob.escape(path), "*.mcap"))
+        )
+    return path.endswith(".bag") and os.path.exists(path)
@@ -0,0 +1,46 @@
+"""
+Read the output of a child process without blocking the GUI thread
+"""
+
+from typing import IO, List, Optional
+
+import queue
+import threading
+
+
+class OutputReader:
+    """
+    Reads lines from a stream in a daemon thread, the lines are collected with drain
+    """
+
+    def __init__(self, stream: Optional[IO[bytes]]) -> None:
+        self._lines: queue.Queue[str] = queue.Queue()
+        self._thread = threading.Thread(
+            target=self._read, args=(stream,), name="outputReader", daemon=True
+        )
+        self._thread.start()
+
+    @property
+    def isAlive(self) -> bool:
+        """
+        True until the stream is closed
+        """
+        return self._thread.is_alive()
+
+    def drain(self) -> List[str]:
+        """
+        Take all the lines read so far
+        """
+
+        lines = []
+        while not self._lines.empty():
+            lines.append(self._lines.get_nowait())
+        return lines
+
+    def _read(self, stream: Optional[IO[bytes]]) -> None:
+        if stream is None:
+            return
+
+        for line in iter(stream.readline, b""):
+            self._lines.put(line.decode("utf-8", errors="replace"))
+        stream.close()
@@ -0,0 +1,162 @@
+"""
+Lightweight timing spans kept in a ring buffer, exported as a Chrome trace.
+Disabled by default, set ROSBAG_PROFILE=1 to enable it.
+"""
+
+from typing import Any, Callable, Deque, Dict, Iterator, List, NamedTuple, TypeVar, cast
+
+import os
+import json
+import time
+import atexit
+import functools
+import threading
+import contextlib
+from collections import deque
+
+F = TypeVar("F", bound=Callable[..., Any])
+
+
+class Span(NamedTuple):
+    """
+    A finished timing span, times are in nanoseconds
+    """
+
+    name: str
+    start: int
+    duration: int
+    threadId: int
+
+
+class LatencyStats(NamedTuple):
+    """
+    Latency statistics of all the spans with the same name, times are in milliseconds
+    """
+
+    calls: int
+    p50: float
+    p99: float
+    maximum: float
+
+
+class Profiler:
+    """
+    Collects timing spans into a bounded ring buffer
+    """
+
+    def __init__(self, enabled: bool = False, capacity: int = 100000) -> None:
+        self.enabled = enabled
+        self.spans: Deque[Span] = deque(maxlen=capacity)
+        self._origin = time.perf_counter_ns()
+
+    def enable(self, tracePath: str = "") -> None:
+        """
+        Start collecting spans
+
+        parameters
+        ----------
+        tracePath: str
+            If given, the trace is exported to this path when the program exits
+        """
+        self.enabled = True
+        if tracePath:
+            atexit.register(self.exportChromeTrace, tracePath)
+
+    def record(self, name: str, start: int, end: int) -> None:
+        """
+        Add a finished span to the ring buffer
+        """
+        self.spans.append(Span(name, start - self._origin, end - start, threading.get_ident()))
+
+    @contextlib.contextmanager
+    def span(self, name: str) -> Iterator[None]:
+        """
+        Time the body of a with statement
+        """
+
+        if not self.enabled:
+            yield
+            return
+
+        start = time.perf_counter_ns()
+        try:
+            yield
+        finally:
+            self.record(name, start, time.perf_counter_ns())
+
+    def latencyStats(self) -> Dict[str, LatencyStats]:
+        """
+        Compute the latency statistics of the spans in the ring buffer grouped by name
+
+        returns
+        -------
+        Dict[str, LatencyStats]
+            The statistics for each span name
+        """
+
+        durations: Dict[str, List[int]] = {}
+        for span in list(self.spans):
+            durations.setdefault(span.name, []).append(span.duration)
+
+        stats = {}
+        for name, values in durations.items():
+            values.sort()
+            stats[name] = LatencyStats(
+                len(values),
+                values[int(0.5 * (len(values) - 1))] / 1e6,
+                values[int(0.99 * (len(values) - 1))] / 1e6,
+                values[-1] / 1e6,
+            )
+        return stats
+
+    def exportChromeTrace(self, path: str) -> None:
+        """
+        Write the spans in the Chrome trace event format,
+        it can be opened with chrome://tracing, Perfetto or speedscope
+
+        parameters
+        ----------
+        path: str
+            Path of the json file to write
+        """
+
+        events = [
+            {
+                "name": span.name,
+                "ph": "X",
+                "ts": span.start / 1000,
+                "dur": span.duration / 1000,
+                "pid": os.getpid(),
+                "tid": span.threadId,
+            }
+            for span in list(self.spans)
+        ]
+
+        with open(path, "w", encoding="utf-8") as file:
+            json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, file)
+
+
+PROFILER = Profiler()
+if os.environ.get("ROSBAG_PROFILE", "") not in ("", "0"):
+    PROFILER.enable(os.environ.get("ROSBAG_PROFILE_TRACE", ""))
+
+
+def traced(func: F) -> F:
+    """
+    Decorator recording a span named after the function on every call
+    """
+
+    name = func.__qualname__
+
+    @functools.wraps(func)
+    def wrapper(*args: Any, **kwargs: Any) -> Any:
+        if not PROFILER.enabled:
+            return func(*args, **kwargs)
+
+        start = time.perf_counter_ns()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            PROFILER.record(name, start, time.perf_counter_ns())
+
+    return cast(F, wrapper)
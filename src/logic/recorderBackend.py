@@ -0,0 +1,224 @@
+"""
+The recorder backend used by the presenters: topic discovery, recording, disk pre-flight
+and catalog changes. The local backend runs everything on this machine,
+the remote backend (remoteBackend.py) forwards it to a recorder agent.
+"""
+
+from typing import Callable, Dict, List, Optional, Protocol, Set
+
+import os
+
+from .bagRecorder import BagRecorder
+from .bagDirectoryWatcher import BagDirectoryWatcher
+from .fileSystemInterface import FileSystemInterface
+from .remoteBackend import RemoteBackend
+from .diskPreflight import PreflightReport, runPreflight
+from .topicDiscovery import (
+    QOS_OVERRIDES_OPTION,
+    TopicDiscovery,
+    TopicInfo,
+    TopicQos,
+    qosOverride,
+    recordedTopics,
+    writeQosOverrides,
+)
+from ..constants import Constants
+
+
+class OutputStream(Protocol):
+    """
+    Output of a recorder, see OutputReader
+    """
+
+    # pylint: disable=C0116
+
+    @property
+    def isAlive(self) -> bool:
+        ...
+
+    def drain(self) -> List[str]:
+        ...
+
+
+class Recorder(Protocol):
+    """
+    A recording of one bag, see BagRecorder
+    """
+
+    # pylint: disable=C0116
+
+    args: List[str]
+    bagName: str
+
+    @property
+    def outputReader(self) -> Optional[OutputStream]:
+        ...
+
+    @property
+    def isAlive(self) -> bool:
+        ...
+
+    @property
+    def exitCode(self) -> Optional[int]:
+        ...
+
+    @property
+    def elapsed(self) -> float:
+        ...
+
+    def start(self) -> None:
+        ...
+
+    def stop(self) -> None:
+        ...
+
+    def wait(self) -> None:
+        ...
+
+
+class CatalogWatcher(Protocol):
+    """
+    Reports the names of the bags that changed, see BagDirectoryWatcher
+    """
+
+    # pylint: disable=C0116
+
+    def start(self) -> None:
+        ...
+
+    def stop(self) -> None:
+        ...
+
+
+class RecorderBackend(Protocol):
+    """
+    Backend Protocol
+    """
+
+    # pylint: disable=C0116
+
+    def listTopics(self) -> List[str]:
+        ...
+
+    def discoverTopics(self) -> List[TopicInfo]:
+        ...
+
+    def createRecorder(self, args: List[str], bagName: str) -> Recorder:
+        ...
+
+    def preflight(
+        self, outputRoot: str, topics: List[str], duration: Optional[float]
+    ) -> PreflightReport:
+        ...
+
+    def watchCatalog(self, onChange: Callable[[Set[str]], None]) -> CatalogWatcher:
+        ...
+
+    def createCatalog(self) -> FileSystemInterface:
+        ...
+
+
+class LocalBackend:
+    """
+    Record on this machine
+    """
+
+    def __init__(self) -> None:
+        self.discovery = TopicDiscovery()
+
+    def listTopics(self) -> List[str]:
+        """
+        Get active topic names from ROS
+
+        Returns
+        -------
+        List[str]
+            List of active topic names
+
+        Raises
+        ------
+        ConnectionError
+            If ros2 topic list reports an error
+        """
+        return [topic.name for topic in self.discoverTopics()]
+
+    def discoverTopics(self) -> List[TopicInfo]:
+        """
+        Get the active topics from ROS with their type, publisher count and QoS
+
+        Raises
+        ------
+        ConnectionError
+            If ros2 topic list reports an error
+        """
+        return self.discovery.discover()
+
+    def createRecorder(self, args: List[str], bagName: str) -> BagRecorder:
+        """
+        Create a ros2 bag record process, it is launched by start
+        The recorded topics published with a QoS the default subscription does not receive get
+        a QoS override
+        """
+        return BagRecorder(self._withQosOverrides(args, bagName), bagName)
+
+    def _withQosOverrides(self, args: List[str], bagName: str) -> List[str]:
+        if QOS_OVERRIDES_OPTION in args:
+            return args
+
+        topics = self.discovery.topics
+        if topics is None:
+            try:
+                topics = self.discovery.discover()
+            except OSError:
+                # the graph cannot be queried, record with the default QoS
+                return args
+
+        overrides: Dict[str, TopicQos] = {}
+        for topic in recordedTopics(args, topics):
+            qos = qosOverride(topic)
+            if qos is not None:
+                overrides[topic.name] = qos
+        if not overrides:
+            return args
+
+        path = os.path.join(Constants.QOS_OVERRIDES_DIR, os.path.splitext(bagName)[0] + ".yaml")
+        writeQosOverrides(path, overrides)
+        return args + [QOS_OVERRIDES_OPTION, path]
+
+    def preflight(
+        self, outputRoot: str, topics: List[str], duration: Optional[float]
+    ) -> PreflightReport:
+        """
+        Check the output disk, see runPreflight
+        """
+        return runPreflight(outputRoot, topics, duration, self.discovery)
+
+    def watchCatalog(self, onChange: Callable[[Set[str]], None]) -> BagDirectoryWatcher:
+        """
+        Watch the bags directory
+        """
+        return BagDirectoryWatcher(Constants.BAG_DIR_PATH, onChange)
+
+    def createCatalog(self) -> FileSystemInterface:
+        """
+        The catalog of the local bags directory
+        """
+        return FileSystemInterface()
+
+
+def createBackend(url: str = "", token: str = "") -> RecorderBackend:
+    """
+    The backend of the recorder agent at url, or the local backend
+
+    parameters
+    ----------
+    url: str
+        Address of the recorder agent, defaults to Constants.AGENT_URL
+    token: str
+        Token of the recorder agent, defaults to Constants.AGENT_TOKEN
+    """
+
+    url = url or Constants.AGENT_URL
+    if url:
+        return RemoteBackend(url, token or Constants.AGENT_TOKEN)
+    return LocalBackend()
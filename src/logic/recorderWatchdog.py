@@ -0,0 +1,112 @@
+"""
+Health of a running recorder. The recorder is polled from the GUI loop: an exit is read from
+its exit code, without signaling it, and a recorder that runs but whose bag stopped growing is
+reported as stalled.
+"""
+
+from typing import Callable, Dict, NamedTuple, Optional, Tuple
+
+import os
+import time
+import datetime
+
+from .recorderBackend import Recorder
+from .bagMetadata import bagSize
+from ..constants import Constants
+
+HEALTHY = "healthy"
+FINISHED = "finished"
+FAILED = "failed"
+STALLED = "stalled"
+
+
+class RecordingGap(NamedTuple):
+    """
+    Interval a recording was interrupted, start and end are ISO 8601 local times
+    """
+
+    start: str
+    end: str
+    reason: str
+
+    def toEntry(self) -> Dict[str, str]:
+        """
+        The gap as stored in the catalog entry of the bag
+        """
+        return {"start": self.start, "end": self.end, "reason": self.reason}
+
+
+class RecorderWatchdog:
+    """
+    Watch one recorder, the output path is only given for a local recorder, the bag of a
+    recorder agent cannot be measured
+    """
+
+    def __init__(
+        self,
+        outputPath: Optional[str],
+        stallTimeout: float = Constants.RECORDER_STALL_S,
+        clock: Callable[[], float] = time.time,
+    ) -> None:
+        self.outputPath = outputPath
+        self.stallTimeout = stallTimeout
+        self.clock = clock
+
+        self.lastSize = -1
+        self.lastActivity = clock()
+
+    def check(self, recorder: Recorder) -> Tuple[str, str]:
+        """
+        Poll the recorder, never blocks
+
+        returns
+        -------
+        Tuple[str, str]
+            The state, HEALTHY, FINISHED, FAILED or STALLED, and the reason of a failure or a
+            stall
+        """
+
+        exitCode = recorder.exitCode
+        if exitCode == 0:
+            return FINISHED, ""
+        if exitCode is not None:
+            if exitCode < 0:
+                return FAILED, f"the recorder was killed by signal {-exitCode}"
+            return FAILED, f"the recorder exited with code {exitCode}"
+
+        now = self.clock()
+        if self.outputPath is None or self.stallTimeout <= 0:
+            self.lastActivity = now
+            return HEALTHY, ""
+
+        size = _outputSize(self.outputPath)
+        if size != self.lastSize:
+            self.lastSize = size
+            self.lastActivity = now
+        elif now - self.lastActivity > self.stallTimeout:
+            return STALLED, f"the bag did not grow for {now - self.lastActivity:.0f} s"
+        return HEALTHY, ""
+
+    def gapUntilNow(self, reason: str) -> RecordingGap:
+        """
+        The gap from the last time the recorder was seen writing until now
+        """
+        return RecordingGap(_isoTime(self.lastActivity), _isoTime(self.clock()), reason)
+
+
+def _outputSize(path: str) -> int:
+    """
+    Size of the bag being written, 0 until the recorder creates it
+    """
+
+    if not os.path.exists(path):
+        return 0
+    try:
+        return bagSize(path)
+    except OSError:
+        # a file of the bag was renamed while it was measured, e.g. at a split
+        return -1
+
+
+def _isoTime(timestamp: float) -> str:
+    return datetime.datetime.fromtimestamp(timestamp).isoformat(timespec="seconds")
@@ -0,0 +1,204 @@
+"""
+Saved recording profiles: topic patterns, recorder options and output root
+"""
+
+from typing import Any, Dict, FrozenSet, List, Optional, Set
+
+import os
+import re
+import json
+
+from ..constants import Constants
+
+REGEX_PREFIX = "re:"
+
+DEFAULT_PROFILES: Dict[str, List[str]] = {
+    name: [f"*{name}*"]
+    for name in ["perception", "slam", "supervisor", "control", "planning", "lidar"]
+}
+
+
+class RecordingProfile:  # pylint: disable=R0902
+    """
+    A named set of topic patterns with the recorder options to use with them.
+    Patterns are globs (* and ?), or regular expressions when prefixed with "re:".
+    All the patterns are compiled once into a single matcher, the expression is kept
+    in a form the recorder accepts too.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        include: List[str],
+        exclude: Optional[List[str]] = None,
+        options: Optional[Dict[str, str]] = None,
+        outputRoot: str = "",
+    ) -> None:
+        self.name = name
+        self.include = list(include)
+        self.exclude = list(exclude or [])
+        self.options = dict(options or {})
+        self.outputRoot = outputRoot
+
+        self.includePattern = _joinPatterns(self.include)
+        self.excludePattern = _joinPatterns(self.exclude)
+        self.includeRegex = re.compile(self.includePattern) if self.includePattern else None
+        self.excludeRegex = re.compile(self.excludePattern) if self.excludePattern else None
+
+        self._lastTopics: Optional[FrozenSet[str]] = None
+        self._lastSelection: Set[str] = set()
+
+    def matches(self, topic: str) -> bool:
+        """
+        Check if a topic is selected by the profile
+        """
+
+        if self.includeRegex is None or not self.includeRegex.search(topic):
+            return False
+        return self.excludeRegex is None or not self.excludeRegex.search(topic)
+
+    def select(self, topics: FrozenSet[str]) -> Set[str]:
+        """
+        Select the topics matching the profile, the selection of the last topic table is cached
+
+        parameters
+        ----------
+        topics: FrozenSet[str]
+            The live topic table
+
+        returns
+        -------
+        Set[str]
+            The selected topics
+        """
+
+        if topics != self._lastTopics:
+            self._lastSelection = {topic for topic in topics if self.matches(topic)}
+            self._lastTopics = topics
+        return set(self._lastSelection)
+
+    def toDict(self) -> Dict[str, Any]:
+        """
+        Serialize the profile for the json file
+        """
+        return {
+            "include": self.include,
+            "exclude": self.exclude,
+            "options": self.options,
+            "outputRoot": self.outputRoot,
+        }
+
+    @classmethod
+    def fromDict(cls, name: str, data: Dict[str, Any]) -> "RecordingProfile":
+        """
+        Create a profile from its json entry
+        """
+        return cls(
+            name,
+            data.get("include", []),
+            data.get("exclude", []),
+            data.get("options", {}),
+            data.get("outputRoot", ""),
+        )
+
+    @classmethod
+    def fromTopics(
+        cls, name: str, topics: List[str], options: Optional[Dict[str, str]] = None
+    ) -> "RecordingProfile":
+        """
+        Create a profile selecting exactly the given topics
+        """
+        return cls(name, [REGEX_PREFIX + re.escape(topic) for topic in topics], options=options)
+
+
+class ProfileStore:
+    """
+    Load and save the recording profiles from the json profiles file
+    """
+
+    def __init__(self, path: str = "") -> None:
+        self.path = path or Constants.PROFILES_PATH
+        self.profiles: Dict[str, RecordingProfile] = {}
+        self.load()
+
+    def load(self) -> None:
+        """
+        Load the profiles, the default profiles are used if there is no profiles file
+        """
+
+        try:
+            with open(self.path, "r", encoding="utf-8") as file:
+                data = json.loads(file.read())
+        except (IOError, json.decoder.JSONDecodeError):
+            data = {name: {"include": patterns} for name, patterns in DEFAULT_PROFILES.items()}
+
+        self.profiles = {
+            name: RecordingProfile.fromDict(name, entry) for name, entry in data.items()
+        }
+
+    def save(self, profile: RecordingProfile) -> None:
+        """
+        Add or replace a profile and write the profiles file
+        """
+
+        self.profiles[profile.name] = profile
+        self._write()
+
+    def remove(self, name: str) -> None:
+        """
+        Remove a profile and write the profiles file
+        """
+
+        self.profiles.pop(name)
+        self._write()
+
+    def get(self, name: str) -> RecordingProfile:
+        """
+        Get a profile by name, unknown names select the topics containing the name
+        """
+
+        if name not in self.profiles:
+            return RecordingProfile(name, [f"*{name}*"])
+        return self.profiles[name]
+
+    def names(self) -> List[str]:
+        """
+        Names of the saved profiles
+        """
+        return list(self.profiles.keys())
+
+    def _write(self) -> None:
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        j = json.dumps(
+            {name: profile.toDict() for name, profile in self.profiles.items()}, indent=4
+        )
+
+        with open(self.path, "w", encoding="utf-8") as file:
+            file.write(j)
+
+
+def _joinPatterns(patterns: List[str]) -> str:
+    """
+    Join glob and regex patterns into one anchored regular expression
+    """
+
+    if not patterns:
+        return ""
+
+    regexes = [
+        pattern[len(REGEX_PREFIX) :] if pattern.startswith(REGEX_PREFIX) else _globToRegex(pattern)
+        for pattern in patterns
+    ]
+    return "^(?:" + "|".join(f"(?:{regex})" for regex in regexes) + ")$"
+
+
+def _globToRegex(pattern: str) -> str:
+    regex = ""
+    for char in pattern:
+        if char == "*":
+            regex += ".*"
+        elif char == "?":
+            regex += "."
+        else:
+            regex += re.escape(char)
+    return regex
@@ -0,0 +1,616 @@
+"""
+Scheduled and conditional recordings.
+A job starts when its start condition becomes true, at a time of day, or as soon as the
+recorder is free, and stops after a duration or when its start condition clears.
+Jobs that are ready while another run is recording are queued and run back to back.
+With rclpy, the graph is observed by a node subscribed to the watched fields, a change is seen
+when its message is received; otherwise ros2 topic list and ros2 topic echo are polled.
+A finished bag is registered once its recorder exited, in the background.
+"""
+
+from typing import Any, Callable, Deque, Dict, List, NamedTuple, Optional, Set, Tuple, FrozenSet
+
+import json
+import time
+import queue
+import datetime
+import functools
+import threading
+import subprocess
+from collections import deque
+
+from .backgroundTask import Scheduler, runBlocking, runCoroutine
+from .recorderBackend import LocalBackend, Recorder, RecorderBackend
+from .topicDiscovery import (
+    SUBSCRIPTION_DEPTH,
+    TopicInfo,
+    messageClass,
+    publisherQos,
+    qosOverride,
+    qosProfile,
+)
+from .diskPreflight import parseDuration
+from .recordingProfiles import ProfileStore
+from .rosCommandGenerator import generateRosBagRecordArgs
+from ..constants import Constants
+
+TICK_PERIOD_MS = 20
+SAMPLE_PERIOD_S = 0.5
+# period of the topic list queries of the sampler node, messages are received at once
+NODE_SAMPLE_PERIOD_S = 0.05
+ECHO_TIMEOUT_S = 2.0
+
+
+class GraphState(NamedTuple):
+    """
+    An observation of the ROS graph, the timestamp is a time.monotonic() value
+    """
+
+    topics: FrozenSet[str]
+    values: Dict[Tuple[str, str], str]
+    timestamp: float
+
+
+class RecordingJob:
+    """
+    A scheduled recording, loaded from the schedule file.
+
+    The start condition is one of
+    {"topicAppears": "/topic"}, {"topicEquals": {"topic": "/t", "field": "f", "value": "v"}},
+    {"at": "HH:MM"} or {} to start as soon as the recorder is free.
+    The stop condition holds "after" (a duration such as 30, 5m or 2h)
+    and/or "whenCleared" (stop when the start condition is no longer true).
+    """
+
+    # pylint: disable=R0902
+
+    def __init__(
+        self,
+        name: str,
+        topics: List[str],
+        profile: str = "",
+        start: Optional[Dict[str, Any]] = None,
+        stop: Optional[Dict[str, Any]] = None,
+        repeat: bool = False,
+    ) -> None:
+        self.name = name
+        self.topics = list(topics)
+        self.profile = profile
+        self.start = dict(start or {})
+        self.stop = dict(stop or {})
+        self.repeat = repeat
+
+        self.duration = parseDuration(str(self.stop.get("after", "")))
+        self.stopWhenCleared = bool(self.stop.get("whenCleared", False))
+        self.wasMet = False
+
+    @property
+    def hasCondition(self) -> bool:
+        """
+        True if the job starts on a condition of the graph
+        """
+        return "topicAppears" in self.start or "topicEquals" in self.start
+
+    @property
+    def watchedField(self) -> Optional[Tuple[str, str]]:
+        """
+        The (topic, field) sampled for a topicEquals condition
+        """
+
+        condition = self.start.get("topicEquals")
+        if condition is None:
+            return None
+        return condition["topic"], condition["field"]
+
+    def isMet(self, state: GraphState) -> bool:
+        """
+        Check the start condition against an observation of the graph
+        """
+
+        if "topicAppears" in self.start:
+            return self.start["topicAppears"] in state.topics
+
+        if "topicEquals" in self.start:
+            condition = self.start["topicEquals"]
+            value = state.values.get((condition["topic"], condition["field"]))
+            return value == str(condition["value"])
+
+        return False
+
+    def describeStart(self) -> str:
+        """
+        Human readable start condition, used in the bag description
+        """
+
+        if "topicAppears" in self.start:
+            return f"{self.start['topicAppears']} appeared"
+        if "topicEquals" in self.start:
+            condition = self.start["topicEquals"]
+            return f"{condition['topic']}.{condition['field']} became {condition['value']}"
+        if "at" in self.start:
+            return f"scheduled at {self.start['at']}"
+        return "queued"
+
+    def nextStartDelay(self) -> Optional[float]:
+        """
+        Seconds until the next time of day of an "at" condition, None for other conditions
+        """
+
+        if "at" not in self.start:
+            return None
+
+        now = datetime.datetime.now()
+        startAt = datetime.time.fromisoformat(self.start["at"])
+        startTime = datetime.datetime.combine(now.date(), startAt)
+        if startTime <= now:
+            startTime += datetime.timedelta(days=1)
+        return (startTime - now).total_seconds()
+
+    def toDict(self) -> Dict[str, Any]:
+        """
+        Serialize the job for the json file
+        """
+        return {
+            "topics": self.topics,
+            "profile": self.profile,
+            "start": self.start,
+            "stop": self.stop,
+            "repeat": self.repeat,
+        }
+
+    @classmethod
+    def fromDict(cls, name: str, data: Dict[str, Any]) -> "RecordingJob":
+        """
+        Create a job from its json entry
+        """
+        return cls(
+            name,
+            data.get("topics", []),
+            data.get("profile", ""),
+            data.get("start", {}),
+            data.get("stop", {}),
+            data.get("repeat", False),
+        )
+
+
+def loadSchedule(path: str = "") -> List[RecordingJob]:
+    """
+    Load the jobs of the schedule file, in the order of the file
+
+    parameters
+    ----------
+    path: str
+        Path of the schedule file, defaults to Constants.SCHEDULE_PATH
+
+    returns
+    -------
+    List[RecordingJob]
+        The jobs, empty if there is no schedule file
+    """
+
+    try:
+        with open(path or Constants.SCHEDULE_PATH, "r", encoding="utf-8") as file:
+            data = json.loads(file.read())
+    except (IOError, json.decoder.JSONDecodeError):
+        return []
+
+    return [RecordingJob.fromDict(name, entry) for name, entry in data.items()]
+
+
+class GraphSampler:
+    """
+    Observe the topic list and the watched fields in a daemon thread,
+    the observations that differ from the previous one are put in the states queue
+    """
+
+    def __init__(self, watchTopics: bool, fields: Set[Tuple[str, str]]) -> None:
+        self.watchTopics = watchTopics
+        self.fields = set(fields)
+        self.states: "queue.Queue[GraphState]" = queue.Queue()
+
+        self._topics: FrozenSet[str] = frozenset()
+        self._values: Dict[Tuple[str, str], str] = {}
+        self._stopEvent = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="graphSampler", daemon=True)
+
+    def start(self) -> None:
+        """
+        Start sampling
+        """
+        self._thread.start()
+
+    def stop(self) -> None:
+        """
+        Stop sampling, the current sample is abandoned
+        """
+        self._stopEvent.set()
+
+    def _run(self) -> None:
+        try:
+            self._runNode()
+        except ImportError:
+            self._poll()
+
+    def _runNode(self) -> None:
+        """
+        Observe the graph with an rclpy node: the topic list is queried from the node, and the
+        watched fields are read from the messages of subscriptions made once their topic exists
+        """
+
+        # pylint: disable=C0415
+        import rclpy
+        from rclpy.executors import SingleThreadedExecutor
+
+        context = rclpy.Context()
+        rclpy.init(context=context)
+        node = rclpy.create_node("rosbag_client_scheduler", context=context)
+        executor = SingleThreadedExecutor(context=context)
+        executor.add_node(node)
+        subscribed: Set[str] = set()
+        try:
+            while not self._stopEvent.is_set():
+                types = dict(node.get_topic_names_and_types())
+                for topic in {topic for topic, _ in self.fields} - subscribed:
+                    if types.get(topic):
+                        qos = qosOverride(
+                            TopicInfo(topic, types[topic][0], 0, publisherQos(node, topic))
+                        )
+                        node.create_subscription(
+                            messageClass(types[topic][0]),
+                            topic,
+                            functools.partial(self._onMessage, topic),
+                            SUBSCRIPTION_DEPTH if qos is None else qosProfile(qos),
+                        )
+                        subscribed.add(topic)
+
+                topics = frozenset(types) if self.watchTopics else frozenset()
+                if topics != self._topics:
+                    self._topics = topics
+                    self._putState()
+                executor.spin_once(timeout_sec=NODE_SAMPLE_PERIOD_S)
+        finally:
+            executor.shutdown()
+            node.destroy_node()
+            context.try_shutdown()
+
+    def _onMessage(self, topic: str, message: Any) -> None:
+        isChanged = False
+        for watchedTopic, field in self.fields:
+            if watchedTopic != topic:
+                continue
+            value = message
+            for name in field.split("."):
+                value = getattr(value, name, None)
+            if value is not None and self._values.get((topic, field)) != str(value):
+                self._values[(topic, field)] = str(value)
+                isChanged = True
+        if isChanged:
+            self._putState()
+
+    def _putState(self) -> None:
+        self.states.put(GraphState(self._topics, dict(self._values), time.monotonic()))
+
+    def _poll(self) -> None:
+        """
+        Observe the graph with ros2 topic list and one ros2 topic echo per watched field
+        """
+
+        last: Optional[GraphState] = None
+        while not self._stopEvent.is_set():
+            topics = frozenset(self._topicList()) if self.watchTopics else frozenset()
+            values = dict(last.values) if last else {}
+            for topic, field in self.fields:
+                value = self._echoField(topic, field)
+                if value is not None:
+                    values[(topic, field)] = value
+
+            if last is None or topics != last.topics or values != last.values:
+                last = GraphState(topics, values, time.monotonic())
+                self.states.put(last)
+
+            self._stopEvent.wait(SAMPLE_PERIOD_S)
+
+    @staticmethod
+    def _topicList() -> List[str]:
+        try:
+            out = subprocess.run(
+                ["ros2", "topic", "list"], capture_output=True, check=False, text=True
+            ).stdout
+        except OSError:
+            return []
+        return out.split()
+
+    @staticmethod
+    def _echoField(topic: str, field: str) -> Optional[str]:
+        try:
+            out = subprocess.run(
+                ["ros2", "topic", "echo", "--once", "--field", field, topic],
+                capture_output=True,
+                check=False,
+                text=True,
+                timeout=ECHO_TIMEOUT_S,
+            ).stdout
+        except (OSError, subprocess.TimeoutExpired):
+            return None
+        value = out.split("\n---")[0].strip()
+        return value or None
+
+
+class ScheduledRun(NamedTuple):
+    """
+    A recording started by the scheduler
+    """
+
+    job: RecordingJob
+    recorder: Recorder
+    topics: List[str]
+    reason: str
+    latency: float
+    waited: float
+
+
+class RecordingScheduler:  # pylint: disable=R0902
+    """
+    Drive the recorder from the jobs, on the thread of the given scheduler.
+    Starts are edge triggered: a job starts when its condition becomes true,
+    and starts again only after it became false if it repeats.
+
+    onEvent gets progress messages, onRecorded gets the name and the generated
+    description of every finished bag, it is called from a worker thread once the recorder
+    exited. The recorders are created, started and stopped by coroutines, the scheduler
+    thread never waits for a process or an agent.
+    """
+
+    def __init__(
+        self,
+        scheduler: Scheduler,
+        jobs: List[RecordingJob],
+        onEvent: Callable[[str], None],
+        onRecorded: Callable[[str, str], None],
+        profiles: Optional[ProfileStore] = None,
+        backend: Optional[RecorderBackend] = None,
+    ) -> None:
+        self.scheduler = scheduler
+        self.jobs = list(jobs)
+        self.onEvent = onEvent
+        self.onRecorded = onRecorded
+        self.profiles = profiles or ProfileStore()
+        self.backend = backend or LocalBackend()
+
+        self.pending: Deque[Tuple[RecordingJob, str, float]] = deque()
+        self.current: Optional[ScheduledRun] = None
+        self.state = GraphState(frozenset(), {}, 0.0)
+        self.freeSince = 0.0
+        self.isRunning = False
+        # a recorder is being created and started, the next run waits for it
+        self.isStarting = False
+        # finished runs waiting for their recorder to exit before they are registered
+        self.finishingCount = 0
+
+        self.sampler = GraphSampler(
+            any("topicAppears" in job.start or not job.topics for job in self.jobs),
+            {job.watchedField for job in self.jobs if job.watchedField is not None},
+        )
+
+    def start(self) -> None:
+        """
+        Start sampling the graph and queue the jobs without start condition
+        """
+
+        self.isRunning = True
+        self.sampler.start()
+        for job in self.jobs:
+            delay = job.nextStartDelay()
+            if delay is not None:
+                self._scheduleAt(job, delay)
+            elif not job.start:
+                self.enqueue(job, job.describeStart())
+        self.scheduler.after(TICK_PERIOD_MS, self._tick)
+
+    def stop(self) -> None:
+        """
+        Stop the current run and drop the queued ones
+        """
+
+        self.isRunning = False
+        self.sampler.stop()
+        self.pending.clear()
+        if self.current is not None:
+            self._finishRun("scheduler stopped")
+
+    def enqueue(self, job: RecordingJob, reason: str, triggerTime: Optional[float] = None) -> None:
+        """
+        Queue a run of job, it starts as soon as the recorder is free
+
+        parameters
+        ----------
+        job: RecordingJob
+            The job to run
+        reason: str
+            Why the job runs, used in the bag description
+        triggerTime: Optional[float]
+            time.monotonic() of the trigger, the start latency is measured from it,
+            or from the end of the previous run if the job was queued
+        """
+
+        self.pending.append((job, reason, time.monotonic() if triggerTime is None else triggerTime))
+        if self.current is not None:
+            self.onEvent(f"{job.name} queued behind {self.current.job.name}")
+        self._startNext()
+
+    def _scheduleAt(self, job: RecordingJob, delay: float) -> None:
+        triggerTime = time.monotonic() + delay
+
+        def fire() -> None:
+            if not self.isRunning:
+                return
+            self.enqueue(job, job.describeStart(), triggerTime)
+            if job.repeat:
+                self._scheduleAt(job, job.nextStartDelay() or 0.0)
+
+        self.scheduler.after(int(delay * 1000), fire)
+
+    def _tick(self) -> None:
+        if not self.isRunning:
+            return
+
+        while not self.sampler.states.empty():
+            self.state = self.sampler.states.get_nowait()
+            self._evaluate(self.state)
+            self._startNext()
+
+        if self.current is not None:
+            run = self.current
+            if not run.recorder.isAlive:
+                self._finishRun("when the recorder exited")
+            elif run.job.duration is not None and run.recorder.elapsed >= run.job.duration:
+                self._finishRun(f"after {run.job.duration:.0f} s")
+            elif run.job.stopWhenCleared and run.job.hasCondition and not run.job.isMet(self.state):
+                self._finishRun("when the condition cleared")
+
+        self.scheduler.after(TICK_PERIOD_MS, self._tick)
+
+    def _evaluate(self, state: GraphState) -> None:
+        """
+        Queue the jobs whose start condition became true in this observation
+        """
+
+        for job in list(self.jobs):
+            if not job.hasCondition:
+                continue
+
+            isMet = job.isMet(state)
+            if isMet and not job.wasMet:
+                isQueued = any(pendingJob is job for pendingJob, _, _ in self.pending)
+                isRecording = self.current is not None and self.current.job is job
+                if not isQueued and not isRecording:
+                    self.enqueue(job, job.describeStart(), state.timestamp)
+                if not job.repeat:
+                    self.jobs.remove(job)
+            job.wasMet = isMet
+
+    def _startNext(self) -> None:
+        if self.current is not None or self.isStarting or not self.pending:
+            return
+
+        job, reason, triggerTime = self.pending[0]
+        if not job.topics and self.state.timestamp == 0.0:
+            # the profile topics are selected from the first observation of the graph
+            return
+        self.pending.popleft()
+
+        profile = self.profiles.get(job.profile) if job.profile else None
+        topics = job.topics or sorted(profile.select(self.state.topics) if profile else [])
+        if not topics:
+            self.onEvent(f"{job.name} skipped, no topic to record")
+            self._startNext()
+            return
+
+        args, bagName = generateRosBagRecordArgs(
+            topics,
+            job.name,
+            dict(profile.options) if profile else {},
+            profile.outputRoot if profile else "",
+        )
+        readyTime = max(triggerTime, self.freeSince)
+        self.isStarting = True
+        runCoroutine(
+            self.scheduler,
+            self._launchRecorder(args, bagName),
+            lambda started: self._onRunStarted(
+                ScheduledRun(
+                    job,
+                    started[0],
+                    topics,
+                    reason,
+                    (started[1] - readyTime) * 1000,
+                    readyTime - triggerTime,
+                )
+            ),
+            lambda err: self._onRunStartError(job, err),
+        )
+
+    async def _launchRecorder(self, args: List[str], bagName: str) -> Tuple[Recorder, float]:
+        """
+        Create and start a recorder, creating a recorder of an agent is a request too
+
+        returns
+        -------
+        Tuple[Recorder, float]
+            The recorder and the time.monotonic() it was started at
+        """
+
+        recorder = await runBlocking(self.backend.createRecorder, args, bagName)
+        await runBlocking(recorder.start)
+        return recorder, time.monotonic()
+
+    def _onRunStarted(self, run: ScheduledRun) -> None:
+        self.isStarting = False
+        self.current = run
+        self.onEvent(f"{run.job.name} started ({run.reason}, {run.latency:.1f} ms start latency)")
+        if not self.isRunning:
+            # the scheduler was stopped while the recorder started
+            self._finishRun("scheduler stopped")
+            return
+
+        if run.job.duration is not None:
+            self.scheduler.after(
+                int(run.job.duration * 1000), lambda: self._stopOnTime(run.recorder)
+            )
+
+    def _onRunStartError(self, job: RecordingJob, err: BaseException) -> None:
+        self.isStarting = False
+        self.freeSince = time.monotonic()
+        if not isinstance(err, OSError):
+            raise err
+
+        self.onEvent(f"{job.name} could not start: {err}")
+        if self.isRunning:
+            self._startNext()
+
+    def _stopOnTime(self, recorder: Recorder) -> None:
+        """
+        Stop the run at its exact duration instead of the next tick
+        """
+
+        if self.current is not None and self.current.recorder is recorder:
+            self._finishRun(f"after {self.current.job.duration:.0f} s")
+
+    def _finishRun(self, stopReason: str) -> None:
+        if self.current is None:
+            return
+
+        run = self.current
+        self.current = None
+        hasExited = not run.recorder.isAlive
+        self.freeSince = time.monotonic()
+
+        description = (
+            f"{run.job.name}: started when {run.reason} "
+            f"({run.latency:.1f} ms start latency"
+            + (f", queued {run.waited:.1f} s" if run.waited > 0 else "")
+            + f"), stopped {stopReason}, recorded {run.recorder.elapsed:.0f} s, "
+            f"topics: {' '.join(run.topics)}"
+        )
+        # the bag is complete once the recorder exited
+        self.finishingCount += 1
+        runCoroutine(
+            self.scheduler,
+            self._registerRun(run.recorder, description, not hasExited),
+            lambda _: self._onRunRegistered(run, stopReason),
+            lambda err: self._onRunRegistered(run, f"{stopReason}, not registered: {err}"),
+        )
+
+        if run.job.repeat and not run.job.start and not hasExited:
+            self.pending.append((run.job, "repeat", time.monotonic()))
+        self._startNext()
+
+    async def _registerRun(self, recorder: Recorder, description: str, isStopped: bool) -> None:
+        if isStopped:
+            await runBlocking(recorder.stop)
+        await runBlocking(recorder.wait)
+        await runBlocking(self.onRecorded, recorder.bagName, description)
+
+    def _onRunRegistered(self, run: ScheduledRun, stopReason: str) -> None:
+        self.finishingCount -= 1
+        self.onEvent(f"{run.job.name} stopped {stopReason}, saved as {run.recorder.bagName}")
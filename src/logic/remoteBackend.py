@@ -0,0 +1,438 @@
+"""
+Backend forwarding the recorder operations to a recorder agent (src/agent/recorderAgent.py),
+so the GUI can run on another machine than the recorder.
+"""
+
+from typing import Any, Callable, Dict, Iterator, List, Optional, Set, Tuple
+
+import os
+import json
+import time
+import queue
+import threading
+import urllib.error
+import urllib.parse
+import urllib.request
+
+from .bagTimeIndex import BagTimeIndex
+from .diskPreflight import PreflightReport
+from .fileSystemInterface import FileSystemInterface, diffCatalogs
+from .topicDiscovery import TopicInfo, TopicQos
+
+REQUEST_TIMEOUT_S = 10.0
+STREAM_TIMEOUT_S = 40.0
+RECONNECT_S = 2.0
+WAIT_PERIOD_S = 0.2
+
+
+class AgentClient:
+    """
+    JSON client of the recorder agent API
+    """
+
+    def __init__(self, url: str, token: str = "") -> None:
+        self.url = url.rstrip("/")
+        self.token = token
+
+    def request(
+        self,
+        method: str,
+        path: str,
+        body: Optional[Dict[str, Any]] = None,
+        timeout: float = REQUEST_TIMEOUT_S,
+    ) -> Any:
+        """
+        Send a request to the agent
+
+        parameters
+        ----------
+        method: str
+            HTTP method
+        path: str
+            Route of the API, e.g. /status
+        body: Optional[Dict[str, Any]]
+            Sent as json
+        timeout: float
+            Seconds to wait for the answer
+
+        returns
+        -------
+        Any
+            The decoded json answer
+
+        raises
+        ------
+        ConnectionError
+            If the agent is unreachable or refuses the request
+        """
+
+        data = json.dumps(body).encode("utf-8") if body is not None else None
+        with self.open(method, path, data, timeout=timeout) as response:
+            return json.loads(response.read() or b"{}")
+
+    def open(
+        self,
+        method: str,
+        path: str,
+        data: Optional[bytes] = None,
+        headers: Optional[Dict[str, str]] = None,
+        timeout: float = REQUEST_TIMEOUT_S,
+    ) -> Any:
+        """
+        Send a request to the agent and return the response to read, e.g. a range of a file
+
+        raises
+        ------
+        ConnectionError
+            If the agent is unreachable or refuses the request
+        """
+
+        request = urllib.request.Request(
+            self.url + path,
+            data=data,
+            headers={**self._headers(), **(headers or {})},
+            method=method,
+        )
+        try:
+            return urllib.request.urlopen(request, timeout=timeout)  # pylint: disable=R1732
+        except urllib.error.HTTPError as err:
+            try:
+                message = json.loads(err.read()).get("error", err.reason)
+            except ValueError:
+                message = err.reason
+            raise ConnectionError(f"Recorder agent: {message}") from err
+        except (urllib.error.URLError, OSError) as err:
+            raise ConnectionError(f"Recorder agent unreachable at {self.url}: {err}") from err
+
+    def events(self) -> Iterator[Tuple[str, Dict[str, Any]]]:
+        """
+        Stream the server-sent events of the agent until the connection closes
+        """
+
+        request = urllib.request.Request(self.url + "/events", headers=self._headers())
+        with urllib.request.urlopen(request, timeout=STREAM_TIMEOUT_S) as response:
+            kind, data = "", ""
+            for rawLine in response:
+                line = rawLine.decode("utf-8").rstrip("\n")
+                if line.startswith("event: "):
+                    kind = line[len("event: ") :]
+                elif line.startswith("data: "):
+                    data += line[len("data: ") :]
+                elif line == "" and kind:
+                    yield kind, json.loads(data)
+                    kind, data = "", ""
+
+    def _headers(self) -> Dict[str, str]:
+        headers = {"Content-Type": "application/json"}
+        if self.token:
+            headers["Authorization"] = f"Bearer {self.token}"
+        return headers
+
+
+class RemoteBackend:
+    """
+    Record on the machine of a recorder agent.
+    A single event stream feeds the recorder output, its status and the catalog changes.
+    """
+
+    def __init__(self, url: str, token: str = "") -> None:
+        self.client = AgentClient(url, token)
+        self.logLines: "queue.Queue[str]" = queue.Queue()
+        self.status: Dict[str, Any] = {}
+        self.catalogCallbacks: List[Callable[[Set[str]], None]] = []
+
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+
+    def listTopics(self) -> List[str]:
+        """
+        Get the active topic names on the agent
+        """
+        topics: List[str] = self.client.request("GET", "/topics")["topics"]
+        return topics
+
+    def discoverTopics(self) -> List[TopicInfo]:
+        """
+        Get the active topics on the agent with their type, publisher count and QoS
+        The agent adds the QoS overrides of its recordings itself
+        """
+        return [
+            TopicInfo(
+                topic["name"],
+                topic["type"],
+                topic["publisherCount"],
+                tuple(TopicQos(*qos) for qos in topic["publisherQos"]),
+            )
+            for topic in self.client.request("GET", "/topics")["details"]
+        ]
+
+    def createRecorder(self, args: List[str], bagName: str) -> "RemoteRecorder":
+        """
+        Create a recording on the agent, it is started by start
+        """
+        return RemoteRecorder(self, args, bagName)
+
+    def preflight(  # pylint: disable=W0613
+        self, outputRoot: str, topics: List[str], duration: Optional[float]
+    ) -> PreflightReport:
+        """
+        Check the disk of the agent, the output root is always the bags directory of the agent
+        """
+        report = self.client.request("POST", "/preflight", {"topics": topics, "duration": duration})
+        return PreflightReport(**report)
+
+    def watchCatalog(self, onChange: Callable[[Set[str]], None]) -> "RemoteCatalogWatcher":
+        """
+        Watch the bags directory of the agent
+        """
+        return RemoteCatalogWatcher(self, onChange)
+
+    def createCatalog(self) -> "RemoteCatalog":
+        """
+        The catalog of the agent
+        """
+        return RemoteCatalog(self.client)
+
+    def ensureEventStream(self) -> None:
+        """
+        Start following the event stream of the agent, reconnecting when it drops
+        """
+
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._readEvents, name="agentEvents", daemon=True
+                )
+                self._thread.start()
+
+    def _readEvents(self) -> None:
+        while True:
+            try:
+                for kind, data in self.client.events():
+                    self._dispatch(kind, data)
+            except (OSError, ValueError):
+                pass
+            time.sleep(RECONNECT_S)
+
+    def _dispatch(self, kind: str, data: Dict[str, Any]) -> None:
+        if kind == "log":
+            self.logLines.put(data["line"])
+        elif kind == "status":
+            self.status = data
+        elif kind == "catalog":
+            for callback in list(self.catalogCallbacks):
+                callback(set(data["names"]))
+
+
+class RemoteOutputReader:
+    """
+    Output of a remote recorder, read from the event stream
+    """
+
+    def __init__(self, recorder: "RemoteRecorder") -> None:
+        self.recorder = recorder
+
+    @property
+    def isAlive(self) -> bool:
+        """
+        True while the remote recorder runs
+        """
+        return self.recorder.isAlive
+
+    def drain(self) -> List[str]:
+        """
+        Take all the lines received so far
+        """
+
+        lines = []
+        logLines = self.recorder.backend.logLines
+        while not logLines.empty():
+            lines.append(logLines.get_nowait())
+        return lines
+
+
+class RemoteRecorder:
+    """
+    A recording running on the agent, with the interface of BagRecorder
+    """
+
+    def __init__(self, backend: RemoteBackend, args: List[str], bagName: str) -> None:
+        self.backend = backend
+        self.args = list(args)
+        self.bagName = bagName
+        self.outputReader: Optional[RemoteOutputReader] = None
+        self.startTime = 0.0
+
+    def start(self) -> None:
+        """
+        Start the recording on the agent, the output directory is the name of the local one
+
+        raises
+        ------
+        ConnectionError
+            If the agent refuses to record
+        """
+
+        self.backend.ensureEventStream()
+        outputIndex = self.args.index("-o") + 1
+        self.backend.status = self.backend.client.request(
+            "POST",
+            "/record",
+            {
+                "name": os.path.basename(self.args[outputIndex].rstrip("/")),
+                "bagName": self.bagName,
+                "args": self.args[outputIndex + 1 :],
+            },
+        )
+        self.startTime = time.monotonic()
+        self.outputReader = RemoteOutputReader(self)
+
+    @property
+    def isAlive(self) -> bool:
+        """
+        True while the agent records this bag, the status of other bags is ignored
+        """
+
+        status = self.backend.status
+        if status.get("bagName") != self.bagName:
+            return self.startTime > 0
+        return bool(status.get("recording"))
+
+    @property
+    def exitCode(self) -> Optional[int]:
+        """
+        Exit code of the recorder on the agent, None while it records
+        """
+
+        status = self.backend.status
+        if status.get("bagName") != self.bagName or status.get("recording"):
+            return None
+        exitCode: Optional[int] = status.get("exitCode")
+        return exitCode
+
+    @property
+    def elapsed(self) -> float:
+        """
+        Seconds since the recording was started
+        """
+        return time.monotonic() - self.startTime
+
+    def stop(self) -> None:
+        """
+        Stop the recording on the agent
+        """
+
+        try:
+            self.backend.client.request("POST", "/stop")
+        except ConnectionError:
+            if self.isAlive:
+                raise
+
+    def wait(self) -> None:
+        """
+        Wait for the agent to stop recording
+        """
+
+        while True:
+            self.backend.status = self.backend.client.request("GET", "/status")
+            if not self.isAlive:
+                return
+            time.sleep(WAIT_PERIOD_S)
+
+
+class RemoteCatalogWatcher:
+    """
+    Reports the bags that changed on the agent, with the interface of BagDirectoryWatcher
+    """
+
+    def __init__(self, backend: RemoteBackend, onChange: Callable[[Set[str]], None]) -> None:
+        self.backend = backend
+        self.onChange = onChange
+
+    def start(self) -> None:
+        """
+        Start following the catalog events
+        """
+        self.backend.catalogCallbacks.append(self.onChange)
+        self.backend.ensureEventStream()
+
+    def stop(self) -> None:
+        """
+        Stop following the catalog events
+        """
+        self.backend.catalogCallbacks.remove(self.onChange)
+
+
+class RemoteCatalog(FileSystemInterface):
+    """
+    The catalog of the agent, with the interface of FileSystemInterface.
+    The agent owns the description file, this only keeps a copy of it.
+    """
+
+    def __init__(self, client: AgentClient) -> None:  # pylint: disable=W0231
+        self.client = client
+        self.bagDescription: Dict[str, Any] = {}
+        self.lock = threading.RLock()
+        self.changeCallbacks: List[Callable[[Dict[str, Any], List[str]], None]] = []
+        # the bags of the agent cannot be opened, their times are unknown
+        self.timeIndex = BagTimeIndex(lambda names: {})
+
+        self.loadDescriptionJson()
+
+    def addBag(
+        self, name: str, description: str, gaps: Optional[List[Dict[str, str]]] = None
+    ) -> None:
+        """
+        Add bag to the catalog of the agent
+        """
+
+        self.client.request(
+            "POST", "/bags", {"name": name, "description": description, "gaps": gaps or []}
+        )
+        with self.lock:
+            entry = self.bagDescription[name] = self._createEntry(name, description, gaps)
+        self.notifyChanges({name: entry}, [])
+
+    def deleteBagFiles(self, name: str) -> None:
+        """
+        Remove bag from the catalog of the agent and delete it
+        """
+        self.client.request("DELETE", "/bags/" + urllib.parse.quote(name, safe=""))
+
+    def applyChanges(self, names: Set[str]) -> Tuple[Dict[str, Any], List[str]]:
+        """
+        Fetch the catalog of the agent after some bags changed
+
+        returns
+        -------
+        Tuple[Dict[str, Any], List[str]]
+            The added bags with their description, and the names of the removed bags
+        """
+
+        bags = self.client.request("GET", "/bags")
+        with self.lock:
+            added = {
+                name: bags[name]
+                for name in names
+                if name in bags and name not in self.bagDescription
+            }
+            removed = [name for name in names if name in self.bagDescription and name not in bags]
+            self.bagDescription = bags
+        self.notifyChanges(added, removed)
+        return added, removed
+
+    def writeJsonToFile(self) -> None:
+        """
+        Nothing to write, the agent writes its description file
+        """
+
+    def loadDescriptionJson(self) -> None:
+        """
+        Fetch the catalog of the agent
+        """
+
+        bags = self.client.request("GET", "/bags")
+        with self.lock:
+            added, removed = diffCatalogs(self.bagDescription, bags)
+            self.bagDescription = bags
+        self.notifyChanges(added, removed)
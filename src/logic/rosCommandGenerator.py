@@ -2,44 +2,133 @@
 Generate a rosbag record command based on the given parameters
 """
 
-from typing import List, Dict, Tuple
+from typing import Collection, FrozenSet, List, Dict, Tuple
 
+import os
+import re
+import shlex
 import datetime
+import functools
 
 from ..constants import Constants
 
 
-def generateRosBagRecordCommand(
-    topicList: List[str], prefix: str, options: Dict[str, str]
-) -> Tuple[str, str]:
+def generateRosBagRecordArgs(
+    topicList: List[str],
+    prefix: str,
+    options: Dict[str, str],
+    outputRoot: str = "",
+    allTopics: Collection[str] = frozenset(),
+    includeRegex: str = "",
+    excludeRegex: str = "",
+) -> Tuple[List[str], str]:
     """
-    Generate a rosbag record command based on the given parameters
+    Generate the arguments of a rosbag record command based on the given parameters
+
+    The topics are given in the shortest equivalent form for the current topic graph:
+    -a when every topic is selected, the regular expressions of a profile when the selection
+    is exactly the profile selection, -a with an exclude expression when fewer topics are left
+    out than selected, and the explicit topic list otherwise.
+    Note that -a and the regular expressions also record matching topics that appear later on.
 
     parameters
     ----------
     topicList : List[str]
         List of topics to record
+    prefix : str
+        Prefix of the bag name
     options : Dict[str, str]
         Dictionary of options to use when generating the command
+    outputRoot : str
+        Directory the bag is written to, defaults to the bags directory
+    allTopics : Collection[str]
+        All the topics of the graph
+    includeRegex : str
+        Regular expression selecting exactly topicList, e.g. from a recording profile
+    excludeRegex : str
+        Regular expression of the topics left out of includeRegex
+
+    returns
+    -------
+    Tuple[List[str], str]
+        The generated arguments, and the bag name
+    """
+
+    output, bagName = generateBagName(prefix, outputRoot)
+
+    args = ["ros2", "bag", "record", "-o", output]
+    for key, value in options.items():
+        args += [key, value]
+
+    args += _topicArgs(frozenset(topicList), frozenset(allTopics), includeRegex, excludeRegex)
+
+    return args, bagName
+
+
+def generateBagName(prefix: str, outputRoot: str = "") -> Tuple[str, str]:
+    """
+    Generate the output path of a new bag, named after the prefix and the current time
+
+    parameters
+    ----------
+    prefix : str
+        Prefix of the bag name
+    outputRoot : str
+        Directory the bag is written to, defaults to the bags directory
 
     returns
     -------
     Tuple[str, str]
-        The generated command, and the bag name
+        The output path, and the bag name, the name of the rosbag2 directory written there
     """
 
     currentTime = datetime.datetime.now().strftime("%d-%m-%Y-%H-%M-%S")
+    bagName = f"{prefix}_{currentTime}" if prefix else currentTime
 
-    command = "ros2 bag record"
+    return os.path.join(outputRoot or Constants.BAG_DIR_PATH, bagName), bagName
 
-    command += f" -o {Constants.BAG_DIR_PATH}"
-    if prefix != "":
-        command += prefix + "_" + currentTime
 
-    for key, value in options.items():
-        command += " " + key + " " + value
+@functools.lru_cache(maxsize=16)
+def _topicArgs(
+    selected: FrozenSet[str], allTopics: FrozenSet[str], includeRegex: str, excludeRegex: str
+) -> Tuple[str, ...]:
+    """
+    The topic selection part of the arguments, cached as it only changes with the selection
+    """
 
-    for topic in topicList:
-        command += " " + topic
+    if allTopics and selected == allTopics:
+        return ("-a",)
+
+    if includeRegex:
+        return ("-e", includeRegex) + (("-x", excludeRegex) if excludeRegex else ())
+
+    if allTopics and selected <= allTopics and len(allTopics) - len(selected) < len(selected):
+        excluded = "|".join(re.escape(topic) for topic in sorted(allTopics - selected))
+        return ("-a", "-x", f"^(?:{excluded})$")
+
+    return tuple(sorted(selected))
+
+
+def generateRosBagRecordCommand(
+    topicList: List[str], prefix: str, options: Dict[str, str], outputRoot: str = ""
+) -> Tuple[str, str]:
+    """
+    Generate a rosbag record command based on the given parameters
+
+    parameters
+    ----------
+    topicList : List[str]
+        List of topics to record
+    options : Dict[str, str]
+        Dictionary of options to use when generating the command
+    outputRoot : str
+        Directory the bag is written to, defaults to the bags directory
+
+    returns
+    -------
+    Tuple[str, str]
+        The generated command, and the bag name
+    """
 
-    return command, prefix + "_" + currentTime + ".bag"
+    args, bagName = generateRosBagRecordArgs(topicList, prefix, options, outputRoot)
+    return shlex.join(args), bagName
@@ -0,0 +1,296 @@
+"""
+Snapshot recording: the serialized messages of the last seconds are kept in memory,
+and written to a bag only when a trigger fires, with the messages received after it.
+Needs rclpy and rosbag2_py, they are imported when a snapshot recorder is started.
+"""
+
+from typing import Any, Callable, Deque, Dict, List, NamedTuple, Optional, Tuple
+
+import time
+import queue
+import threading
+from collections import deque
+
+from .profiler import PROFILER
+from .topicDiscovery import (
+    SUBSCRIPTION_DEPTH,
+    TopicDiscovery,
+    messageClass,
+    qosOverride,
+    qosProfile,
+)
+
+MESSAGE_OVERHEAD = 64
+SPIN_PERIOD_S = 0.1
+# the topics not published yet are looked for again at this period
+DISCOVERY_PERIOD_S = 2.0
+
+
+class BufferedMessage(NamedTuple):
+    """
+    A serialized message, the timestamp is in nanoseconds
+    """
+
+    timestamp: int
+    topic: str
+    data: bytes
+
+
+class SnapshotBuffer:
+    """
+    Ring buffer of the messages received during the last window seconds, bounded in memory.
+    Messages after a pinned timestamp are kept past the window until the pin is released.
+    """
+
+    def __init__(self, window: float, maxBytes: int) -> None:
+        self.window = int(window * 1e9)
+        self.maxBytes = maxBytes
+        self.size = 0
+        self.dropped = 0
+
+        self._messages: Deque[BufferedMessage] = deque()
+        self._pinned: Optional[int] = None
+        self._lock = threading.Lock()
+
+    def append(self, topic: str, data: bytes, timestamp: int) -> None:
+        """
+        Add a message, and evict the messages out of the window or over the memory cap
+        """
+
+        with self._lock:
+            self._messages.append(BufferedMessage(timestamp, topic, data))
+            self.size += len(data) + MESSAGE_OVERHEAD
+
+            oldest = timestamp - self.window
+            if self._pinned is not None:
+                oldest = min(oldest, self._pinned)
+            while self._messages[0].timestamp < oldest:
+                self._evict()
+
+            while self.size > self.maxBytes and len(self._messages) > 1:
+                self._evict()
+                self.dropped += 1
+
+    def _evict(self) -> None:
+        message = self._messages.popleft()
+        self.size -= len(message.data) + MESSAGE_OVERHEAD
+
+    def pin(self, timestamp: Optional[int]) -> None:
+        """
+        Keep the messages received after timestamp, None releases the pin
+        """
+        with self._lock:
+            self._pinned = timestamp
+
+    def release(self, timestamp: int) -> None:
+        """
+        Release the pin if it is still at timestamp, a newer pin is kept
+        """
+        with self._lock:
+            if self._pinned == timestamp:
+                self._pinned = None
+
+    def take(self, start: int, end: int) -> List[BufferedMessage]:
+        """
+        Copy the messages received between start and end
+        """
+        with self._lock:
+            return [message for message in self._messages if start <= message.timestamp <= end]
+
+
+class SnapshotRecorder:  # pylint: disable=R0902
+    """
+    Buffer the topics in memory and write a bag around every trigger.
+    A trigger is a message on one of the trigger topics accepted by the condition,
+    or a call to trigger, e.g. from a hotkey.
+
+    The progress is reported through the events queue as (kind, text) tuples,
+    kind is "triggered", "saved" with the bag name or "error".
+    outputPath gives the path and the bag name of the next snapshot.
+    The topics are subscribed with the QoS of their publishers once the discovery sees them,
+    the discovery of the backend can be shared to skip its wait for the graph.
+    """
+
+    def __init__(  # pylint: disable=R0913
+        self,
+        topics: List[str],
+        outputPath: Callable[[], Tuple[str, str]],
+        triggerTopics: Optional[List[str]] = None,
+        condition: Optional[Callable[[str, bytes], bool]] = None,
+        before: float = 30.0,
+        after: float = 30.0,
+        maxBytes: int = 1024 * 1024 * 1024,
+        discovery: Optional[TopicDiscovery] = None,
+    ) -> None:
+        # checked for every message received
+        self.topics = frozenset(topics)
+        self.discovery = discovery or TopicDiscovery()
+        self.outputPath = outputPath
+        self.triggerTopics = frozenset(triggerTopics or [])
+        self.condition = condition or (lambda topic, data: True)
+        self.before = before
+        self.after = after
+
+        self.buffer = SnapshotBuffer(before, maxBytes)
+        self.events: "queue.Queue[Tuple[str, str]]" = queue.Queue()
+
+        self._topicTypes: Dict[str, str] = {}
+        self._deadline: Optional[int] = None
+        self._triggerTime = 0
+        self._lock = threading.Lock()
+        self._stopEvent = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._writers: List[threading.Thread] = []
+        self._rosbag2: Any = None
+
+    def start(self) -> None:
+        """
+        Start buffering in a daemon thread, the topics are subscribed by the thread as they
+        are discovered
+
+        raises
+        ------
+        ImportError
+            If rclpy or rosbag2_py is not available
+        """
+
+        # pylint: disable=C0415
+        import rclpy
+        import rosbag2_py
+        from rclpy.executors import SingleThreadedExecutor
+
+        self._rosbag2 = rosbag2_py
+        context = rclpy.Context()
+        rclpy.init(context=context)
+        node = rclpy.create_node("rosbag_client_snapshot", context=context)
+
+        executor = SingleThreadedExecutor(context=context)
+        executor.add_node(node)
+        self._thread = threading.Thread(
+            target=self._spin, args=(executor, node, context), name="snapshotRecorder", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self) -> None:
+        """
+        Stop buffering, a pending snapshot is written with the messages received so far.
+        Returns once all the snapshots are written.
+        """
+
+        self._stopEvent.set()
+        if self._thread is not None:
+            self._thread.join()
+        for writer in self._writers:
+            writer.join()
+
+    def trigger(self, reason: str = "manual") -> None:
+        """
+        Write a snapshot once the after window has elapsed, can be called from any thread.
+        Triggers received while a snapshot is pending are merged into it.
+        """
+
+        now = time.time_ns()
+        with self._lock:
+            if self._deadline is not None:
+                return
+            self._triggerTime = now
+            self._deadline = now + int(self.after * 1e9)
+            self.buffer.pin(now - int(self.before * 1e9))
+
+        self.events.put(("triggered", reason))
+
+    def _onMessage(self, topic: str, data: bytes) -> None:
+        if topic in self.topics:
+            self.buffer.append(topic, data, time.time_ns())
+        if topic in self.triggerTopics and self.condition(topic, data):
+            self.trigger(topic)
+
+    def _subscribe(self, node: Any) -> None:
+        """
+        Subscribe to the wanted topics the graph has published since the last call
+        """
+
+        wanted = self.topics | self.triggerTopics
+        if wanted <= self._topicTypes.keys():
+            return
+
+        try:
+            topics = self.discovery.discover()
+        except OSError as err:
+            self.events.put(("error", f"Topic discovery failed: {err}"))
+            return
+
+        for topic in topics:
+            if topic.name not in wanted or topic.name in self._topicTypes or not topic.type:
+                continue
+            qos = qosOverride(topic)
+            node.create_subscription(
+                messageClass(topic.type),
+                topic.name,
+                lambda data, name=topic.name: self._onMessage(name, data),
+                SUBSCRIPTION_DEPTH if qos is None else qosProfile(qos),
+                raw=True,
+            )
+            self._topicTypes[topic.name] = topic.type
+
+    def _spin(self, executor: Any, node: Any, context: Any) -> None:
+        lastDiscovery = 0.0
+        try:
+            while not self._stopEvent.is_set():
+                if time.monotonic() - lastDiscovery >= DISCOVERY_PERIOD_S:
+                    self._subscribe(node)
+                    lastDiscovery = time.monotonic()
+                executor.spin_once(timeout_sec=SPIN_PERIOD_S)
+                with self._lock:
+                    isDue = self._deadline is not None and time.time_ns() >= self._deadline
+                if isDue:
+                    self._flush()
+        finally:
+            if self._deadline is not None:
+                self._flush()
+            executor.shutdown()
+            node.destroy_node()
+            context.try_shutdown()
+
+    def _flush(self) -> None:
+        """
+        Write the messages around the trigger to a new bag in a separate thread
+        """
+
+        with self._lock:
+            start = self._triggerTime - int(self.before * 1e9)
+            end = self._deadline or time.time_ns()
+            self._deadline = None
+
+        messages = self.buffer.take(start, end)
+        # a trigger since the deadline was cleared pinned the window of its own snapshot
+        self.buffer.release(start)
+        writer = threading.Thread(
+            target=self._write, args=(*self.outputPath(), messages), name="snapshotWriter"
+        )
+        writer.start()
+        self._writers = [thread for thread in self._writers if thread.is_alive()] + [writer]
+
+    def _write(self, path: str, name: str, messages: List[BufferedMessage]) -> None:
+        rosbag2 = self._rosbag2
+        try:
+            with PROFILER.span("snapshot write"):
+                writer = rosbag2.SequentialWriter()
+                writer.open(
+                    rosbag2.StorageOptions(uri=path, storage_id="sqlite3"),
+                    rosbag2.ConverterOptions("cdr", "cdr"),
+                )
+                for topic in sorted({message.topic for message in messages}):
+                    writer.create_topic(
+                        rosbag2.TopicMetadata(
+                            name=topic, type=self._topicTypes[topic], serialization_format="cdr"
+                        )
+                    )
+                for message in messages:
+                    writer.write(message.topic, message.data, message.timestamp)
+                del writer
+        except (OSError, RuntimeError) as err:
+            self.events.put(("error", f"Could not write {path}: {err}"))
+            return
+
+        self.events.put(("saved", name))
@@ -0,0 +1,192 @@
+"""
+Disk usage of the catalog by prefix, by day and by topic.
+The totals are updated bag by bag when bags are added or removed, so they never need a walk of
+the bags directory. The usage of a topic is estimated by sharing the size of every bag between
+its topics in proportion to their number of messages.
+"""
+
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+
+import threading
+from collections import Counter
+
+from .bagMetadata import BagMetadata
+from .diskPreflight import formatSize
+
+USAGE_DIMENSIONS = ("prefix", "day", "topic")
+# the usage tables and the growth of the catalog
+STORAGE_VIEWS = USAGE_DIMENSIONS + ("growth",)
+BAR_WIDTH = 30
+
+
+class BagUsage(NamedTuple):
+    """
+    What a bag adds to the totals, the bytes by dimension and key
+    """
+
+    size: int
+    keys: Dict[str, Dict[str, int]]
+
+
+class UsageRow(NamedTuple):
+    """
+    Usage of one prefix, day or topic
+    """
+
+    key: str
+    bagCount: int
+    size: int
+
+
+class StorageStats:
+    """
+    Totals of the catalog, safe to update from the catalog callbacks
+    """
+
+    def __init__(self) -> None:
+        self.bags: Dict[str, BagUsage] = {}
+        self.totalSize = 0
+
+        self._lock = threading.Lock()
+        self._sizes: Dict[str, "Counter[str]"] = {
+            dimension: Counter() for dimension in USAGE_DIMENSIONS
+        }
+        self._counts: Dict[str, "Counter[str]"] = {
+            dimension: Counter() for dimension in USAGE_DIMENSIONS
+        }
+
+    def build(self, bags: Dict[str, Any], metadata: Dict[str, BagMetadata]) -> None:
+        """
+        Compute the totals of the whole catalog
+
+        parameters
+        ----------
+        bags: Dict[str, Any]
+            The catalog entries by bag name
+        metadata: Dict[str, BagMetadata]
+            Metadata of the bags, see loadBagMetadata
+        """
+
+        with self._lock:
+            self.bags = {}
+            self.totalSize = 0
+            for dimension in USAGE_DIMENSIONS:
+                self._sizes[dimension].clear()
+                self._counts[dimension].clear()
+            for name, entry in bags.items():
+                self._add(name, _createUsage(entry, metadata.get(name)))
+
+    def add(self, name: str, entry: Dict[str, Any], metadata: Optional[BagMetadata]) -> None:
+        """
+        Count a new bag, or count an updated bag again
+        """
+
+        usage = _createUsage(entry, metadata)
+        with self._lock:
+            self._remove(name)
+            self._add(name, usage)
+
+    def remove(self, name: str) -> None:
+        """
+        Stop counting a bag
+        """
+
+        with self._lock:
+            self._remove(name)
+
+    def usage(self, dimension: str) -> List[UsageRow]:
+        """
+        Usage by prefix, day or topic, the days in time order and the others largest first
+        """
+
+        with self._lock:
+            rows = [
+                UsageRow(key, self._counts[dimension][key], size)
+                for key, size in self._sizes[dimension].items()
+            ]
+        if dimension == "day":
+            return sorted(rows)
+        return sorted(rows, key=lambda row: (-row.size, row.key))
+
+    def growth(self) -> List[Tuple[str, int]]:
+        """
+        Size of the catalog at the end of every day a bag was recorded
+        """
+
+        total = 0
+        growth = []
+        for row in self.usage("day"):
+            total += row.size
+            growth.append((row.key, total))
+        return growth
+
+    def _add(self, name: str, usage: BagUsage) -> None:
+        self.bags[name] = usage
+        self.totalSize += usage.size
+        for dimension, sizes in usage.keys.items():
+            self._sizes[dimension].update(sizes)
+            self._counts[dimension].update(sizes.keys())
+
+    def _remove(self, name: str) -> None:
+        usage = self.bags.pop(name, None)
+        if usage is None:
+            return
+
+        self.totalSize -= usage.size
+        for dimension, sizes in usage.keys.items():
+            for key, size in sizes.items():
+                self._sizes[dimension][key] -= size
+                self._counts[dimension][key] -= 1
+                if self._counts[dimension][key] <= 0:
+                    del self._sizes[dimension][key]
+                    del self._counts[dimension][key]
+
+
+def _createUsage(entry: Dict[str, Any], metadata: Optional[BagMetadata]) -> BagUsage:
+    size = metadata.size if metadata else 0
+    topicSizes: Dict[str, int] = {}
+    if metadata and metadata.topics:
+        messageCount = sum(metadata.messageCounts)
+        for topic, count in zip(metadata.topics, metadata.messageCounts):
+            if messageCount:
+                topicSizes[topic] = size * count // messageCount
+            else:
+                topicSizes[topic] = size // len(metadata.topics)
+
+    return BagUsage(
+        size,
+        {
+            "prefix": {entry.get("name", ""): size},
+            # the timestamp is an ISO 8601 string, its date sorts in time order
+            "day": {entry.get("timestamp", "")[:10]: size},
+            "topic": topicSizes,
+        },
+    )
+
+
+def formatUsage(dimension: str, rows: List[UsageRow], totalSize: int) -> List[str]:
+    """
+    Lines of a usage table, with a bar showing the share of every row in the total size
+    """
+
+    lines = [f"{dimension:<48}{'bags':>8}{'size':>12}{'share':>8}"]
+    for row in rows:
+        share = row.size / totalSize if totalSize else 0.0
+        lines.append(
+            f"{row.key:<48}{row.bagCount:>8}{formatSize(row.size):>12}{share:>8.1%}  "
+            + "\u2588" * round(share * BAR_WIDTH)
+        )
+    return lines
+
+
+def formatGrowth(growth: List[Tuple[str, int]]) -> List[str]:
+    """
+    Lines of the growth table, with a bar showing the size of the catalog every day
+    """
+
+    lines = [f"{'day':<12}{'total':>12}"]
+    largest = growth[-1][1] if growth else 0
+    for day, size in growth:
+        share = size / largest if largest else 0.0
+        lines.append(f"{day:<12}{formatSize(size):>12}  " + "\u2588" * round(share * BAR_WIDTH))
+    return lines
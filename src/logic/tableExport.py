@@ -0,0 +1,543 @@
+"""
+Export the numeric topics of a bag as tables, one file per topic, in Parquet, Arrow or CSV.
+The messages are decoded in batches: the offsets of the fields are read once from a message,
+then numpy views every message of the same layout as a record of a structured type, so each
+field becomes a column without a Python loop over the messages. The memory
+used is bounded by the batch size.
+Needs numpy, and pyarrow for Parquet and Arrow. Only the message types of MESSAGE_FIELDS,
+without variable length arrays, are supported.
+"""
+
+from typing import Any, Dict, Iterator, List, NamedTuple, Optional, Tuple
+
+import os
+import sys
+import csv
+import shutil
+
+from .bagReader import Bag, BagFormatError, openBag
+from .profiler import PROFILER
+from ..constants import Constants
+
+TABLE_FORMATS = ("parquet", "arrow", "csv")
+HEADER_TYPE = "std_msgs/Header"
+
+# little endian numpy formats and alignments of the primitive types
+PRIMITIVE_FORMATS = {
+    "bool": "?",
+    "int8": "i1",
+    "uint8": "u1",
+    "int16": "<i2",
+    "uint16": "<u2",
+    "int32": "<i4",
+    "uint32": "<u4",
+    "int64": "<i8",
+    "uint64": "<u8",
+    "float32": "<f4",
+    "float64": "<f8",
+}
+PRIMITIVE_SIZES = {
+    "bool": 1,
+    "int8": 1,
+    "uint8": 1,
+    "int16": 2,
+    "uint16": 2,
+    "int32": 4,
+    "uint32": 4,
+    "int64": 8,
+    "uint64": 8,
+    "float32": 4,
+    "float64": 8,
+}
+
+_VECTOR3 = [("x", "float64"), ("y", "float64"), ("z", "float64")]
+_TWIST = [("linear", "geometry_msgs/Vector3"), ("angular", "geometry_msgs/Vector3")]
+_ACKERMANN = [
+    ("steering_angle", "float32"),
+    ("steering_angle_velocity", "float32"),
+    ("speed", "float32"),
+    ("acceleration", "float32"),
+    ("jerk", "float32"),
+]
+
+# fields of the supported message types, by type name without /msg/
+MESSAGE_FIELDS: Dict[str, List[Tuple[str, str]]] = {
+    **{
+        "std_msgs/" + name.capitalize().replace("Uint", "UInt"): [("data", name)]
+        for name in PRIMITIVE_FORMATS
+    },
+    "geometry_msgs/Vector3": _VECTOR3,
+    "geometry_msgs/Point": _VECTOR3,
+    "geometry_msgs/Quaternion": _VECTOR3 + [("w", "float64")],
+    "geometry_msgs/Pose": [
+        ("position", "geometry_msgs/Point"),
+        ("orientation", "geometry_msgs/Quaternion"),
+    ],
+    "geometry_msgs/Twist": _TWIST,
+    "geometry_msgs/Accel": _TWIST,
+    "geometry_msgs/Wrench": [
+        ("force", "geometry_msgs/Vector3"),
+        ("torque", "geometry_msgs/Vector3"),
+    ],
+    "geometry_msgs/PoseWithCovariance": [
+        ("pose", "geometry_msgs/Pose"),
+        ("covariance", "float64[36]"),
+    ],
+    "geometry_msgs/TwistWithCovariance": [
+        ("twist", "geometry_msgs/Twist"),
+        ("covariance", "float64[36]"),
+    ],
+    **{
+        f"geometry_msgs/{name}Stamped": [("header", HEADER_TYPE), (field, f"geometry_msgs/{name}")]
+        for name, field in (
+            ("Vector3", "vector"),
+            ("Point", "point"),
+            ("Quaternion", "quaternion"),
+            ("Pose", "pose"),
+            ("Twist", "twist"),
+            ("Accel", "accel"),
+            ("Wrench", "wrench"),
+            ("PoseWithCovariance", "pose"),
+            ("TwistWithCovariance", "twist"),
+        )
+    },
+    "nav_msgs/Odometry": [
+        ("header", HEADER_TYPE),
+        ("child_frame_id", "string"),
+        ("pose", "geometry_msgs/PoseWithCovariance"),
+        ("twist", "geometry_msgs/TwistWithCovariance"),
+    ],
+    "sensor_msgs/Imu": [
+        ("header", HEADER_TYPE),
+        ("orientation", "geometry_msgs/Quaternion"),
+        ("orientation_covariance", "float64[9]"),
+        ("angular_velocity", "geometry_msgs/Vector3"),
+        ("angular_velocity_covariance", "float64[9]"),
+        ("linear_acceleration", "geometry_msgs/Vector3"),
+        ("linear_acceleration_covariance", "float64[9]"),
+    ],
+    "sensor_msgs/MagneticField": [
+        ("header", HEADER_TYPE),
+        ("magnetic_field", "geometry_msgs/Vector3"),
+        ("magnetic_field_covariance", "float64[9]"),
+    ],
+    "sensor_msgs/Temperature": [
+        ("header", HEADER_TYPE),
+        ("temperature", "float64"),
+        ("variance", "float64"),
+    ],
+    "sensor_msgs/FluidPressure": [
+        ("header", HEADER_TYPE),
+        ("fluid_pressure", "float64"),
+        ("variance", "float64"),
+    ],
+    "sensor_msgs/NavSatFix": [
+        ("header", HEADER_TYPE),
+        ("status", "sensor_msgs/NavSatStatus"),
+        ("latitude", "float64"),
+        ("longitude", "float64"),
+        ("altitude", "float64"),
+        ("position_covariance", "float64[9]"),
+        ("position_covariance_type", "uint8"),
+    ],
+    "sensor_msgs/NavSatStatus": [("status", "int8"), ("service", "uint16")],
+    "sensor_msgs/Range": [
+        ("header", HEADER_TYPE),
+        ("radiation_type", "uint8"),
+        ("field_of_view", "float32"),
+        ("min_range", "float32"),
+        ("max_range", "float32"),
+        ("range", "float32"),
+    ],
+    "ackermann_msgs/AckermannDrive": _ACKERMANN,
+    "ackermann_msgs/AckermannDriveStamped": [
+        ("header", HEADER_TYPE),
+        ("drive", "ackermann_msgs/AckermannDrive"),
+    ],
+}
+
+
+class Field(NamedTuple):
+    """
+    A member of a message at an offset of the message, with its size in bytes, the size of a
+    string includes its length prefix
+    """
+
+    name: str
+    offset: int
+    primitive: str
+    size: int
+    text: str
+
+
+def normalizeType(messageType: str) -> str:
+    """
+    The ROS 1 name of a ROS 2 message type, e.g. nav_msgs/Odometry for nav_msgs/msg/Odometry
+    """
+    return messageType.replace("/msg/", "/")
+
+
+def isTableType(messageType: str) -> bool:
+    """
+    True if the messages of the type can be exported as a table
+    """
+    return normalizeType(messageType) in MESSAGE_FIELDS
+
+
+def checkTableFormat(tableFormat: str) -> None:
+    """
+    raises
+    ------
+    ValueError
+        If the format is unknown or its libraries are not installed
+    """
+
+    if tableFormat not in TABLE_FORMATS:
+        raise ValueError(
+            f"Unknown format {tableFormat}, expected one of {', '.join(TABLE_FORMATS)}"
+        )
+    try:
+        # pylint: disable=C0415,W0611
+        import numpy
+
+        if tableFormat != "csv":
+            import pyarrow
+    except ImportError as err:
+        raise ValueError(f"Exporting {tableFormat} tables needs {err.name}") from err
+
+
+def readLayout(messageType: str, data: bytes, isCdr: bool) -> List[Field]:
+    """
+    The columns of a serialized message, with the offsets of the fields in data
+
+    raises
+    ------
+    BagFormatError
+        If the message does not match its type
+    """
+
+    if isCdr and data[1:2] != b"\x01":
+        raise BagFormatError("Only little endian CDR messages are supported")
+
+    fields: List[Field] = []
+    origin = 4 if isCdr else 0
+    try:
+        end = _walk(normalizeType(messageType), "", data, origin, origin, isCdr, fields)
+    except (IndexError, UnicodeDecodeError) as err:
+        raise BagFormatError(f"The message does not match {messageType}") from err
+    # CDR messages may be padded to a multiple of 4 bytes
+    if end > len(data) or (len(data) - end >= (4 if isCdr else 1)):
+        raise BagFormatError(f"The message does not match {messageType}")
+    return fields
+
+
+def _walk(  # pylint: disable=R0913
+    typeName: str,
+    prefix: str,
+    data: bytes,
+    offset: int,
+    origin: int,
+    isCdr: bool,
+    fields: List[Field],
+) -> int:
+    """
+    Append the fields of typeName at offset to fields, returns the offset after them
+    """
+
+    for columnName, fieldType in _members(typeName, prefix, isCdr):
+        if fieldType == "string":
+            offset = _align(offset, 4, origin, isCdr)
+            length = int.from_bytes(data[offset : offset + 4], "little")
+            text = data[offset + 4 : offset + 4 + length].rstrip(b"\0").decode("utf-8")
+            fields.append(Field(columnName, offset, fieldType, 4 + length, text))
+            offset += 4 + length
+        elif fieldType in PRIMITIVE_SIZES:
+            size = PRIMITIVE_SIZES[fieldType]
+            offset = _align(offset, size, origin, isCdr)
+            if offset + size > len(data):
+                raise IndexError(columnName)
+            fields.append(Field(columnName, offset, fieldType, size, ""))
+            offset += size
+        else:
+            offset = _walk(fieldType, columnName + ".", data, offset, origin, isCdr, fields)
+    return offset
+
+
+def _members(typeName: str, prefix: str, isCdr: bool) -> List[Tuple[str, str]]:
+    """
+    Column names and types of the members of typeName, with an item per element of the arrays
+    """
+
+    if typeName == HEADER_TYPE:
+        # ROS 1 headers start with a sequence number and have an unsigned stamp
+        members = [] if isCdr else [("seq", "uint32")]
+        members += [("stamp.sec", "int32" if isCdr else "uint32"), ("stamp.nanosec", "uint32")]
+        members += [("frame_id", "string")]
+    else:
+        members = MESSAGE_FIELDS[typeName]
+
+    columns = []
+    for name, fieldType in members:
+        if fieldType.endswith("]"):
+            fieldType, _, length = fieldType[:-1].partition("[")
+            columns += [(f"{prefix}{name}.{index}", fieldType) for index in range(int(length))]
+        else:
+            columns.append((prefix + name, fieldType))
+    return columns
+
+
+def _align(offset: int, size: int, origin: int, isCdr: bool) -> int:
+    if not isCdr:
+        return offset
+    return offset + (-(offset - origin) % size)
+
+
+def exportTables(
+    path: str,
+    destination: str,
+    tableFormat: str = Constants.EXPORT_FORMAT,
+    topics: Optional[List[str]] = None,
+    timeRange: Optional[Tuple[int, int]] = None,
+    batchSize: int = Constants.EXPORT_BATCH_SIZE,
+) -> Dict[str, int]:
+    """
+    Write the topics of the bag at path to destination, one table per topic, e.g.
+    /imu/data to destination/imu_data.parquet. The directory is removed if the export fails.
+
+    parameters
+    ----------
+    path: str
+        Path of the bag
+    destination: str
+        Directory of the tables, created
+    tableFormat: str
+        One of TABLE_FORMATS
+    topics: Optional[List[str]]
+        Topics to export, defaults to every topic of a supported type
+    timeRange: Optional[Tuple[int, int]]
+        Only the messages recorded from the start to the end time, in nanoseconds since the
+        epoch, defaults to the whole bag
+    batchSize: int
+        Messages decoded at once per topic
+
+    returns
+    -------
+    Dict[str, int]
+        The number of rows of every topic
+
+    raises
+    ------
+    BagFormatError
+        If a topic is missing, of an unsupported type, or its messages do not match their type
+    """
+
+    bag = openBag(path)
+    bagTopics = bag.index().topics
+    if topics is None:
+        topics = [name for name, topic in bagTopics.items() if isTableType(topic.type)]
+        if not topics:
+            raise BagFormatError("No topic of the bag can be exported as a table")
+    for name in topics:
+        if name not in bagTopics:
+            raise BagFormatError(f"No topic {name} in the bag")
+        if not isTableType(bagTopics[name].type):
+            raise BagFormatError(f"Cannot export {name}, {bagTopics[name].type} is not supported")
+
+    os.makedirs(destination)
+    writers = {
+        name: _TableWriter(os.path.join(destination, _tableName(name, tableFormat)), tableFormat)
+        for name in topics
+    }
+    try:
+        with PROFILER.span("table export"):
+            _writeTables(bag, writers, timeRange or (0, sys.maxsize), batchSize)
+    except BaseException:
+        for writer in writers.values():
+            writer.close()
+        shutil.rmtree(destination, ignore_errors=True)
+        raise
+
+    for writer in writers.values():
+        writer.close()
+    return {name: writer.rowCount for name, writer in writers.items()}
+
+
+def _writeTables(
+    bag: Bag, writers: Dict[str, "_TableWriter"], timeRange: Tuple[int, int], batchSize: int
+) -> None:
+    """
+    Decode the messages of the topics of writers in batches, and write the batches
+    """
+
+    bagTopics = bag.index().topics
+    startTime, endTime = timeRange
+    batches: Dict[str, Tuple[List[int], List[bytes]]] = {name: ([], []) for name in writers}
+    for name, timestamp, data in bag.messages(list(writers), startTime):
+        # messages are only in time order within a chunk, the end cannot stop the reading
+        if timestamp > endTime:
+            continue
+        timestamps, messages = batches[name]
+        timestamps.append(timestamp)
+        messages.append(data)
+        if len(messages) >= batchSize:
+            writers[name].write(_decodeBatch(bagTopics[name].type, timestamps, messages, bag.isCdr))
+            batches[name] = ([], [])
+
+    for name, (timestamps, messages) in batches.items():
+        if messages:
+            writers[name].write(_decodeBatch(bagTopics[name].type, timestamps, messages, bag.isCdr))
+
+
+def _tableName(topic: str, tableFormat: str) -> str:
+    return "_".join(topic.strip("/").split("/")) + "." + tableFormat
+
+
+def _decodeBatch(
+    messageType: str, timestamps: List[int], messages: List[bytes], isCdr: bool
+) -> Dict[str, Any]:
+    """
+    Columns of a batch of messages, as numpy arrays in time order
+    The messages are decoded in groups of messages of the same length, which share the
+    offsets of their fields unless their strings differ in length.
+    """
+
+    # pylint: disable=C0415
+    import numpy as np
+
+    stamps = np.asarray(timestamps, dtype=np.int64)
+    lengths = np.fromiter(map(len, messages), dtype=np.int64, count=len(messages))
+    groups: List[Dict[str, Any]] = []
+    for length in np.unique(lengths):
+        (pending,) = np.nonzero(lengths == length)
+        while len(pending):
+            group = messages if len(pending) == len(messages) else [messages[i] for i in pending]
+            columns, matched = _decodeGroup(messageType, group, isCdr)
+            groups.append({"timestamp": stamps[pending[matched]], **columns})
+            pending = pending[~matched]
+
+    if len(groups) == 1:
+        return groups[0]
+
+    merged = {name: np.concatenate([group[name] for group in groups]) for name in groups[0]}
+    order = np.argsort(merged["timestamp"], kind="stable")
+    return {name: column[order] for name, column in merged.items()}
+
+
+def _decodeGroup(messageType: str, group: List[bytes], isCdr: bool) -> Tuple[Dict[str, Any], Any]:
+    """
+    Decode the messages of group laid out as its first message, they all have its length
+
+    returns
+    -------
+    Tuple[Dict[str, Any], Any]
+        The columns of the messages decoded, and the mask of these messages in group
+    """
+
+    # pylint: disable=C0415
+    import numpy as np
+
+    layout = readLayout(messageType, group[0], isCdr)
+    members: List[Tuple[str, str, int]] = []
+    for field in layout:
+        if field.primitive == "string":
+            # the length prefix tells the messages whose strings are laid out differently
+            members.append((field.name + "#length", "<u4", field.offset))
+            if field.size > 4:
+                members.append((field.name, f"S{field.size - 4}", field.offset + 4))
+        else:
+            members.append((field.name, PRIMITIVE_FORMATS[field.primitive], field.offset))
+
+    names, formats, offsets = zip(*members)
+    records = np.frombuffer(
+        b"".join(group),
+        dtype=np.dtype(
+            {
+                "names": list(names),
+                "formats": list(formats),
+                "offsets": list(offsets),
+                "itemsize": len(group[0]),
+            }
+        ),
+    )
+
+    matched = np.ones(len(group), dtype=bool)
+    for field in layout:
+        if field.primitive == "string":
+            matched &= records[field.name + "#length"] == field.size - 4
+    records = records[matched]
+
+    columns: Dict[str, Any] = {}
+    for field in layout:
+        if field.primitive != "string":
+            columns[field.name] = np.ascontiguousarray(records[field.name])
+        elif field.size > 4:
+            # S columns drop the trailing null of the ROS 2 strings
+            columns[field.name] = np.char.decode(records[field.name], "utf-8")
+        else:
+            columns[field.name] = np.full(len(records), "", dtype=object)
+    return columns, matched
+
+
+class _TableWriter:
+    """
+    Append batches of columns to a table file, the file is created with the first batch
+    """
+
+    def __init__(self, path: str, tableFormat: str) -> None:
+        self.path = path
+        self.tableFormat = tableFormat
+        self.rowCount = 0
+        self._writer: Any = None
+        self._file: Any = None
+
+    def write(self, columns: Dict[str, Any]) -> None:
+        """
+        Append a batch
+        """
+
+        if self.tableFormat == "csv":
+            self._writeCsv(columns)
+        else:
+            self._writeArrow(columns)
+        self.rowCount += len(columns["timestamp"])
+
+    def _writeArrow(self, columns: Dict[str, Any]) -> None:
+        # pylint: disable=C0415
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        table = pa.table(
+            {
+                name: pa.array(column, type=pa.timestamp("ns"))
+                if name == "timestamp"
+                else pa.array(column)
+                for name, column in columns.items()
+            }
+        )
+        if self._writer is None:
+            if self.tableFormat == "parquet":
+                self._writer = pq.ParquetWriter(self.path, table.schema, compression="zstd")
+            else:
+                self._writer = pa.ipc.new_file(self.path, table.schema)
+        self._writer.write_table(table)
+
+    def _writeCsv(self, columns: Dict[str, Any]) -> None:
+        if self._file is None:
+            self._file = open(self.path, "w", encoding="utf-8", newline="")  # pylint: disable=R1732
+            csv.writer(self._file).writerow(columns)
+        csv.writer(self._file).writerows(_rows(columns))
+
+    def close(self) -> None:
+        """
+        Complete the file
+        """
+
+        if self._writer is not None:
+            self._writer.close()
+        if self._file is not None:
+            self._file.close()
+
+
+def _rows(columns: Dict[str, Any]) -> Iterator[Tuple[Any, ...]]:
+    # tolist converts a whole column to Python values at once
+    return zip(*(column.tolist() for column in columns.values()))
@@ -0,0 +1,78 @@
+"""
+Model of the terminal response pane, bounded in lines and coalescing updates
+"""
+
+from typing import IO, List, Optional, Tuple
+
+
+class TerminalBuffer:
+    """
+    Keeps track of the lines shown in a terminal pane.
+    Appended text is held until the next flush so one frame gets a single insert,
+    and the pane is trimmed from the top to at most maxLines lines.
+    """
+
+    def __init__(self, maxLines: int = 5000, spillPath: str = "") -> None:
+        self.maxLines = maxLines
+        self.lineCount = 0
+
+        self._pending: List[str] = []
+        self._spillFile: Optional[IO[str]] = None
+        if spillPath:
+            self._spillFile = open(spillPath, "a", encoding="utf-8")  # pylint: disable=R1732
+
+    @property
+    def hasPending(self) -> bool:
+        """
+        True if text was appended since the last flush
+        """
+        return len(self._pending) > 0
+
+    def append(self, text: str) -> None:
+        """
+        Queue text for the next flush, and write it to the spill log if there is one
+        """
+
+        self._pending.append(text)
+        if self._spillFile is not None:
+            self._spillFile.write(text)
+
+    def flush(self) -> Tuple[str, int]:
+        """
+        Take the text appended since the last flush
+
+        returns
+        -------
+        Tuple[str, int]
+            The text to insert at the end of the pane,
+            and the number of lines to delete from the top of the pane after inserting it
+        """
+
+        text = "".join(self._pending)
+        self._pending = []
+        if self._spillFile is not None:
+            self._spillFile.flush()
+
+        lines = text.split("\n")
+        if len(lines) > self.maxLines + 1:
+            text = "\n".join(lines[-(self.maxLines + 1) :])
+
+        self.lineCount += text.count("\n")
+        trim = max(0, self.lineCount - self.maxLines)
+        self.lineCount -= trim
+        return text, trim
+
+    def clear(self) -> None:
+        """
+        Forget the content of the pane
+        """
+        self.lineCount = 0
+        self._pending = []
+
+    def close(self) -> None:
+        """
+        Close the spill log
+        """
+        if self._spillFile is not None:
+            self._spillFile.close()
+            self._spillFile = None
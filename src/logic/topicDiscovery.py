@@ -0,0 +1,354 @@
+"""
+Discovery of the topics of the ROS graph with their type, publisher count and the QoS of their
+publishers. With rclpy, the graph is read from a discovery node kept for the life of the
+process. Otherwise a single ros2 topic list -v gives the types and publisher counts, the QoS is
+then unknown.
+The result is cached until the graph changes, and gives the QoS overrides of the recorder: a
+subscription that does not match the QoS of the publishers receives nothing, e.g. a reliable
+subscription of a best effort sensor stream.
+"""
+
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+import os
+import re
+import time
+import shlex
+import threading
+import functools
+import subprocess
+
+from .profiler import PROFILER
+from ..constants import Constants
+
+QOS_OVERRIDES_OPTION = "--qos-profile-overrides-path"
+SUBSCRIPTION_DEPTH = 10
+# the options of the recorder that take no value
+RECORDER_FLAGS = {"-a", "--all"}
+
+_VERBOSE_TOPIC_LINE = re.compile(r"^ \* (?P<name>\S+) \[(?P<type>[^\]]*)\] (?P<count>\d+) ")
+# a policy of a profile of the offered_qos_profiles YAML of a rosbag2 topic
+_OFFERED_QOS_LINE = re.compile(
+    r"^(?:- |  )(?P<key>history|depth|reliability|durability): *(?P<value>\S+)"
+)
+# the numbered policies of the bags written before the policies were named
+_POLICY_NAMES = {
+    "history": {"1": "keep_last", "2": "keep_all"},
+    "reliability": {"1": "reliable", "2": "best_effort"},
+    "durability": {"1": "transient_local", "2": "volatile"},
+}
+_DEFAULT_POLICIES = {"history": "keep_last", "reliability": "reliable", "durability": "volatile"}
+
+
+class TopicQos(NamedTuple):
+    """
+    QoS profile of a publisher, the policies are named as in a QoS overrides file
+    """
+
+    reliability: str
+    durability: str
+    history: str
+    depth: int
+
+
+class TopicInfo(NamedTuple):
+    """
+    A topic of the graph, publisherQos is empty if the QoS is unknown
+    """
+
+    name: str
+    type: str
+    publisherCount: int
+    publisherQos: Tuple[TopicQos, ...]
+
+
+class TopicDiscovery:  # pylint: disable=R0903
+    """
+    Graph queries, the last result is kept for the recorder. With rclpy, the QoS of the
+    publishers is only queried again once the topics, types or publisher counts changed.
+    """
+
+    def __init__(self) -> None:
+        self.topics: Optional[List[TopicInfo]] = None
+
+        self._lock = threading.Lock()
+        self._signature: Tuple[Tuple[str, str, int], ...] = ()
+        self._node: Any = None
+        self._context: Any = None
+
+    def discover(self) -> List[TopicInfo]:
+        """
+        Query the graph, blocks on the first query while the discovery node joins the graph
+
+        raises
+        ------
+        ConnectionError
+            If ros2 topic list reports an error
+        """
+
+        with self._lock:
+            try:
+                node = self._discoveryNode()
+            except ImportError:
+                self.topics = _listVerboseTopics()
+                return self.topics
+
+            signature = tuple(
+                sorted(
+                    (name, types[0] if types else "", node.count_publishers(name))
+                    for name, types in node.get_topic_names_and_types()
+                )
+            )
+            if self.topics is None or signature != self._signature:
+                with PROFILER.span("topic qos query"):
+                    self.topics = [
+                        TopicInfo(name, topicType, count, publisherQos(node, name))
+                        for name, topicType, count in signature
+                    ]
+                self._signature = signature
+            return self.topics
+
+    def measureBandwidth(self, topics: List[str], window: float) -> Dict[str, float]:
+        """
+        Bandwidth of the topics in bytes per second, the serialized messages are received by
+        the discovery node during window seconds, with the QoS of their publishers
+
+        raises
+        ------
+        ImportError
+            If rclpy is not available
+        """
+
+        # pylint: disable=C0415
+        from rclpy.executors import SingleThreadedExecutor
+
+        with self._lock:
+            self._discoveryNode()
+        infos = {topic.name: topic for topic in self.discover()}
+
+        received = dict.fromkeys(topics, 0)
+
+        def onMessage(name: str, data: bytes) -> None:
+            received[name] += len(data)
+
+        with self._lock:
+            node = self._discoveryNode()
+            subscriptions = []
+            for name in topics:
+                info = infos.get(name)
+                if info is None or not info.type:
+                    continue
+                qos = qosOverride(info)
+                subscriptions.append(
+                    node.create_subscription(
+                        messageClass(info.type),
+                        name,
+                        functools.partial(onMessage, name),
+                        SUBSCRIPTION_DEPTH if qos is None else qosProfile(qos),
+                        raw=True,
+                    )
+                )
+
+            executor = SingleThreadedExecutor(context=self._context)
+            executor.add_node(node)
+            try:
+                deadline = time.monotonic() + window
+                while time.monotonic() < deadline:
+                    executor.spin_once(timeout_sec=max(deadline - time.monotonic(), 0.0))
+            finally:
+                executor.shutdown()
+                for subscription in subscriptions:
+                    node.destroy_subscription(subscription)
+
+        return {name: size / window for name, size in received.items()}
+
+    def _discoveryNode(self) -> Any:
+        if self._node is None:
+            # pylint: disable=C0415
+            import rclpy
+
+            self._context = rclpy.Context()
+            rclpy.init(context=self._context)
+            self._node = rclpy.create_node("rosbag_client_discovery", context=self._context)
+            time.sleep(Constants.DISCOVERY_WAIT_S)
+        return self._node
+
+
+def publisherQos(node: Any, name: str) -> Tuple[TopicQos, ...]:
+    """
+    QoS of the publishers of a topic, queried with an rclpy node
+    """
+
+    return tuple(
+        TopicQos(
+            info.qos_profile.reliability.name.lower(),
+            info.qos_profile.durability.name.lower(),
+            info.qos_profile.history.name.lower(),
+            info.qos_profile.depth,
+        )
+        for info in node.get_publishers_info_by_topic(name)
+    )
+
+
+def _listVerboseTopics() -> List[TopicInfo]:
+    """
+    Topics of ros2 topic list -v, the published topics and then the topics that are only
+    subscribed to
+    """
+
+    command = shlex.split("ros2 topic list -v")
+    with PROFILER.span("subprocess ros2 topic list"):
+        proc = subprocess.Popen(  # pylint: disable=R1732
+            command, stderr=subprocess.PIPE, stdout=subprocess.PIPE
+        )
+        out, err = proc.communicate()
+
+    if err:
+        raise ConnectionError(err.decode("utf-8"))
+
+    topics: Dict[str, TopicInfo] = {}
+    isPublished = True
+    for line in out.decode("utf-8").splitlines():
+        if line.startswith("Subscribed topics"):
+            isPublished = False
+        match = _VERBOSE_TOPIC_LINE.match(line)
+        if match and match["name"] not in topics:
+            count = int(match["count"]) if isPublished else 0
+            topics[match["name"]] = TopicInfo(match["name"], match["type"], count, ())
+    return list(topics.values())
+
+
+def parseOfferedQos(text: str) -> Tuple[TopicQos, ...]:
+    """
+    The QoS profiles of the offered_qos_profiles YAML of a rosbag2 topic, the system default
+    policies are given as the default ROS 2 policies
+    """
+
+    profiles: List[Dict[str, str]] = []
+    for line in text.splitlines():
+        if line.startswith("- "):
+            profiles.append({})
+        match = _OFFERED_QOS_LINE.match(line)
+        if match and profiles:
+            profiles[-1][match["key"]] = match["value"].strip("'\"").lower()
+
+    def policy(profile: Dict[str, str], key: str) -> str:
+        value = profile.get(key, "")
+        value = _POLICY_NAMES[key].get(value, value)
+        return value if value in _POLICY_NAMES[key].values() else _DEFAULT_POLICIES[key]
+
+    return tuple(
+        TopicQos(
+            policy(profile, "reliability"),
+            policy(profile, "durability"),
+            policy(profile, "history"),
+            int(profile["depth"]) if profile.get("depth", "").isdigit() else 0,
+        )
+        for profile in profiles
+    )
+
+
+def qosOverride(topic: TopicInfo) -> Optional[TopicQos]:
+    """
+    QoS the recorder must subscribe with to receive every publisher of the topic, None if the
+    default reliable and volatile subscription does
+    A best effort publisher needs a best effort subscription, and the messages kept by
+    transient local publishers are only received by a transient local subscription.
+    """
+
+    if not topic.publisherQos:
+        return None
+
+    isBestEffort = any(qos.reliability == "best_effort" for qos in topic.publisherQos)
+    isTransientLocal = all(qos.durability == "transient_local" for qos in topic.publisherQos)
+    if not isBestEffort and not isTransientLocal:
+        return None
+
+    return TopicQos(
+        "best_effort" if isBestEffort else "reliable",
+        "transient_local" if isTransientLocal else "volatile",
+        "keep_last",
+        max([Constants.QOS_OVERRIDE_DEPTH] + [qos.depth for qos in topic.publisherQos]),
+    )
+
+
+def qosProfile(qos: TopicQos) -> Any:
+    """
+    The rclpy QoS profile of a TopicQos, needs rclpy
+    """
+
+    # pylint: disable=C0415
+    from rclpy.qos import DurabilityPolicy, HistoryPolicy, QoSProfile, ReliabilityPolicy
+
+    return QoSProfile(
+        reliability=ReliabilityPolicy[qos.reliability.upper()],
+        durability=DurabilityPolicy[qos.durability.upper()],
+        history=HistoryPolicy[qos.history.upper()],
+        depth=qos.depth,
+    )
+
+
+def recordedTopics(args: List[str], topics: Iterable[TopicInfo]) -> List[TopicInfo]:
+    """
+    The topics a recorder records, from the topics listed in its arguments or from its -a, -e
+    and -x options
+    """
+
+    listed = set()
+    include: Optional[str] = None
+    exclude: Optional[str] = None
+    index = args.index("record") + 1 if "record" in args else 0
+    while index < len(args):
+        arg = args[index]
+        if arg in RECORDER_FLAGS:
+            include = include or ""
+        elif arg in ("-e", "--regex"):
+            include = args[index + 1]
+        elif arg in ("-x", "--exclude"):
+            exclude = args[index + 1]
+        elif not arg.startswith("-"):
+            listed.add(arg)
+        if arg.startswith("-") and arg not in RECORDER_FLAGS:
+            index += 1
+        index += 1
+
+    return [
+        topic
+        for topic in topics
+        if topic.name in listed
+        or (
+            include is not None
+            and re.search(include, topic.name)
+            and not (exclude and re.search(exclude, topic.name))
+        )
+    ]
+
+
+def writeQosOverrides(path: str, overrides: Dict[str, TopicQos]) -> None:
+    """
+    Write a QoS overrides file of ros2 bag record
+    """
+
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w", encoding="utf-8") as file:
+        for name, qos in sorted(overrides.items()):
+            file.write(
+                f"{name}:\n"
+                f"  reliability: {qos.reliability}\n"
+                f"  durability: {qos.durability}\n"
+                f"  history: {qos.history}\n"
+                f"  depth: {qos.depth}\n"
+            )
+
+
+@functools.lru_cache(maxsize=None)
+def messageClass(typeName: str) -> Any:
+    """
+    Message class of a type, e.g. sensor_msgs/msg/PointCloud2. The type support is imported
+    once per type.
+    """
+
+    # pylint: disable=C0415
+    from rosidl_runtime_py.utilities import get_message
+
+    return get_message(typeName)
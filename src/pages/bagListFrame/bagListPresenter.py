@@ -2,15 +2,55 @@
 Bag List Presenter
 """
 from __future__ import annotations
-from typing import Dict, Any, Protocol, Optional
+from typing import (
+    TYPE_CHECKING,
+    AbstractSet,
+    Dict,
+    Any,
+    Protocol,
+    Optional,
+    Callable,
+    List,
+    Set,
+    Tuple,
+)
 
 import os
-import tkinter as tk
+import queue
+import functools
 from ...constants import Constants
 from ...logic.fileSystemInterface import FileSystemInterface
+from ...logic.backgroundTask import runBlocking, runCoroutine, runInBackground
+from ...logic.bagPreview import PreviewService
+from ...logic.bagReader import BagFormatError, openBag
+from ...logic.bagReplay import BagReplay, RosPublisher, createPublisher
+from ...logic.bagMetadata import loadBagMetadata
+from ...logic.bagSearch import BagSearchIndex
+from ...logic.bagTimeIndex import parseTime
+from ...logic.bagTrash import TrashReaper
+from ...logic.bagTransfer import BagTransfer, parseRate
+from ...logic.bulkOperations import (
+    BULK_ACTIONS,
+    REMOTE_ACTIONS,
+    REMOVING_ACTIONS,
+    BulkOperation,
+    BulkResult,
+)
+from ...logic.recorderBackend import CatalogWatcher, LocalBackend, RecorderBackend
+from ...logic.remoteBackend import RemoteBackend
+from ...logic.profiler import PROFILER, traced
 
+if TYPE_CHECKING:
+    import tkinter as tk
 
-class BagListView(Protocol):  # pylint: disable=R0903
+CHANGES_POLL_PERIOD_MS = 250
+TRANSFER_POLL_PERIOD_MS = 500
+PREVIEW_POLL_PERIOD_MS = 100
+BULK_POLL_PERIOD_MS = 250
+REPLAY_POLL_PERIOD_MS = 1000
+
+
+class BagListView(Protocol):
     """
     View Protocol
     """
@@ -26,42 +66,559 @@ class BagListView(Protocol):  # pylint: disable=R0903
     def addBags(self, bagsDescription: Dict[str, Any]) -> None:
         ...
 
+    def removeBags(self, names: List[str]) -> None:
+        ...
+
+    def sortBags(self, names: List[str]) -> None:
+        ...
+
+    def filterBags(self, names: AbstractSet[str]) -> None:
+        ...
+
+    def setTransferStatus(self, text: str) -> None:
+        ...
+
+    def setPreview(self, name: str, text: str, thumbnail: str) -> None:
+        ...
+
+    def setBulkStatus(self, text: str) -> None:
+        ...
+
+    def after(self, time: int, func: Callable[..., None]) -> None:
+        ...
+
 
 class BagListPresenter:
     """
     Bag List Presenter
     """
 
-    # pylint: disable=W0613
+    # pylint: disable=W0613,R0902
 
-    def __init__(self, view: BagListView, model: FileSystemInterface) -> None:
+    def __init__(
+        self,
+        view: BagListView,
+        model: FileSystemInterface,
+        backend: Optional[RecorderBackend] = None,
+    ) -> None:
         self.view = view
         self.model = model
+        self.backend = backend or LocalBackend()
+
+        self.watcher: Optional[CatalogWatcher] = None
+        # a refresh is ignored while the previous one is still syncing the catalog
+        self.refreshPending = False
+        self._changes: queue.Queue[Tuple[Dict[str, Any], List[str]]] = queue.Queue()
+
+        self.transfers: Dict[str, BagTransfer] = {}
+        self.localCatalog: Optional[FileSystemInterface] = None
+        self._isPollingTransfers = False
+
+        # previews are computed from the local bags only
+        self.previews = None if isinstance(self.backend, RemoteBackend) else PreviewService()
+        self._isPollingPreviews = False
+
+        self.searchIndex = BagSearchIndex()
+        self.query = ""
+        self.sortColumn = "date"
+        self.sortDescending = False
+
+        self.bulkOperation: Optional[BulkOperation] = None
+        self.bulkResult: Optional[BulkResult] = None
+        # bags being moved out of the bags directory, the watcher leaves them to the operation
+        self._busyNames: Set[str] = set()
+
+        # the last deleted bags, in the trash until the reaper purges them
+        self.lastDeleted: List[str] = []
+        self.reaper: Optional[TrashReaper] = None
+
+        self.replay: Optional[BagReplay] = None
+        self.replayName = ""
+        self._replayPublisher: Optional[RosPublisher] = None
+
+    @property
+    def canDownload(self) -> bool:
+        """
+        True if the bags are on a recorder agent and can be downloaded
+        """
+        return isinstance(self.backend, RemoteBackend)
+
+    @property
+    def canPreview(self) -> bool:
+        """
+        True if the bags are local and their previews can be computed
+        """
+        return self.previews is not None
+
+    @property
+    def canUndo(self) -> bool:
+        """
+        True if the deleted bags are in a local trash and can be restored
+        """
+        return not isinstance(self.backend, RemoteBackend)
+
+    @property
+    def bulkActions(self) -> Tuple[str, ...]:
+        """
+        The actions that can be applied to a selection of bags
+        """
+        return REMOTE_ACTIONS if isinstance(self.backend, RemoteBackend) else BULK_ACTIONS
 
+    @traced
     def handlePlayBag(self, name: str, event: Optional[tk.EventType] = None) -> None:
         """
-        handle start record the ros bag
+        handle replay the ros bag
+        A rosbag2 bag is replayed by the replay engine when rclpy is available, a replay in
+        progress is stopped first. Other bags are played by rosbag play in a terminal.
         """
-        os.system(
-            f"gnome-terminal -e 'bash -c \
-              \"rosbag play {os.path.join(Constants.BAG_DIR_PATH, name)}; exec bash\"'"
+
+        runCoroutine(
+            self.view,
+            self._startReplay(name, *self._detachReplay()),
+            lambda created: self._onReplayCreated(name, *created),
+            lambda err: self._onReplayError(name, err),
         )
 
+    async def _startReplay(
+        self, name: str, replay: Optional[BagReplay], publisher: Optional[RosPublisher]
+    ) -> Tuple[BagReplay, RosPublisher]:
+        await self._closeReplay(replay, publisher)
+        return await runBlocking(self._createReplay, name)
+
+    def _createReplay(self, name: str) -> Tuple[BagReplay, RosPublisher]:
+        """
+        Open the bag and the publishers of its topics, in the background
+        """
+
+        bag = openBag(os.path.join(Constants.BAG_DIR_PATH, name))
+        topics = list(bag.index().topics)
+        publisher = createPublisher(bag, topics)
+        return BagReplay(bag, topics, publisher.publish, Constants.REPLAY_RATE), publisher
+
+    def _onReplayCreated(self, name: str, replay: BagReplay, publisher: RosPublisher) -> None:
+        # a replay started meanwhile
+        self._stopReplay()
+        self.replay = replay
+        self.replayName = name
+        self._replayPublisher = publisher
+        replay.start()
+        self.view.setBulkStatus(f"Replaying {name} at {replay.rate:g}x")
+        self.view.after(REPLAY_POLL_PERIOD_MS, self._pushReplayStats)
+
+    def _onReplayError(self, name: str, err: BaseException) -> None:
+        if not isinstance(err, (ImportError, BagFormatError, OSError)):
+            raise err
+        runCoroutine(self.view, runBlocking(self._playInTerminal, name), lambda _: None)
+
+    def _pushReplayStats(self) -> None:
+        if self.replay is None:
+            return
+
+        stats = self.replay.stats
+        if self.replay.isAlive:
+            self.view.setBulkStatus(f"Replaying {self.replayName}: {stats.describe()}")
+            self.view.after(REPLAY_POLL_PERIOD_MS, self._pushReplayStats)
+            return
+
+        status = f"Replayed {self.replayName}: {stats.describe()}"
+        if self.replay.error is not None:
+            status += f", stopped: {self.replay.error}"
+        elif stats.late:
+            status += f", too slow for {self.replay.rate:g}x"
+        self.view.setBulkStatus(status)
+        self._stopReplay()
+
+    def _stopReplay(self) -> None:
+        """
+        Stop the replay in the background, stopping waits for its threads
+        """
+
+        replay, publisher = self._detachReplay()
+        if replay is not None or publisher is not None:
+            runCoroutine(self.view, self._closeReplay(replay, publisher), lambda _: None)
+
+    def _detachReplay(self) -> Tuple[Optional[BagReplay], Optional[RosPublisher]]:
+        replay, publisher = self.replay, self._replayPublisher
+        self.replay = None
+        self._replayPublisher = None
+        return replay, publisher
+
+    @staticmethod
+    async def _closeReplay(replay: Optional[BagReplay], publisher: Optional[RosPublisher]) -> None:
+        if replay is not None:
+            await runBlocking(replay.stop)
+        if publisher is not None:
+            await runBlocking(publisher.close)
+
+    def _playInTerminal(self, name: str) -> None:
+        with PROFILER.span("subprocess rosbag play"):
+            os.system(
+                f"gnome-terminal -e 'bash -c \
+                  \"rosbag play {os.path.join(Constants.BAG_DIR_PATH, name)}; exec bash\"'"
+            )
+
+    @traced
     def handleDeleteBag(self, name: str, event: Optional[tk.EventType] = None) -> None:
         """
         handle delete the ros bag
+        The bag is moved to the trash in the background, deleting a bag of a recorder agent is
+        a request, the reaper frees its space later
         """
-        self.model.removeBag(name)
-        self.handleRefreshBags()
 
+        runCoroutine(
+            self.view,
+            runBlocking(self.model.removeBag, name),
+            lambda _: self._onBagDeleted(name),
+            functools.partial(self._onDeleteFailed, name),
+        )
+
+    def _onBagDeleted(self, name: str) -> None:
+        self.searchIndex.remove(name)
+        self.view.removeBags([name])
+        if self.canUndo:
+            self._onDeleted([name])
+            self.view.setBulkStatus(f"Deleted {name}, Undo restores it")
+
+    def _onDeleteFailed(self, name: str, err: BaseException) -> None:
+        if not isinstance(err, OSError):
+            raise err
+        self.view.setBulkStatus(f"Could not delete {name}: {err}")
+
+    def _onDeleted(self, names: List[str]) -> None:
+        self.lastDeleted = names
+        if self.reaper is not None:
+            self.reaper.wake()
+
+    @traced
+    def handleUndoDelete(self, event: Optional[tk.EventType] = None) -> None:
+        """
+        handle restore the last deleted bags
+        """
+        self.handleRestoreBags(self.lastDeleted)
+
+    @traced
+    def handleRestoreBags(self, names: List[str]) -> None:
+        """
+        handle move deleted bags back from the trash to the bags directory
+        The bags are added back to the catalog with their descriptions in the background
+        """
+
+        if not names:
+            return
+        if not self.canUndo:
+            self.view.setBulkStatus("Cannot restore the bags of a recorder agent")
+            return
+
+        runInBackground(
+            self.view, lambda: self._restoreBags(names), self._onBagsRestored, self._onBulkFailed
+        )
+
+    def _restoreBags(self, names: List[str]) -> BulkResult:
+        restored, errors = self.model.restoreBags(names)
+        metadata = loadBagMetadata(restored, complete=False)
+        for name, entry in restored.items():
+            self.searchIndex.add(name, entry, metadata.get(name))
+        return BulkResult("restore", list(restored), errors)
+
+    def _onBagsRestored(self, result: BulkResult) -> None:
+        self.bulkResult = result
+        self.lastDeleted = [name for name in self.lastDeleted if name not in result.names]
+
+        with self.model.lock:
+            self.view.addBags({name: self.model.bagDescription[name] for name in result.names})
+        self.view.sortBags(self.searchIndex.order(self.sortColumn, self.sortDescending))
+        self.view.filterBags(self._searchBags(self.query))
+        self.view.setBulkStatus(result.describe())
+
+    @traced
+    def handleBulkAction(
+        self,
+        action: str,
+        names: List[str],
+        destination: str = "",
+        tableFormat: str = Constants.EXPORT_FORMAT,
+        topics: Optional[List[str]] = None,
+        timeRange: Optional[Tuple[int, int]] = None,
+    ) -> None:
+        """
+        handle delete, move, compress, export or convert to tables the selected bags
+        The bags are processed in the background, the catalog and the bag list are updated once
+        all of them are done. One bulk operation runs at a time.
+        """
+
+        if not names:
+            return
+        if self.bulkOperation is not None:
+            self.view.setBulkStatus("Wait for the running operation to finish")
+            return
+        if action not in self.bulkActions:
+            self.view.setBulkStatus(f"Cannot {action} the bags of a recorder agent")
+            return
+
+        try:
+            operation = BulkOperation(
+                self.model,
+                action,
+                names,
+                destination,
+                tableFormat=tableFormat,
+                topics=topics,
+                timeRange=timeRange,
+            )
+        except ValueError as err:
+            self.view.setBulkStatus(str(err))
+            return
+
+        self.bulkOperation = operation
+        self.bulkResult = None
+        if action in REMOVING_ACTIONS:
+            self._busyNames = set(operation.names)
+        runInBackground(self.view, operation.run, self._onBulkDone, self._onBulkFailed)
+        self.view.after(BULK_POLL_PERIOD_MS, self._pushBulkProgress)
+
+    def _pushBulkProgress(self) -> None:
+        if self.bulkOperation is None:
+            return
+        self.view.setBulkStatus(self.bulkOperation.progress.describe())
+        self.view.after(BULK_POLL_PERIOD_MS, self._pushBulkProgress)
+
+    def _onBulkDone(self, result: BulkResult) -> None:
+        self.bulkOperation = None
+        self.bulkResult = result
+        self._busyNames = set()
+
+        if result.action in REMOVING_ACTIONS:
+            for name in result.names:
+                self.searchIndex.remove(name)
+            self.view.removeBags(result.names)
+
+        status = result.describe()
+        if result.action == "delete" and result.names and self.canUndo:
+            self._onDeleted(result.names)
+            status += ", Undo restores them"
+        self.view.setBulkStatus(status)
+
+    def _onBulkFailed(self, error: BaseException) -> None:
+        self.bulkOperation = None
+        self._busyNames = set()
+        self.view.setBulkStatus(f"Failed: {error}")
+
+    @traced
+    def handleDownloadBag(self, name: str, event: Optional[tk.EventType] = None) -> None:
+        """
+        handle download a bag of the recorder agent into the local bags directory
+        A running download is cancelled instead, downloading it again resumes it. The local
+        catalog is loaded in the background before the first download.
+        """
+
+        if not isinstance(self.backend, RemoteBackend):
+            return
+
+        transfer = self.transfers.get(name)
+        if transfer is not None and not transfer.isFinished:
+            transfer.cancel()
+            return
+
+        if self.localCatalog is None:
+            runCoroutine(
+                self.view,
+                runBlocking(FileSystemInterface),
+                lambda catalog: self._onLocalCatalogLoaded(name, catalog),
+            )
+            return
+        self._startDownload(name, self.backend, self.localCatalog)
+
+    def _onLocalCatalogLoaded(self, name: str, catalog: FileSystemInterface) -> None:
+        # the catalog of an earlier download may have been loaded meanwhile
+        if self.localCatalog is None:
+            self.localCatalog = catalog
+
+        transfer = self.transfers.get(name)
+        if isinstance(self.backend, RemoteBackend) and (transfer is None or transfer.isFinished):
+            self._startDownload(name, self.backend, self.localCatalog)
+
+    def _startDownload(
+        self, name: str, backend: RemoteBackend, localCatalog: FileSystemInterface
+    ) -> None:
+        transfer = BagTransfer(
+            backend.client,
+            name,
+            localCatalog,
+            bandwidthLimit=parseRate(Constants.TRANSFER_LIMIT),
+        )
+        transfer.start()
+        self.transfers[name] = transfer
+
+        if not self._isPollingTransfers:
+            self._isPollingTransfers = True
+            self.view.after(TRANSFER_POLL_PERIOD_MS, self._pushTransferProgress)
+
+    def _pushTransferProgress(self) -> None:
+        self.view.setTransferStatus(
+            "\n".join(transfer.progress.describe() for transfer in self.transfers.values())
+        )
+
+        if all(transfer.isFinished for transfer in self.transfers.values()):
+            self._isPollingTransfers = False
+            return
+        self.view.after(TRANSFER_POLL_PERIOD_MS, self._pushTransferProgress)
+
+    def handleRowsVisible(self, names: List[str]) -> None:
+        """
+        handle rows of the bag list scrolled into view
+        Their previews are computed by the worker processes, or read from the preview cache
+        """
+
+        if self.previews is None:
+            return
+
+        for name in names:
+            self.previews.request(name, os.path.join(Constants.BAG_DIR_PATH, name))
+
+        if self.previews.pending and not self._isPollingPreviews:
+            self._isPollingPreviews = True
+            self.view.after(PREVIEW_POLL_PERIOD_MS, self._pushPreviews)
+
+    def _pushPreviews(self) -> None:
+        if self.previews is None:
+            return
+
+        for name, preview, error in self.previews.drain():
+            if preview is None:
+                self.view.setPreview(name, f"No preview: {error}", "")
+            else:
+                self.view.setPreview(name, preview.sparklines(), preview.thumbnail)
+
+        if not self.previews.pending:
+            self._isPollingPreviews = False
+            return
+        self.view.after(PREVIEW_POLL_PERIOD_MS, self._pushPreviews)
+
+    @traced
+    def handleSearch(self, query: str) -> None:
+        """
+        handle the search text changed, only the bags matching every word are shown, or with
+        @ and a time, e.g. @2026-10-19 14:03, the bags recorded at that time
+        """
+
+        self.query = query
+        self.view.filterBags(self._searchBags(query))
+
+    def _searchBags(self, query: str) -> AbstractSet[str]:
+        if not query.startswith("@"):
+            return self.searchIndex.search(query)
+        try:
+            time = parseTime(query[1:])
+        except ValueError:
+            return frozenset()
+        return frozenset(span.name for span in self.model.timeIndex.covering(time))
+
+    @traced
+    def handleSort(self, column: str, descending: bool = False) -> None:
+        """
+        handle sort the bag list by name, date, size, duration or number of topics
+        """
+
+        self.sortColumn = column
+        self.sortDescending = descending
+        self.view.sortBags(self.searchIndex.order(column, descending))
+
+    @traced
     def handleRefreshBags(self, event: Optional[tk.EventType] = None) -> None:
         """
         handle refresh the ros bags
+        The catalog is synced with the bags directory in the background, a refresh requested
+        while one is in flight is ignored
         """
 
-        self.model.loadDescriptionJson()
+        if self.refreshPending:
+            return
+
+        self.refreshPending = True
+        runCoroutine(self.view, self._loadBags(), self._onBagsLoaded, self._onLoadBagsError)
+
+    async def _loadBags(self) -> Dict[str, Any]:
+        await runBlocking(self.model.loadDescriptionJson)
+        with self.model.lock:
+            bagsDescription = dict(self.model.bagDescription)
+        # the sizes, durations and topics are read from the local bags only
+        metadata = (
+            {} if self.previews is None else await runBlocking(loadBagMetadata, bagsDescription)
+        )
+        await runBlocking(self.searchIndex.build, bagsDescription, metadata)
+        # the metadata cache is up to date, the time index reads it without opening the bags
+        await runBlocking(self.model.timeIndex.refresh)
+        return bagsDescription
+
+    def _onBagsLoaded(self, bagsDescription: Dict[str, Any]) -> None:
+        self.refreshPending = False
+        order = self.searchIndex.order(self.sortColumn, self.sortDescending)
         self.view.clearBagList()
-        self.view.addBags(self.model.bagDescription)
+        self.view.addBags({name: bagsDescription[name] for name in order})
+        if self.query:
+            self.view.filterBags(self._searchBags(self.query))
+
+    def _onLoadBagsError(self, err: BaseException) -> None:
+        self.refreshPending = False
+        raise err
+
+    def watchBagDirectory(self) -> None:
+        """
+        Keep the bag list live, bags created or deleted by other tools are applied to the
+        catalog in the background and pushed to the view without rescanning the directory
+        """
+
+        self.watcher = self.backend.watchCatalog(self._onDirectoryChanged)
+        self.watcher.start()
+        self.view.after(CHANGES_POLL_PERIOD_MS, self._pushChanges)
+
+        # the agent reaps its own trash
+        if self.canUndo:
+            self.reaper = TrashReaper(self.model.trash)
+            self.reaper.start()
+
+    def stopWatching(self) -> None:
+        """
+        Stop the watcher and the reaper threads, e.g. when the window is closed
+        """
+
+        if self.watcher is not None:
+            self.watcher.stop()
+            self.watcher = None
+        if self.reaper is not None:
+            self.reaper.stop()
+            self.reaper = None
+
+    def _onDirectoryChanged(self, names: Set[str]) -> None:
+        """
+        Called from the watcher thread
+        """
+
+        added, removed = self.model.applyChanges(names - self._busyNames)
+        if not added and not removed:
+            return
+
+        for name in removed:
+            self.searchIndex.remove(name)
+        metadata = {} if self.previews is None else loadBagMetadata(added, complete=False)
+        for name, entry in added.items():
+            self.searchIndex.add(name, entry, metadata.get(name))
+        self._changes.put((added, removed))
+
+    def _pushChanges(self) -> None:
+        isChanged = False
+        while not self._changes.empty():
+            added, removed = self._changes.get_nowait()
+            self.view.removeBags(removed)
+            self.view.addBags(added)
+            isChanged = isChanged or bool(added)
+
+        if isChanged:
+            # new bags are added at the end, move them to their place in the sort order
+            self.view.sortBags(self.searchIndex.order(self.sortColumn, self.sortDescending))
+            self.view.filterBags(self._searchBags(self.query))
+
+        self.view.after(CHANGES_POLL_PERIOD_MS, self._pushChanges)
 
     def run(self) -> None:
         """
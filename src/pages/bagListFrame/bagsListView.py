@@ -2,12 +2,16 @@
 Record page
 """
 
-from typing import Dict, Any, Union, Optional, Protocol
+from typing import AbstractSet, Dict, Any, Union, Optional, Protocol, List, Tuple
 
 
 import tkinter as tk
+from tkinter import filedialog, messagebox
 import customtkinter as ctk
+from ...constants import Constants
 from ...components.scrollableLabelButtonFrame import ScrollableLabelButtonFrame
+from ...logic.bagSearch import SORT_COLUMNS
+from ...logic.profiler import traced
 
 
 class BagListPresenter(Protocol):
@@ -17,12 +21,47 @@ class BagListPresenter(Protocol):
 
     # pylint: disable=C0116
 
+    canDownload: bool
+    canPreview: bool
+    canUndo: bool
+    sortColumn: str
+    bulkActions: Tuple[str, ...]
+
     def handlePlayBag(self, name: str, event: Optional[tk.EventType] = None) -> None:
         ...
 
     def handleDeleteBag(self, name: str, event: Optional[tk.EventType] = None) -> None:
         ...
 
+    def handleDownloadBag(self, name: str, event: Optional[tk.EventType] = None) -> None:
+        ...
+
+    def handleRowsVisible(self, names: List[str]) -> None:
+        ...
+
+    def handleSearch(self, query: str) -> None:
+        ...
+
+    def handleSort(self, column: str, descending: bool = False) -> None:
+        ...
+
+    def handleBulkAction(
+        self,
+        action: str,
+        names: List[str],
+        destination: str = "",
+        tableFormat: str = Constants.EXPORT_FORMAT,
+        topics: Optional[List[str]] = None,
+    ) -> None:
+        ...
+
+    def handleUndoDelete(self, event: Optional[tk.EventType] = None) -> None:
+        ...
+
+
+VISIBLE_ROWS_POLL_PERIOD_MS = 300
+SEARCH_DELAY_MS = 150
+
 
 class BagsListFrame(ctk.CTkFrame):  # type: ignore # pylint: disable=R0901
     """
@@ -33,31 +72,217 @@ class BagsListFrame(ctk.CTkFrame):  # type: ignore # pylint: disable=R0901
         super().__init__(master, **kwargs)
 
         self.grid_columnconfigure(0, weight=1)
-        self.grid_rowconfigure(0, weight=1)
+        self.grid_rowconfigure(2, weight=1)
 
         self.widgets: Dict[str, ctk.CTkBaseClass] = {}
+        self.presenter: Optional[BagListPresenter] = None
+        self.visibleRows: Tuple[str, ...] = ()
+        self.searchJob: Optional[str] = None
 
+    @traced
     def buildGUI(self, presenter: BagListPresenter, bagDescription: Dict[str, Any]) -> None:
         """
         Build the GUI, runs all the methods that build the GUI.
         """
 
+        self._buildSearchBar(presenter)
+        self._buildActionBar(presenter)
+
         scrollableLabelButtonFrame = ScrollableLabelButtonFrame(
-            self, bagDescription, presenter.handlePlayBag, presenter.handleDeleteBag
-        )
-        scrollableLabelButtonFrame.grid(
-            row=0, column=0, padx=(10, 10), pady=(10, 10), sticky="nswe"
+            self,
+            bagDescription,
+            presenter.handlePlayBag,
+            presenter.handleDeleteBag,
+            presenter.handleDownloadBag if presenter.canDownload else None,
         )
+        scrollableLabelButtonFrame.grid(row=2, column=0, padx=(10, 10), pady=(0, 10), sticky="nswe")
         self.widgets["scrollableLabelButtonFrame"] = scrollableLabelButtonFrame
 
+        transferLabel = ctk.CTkLabel(self, text="", anchor="w", justify="left")
+        self.widgets["transferLabel"] = transferLabel
+
+        bulkLabel = ctk.CTkLabel(self, text="", anchor="w", justify="left")
+        self.widgets["bulkLabel"] = bulkLabel
+
+        self.presenter = presenter
+        if presenter.canPreview:
+            self.after(VISIBLE_ROWS_POLL_PERIOD_MS, self._pollVisibleRows)
+
+    def _buildSearchBar(self, presenter: BagListPresenter) -> None:
+        """
+        Search entry and sort order of the bag list
+        """
+
+        searchBar = ctk.CTkFrame(self, fg_color="transparent")
+        searchBar.grid(row=0, column=0, padx=(10, 10), pady=(10, 10), sticky="we")
+        searchBar.grid_columnconfigure(0, weight=1)
+        self.widgets["searchBar"] = searchBar
+
+        searchEntry = ctk.CTkEntry(searchBar, placeholder_text="Search names, descriptions, topics")
+        searchEntry.bind("<KeyRelease>", lambda event: self._scheduleSearch())
+        searchEntry.grid(row=0, column=0, padx=(0, 10), sticky="we")
+        self.widgets["searchEntry"] = searchEntry
+
+        descendingSwitch = ctk.CTkSwitch(searchBar, text="Descending", command=self._sort)
+        descendingSwitch.grid(row=0, column=2, padx=(10, 0))
+        self.widgets["descendingSwitch"] = descendingSwitch
+
+        sortButton = ctk.CTkSegmentedButton(
+            searchBar, values=list(SORT_COLUMNS), command=lambda column: self._sort()
+        )
+        sortButton.set(presenter.sortColumn)
+        sortButton.grid(row=0, column=1)
+        self.widgets["sortButton"] = sortButton
+
+    def _buildActionBar(self, presenter: BagListPresenter) -> None:
+        """
+        Select all check box and the actions applied to the checked bags
+        """
+
+        actionBar = ctk.CTkFrame(self, fg_color="transparent")
+        actionBar.grid(row=1, column=0, padx=(10, 10), pady=(0, 10), sticky="we")
+        self.widgets["actionBar"] = actionBar
+
+        selectAllCheckBox = ctk.CTkCheckBox(
+            actionBar,
+            text="Select all",
+            command=lambda: self.widgets["scrollableLabelButtonFrame"].selectAll(
+                bool(self.widgets["selectAllCheckBox"].get())
+            ),
+        )
+        selectAllCheckBox.grid(row=0, column=0, padx=(5, 10))
+        self.widgets["selectAllCheckBox"] = selectAllCheckBox
+
+        for column, action in enumerate(presenter.bulkActions, start=1):
+            actionButton = ctk.CTkButton(
+                actionBar,
+                text=action.capitalize(),
+                width=80,
+                command=lambda action=action: self._applyBulkAction(action),
+            )
+            actionButton.grid(row=0, column=column, padx=(0, 10))
+            self.widgets[f"{action}Button"] = actionButton
+
+        if presenter.canUndo:
+            undoButton = ctk.CTkButton(
+                actionBar, text="Undo", width=80, command=presenter.handleUndoDelete
+            )
+            undoButton.grid(row=0, column=len(presenter.bulkActions) + 1, padx=(0, 10))
+            self.widgets["undoButton"] = undoButton
+
+    def _applyBulkAction(self, action: str) -> None:
+        """
+        Ask for the destination, or a confirmation to delete, then apply action to the checked
+        bags
+        """
+
+        names = self.widgets["scrollableLabelButtonFrame"].selectedKeys()
+        if not names or self.presenter is None:
+            return
+
+        destination = ""
+        if action == "delete":
+            if not messagebox.askyesno("Delete bags", f"Move {len(names)} bags to the trash?"):
+                return
+        else:
+            destination = filedialog.askdirectory(title=f"{action.capitalize()} the bags to")
+            if not destination:
+                return
+
+        self.widgets["selectAllCheckBox"].deselect()
+        self.presenter.handleBulkAction(action, names, destination)
+
+    def _scheduleSearch(self) -> None:
+        """
+        Search once the typing pauses, a fast typist does not filter the list at every key
+        """
+
+        if self.searchJob is not None:
+            self.after_cancel(self.searchJob)
+        self.searchJob = self.after(SEARCH_DELAY_MS, self._search)
+
+    def _search(self) -> None:
+        self.searchJob = None
+        if self.presenter is not None:
+            self.presenter.handleSearch(self.widgets["searchEntry"].get())
+
+    def _sort(self) -> None:
+        if self.presenter is not None:
+            self.presenter.handleSort(
+                self.widgets["sortButton"].get(), bool(self.widgets["descendingSwitch"].get())
+            )
+
+    def _pollVisibleRows(self) -> None:
+        """
+        Report the rows scrolled into view, their previews are loaded lazily
+        """
+
+        if self.winfo_ismapped() and self.presenter is not None:
+            visibleRows = tuple(self.widgets["scrollableLabelButtonFrame"].visibleKeys())
+            if visibleRows != self.visibleRows:
+                self.visibleRows = visibleRows
+                self.presenter.handleRowsVisible(list(visibleRows))
+
+        self.after(VISIBLE_ROWS_POLL_PERIOD_MS, self._pollVisibleRows)
+
     def clearBagList(self) -> None:
         """
         Clear the bag list
         """
         self.widgets["scrollableLabelButtonFrame"].clear()
 
+    @traced
     def addBags(self, bagsDescription: Dict[str, Any]) -> None:
         """
         Add bags to the bag list
         """
         self.widgets["scrollableLabelButtonFrame"].addItems(bagsDescription)
+
+    def removeBags(self, names: List[str]) -> None:
+        """
+        Remove bags from the bag list
+        """
+        for name in names:
+            self.widgets["scrollableLabelButtonFrame"].removeItem(name)
+
+    def sortBags(self, names: List[str]) -> None:
+        """
+        Reorder the bag list
+        """
+        self.widgets["scrollableLabelButtonFrame"].sortItems(names)
+
+    def filterBags(self, names: AbstractSet[str]) -> None:
+        """
+        Show only the bags of names
+        """
+        self.widgets["scrollableLabelButtonFrame"].filterItems(names)
+
+    def setTransferStatus(self, text: str) -> None:
+        """
+        Show the progress of the downloads under the bag list
+        """
+
+        transferLabel = self.widgets["transferLabel"]
+        transferLabel.configure(text=text)
+        if text:
+            transferLabel.grid(row=3, column=0, padx=(10, 10), pady=(0, 10), sticky="we")
+        else:
+            transferLabel.grid_remove()
+
+    def setBulkStatus(self, text: str) -> None:
+        """
+        Show the progress of the bulk operation under the bag list
+        """
+
+        bulkLabel = self.widgets["bulkLabel"]
+        bulkLabel.configure(text=text)
+        if text:
+            bulkLabel.grid(row=4, column=0, padx=(10, 10), pady=(0, 10), sticky="we")
+        else:
+            bulkLabel.grid_remove()
+
+    def setPreview(self, name: str, text: str, thumbnail: str) -> None:
+        """
+        Show the preview of a bag under its row
+        """
+        self.widgets["scrollableLabelButtonFrame"].setPreview(name, text, thumbnail)
@@ -0,0 +1,75 @@
+"""
+Profiler Presenter
+"""
+from __future__ import annotations
+from typing import TYPE_CHECKING, Callable, Dict, Optional, Protocol
+
+from ...constants import Constants
+from ...logic.profiler import Profiler, LatencyStats
+
+if TYPE_CHECKING:
+    import tkinter as tk
+
+REFRESH_PERIOD_MS = 1000
+
+
+class ProfilerView(Protocol):
+    """
+    View Protocol
+    """
+
+    # pylint: disable=C0116
+
+    def buildGUI(self, presenter: ProfilerPresenter) -> None:
+        ...
+
+    def after(self, time: int, func: Callable[..., None]) -> None:
+        ...
+
+    def winfo_ismapped(self) -> bool:  # pylint: disable=C0103
+        ...
+
+    def updateLatencyTable(self, stats: Dict[str, LatencyStats]) -> None:
+        ...
+
+    def updateStatus(self, status: str) -> None:
+        ...
+
+
+class ProfilerPresenter:
+    """
+    Profiler Presenter
+    """
+
+    # pylint: disable=W0613
+
+    def __init__(self, view: ProfilerView, model: Profiler) -> None:
+        self.view = view
+        self.model = model
+
+    def handleRefreshStats(self, event: Optional[tk.EventType] = None) -> None:
+        """
+        Update the latency table with the spans currently in the ring buffer
+        """
+        self.view.updateLatencyTable(self.model.latencyStats())
+
+    def handleExportTrace(self, event: Optional[tk.EventType] = None) -> None:
+        """
+        Export the spans as a Chrome trace
+        """
+        self.model.exportChromeTrace(Constants.TRACE_PATH)
+        self.view.updateStatus(f"{len(self.model.spans)} spans exported to {Constants.TRACE_PATH}")
+
+    def _refreshPeriodically(self) -> None:
+        if self.view.winfo_ismapped():
+            self.handleRefreshStats()
+        self.view.after(REFRESH_PERIOD_MS, self._refreshPeriodically)
+
+    def run(self) -> None:
+        """
+        Run the GUI.
+        """
+
+        self.view.buildGUI(self)
+        self.handleRefreshStats()
+        self.view.after(REFRESH_PERIOD_MS, self._refreshPeriodically)
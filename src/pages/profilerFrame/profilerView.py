@@ -0,0 +1,87 @@
+"""
+Profiler page
+"""
+
+from typing import Dict, Any, Union, Optional, Protocol
+
+import tkinter as tk
+import customtkinter as ctk
+
+from ...logic.profiler import LatencyStats
+
+
+class ProfilerPresenter(Protocol):
+    """
+    Profiler Presenter protocol
+    """
+
+    # pylint: disable=C0116
+
+    def handleRefreshStats(self, event: Optional[tk.EventType] = None) -> None:
+        ...
+
+    def handleExportTrace(self, event: Optional[tk.EventType] = None) -> None:
+        ...
+
+
+class ProfilerView(ctk.CTkFrame):  # type: ignore # pylint: disable=R0901
+    """
+    Profiler frame
+    """
+
+    def __init__(self, master: Union[ctk.CTk, ctk.CTkFrame], **kwargs: Optional[Any]) -> None:
+        super().__init__(master, **kwargs)
+
+        self.grid_columnconfigure(0, weight=1)
+        self.grid_rowconfigure(1, weight=1)
+
+        self.widgets: Dict[str, ctk.CTkBaseClass] = {}
+
+    def buildGUI(self, presenter: ProfilerPresenter) -> None:
+        """
+        Build the GUI, runs all the methods that build the GUI.
+        """
+
+        statusLabel = ctk.CTkLabel(self, text="Handler latency", anchor="w")
+        statusLabel.grid(row=0, column=0, padx=(10, 10), pady=(10, 10), sticky="we")
+        self.widgets["statusLabel"] = statusLabel
+
+        refreshButton = ctk.CTkButton(self, text="Refresh", command=presenter.handleRefreshStats)
+        refreshButton.grid(row=0, column=1, padx=(10, 10), pady=(10, 10))
+
+        exportButton = ctk.CTkButton(self, text="Export Trace", command=presenter.handleExportTrace)
+        exportButton.grid(row=0, column=2, padx=(10, 10), pady=(10, 10))
+
+        latencyTextbox = ctk.CTkTextbox(self, font=ctk.CTkFont(family="Courier"))
+        latencyTextbox.grid(
+            row=1, column=0, columnspan=3, padx=(10, 10), pady=(10, 10), sticky="nsew"
+        )
+        latencyTextbox.configure(state="disabled")
+        self.widgets["latencyTextbox"] = latencyTextbox
+
+    def updateLatencyTable(self, stats: Dict[str, LatencyStats]) -> None:
+        """
+        Replace the latency table with the given statistics, slowest p99 first
+
+        parameters
+        ----------
+        stats: Dict[str, LatencyStats]
+            The statistics of each span name
+        """
+
+        lines = [f"{'span':<60}{'calls':>8}{'p50 ms':>12}{'p99 ms':>12}{'max ms':>12}"]
+        for name, stat in sorted(stats.items(), key=lambda item: -item[1].p99):
+            lines.append(
+                f"{name:<60}{stat.calls:>8}{stat.p50:>12.2f}{stat.p99:>12.2f}{stat.maximum:>12.2f}"
+            )
+
+        self.widgets["latencyTextbox"].configure(state="normal")
+        self.widgets["latencyTextbox"].delete(1.0, "end")
+        self.widgets["latencyTextbox"].insert("end", "\n".join(lines))
+        self.widgets["latencyTextbox"].configure(state="disabled")
+
+    def updateStatus(self, status: str) -> None:
+        """
+        Show a status message above the table
+        """
+        self.widgets["statusLabel"].configure(text=status)
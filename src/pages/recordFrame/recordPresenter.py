@@ -3,26 +3,40 @@ FTP Client Presenter
 """
 # pylint: disable=C0103
 from __future__ import annotations
-from typing import Optional, Protocol, Callable, Any, List, Dict
+from typing import TYPE_CHECKING, Optional, Protocol, Callable, List, Dict, Set, FrozenSet, Tuple
 
 import re
-import subprocess
-import signal
+import math
 import shlex
+import functools
 
-import tkinter as tk
-import psutil
-from ...logic.rosCommandGenerator import generateRosBagRecordCommand
+from ...logic.rosCommandGenerator import generateBagName, generateRosBagRecordArgs
 from ...logic.fileSystemInterface import FileSystemInterface
+from ...logic.backgroundTask import runBlocking, runCoroutine, runInBackground
+from ...logic.recorderBackend import LocalBackend, Recorder, RecorderBackend
+from ...logic.topicDiscovery import QOS_OVERRIDES_OPTION, TopicInfo
+from ...logic.recorderWatchdog import FAILED, FINISHED, HEALTHY, RecorderWatchdog, RecordingGap
+from ...logic.diskPreflight import PreflightReport, parseDuration
+from ...logic.snapshotRecorder import SnapshotRecorder
+from ...logic.recordingScheduler import RecordingScheduler, loadSchedule
+from ...logic.recordingProfiles import ProfileStore, RecordingProfile
+from ...logic.profiler import traced
 from ...constants import Constants
 
+if TYPE_CHECKING:
+    import tkinter as tk
+
+OUTPUT_POLL_PERIOD_MS = 100
+SNAPSHOT_POLL_PERIOD_MS = 250
+WATCHDOG_PERIOD_MS = 1000
+
 
 class RecordView(Protocol):
     """
     View Protocol
     """
 
-    # pylint: disable=C0116
+    # pylint: disable=C0116,R0904
 
     def buildGUI(self, presenter: RecordPresenter, rosTopics: List[str]) -> None:
         ...
@@ -51,10 +65,28 @@ class RecordView(Protocol):
     def command(self) -> str:
         ...
 
+    @property
+    def snapshotMode(self) -> bool:
+        ...
+
+    @property
+    def triggerTopic(self) -> str:
+        ...
+
     def after(self, time: int, func: Callable[..., None]) -> None:
         ...
 
-    def updateTopicsByDropDownList(self, name: str) -> None:
+    @property
+    def topics(self) -> List[str]:
+        ...
+
+    def setCheckedTopics(self, topics: Set[str]) -> None:
+        ...
+
+    def setTopicSelectOptions(self, names: List[str]) -> None:
+        ...
+
+    def setScheduleActive(self, isActive: bool) -> None:
         ...
 
     def updateTerminalResponse(self, response: str) -> None:
@@ -81,26 +113,75 @@ class RecordView(Protocol):
     def openDescriptionDialog(self) -> Optional[str]:
         ...
 
+    def openProfileNameDialog(self) -> Optional[str]:
+        ...
+
 
 class RecordPresenter:
     """
     Record Presenter
     """
 
-    # pylint: disable=W0613
+    # pylint: disable=W0613,R0902
 
-    def __init__(self, view: RecordView, model: FileSystemInterface) -> None:
+    def __init__(
+        self,
+        view: RecordView,
+        model: FileSystemInterface,
+        profiles: Optional[ProfileStore] = None,
+        backend: Optional[RecorderBackend] = None,
+    ) -> None:
         self.view = view
         self.model = model
+        self.profiles = profiles or ProfileStore()
+        self.backend = backend or LocalBackend()
+
+        self.activeProfile: Optional[RecordingProfile] = None
+        self.topicTable: FrozenSet[str] = frozenset()
+        self.topicInfos: Dict[str, TopicInfo] = {}
+        self.currentOutputRoot = Constants.BAG_DIR_PATH
 
         self.isCommandValid = False
-        self.proc: Any = None
+        self.recorder: Optional[Recorder] = None
+        self.commandArgs: List[str] = []
         self.currentName = ""
+        self.preflightEnabled = True
+        self.preflightPending = False
+        self.snapshotRecorder: Optional[SnapshotRecorder] = None
+        self.snapshotReason = ""
+        self.recordingScheduler: Optional[RecordingScheduler] = None
+
+        self.watchdog: Optional[RecorderWatchdog] = None
+        self.maxRestarts = Constants.RECORDER_RESTARTS
+        self.recordedTime = 0.0
+        self.recordingGaps: List[RecordingGap] = []
+        self.segmentNames: List[str] = []
+        self.recordingFailure = ""
+        self.isStallReported = False
+        self.startPending = False
+        self.stopRequested = False
+        self.endPending = False
+
+    @property
+    def isRecording(self) -> bool:
+        """
+        Whether a recording is checked, started, running, stopped or registered
+        """
+
+        return (
+            self.preflightPending
+            or self.startPending
+            or self.endPending
+            or self.watchdog is not None
+            or self.snapshotRecorder is not None
+        )
 
+    @traced
     def handleStartRecord(self, event: Optional[tk.EventType] = None) -> None:
         """
         handle start record the ros bag
-        The function creates a new subprocess that runs the command
+        The output disk is checked in the background first, then the function creates
+        a new subprocess that runs the command
         While this function is running the GUI is disabled
         """
 
@@ -110,53 +191,545 @@ class RecordPresenter:
             self.view.updateCommandResponse("Build command first")
             return
 
-        command = shlex.split(self.view.command)
-        self.proc = subprocess.Popen(  # pylint: disable=R1732
-            command, stderr=subprocess.PIPE, stdout=subprocess.PIPE
+        if self.view.snapshotMode:
+            self._startSnapshotRecorder()
+            return
+
+        if not self.preflightEnabled:
+            self._startRecorder()
+            return
+
+        self.preflightPending = True
+        self.view.disableUiOnRecord()
+        self.view.updateTerminalResponse("Checking the output disk...\n")
+        self.view.scrollDownTerminalResponse()
+
+        topics = self.view.checkedTopics
+        duration = parseDuration(self.view.durationOption)
+        runInBackground(
+            self.view,
+            lambda: self.backend.preflight(self.currentOutputRoot, topics, duration),
+            self._onPreflightDone,
+            self._onPreflightError,
+        )
+
+    def _onPreflightDone(self, report: PreflightReport) -> None:
+        """
+        Start the recorder unless the pre-flight check found a blocking problem
+        """
+
+        if not self.preflightPending:
+            return
+
+        self.preflightPending = False
+        printOutput = "".join(f"Warning: {warning}\n" for warning in report.warnings)
+        printOutput += "".join(f"Error: {error}\n" for error in report.errors)
+        if printOutput:
+            self.view.updateTerminalResponse(printOutput + "\n")
+            self.view.scrollDownTerminalResponse()
+
+        if not report.passed:
+            self.view.enableUiOnStopRecord()
+            self.view.updateCommandResponse("Recording blocked by the pre-flight check")
+            return
+
+        self._startRecorder()
+
+    def _onPreflightError(self, err: BaseException) -> None:
+        if not self.preflightPending:
+            return
+
+        self.preflightPending = False
+        self.view.enableUiOnStopRecord()
+        self.view.updateTerminalResponse(f"Pre-flight check failed: {err}\n\n")
+        self.view.scrollDownTerminalResponse()
+
+    def _startRecorder(self) -> None:
+        """
+        Launch the recorder with the generated command, in the background
+        """
+
+        self.recordingFailure = ""
+        self.startPending = True
+        self.stopRequested = False
+        self.view.disableUiOnRecord()
+        runCoroutine(
+            self.view,
+            self._launchRecorder(self.commandArgs, self.currentName),
+            self._onRecorderStarted,
+            self._onRecorderStartError,
+        )
+
+    async def _launchRecorder(self, args: List[str], bagName: str) -> Recorder:
+        """
+        Create and start a recorder, creating a recorder of an agent is a request too
+        """
+
+        recorder = await runBlocking(self.backend.createRecorder, args, bagName)
+        await runBlocking(recorder.start)
+        return recorder
+
+    def _onRecorderStarted(self, recorder: Recorder) -> None:
+        self.startPending = False
+        self.recorder = recorder
+        self.recordedTime = 0.0
+        self.recordingGaps = []
+        self.segmentNames = [self.currentName]
+        self.watchdog = RecorderWatchdog(self._localOutputPath(self.commandArgs))
+        self.isStallReported = False
+        self.view.after(
+            OUTPUT_POLL_PERIOD_MS, functools.partial(self._pushRecorderOutput, recorder)
         )
 
         topicListStr = "\n".join(self.view.checkedTopics)
         printOutput = f"Started Recording a bag of the following topics:\n{topicListStr}\n\n"
+        if QOS_OVERRIDES_OPTION in recorder.args:
+            overridesPath = recorder.args[recorder.args.index(QOS_OVERRIDES_OPTION) + 1]
+            printOutput += (
+                f"QoS overrides of the best effort and latched topics:\n{overridesPath}\n\n"
+            )
 
-        self.view.disableUiOnRecord()
         self.view.updateTerminalResponse(printOutput)
         self.view.scrollDownTerminalResponse()
+        self._resumeRecording()
 
-    def handleStopRecord(self, event: Optional[tk.EventType] = None) -> None:
+    def _onRecorderStartError(self, err: BaseException) -> None:
+        self.startPending = False
+        if not isinstance(err, OSError):
+            self.view.enableUiOnStopRecord()
+            raise err
+
+        self.view.enableUiOnStopRecord()
+        self.view.updateTerminalResponse(f"Could not start the recorder: {err}\n\n")
+        self.view.scrollDownTerminalResponse()
+
+    def _resumeRecording(self) -> None:
         """
-        handle stop record the ros bag
-        The function stops the process that is running the record bag command
-        This function returns the GUI to normal
+        Watch the recorder that just started, or stop it if stop was pressed meanwhile
+        """
+
+        if self.stopRequested:
+            self.handleStopRecord()
+        else:
+            self.view.after(WATCHDOG_PERIOD_MS, self._checkRecorder)
+
+    def _pushRecorderOutput(self, recorder: Recorder) -> None:
+        """
+        Forward the output of the recorder to the terminal response until the recorder exits
+        """
+
+        if recorder.outputReader is None:
+            return
+
+        outputReader = recorder.outputReader
+        lines = outputReader.drain()
+        if lines:
+            self.view.updateTerminalResponse("".join(lines))
+            self.view.scrollDownTerminalResponse()
+
+        if outputReader.isAlive:
+            self.view.after(
+                OUTPUT_POLL_PERIOD_MS, functools.partial(self._pushRecorderOutput, recorder)
+            )
+
+    def _localOutputPath(self, args: List[str]) -> Optional[str]:
+        """
+        The bag written by a local recorder, the bags of a recorder agent are not measured
+        """
+
+        if not isinstance(self.backend, LocalBackend):
+            return None
+        return args[args.index("-o") + 1]
+
+    def _checkRecorder(self) -> None:
+        """
+        Watch the recorder until the recording ends: a recorder that exits ends the recording,
+        a recorder that failed or stalled is restarted into a new segment while restarts are
+        left
+        The check measures the bag on disk, so it runs in the background
         """
 
-        for proc in psutil.process_iter():
-            if "record" in proc.name() and set(self.view.command[2:]).issubset(proc.cmdline()):
-                proc.send_signal(signal.SIGINT)
+        if self.recorder is None or self.watchdog is None:
+            return
+
+        runCoroutine(
+            self.view,
+            runBlocking(self.watchdog.check, self.recorder),
+            functools.partial(self._onRecorderChecked, self.watchdog),
+        )
+
+    def _onRecorderChecked(self, watchdog: RecorderWatchdog, result: Tuple[str, str]) -> None:
+        if watchdog is not self.watchdog or self.stopRequested:
+            # the recording was stopped or restarted meanwhile
+            return
+
+        state, reason = result
+        if state == HEALTHY:
+            self.isStallReported = False
+        elif state == FINISHED:
+            self._endRecording("Recording finished\n\n")
+            return
+        elif len(self.segmentNames) <= self.maxRestarts:
+            self._restartRecorder(reason)
+            return
+        elif state == FAILED:
+            self.recordingFailure = reason
+            self._endRecording(f"Recording failed, {reason}\n\n")
+            return
+        elif not self.isStallReported:
+            self.isStallReported = True
+            self.view.updateTerminalResponse(f"Warning: {reason}\n\n")
+            self.view.scrollDownTerminalResponse()
 
+        self.view.after(WATCHDOG_PERIOD_MS, self._checkRecorder)
 
-        self.proc.send_signal(signal.SIGINT)
+    def _restartRecorder(self, reason: str) -> None:
+        """
+        Start a new segment of the recording, the bag written so far is kept as it is
+        The interruption is recorded as a gap of the recording
+        """
+
+        if self.recorder is None:
+            return
+
+        self.startPending = True
+        runCoroutine(
+            self.view,
+            runBlocking(self.recorder.stop),
+            lambda _: self._startSegment(reason),
+            functools.partial(self._onRestartError, reason),
+        )
+
+    def _startSegment(self, reason: str) -> None:
+        """
+        Launch the recorder of the next segment, once the failed recorder stopped
+        """
+
+        if self.recorder is None:
+            return
+
+        self.recordedTime += self.recorder.elapsed
+        segment = len(self.segmentNames)
+        args = list(self.commandArgs)
+        outputIndex = args.index("-o") + 1
+        args[outputIndex] = f"{args[outputIndex]}_{segment}"
+        if "-d" in args:
+            # the new segment records what is left of the duration
+            durationIndex = args.index("-d") + 1
+            duration = parseDuration(args[durationIndex]) or 0.0
+            remaining = duration - self.recordedTime
+            args[durationIndex] = str(max(1, math.ceil(remaining)))
+        bagName = f"{self.currentName}_{segment}"
+
+        runCoroutine(
+            self.view,
+            self._launchRecorder(args, bagName),
+            functools.partial(self._onSegmentStarted, reason, args, bagName),
+            functools.partial(self._onRestartError, reason),
+        )
+
+    def _onSegmentStarted(
+        self, reason: str, args: List[str], bagName: str, recorder: Recorder
+    ) -> None:
+        self.startPending = False
+        if self.watchdog is not None:
+            self.recordingGaps.append(self.watchdog.gapUntilNow(reason))
+        self.segmentNames.append(bagName)
+        self.recorder = recorder
+        self.watchdog = RecorderWatchdog(self._localOutputPath(args))
+        self.view.after(
+            OUTPUT_POLL_PERIOD_MS, functools.partial(self._pushRecorderOutput, recorder)
+        )
+
+        self.view.updateTerminalResponse(
+            f"Restarted the recorder, {reason}\nRecording the next segment to {bagName}\n\n"
+        )
+        self.view.scrollDownTerminalResponse()
+        self._resumeRecording()
+
+    def _onRestartError(self, reason: str, err: BaseException) -> None:
+        self.startPending = False
+        if not isinstance(err, OSError):
+            self._endRecording(f"Recording failed, {reason}\n\n")
+            raise err
+
+        self.recordingFailure = f"{reason}, and the recorder could not restart: {err}"
+        self._endRecording(f"Recording failed, {self.recordingFailure}\n\n")
+
+    def _endRecording(self, printOutput: str) -> None:
+        """
+        Register the segments of the recording with its gaps in the background, and return the
+        GUI to normal once they are registered
+        """
+
+        self.watchdog = None
+        self.endPending = True
 
         description = self.view.openDescriptionDialog()
         if not description:
             description = ""
 
-        self.model.addBag(self.currentName, description)
-
-        printOutput = "Stopped Recording\n\n"
+        gaps = [gap.toEntry() for gap in self.recordingGaps]
+        if gaps:
+            printOutput += f"The recording has {len(gaps)} gap(s):\n"
+            printOutput += "".join(
+                f"{gap.start} - {gap.end}, {gap.reason}\n" for gap in self.recordingGaps
+            )
+            printOutput += "\n"
         printOutput += (
-            f"The bag can be found in the following directory:\n{Constants.BAG_DIR_PATH}\n\n"
+            f"The bag can be found in the following directory:\n{self.currentOutputRoot}\n\n"
+        )
+
+        runCoroutine(
+            self.view,
+            self._registerSegments(list(self.segmentNames), description, gaps),
+            lambda _: self._onRecordingEnded(printOutput),
+            lambda err: self._onRecordingEnded(
+                f"{printOutput}The recording could not be registered: {err}\n\n"
+            ),
         )
 
+    async def _registerSegments(
+        self, names: List[str], description: str, gaps: List[Dict[str, str]]
+    ) -> None:
+        for name in names:
+            await runBlocking(self.model.addBag, name, description, gaps)
+
+    def _onRecordingEnded(self, printOutput: str) -> None:
+        self.endPending = False
         self.view.enableUiOnStopRecord()
         self.view.updateTerminalResponse(printOutput)
         self.view.scrollDownTerminalResponse()
 
+    @traced
+    def handleStopRecord(self, event: Optional[tk.EventType] = None) -> None:
+        """
+        handle stop record the ros bag
+        The function stops the process that is running the record bag command
+        This function returns the GUI to normal
+        A pending pre-flight check is cancelled instead, and a recording that already ended is
+        left as it is
+        In snapshot mode, the pending snapshot is written before the GUI returns to normal
+        """
+
+        if self.snapshotRecorder is not None:
+            self.view.updateTerminalResponse("Stopping the snapshot recorder...\n")
+            self.view.scrollDownTerminalResponse()
+            runInBackground(self.view, self.snapshotRecorder.stop, self._onSnapshotStopped)
+            return
+
+        if self.preflightPending:
+            self.preflightPending = False
+            self.view.enableUiOnStopRecord()
+            self.view.updateTerminalResponse("Recording cancelled\n\n")
+            self.view.scrollDownTerminalResponse()
+            return
+
+        if self.startPending:
+            # the recorder is stopped as soon as it started
+            self.stopRequested = True
+            self.view.updateTerminalResponse("Stopping the recorder...\n")
+            self.view.scrollDownTerminalResponse()
+            return
+
+        if self.recorder is None or self.watchdog is None:
+            return
+
+        self.stopRequested = False
+        self.watchdog = None
+        self.endPending = True
+        runCoroutine(
+            self.view,
+            self._stopRecorder(self.recorder),
+            lambda _: self._endRecording("Stopped Recording\n\n"),
+            lambda err: self._endRecording(f"Stopped Recording, {err}\n\n"),
+        )
+
+    async def _stopRecorder(self, recorder: Recorder) -> None:
+        """
+        Interrupt the recorder and wait for it to close its bag
+        """
+
+        await runBlocking(recorder.stop)
+        await runBlocking(recorder.wait)
+
+    def _startSnapshotRecorder(self) -> None:
+        """
+        Start buffering the checked topics in memory, a bag is written around every trigger
+        """
+
+        prefix = self.view.prefix
+        outputRoot = self.currentOutputRoot
+        triggerTopic = self.view.triggerTopic
+        recorder = SnapshotRecorder(
+            self.view.checkedTopics,
+            lambda: generateBagName(prefix, outputRoot),
+            [triggerTopic] if triggerTopic else [],
+            before=Constants.SNAPSHOT_BEFORE_S,
+            after=Constants.SNAPSHOT_AFTER_S,
+            maxBytes=Constants.SNAPSHOT_MAX_BYTES,
+            discovery=self.backend.discovery if isinstance(self.backend, LocalBackend) else None,
+        )
+
+        try:
+            recorder.start()
+        except ImportError:
+            self.view.updateCommandResponse("Snapshot recording needs rclpy and rosbag2_py")
+            return
+
+        self.snapshotRecorder = recorder
+        self.view.after(SNAPSHOT_POLL_PERIOD_MS, self._pushSnapshotEvents)
+
+        printOutput = (
+            f"Buffering the last {Constants.SNAPSHOT_BEFORE_S:.0f} s of the checked topics\n"
+        )
+        if triggerTopic:
+            printOutput += f"A message on {triggerTopic} writes a snapshot\n"
+        printOutput += "Press F9 or Snapshot to write a snapshot\n\n"
+
+        self.view.disableUiOnRecord()
+        self.view.updateTerminalResponse(printOutput)
+        self.view.scrollDownTerminalResponse()
+
+    @traced
+    def handleSnapshotTrigger(self, event: Optional[tk.EventType] = None) -> None:
+        """
+        Write a snapshot of the buffered topics, e.g. from the hotkey
+        """
+
+        if self.snapshotRecorder is not None:
+            self.snapshotRecorder.trigger("manual")
+
+    def _pushSnapshotEvents(self) -> None:
+        """
+        Report the snapshot triggers and register the written bags while the recorder runs
+        """
+
+        if self.snapshotRecorder is None:
+            return
+
+        self._drainSnapshotEvents(self.snapshotRecorder)
+        self.view.after(SNAPSHOT_POLL_PERIOD_MS, self._pushSnapshotEvents)
+
+    def _drainSnapshotEvents(self, recorder: SnapshotRecorder) -> None:
+        printOutput = ""
+        while not recorder.events.empty():
+            kind, text = recorder.events.get()
+            if kind == "triggered":
+                self.snapshotReason = text
+                printOutput += (
+                    f"Snapshot triggered by {text}, "
+                    f"writing in {Constants.SNAPSHOT_AFTER_S:.0f} s\n"
+                )
+            elif kind == "saved":
+                runCoroutine(
+                    self.view,
+                    runBlocking(
+                        self.model.addBag, text, f"snapshot triggered by {self.snapshotReason}"
+                    ),
+                    lambda _: None,
+                    functools.partial(self._onSnapshotRegisterError, text),
+                )
+                printOutput += f"Snapshot saved as {text}\n"
+            else:
+                printOutput += text + "\n"
+
+        if recorder.buffer.dropped:
+            printOutput += f"{recorder.buffer.dropped} messages dropped over the memory cap\n"
+            recorder.buffer.dropped = 0
+
+        if printOutput:
+            self.view.updateTerminalResponse(printOutput)
+            self.view.scrollDownTerminalResponse()
+
+    def _onSnapshotRegisterError(self, name: str, err: BaseException) -> None:
+        if not isinstance(err, OSError):
+            raise err
+        self.view.updateTerminalResponse(f"The snapshot {name} could not be registered: {err}\n\n")
+        self.view.scrollDownTerminalResponse()
+
+    def _onSnapshotStopped(self, _: None) -> None:
+        if self.snapshotRecorder is None:
+            return
+
+        self._drainSnapshotEvents(self.snapshotRecorder)
+        self.snapshotRecorder = None
+
+        self.view.enableUiOnStopRecord()
+        self.view.updateTerminalResponse(
+            f"Stopped Recording\n\nThe snapshots can be found in:\n{self.currentOutputRoot}\n\n"
+        )
+        self.view.scrollDownTerminalResponse()
+
+    @traced
+    def handleToggleSchedule(self, event: Optional[tk.EventType] = None) -> None:
+        """
+        Start or stop the scheduled recordings of the schedule file
+        The runs are registered in the catalog with a generated description
+        """
+
+        if self.recordingScheduler is not None:
+            self.recordingScheduler.stop()
+            self.recordingScheduler = None
+            self.view.setScheduleActive(False)
+            self._onScheduleEvent("Schedule stopped")
+            return
+
+        jobs = loadSchedule()
+        if not jobs:
+            self._onScheduleEvent(f"No scheduled recording in {Constants.SCHEDULE_PATH}")
+            return
+
+        self.recordingScheduler = RecordingScheduler(
+            self.view, jobs, self._onScheduleEvent, self.model.addBag, self.profiles, self.backend
+        )
+        self.recordingScheduler.start()
+        self.view.setScheduleActive(True)
+        self._onScheduleEvent(f"Schedule started with {len(jobs)} job(s)")
+
+    def _onScheduleEvent(self, message: str) -> None:
+        self.view.updateTerminalResponse(message + "\n\n")
+        self.view.scrollDownTerminalResponse()
+
+    @traced
     def handleCheckTopicsByDropDownList(self, event: Optional[tk.EventType] = None) -> None:
         """
-        Check the topics by the drop down list
+        Check the topics by the drop down list, either all, none or the topics of a profile
+        The profile options are used when generating the command
+        """
+
+        name = self.view.selectedTopicTypeOption
+        self.activeProfile = None
+
+        if name == "all":
+            selection = set(self.topicTable)
+        elif name == "none":
+            selection = set()
+        else:
+            self.activeProfile = self.profiles.get(name)
+            selection = self.activeProfile.select(self.topicTable)
+
+        self.view.setCheckedTopics(selection)
+        self.handleGenerateCommand()
+
+    @traced
+    def handleSaveProfile(self, event: Optional[tk.EventType] = None) -> None:
+        """
+        Save the checked topics and the options as a recording profile
         """
-        self.view.updateTopicsByDropDownList(self.view.selectedTopicTypeOption)
 
+        name = self.view.openProfileNameDialog()
+        if not name:
+            return
+
+        options = dict(self.activeProfile.options) if self.activeProfile else {}
+        if self.view.durationOption != "":
+            options["-d"] = self.view.durationOption
+
+        self.profiles.save(RecordingProfile.fromTopics(name, self.view.checkedTopics, options))
+        self.view.setTopicSelectOptions(self._topicSelectOptions())
+
+    @traced
     def handleGenerateCommand(self, event: Optional[tk.EventType] = None) -> None:
         """
         Given the selected topics and options, generate the command
@@ -164,7 +737,8 @@ class RecordPresenter:
 
         self.isCommandValid = False
         ### validate checked topics ###
-        if len(self.view.checkedTopics) == 0:
+        checkedTopics = self.view.checkedTopics
+        if len(checkedTopics) == 0:
             self.view.updateCommandResponse("No topics selected")
             return
 
@@ -178,7 +752,7 @@ class RecordPresenter:
             return
 
         ### validate options ###
-        options: Dict[str, str] = {}
+        options: Dict[str, str] = dict(self.activeProfile.options) if self.activeProfile else {}
 
         if self.view.durationOption != "":
             if re.match(r"\d+$", self.view.durationOption) or re.match(
@@ -192,51 +766,49 @@ class RecordPresenter:
                 return
 
         ### generate command ###
-        command, self.currentName = generateRosBagRecordCommand(
-            self.view.checkedTopics, self.view.prefix, options
+        self.currentOutputRoot = (
+            self.activeProfile.outputRoot if self.activeProfile else ""
+        ) or Constants.BAG_DIR_PATH
+        includeRegex, excludeRegex = "", ""
+        if self.activeProfile and set(checkedTopics) == self.activeProfile.select(self.topicTable):
+            includeRegex = self.activeProfile.includePattern
+            excludeRegex = self.activeProfile.excludePattern
+
+        self.commandArgs, self.currentName = generateRosBagRecordArgs(
+            checkedTopics,
+            self.view.prefix,
+            options,
+            self.currentOutputRoot,
+            self.topicTable,
+            includeRegex,
+            excludeRegex,
         )
-        self.view.updateCommandResponse(command)
+        self.view.updateCommandResponse(shlex.join(self.commandArgs))
         self.isCommandValid = True
 
+    @traced
     def handleRefreshTopic(self, event: Optional[tk.EventType] = None) -> None:
         """
         Refresh the topic list from ros master
+        The discovery runs in the background, the check list is updated once it is done
         """
 
-        try:
-            topics = self._getTopicsNameFromRos()
-            self.view.emptyTopicCheckList()
-            self.view.addTopicsToCheckList(topics)
-        except ConnectionError as err:
-            self.view.updateTerminalResponse(str(err) + "\n\n")
-            self.view.scrollDownTerminalResponse()
-
-    def _getTopicsNameFromRos(self) -> List[str]:
-        """
-        Get active topic names from ROS
-
-        Returns
-        -------
-        List[str]
-            List of active topic names
-
-        Raises
-        ------
-
-        """
-        command = shlex.split("ros2 topic list")
-        proc = subprocess.Popen(  # pylint: disable=R1732
-            command, stderr=subprocess.PIPE, stdout=subprocess.PIPE
+        runInBackground(
+            self.view, self.backend.discoverTopics, self._onTopicsReceived, self._onError
         )
 
-        out, err = proc.communicate()
+    def _onTopicsReceived(self, topics: List[TopicInfo]) -> None:
+        self.topicInfos = {topic.name: topic for topic in topics}
+        self.topicTable = frozenset(self.topicInfos)
+        self.view.emptyTopicCheckList()
+        self.view.addTopicsToCheckList([topic.name for topic in topics])
 
-        if err:
-            raise ConnectionError(err.decode("utf-8"))
+    def _onError(self, err: BaseException) -> None:
+        if not isinstance(err, ConnectionError):
+            raise err
 
-        topics = out.decode("utf-8").strip().split("\n")
-
-        return topics
+        self.view.updateTerminalResponse(str(err) + "\n\n")
+        self.view.scrollDownTerminalResponse()
 
     def run(self) -> None:
         """
@@ -244,4 +816,8 @@ class RecordPresenter:
         """
 
         self.view.buildGUI(self, [])
+        self.view.setTopicSelectOptions(self._topicSelectOptions())
         self.handleRefreshTopic()
+
+    def _topicSelectOptions(self) -> List[str]:
+        return ["none", "all"] + self.profiles.names()
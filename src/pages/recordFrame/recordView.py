@@ -2,15 +2,16 @@
 Record page
 """
 
-from typing import Dict, Any, Union, Optional, Protocol, List
+from typing import Dict, Any, Union, Optional, Protocol, List, Set
 
-import os
 import tkinter as tk
 import customtkinter as ctk
-from PIL import Image
 
 from ...components.scrollableCheckBoxFrame import ScrollableCheckBoxFrame
+from ...components.imageRegistry import getImage
 from ...constants import Constants
+from ...logic.terminalBuffer import TerminalBuffer
+from ...logic.profiler import traced
 
 
 class RecordPresenter(Protocol):
@@ -35,8 +36,20 @@ class RecordPresenter(Protocol):
     def handleRefreshTopic(self, event: Optional[tk.EventType] = None) -> None:
         ...
 
+    def handleSaveProfile(self, event: Optional[tk.EventType] = None) -> None:
+        ...
+
+    def handleSnapshotTrigger(self, event: Optional[tk.EventType] = None) -> None:
+        ...
+
+    def handleToggleSchedule(self, event: Optional[tk.EventType] = None) -> None:
+        ...
+
+
+FRAME_PERIOD_MS = 16
+
 
-class RecordView(ctk.CTkFrame):  # type: ignore # pylint: disable=R0901
+class RecordView(ctk.CTkFrame):  # type: ignore # pylint: disable=R0901,R0904
     """
     Record frame
     """
@@ -49,7 +62,13 @@ class RecordView(ctk.CTkFrame):  # type: ignore # pylint: disable=R0901
         self.grid_rowconfigure(0, weight=1)
 
         self.widgets: Dict[str, ctk.CTkBaseClass] = {}
+        self.terminalBuffer = TerminalBuffer(
+            Constants.TERMINAL_MAX_LINES, Constants.TERMINAL_SPILL_PATH
+        )
+        self._isFlushScheduled = False
+        self._isScrollPending = False
 
+    @traced
     def buildGUI(self, presenter: RecordPresenter, rosTopics: List[str]) -> None:
         """
         Build the GUI, runs all the methods that build the GUI.
@@ -57,6 +76,7 @@ class RecordView(ctk.CTkFrame):  # type: ignore # pylint: disable=R0901
         self.buildScrollableFrameBar(presenter, rosTopics)
         self.buildMainSection(presenter)
         self.buildOptionsSection(presenter)
+        self.winfo_toplevel().bind("<F9>", presenter.handleSnapshotTrigger)
 
     def buildScrollableFrameBar(self, presenter: RecordPresenter, rosTopics: List[str]) -> None:
         """
@@ -72,27 +92,14 @@ class RecordView(ctk.CTkFrame):  # type: ignore # pylint: disable=R0901
             scrollableBarFrame,
             dynamic_resizing=True,
             command=presenter.handleCheckTopicsByDropDownList,
-            values=[
-                "none",
-                "all",
-                "perception",
-                "slam",
-                "supervisor",
-                "control",
-                "planning",
-                "lidar",
-            ],
+            values=["none", "all"],
         )
         topicSelectOptions.grid(row=0, column=0, padx=(10, 5), pady=(5, 5), sticky="we")
         self.widgets["topicSelectOptions"] = topicSelectOptions
 
-        refreshImage = ctk.CTkImage(
-            light_image=Image.open(os.path.join(Constants.IMAGE_PATH, "refresh_dark.png")),
-            dark_image=Image.open(os.path.join(Constants.IMAGE_PATH, "refresh_dark.png")),
-            size=(20, 20),
+        refreshButton = ctk.CTkButton(
+            scrollableBarFrame, text="", width=50, image=getImage("refresh_dark")
         )
-
-        refreshButton = ctk.CTkButton(scrollableBarFrame, text="", width=50, image=refreshImage)
         refreshButton.configure(command=presenter.handleRefreshTopic)
         refreshButton.grid(row=0, column=1, pady=(5, 5), padx=(5, 10), sticky="e")
 
@@ -130,7 +137,7 @@ class RecordView(ctk.CTkFrame):  # type: ignore # pylint: disable=R0901
 
         prefixEntry = ctk.CTkEntry(
             mainSectionFrame,
-            placeholder_text="Prefix for bag name, final name will be {prefix}{timestamp}.bag",
+            placeholder_text="Prefix for bag name, final name will be {prefix}_{timestamp}",
             validate="focus",
             validatecommand=presenter.handleGenerateCommand,
         )
@@ -202,6 +209,36 @@ class RecordView(ctk.CTkFrame):  # type: ignore # pylint: disable=R0901
         self.widgets["durationEntry"] = durationEntry
         durationEntry.bind("<KeyRelease>", presenter.handleGenerateCommand)
 
+        saveProfileButton = ctk.CTkButton(
+            master=optionFrame, command=presenter.handleSaveProfile, text="Save as profile"
+        )
+        saveProfileButton.grid(row=6, column=0, padx=5, pady=(20, 0), sticky="n")
+
+        snapshotSwitch = ctk.CTkSwitch(
+            master=optionFrame, text="Snapshot mode", command=presenter.handleGenerateCommand
+        )
+        snapshotSwitch.grid(row=7, column=0, padx=10, pady=(30, 10), sticky="nw")
+        self.widgets["snapshotSwitch"] = snapshotSwitch
+
+        triggerLabel = ctk.CTkLabel(master=optionFrame, text="Trigger topic", anchor="w")
+        triggerLabel.grid(row=8, column=0, padx=10, sticky="nw")
+        triggerEntry = ctk.CTkEntry(master=optionFrame, width=200, placeholder_text="optional")
+        triggerEntry.grid(row=9, column=0, padx=5, sticky="n")
+        self.widgets["triggerEntry"] = triggerEntry
+
+        snapshotButton = ctk.CTkButton(
+            master=optionFrame, command=presenter.handleSnapshotTrigger, text="Snapshot (F9)"
+        )
+        snapshotButton.configure(state="disabled")
+        snapshotButton.grid(row=10, column=0, padx=5, pady=(10, 0), sticky="n")
+        self.widgets["snapshotButton"] = snapshotButton
+
+        scheduleButton = ctk.CTkButton(
+            master=optionFrame, command=presenter.handleToggleSchedule, text="Run schedule"
+        )
+        scheduleButton.grid(row=11, column=0, padx=5, pady=(30, 0), sticky="n")
+        self.widgets["scheduleButton"] = scheduleButton
+
     def _copy(self, _: Any) -> None:
         """
         copy the command to clipboard
@@ -234,6 +271,30 @@ class RecordView(ctk.CTkFrame):  # type: ignore # pylint: disable=R0901
         """
         return self.widgets["commandTextbox"].get("1.0", "end")  # type: ignore
 
+    @property
+    def snapshotMode(self) -> bool:
+        """
+        Get the state of the snapshot mode switch
+
+        returns
+        -------
+        bool
+            True if the topics are buffered in memory until a trigger
+        """
+        return bool(self.widgets["snapshotSwitch"].get())
+
+    @property
+    def triggerTopic(self) -> str:
+        """
+        Get the input from the trigger topic entry widget
+
+        returns
+        -------
+        str
+            The trigger topic, empty if snapshots are only taken manually
+        """
+        return self.widgets["triggerEntry"].get().strip()  # type: ignore
+
     @property
     def durationOption(self) -> str:
         """
@@ -282,37 +343,81 @@ class RecordView(ctk.CTkFrame):  # type: ignore # pylint: disable=R0901
         """
         return self.widgets["scrollableCheckBoxes"].getCheckedItems()  # type: ignore
 
-    def updateTopicsByDropDownList(self, name: str) -> None:
+    @property
+    def topics(self) -> List[str]:
         """
-        Update the topics list by the drop down list
+        Get all the topics of the topics list frame
+
+        returns
+        -------
+        List[str]
+            The topics
         """
+        return self.widgets["scrollableCheckBoxes"].getItems()  # type: ignore
 
-        if name == "all":
-            self.widgets["scrollableCheckBoxes"].selectAll()
-        elif name == "none":
-            self.widgets["scrollableCheckBoxes"].deselectAll()
-        else:
-            self.widgets["scrollableCheckBoxes"].selectContainingName(name)
+    def setCheckedTopics(self, topics: Set[str]) -> None:
+        """
+        Check exactly the given topics in the topics list frame
+        """
+        self.widgets["scrollableCheckBoxes"].setCheckedItems(topics)
+
+    def setTopicSelectOptions(self, names: List[str]) -> None:
+        """
+        Set the choices of the topic selection drop down list
+        """
+        self.widgets["topicSelectOptions"].configure(values=names)
+
+    def setScheduleActive(self, isActive: bool) -> None:
+        """
+        Show if the scheduled recordings are running on the schedule button
+        """
+        self.widgets["scheduleButton"].configure(
+            text="Stop schedule" if isActive else "Run schedule"
+        )
 
     def scrollDownTerminalResponse(self) -> None:
         """
-        Scroll the terminal response textbox down
+        Scroll the terminal response textbox down on the next frame
         """
-        self.widgets["terminalResponseTextbox"].see("end")
+        self._isScrollPending = True
+        self._scheduleTerminalFlush()
 
     def updateTerminalResponse(self, response: str) -> None:
         """
         Update the terminal response textbox with the response
-        The
+        Responses arriving within one frame are inserted together on the next frame
 
         parameters
         ----------
         response: str
             The response to update the textbox with
         """
-        self.widgets["terminalResponseTextbox"].configure(state="normal")
-        self.widgets["terminalResponseTextbox"].insert("end", response)
-        self.widgets["terminalResponseTextbox"].configure(state="disabled")
+        self.terminalBuffer.append(response)
+        self._scheduleTerminalFlush()
+
+    def _scheduleTerminalFlush(self) -> None:
+        if not self._isFlushScheduled:
+            self._isFlushScheduled = True
+            self.after(FRAME_PERIOD_MS, self._flushTerminalResponse)
+
+    def _flushTerminalResponse(self) -> None:
+        """
+        Insert the pending responses, and trim the textbox to the maximum number of lines
+        """
+        self._isFlushScheduled = False
+        textbox = self.widgets["terminalResponseTextbox"]
+
+        if self.terminalBuffer.hasPending:
+            text, trim = self.terminalBuffer.flush()
+            textbox.configure(state="normal")
+            textbox.insert("end", text)
+            if trim > 0:
+                textbox.delete("1.0", f"{trim + 1}.0")
+            textbox.configure(state="disabled")
+
+        if self._isScrollPending:
+            self._isScrollPending = False
+            textbox.see("end")
 
     def updateCommandResponse(self, command: str) -> None:
         """
@@ -338,8 +443,11 @@ class RecordView(ctk.CTkFrame):  # type: ignore # pylint: disable=R0901
         self.widgets["stopButton"].configure(state="normal")
         self.widgets["prefixEntry"].configure(state="disabled")
         self.widgets["durationEntry"].configure(state="disabled")
-        self.widgets["numberEntry"].configure(state="disabled")
         self.widgets["topicSelectOptions"].configure(state="disabled")
+        self.widgets["snapshotSwitch"].configure(state="disabled")
+        self.widgets["triggerEntry"].configure(state="disabled")
+        if self.snapshotMode:
+            self.widgets["snapshotButton"].configure(state="normal")
 
     def enableUiOnStopRecord(self) -> None:
         """
@@ -350,8 +458,10 @@ class RecordView(ctk.CTkFrame):  # type: ignore # pylint: disable=R0901
         self.widgets["stopButton"].configure(state="disabled")
         self.widgets["prefixEntry"].configure(state="normal")
         self.widgets["durationEntry"].configure(state="normal")
-        self.widgets["numberEntry"].configure(state="normal")
         self.widgets["topicSelectOptions"].configure(state="normal")
+        self.widgets["snapshotSwitch"].configure(state="normal")
+        self.widgets["triggerEntry"].configure(state="normal")
+        self.widgets["snapshotButton"].configure(state="disabled")
 
     def emptyTopicCheckList(self) -> None:
         """
@@ -384,3 +494,11 @@ class RecordView(ctk.CTkFrame):  # type: ignore # pylint: disable=R0901
         )
 
         return dialog.get_input()  # type: ignore
+
+    def openProfileNameDialog(self) -> Optional[str]:
+        """
+        Ask for the name of the profile to save
+        """
+        dialog = ctk.CTkInputDialog(text="Type in a name for the profile:", title="Save Profile")
+
+        return dialog.get_input()  # type: ignore
@@ -0,0 +1,192 @@
+"""
+Storage Presenter
+"""
+from __future__ import annotations
+from typing import TYPE_CHECKING, Any, Callable, Dict, List, Optional, Protocol, Tuple
+
+import queue
+from ...logic.backgroundTask import runInBackground
+from ...logic.bagMetadata import loadBagMetadata
+from ...logic.diskPreflight import formatSize
+from ...logic.fileSystemInterface import FileSystemInterface
+from ...logic.recorderBackend import LocalBackend, RecorderBackend
+from ...logic.remoteBackend import RemoteBackend
+from ...logic.storageStats import StorageStats, UsageRow
+from ...logic.profiler import traced
+
+if TYPE_CHECKING:
+    import tkinter as tk
+
+CHANGES_POLL_PERIOD_MS = 1000
+
+Change = Tuple[Dict[str, Any], List[str]]
+
+
+class StorageView(Protocol):
+    """
+    View Protocol
+    """
+
+    # pylint: disable=C0116
+
+    def buildGUI(self, presenter: StoragePresenter) -> None:
+        ...
+
+    def updateUsage(self, dimension: str, rows: List[UsageRow], totalSize: int) -> None:
+        ...
+
+    def updateGrowth(self, growth: List[Tuple[str, int]]) -> None:
+        ...
+
+    def updateStatus(self, status: str) -> None:
+        ...
+
+    def after(self, time: int, func: Callable[..., None]) -> None:
+        ...
+
+
+class StoragePresenter:
+    """
+    Storage Presenter
+    """
+
+    # pylint: disable=W0613,R0902
+
+    def __init__(
+        self,
+        view: StorageView,
+        model: FileSystemInterface,
+        backend: Optional[RecorderBackend] = None,
+    ) -> None:
+        self.view = view
+        self.model = model
+        self.backend = backend or LocalBackend()
+
+        self.stats = StorageStats()
+        self.selectedView = "prefix"
+        self.isLoaded = False
+
+        self._changes: queue.Queue[Change] = queue.Queue()
+        self._isApplyingChanges = False
+
+    @property
+    def hasSizes(self) -> bool:
+        """
+        True if the bags are local and their sizes can be read
+        """
+        return not isinstance(self.backend, RemoteBackend)
+
+    @traced
+    def handleSelectView(self, name: str) -> None:
+        """
+        handle show the usage by prefix, day or topic, or the growth of the catalog
+        """
+
+        self.selectedView = name
+        self._showStats()
+
+    @traced
+    def handleRefresh(self, event: Optional[tk.EventType] = None) -> None:
+        """
+        handle sync the catalog with the bags directory
+        Only the bags that changed are counted again: the bags added or removed through the
+        catalog callbacks, and the bags whose size changed since they were counted, e.g. a bag
+        added while it was still being recorded
+        """
+
+        runInBackground(self.view, self._refresh, self._onRefreshed)
+
+    def _showStats(self) -> None:
+        if not self.isLoaded:
+            self.view.updateStatus("Loading the catalog")
+            return
+
+        if self.selectedView == "growth":
+            self.view.updateGrowth(self.stats.growth())
+        else:
+            self.view.updateUsage(
+                self.selectedView, self.stats.usage(self.selectedView), self.stats.totalSize
+            )
+
+        status = f"{len(self.stats.bags)} bags"
+        if self.hasSizes:
+            status += f", {formatSize(self.stats.totalSize)}"
+        else:
+            status += ", the sizes of the bags of a recorder agent are unknown"
+        self.view.updateStatus(status)
+
+    def _loadStats(self) -> None:
+        with self.model.lock:
+            bags = dict(self.model.bagDescription)
+        # the metadata cache is shared with the bags list, unchanged bags are not opened
+        metadata = loadBagMetadata(bags) if self.hasSizes else {}
+        self.stats.build(bags, metadata)
+
+    def _refresh(self) -> None:
+        self.model.loadDescriptionJson()
+        if not self.isLoaded or not self.hasSizes:
+            return
+
+        with self.model.lock:
+            bags = dict(self.model.bagDescription)
+        # the metadata of the bags whose modification time or size changed is read again
+        metadata = loadBagMetadata(bags)
+        for name, entry in bags.items():
+            usage = self.stats.bags.get(name)
+            if usage is not None and name in metadata and usage.size != metadata[name].size:
+                self.stats.add(name, entry, metadata[name])
+
+    def _onRefreshed(self, _: None) -> None:
+        self._showStats()
+
+    def _onStatsLoaded(self, _: None) -> None:
+        self.isLoaded = True
+        self._showStats()
+
+    def _onCatalogChanged(self, added: Dict[str, Any], removed: List[str]) -> None:
+        """
+        Called from the thread that changed the catalog
+        """
+        self._changes.put((added, removed))
+
+    def _pushChanges(self) -> None:
+        if self.isLoaded and not self._isApplyingChanges and not self._changes.empty():
+            changes = []
+            while not self._changes.empty():
+                changes.append(self._changes.get_nowait())
+
+            self._isApplyingChanges = True
+            runInBackground(self.view, lambda: self._applyChanges(changes), self._onChangesApplied)
+
+        self.view.after(CHANGES_POLL_PERIOD_MS, self._pushChanges)
+
+    def _applyChanges(self, changes: List[Change]) -> None:
+        for added, removed in changes:
+            for name in removed:
+                self.stats.remove(name)
+            metadata = loadBagMetadata(added, complete=False) if self.hasSizes else {}
+            for name, entry in added.items():
+                self.stats.add(name, entry, metadata.get(name))
+
+    def _onChangesApplied(self, _: None) -> None:
+        self._isApplyingChanges = False
+        self._showStats()
+
+    def watchCatalog(self) -> None:
+        """
+        Keep the totals live, every bag added to or removed from the catalog is counted in or
+        out of them
+        """
+
+        self.model.changeCallbacks.append(self._onCatalogChanged)
+        self.view.after(CHANGES_POLL_PERIOD_MS, self._pushChanges)
+
+    def run(self) -> None:
+        """
+        Run the GUI.
+        The totals are computed in the background from the catalog and the metadata cache
+        """
+
+        self.view.buildGUI(self)
+        self._showStats()
+        runInBackground(self.view, self._loadStats, self._onStatsLoaded)
@@ -0,0 +1,99 @@
+"""
+Storage page
+"""
+
+from typing import Dict, Any, List, Tuple, Union, Optional, Protocol
+
+import tkinter as tk
+import customtkinter as ctk
+
+from ...logic.storageStats import STORAGE_VIEWS, UsageRow, formatGrowth, formatUsage
+
+
+class StoragePresenter(Protocol):
+    """
+    Storage Presenter protocol
+    """
+
+    # pylint: disable=C0116
+
+    selectedView: str
+
+    def handleSelectView(self, name: str) -> None:
+        ...
+
+    def handleRefresh(self, event: Optional[tk.EventType] = None) -> None:
+        ...
+
+
+class StorageView(ctk.CTkFrame):  # type: ignore # pylint: disable=R0901
+    """
+    Storage frame
+    """
+
+    def __init__(self, master: Union[ctk.CTk, ctk.CTkFrame], **kwargs: Optional[Any]) -> None:
+        super().__init__(master, **kwargs)
+
+        self.grid_columnconfigure(0, weight=1)
+        self.grid_rowconfigure(1, weight=1)
+
+        self.widgets: Dict[str, ctk.CTkBaseClass] = {}
+
+    def buildGUI(self, presenter: StoragePresenter) -> None:
+        """
+        Build the GUI, runs all the methods that build the GUI.
+        """
+
+        statusLabel = ctk.CTkLabel(self, text="Disk usage", anchor="w")
+        statusLabel.grid(row=0, column=0, padx=(10, 10), pady=(10, 10), sticky="we")
+        self.widgets["statusLabel"] = statusLabel
+
+        viewButton = ctk.CTkSegmentedButton(
+            self, values=list(STORAGE_VIEWS), command=presenter.handleSelectView
+        )
+        viewButton.set(presenter.selectedView)
+        viewButton.grid(row=0, column=1, padx=(10, 10), pady=(10, 10))
+        self.widgets["viewButton"] = viewButton
+
+        refreshButton = ctk.CTkButton(self, text="Refresh", command=presenter.handleRefresh)
+        refreshButton.grid(row=0, column=2, padx=(10, 10), pady=(10, 10))
+
+        usageTextbox = ctk.CTkTextbox(self, font=ctk.CTkFont(family="Courier"))
+        usageTextbox.grid(
+            row=1, column=0, columnspan=3, padx=(10, 10), pady=(10, 10), sticky="nsew"
+        )
+        usageTextbox.configure(state="disabled")
+        self.widgets["usageTextbox"] = usageTextbox
+
+    def updateUsage(self, dimension: str, rows: List[UsageRow], totalSize: int) -> None:
+        """
+        Replace the table with the usage by prefix, day or topic
+
+        parameters
+        ----------
+        dimension: str
+            prefix, day or topic
+        rows: List[UsageRow]
+            The usage of every prefix, day or topic
+        totalSize: int
+            Size of the catalog in bytes
+        """
+        self._setText(formatUsage(dimension, rows, totalSize))
+
+    def updateGrowth(self, growth: List[Tuple[str, int]]) -> None:
+        """
+        Replace the table with the size of the catalog every day
+        """
+        self._setText(formatGrowth(growth))
+
+    def updateStatus(self, status: str) -> None:
+        """
+        Show a status message above the table
+        """
+        self.widgets["statusLabel"].configure(text=status)
+
+    def _setText(self, lines: List[str]) -> None:
+        self.widgets["usageTextbox"].configure(state="normal")
+        self.widgets["usageTextbox"].delete(1.0, "end")
+        self.widgets["usageTextbox"].insert("end", "\n".join(lines))
+        self.widgets["usageTextbox"].configure(state="disabled")
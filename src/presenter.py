@@ -2,15 +2,20 @@
 Bag List Presenter
 """
 from __future__ import annotations
-from typing import Protocol, Optional, Dict
+from typing import Dict, Protocol, Optional, Callable, Any
 
 import tkinter as tk
 import customtkinter as ctk
 
 from .constants import Pages
+from .logic.backgroundTask import runBlocking, runCoroutine
 from .logic.fileSystemInterface import FileSystemInterface
+from .logic.recorderBackend import createBackend
+from .logic.profiler import PROFILER, traced
 from .pages.recordFrame.recordPresenter import RecordPresenter
 from .pages.bagListFrame.bagListPresenter import BagListPresenter
+from .pages.profilerFrame.profilerPresenter import ProfilerPresenter
+from .pages.storageFrame.storagePresenter import StoragePresenter
 
 
 class RosBagClientGui(Protocol):  # pylint: disable=R0903
@@ -20,53 +25,168 @@ class RosBagClientGui(Protocol):  # pylint: disable=R0903
 
     # pylint: disable=C0116
 
-    def buildGUI(self, presenter: RosBagPresenter) -> Dict[Pages, ctk.CTkFrame]:
+    def buildGUI(self, presenter: RosBagPresenter) -> None:
+        ...
+
+    def buildPage(self, name: Pages) -> ctk.CTkFrame:
         ...
 
     def selectPage(self, name: Pages) -> None:
         ...
 
+    def after_idle(self, func: Callable[..., None]) -> Any:  # pylint: disable=C0103
+        ...
+
+    def after(self, time: int, func: Callable[..., None]) -> Any:
+        ...
+
+    def showError(self, title: str, message: str) -> None:
+        ...
+
+    def destroy(self) -> None:
+        ...
+
 
 class RosBagPresenter:
     """
     Bag List Presenter
     """
 
-    # pylint: disable=W0613
+    # pylint: disable=W0613,R0902
 
     def __init__(self, view: RosBagClientGui) -> None:
         self.view = view
+        self.backend = createBackend()
+        self.fileSystem: Optional[FileSystemInterface] = None
         self.recordPresenter: Optional[RecordPresenter] = None
         self.bagListPresenter: Optional[BagListPresenter] = None
+        self.profilerPresenter: Optional[ProfilerPresenter] = None
+        self.storagePresenter: Optional[StoragePresenter] = None
+        # the pages waiting for the catalog, built in the order they were last selected
+        self._pendingPages: Dict[Pages, Callable[[FileSystemInterface], None]] = {}
 
+    @traced
     def handleRecordButtonEvent(self, event: Optional[tk.EventType] = None) -> None:
         """
         Handle the record button event.
+        The record page is built the first time it is selected, once the catalog is loaded
         """
-        if not self.recordPresenter:
-            return
-
+        if self.recordPresenter:
+            self.view.selectPage(Pages.RECORD)
+        else:
+            self._buildWithCatalog(Pages.RECORD, self._buildRecordPage)
+
+    def _buildRecordPage(self, fileSystem: FileSystemInterface) -> None:
+        self.recordPresenter = RecordPresenter(
+            self.view.buildPage(Pages.RECORD), fileSystem, backend=self.backend
+        )
+        self.recordPresenter.run()
         self.view.selectPage(Pages.RECORD)
 
+    @traced
     def handleAvailableBagsButtonEvent(self, event: Optional[tk.EventType] = None) -> None:
         """
         Handle the available bags button event.
+        The bags page is built the first time it is selected, once the catalog is loaded, it is
+        kept live after that
+        """
+        if self.bagListPresenter:
+            self.view.selectPage(Pages.AVAILABLE_BAGS)
+        else:
+            self._buildWithCatalog(Pages.AVAILABLE_BAGS, self._buildBagListPage)
+
+    def _buildBagListPage(self, fileSystem: FileSystemInterface) -> None:
+        self.bagListPresenter = BagListPresenter(
+            self.view.buildPage(Pages.AVAILABLE_BAGS), fileSystem, self.backend
+        )
+        self.bagListPresenter.run()
+        self.bagListPresenter.watchBagDirectory()
+        self.view.selectPage(Pages.AVAILABLE_BAGS)
+
+    @traced
+    def handleStorageButtonEvent(self, event: Optional[tk.EventType] = None) -> None:
         """
-        if not self.bagListPresenter:
+        Handle the storage button event.
+        The storage page is built the first time it is selected, once the catalog is loaded,
+        its totals are kept live by the catalog changes after that
+        """
+        if self.storagePresenter:
+            self.view.selectPage(Pages.STORAGE)
+        else:
+            self._buildWithCatalog(Pages.STORAGE, self._buildStoragePage)
+
+    def _buildStoragePage(self, fileSystem: FileSystemInterface) -> None:
+        self.storagePresenter = StoragePresenter(
+            self.view.buildPage(Pages.STORAGE), fileSystem, self.backend
+        )
+        self.storagePresenter.watchCatalog()
+        self.storagePresenter.run()
+        self.view.selectPage(Pages.STORAGE)
+
+    @traced
+    def handleProfilerButtonEvent(self, event: Optional[tk.EventType] = None) -> None:
+        """
+        Handle the profiler button event.
+        """
+        if not self.profilerPresenter:
+            self.profilerPresenter = ProfilerPresenter(
+                self.view.buildPage(Pages.PROFILER), PROFILER
+            )
+            self.profilerPresenter.run()
+
+        self.view.selectPage(Pages.PROFILER)
+
+    def handleCloseEvent(self) -> None:
+        """
+        Handle the window close event.
+        The background threads watching the bags directory are stopped before the window is
+        destroyed
+        """
+        if self.bagListPresenter:
+            self.bagListPresenter.stopWatching()
+
+        self.view.destroy()
+
+    def _buildWithCatalog(self, page: Pages, build: Callable[[FileSystemInterface], None]) -> None:
+        """
+        Build a page with the catalog, the catalog is created in the background the first time:
+        the local bags directory is scanned, or the catalog of the agent is requested
+        """
+
+        if self.fileSystem:
+            build(self.fileSystem)
             return
 
-        self.view.selectPage(Pages.AVAILABLE_BAGS)
-        self.bagListPresenter.handleRefreshBags()
+        isLoading = bool(self._pendingPages)
+        self._pendingPages.pop(page, None)
+        self._pendingPages[page] = build
+        if not isLoading:
+            runCoroutine(
+                self.view,
+                runBlocking(self.backend.createCatalog),
+                self._onCatalogCreated,
+                self._onCatalogError,
+            )
+
+    def _onCatalogCreated(self, fileSystem: FileSystemInterface) -> None:
+        self.fileSystem = fileSystem
+        builds = list(self._pendingPages.values())
+        self._pendingPages.clear()
+        for build in builds:
+            build(fileSystem)
+
+    def _onCatalogError(self, err: BaseException) -> None:
+        # the pages are built again on their next selection
+        self._pendingPages.clear()
+        if not isinstance(err, ConnectionError):
+            raise err
+
+        self.view.showError("Catalog", f"Could not load the catalog: {err}")
 
     def run(self) -> None:
         """
         Run the GUI.
+        Only the sidebar is built right away, the record page is built once the window is drawn
         """
-        pages = self.view.buildGUI(self)
-        fileSystem = FileSystemInterface()
-
-        self.recordPresenter = RecordPresenter(pages[Pages.RECORD], fileSystem)
-        self.bagListPresenter = BagListPresenter(pages[Pages.AVAILABLE_BAGS], fileSystem)
-
-        self.recordPresenter.run()
-        self.bagListPresenter.run()
+        self.view.buildGUI(self)
+        self.view.after_idle(self.handleRecordButtonEvent)
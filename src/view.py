@@ -2,16 +2,20 @@
 ROSBAG GUI
 """
 
-from typing import Dict, Protocol, Optional
+from typing import Callable, Dict, Protocol, Optional
 
 import os
 import tkinter as tk
+from tkinter import messagebox
 import customtkinter as ctk
 
-from PIL import Image
+from .components.imageRegistry import getImage
+from .logic.profiler import PROFILER, traced
 from .pages.bagListFrame.bagsListView import BagsListFrame
 from .pages.recordFrame.recordView import RecordView
-from .constants import Constants, Pages
+from .pages.profilerFrame.profilerView import ProfilerView
+from .pages.storageFrame.storageView import StorageView
+from .constants import Pages
 
 
 class RosBagPresenter(Protocol):
@@ -27,6 +31,15 @@ class RosBagPresenter(Protocol):
     def handleAvailableBagsButtonEvent(self, event: Optional[tk.EventType] = None) -> None:
         ...
 
+    def handleStorageButtonEvent(self, event: Optional[tk.EventType] = None) -> None:
+        ...
+
+    def handleProfilerButtonEvent(self, event: Optional[tk.EventType] = None) -> None:
+        ...
+
+    def handleCloseEvent(self) -> None:
+        ...
+
 
 class RosBagClientGui(ctk.CTk):  # type: ignore # pylint: disable=R0901
     """
@@ -41,26 +54,45 @@ class RosBagClientGui(ctk.CTk):  # type: ignore # pylint: disable=R0901
         self.tk.call("wm", "iconphoto", self._w, icon)
         ctk.set_widget_scaling(1.05)
 
-        self.buttonWidgets: Dict[str, ctk.CTkEntry] = {}
+        self.pageButtons: Dict[Pages, ctk.CTkButton] = {}
         self.pages: Dict[Pages, ctk.CTkFrame] = {}
 
-    def buildGUI(self, presenter: RosBagPresenter) -> Dict[Pages, ctk.CTkFrame]:
+    @traced
+    def buildGUI(self, presenter: RosBagPresenter) -> None:
         """
         Build the GUI, runs all the methods that build the GUI.
+        The pages are built later on by buildPage when they are first selected
         """
 
         self.grid_columnconfigure(1, weight=1)
         self.grid_rowconfigure(0, weight=1)
 
         self.buildSidebar(presenter)
+        self.protocol("WM_DELETE_WINDOW", presenter.handleCloseEvent)
+
+    @traced
+    def buildPage(self, name: Pages) -> ctk.CTkFrame:
+        """
+        Build the frame of a page, the frame is shown by selectPage
 
-        self.pages[Pages.RECORD] = RecordView(self, fg_color="transparent")
-        self.pages[Pages.RECORD].grid(row=0, column=1, sticky="nsew")
+        parameters
+        ----------
+        name: Pages
+            The page to build
+        """
 
-        self.pages[Pages.AVAILABLE_BAGS] = BagsListFrame(self, fg_color="transparent")
+        if name == Pages.RECORD:
+            self.pages[name] = RecordView(self, fg_color="transparent")
+        elif name == Pages.AVAILABLE_BAGS:
+            self.pages[name] = BagsListFrame(self, fg_color="transparent")
+        elif name == Pages.STORAGE:
+            self.pages[name] = StorageView(self, fg_color="transparent")
+        else:
+            self.pages[name] = ProfilerView(self, fg_color="transparent")
 
-        return self.pages
+        return self.pages[name]
 
+    @traced
     def buildSidebar(self, presenter: RosBagPresenter) -> None:
         """
         Build the sidebar frame with widgets
@@ -70,7 +102,7 @@ class RosBagClientGui(ctk.CTk):  # type: ignore # pylint: disable=R0901
         ### SIDEBAR MAIN FRAME ###
         sideBarFrame = ctk.CTkFrame(self, width=140, corner_radius=0)
         sideBarFrame.grid(row=0, column=0, sticky="nsew")
-        sideBarFrame.grid_rowconfigure(3, weight=1)
+        sideBarFrame.grid_rowconfigure(2, weight=1)
 
         ### SIDEBAR LABEL ###
         nameLabel = ctk.CTkLabel(
@@ -81,94 +113,110 @@ class RosBagClientGui(ctk.CTk):  # type: ignore # pylint: disable=R0901
         nameLabel.grid(row=0, column=0, padx=20, pady=(20, 10))
 
         ### SIDEBAR Buttons ###
-        recordImage = ctk.CTkImage(
-            light_image=Image.open(os.path.join(Constants.IMAGE_PATH, "record_light.png")),
-            dark_image=Image.open(os.path.join(Constants.IMAGE_PATH, "record_dark.png")),
-            size=(20, 20),
+        pageButtonsFrame = ctk.CTkFrame(sideBarFrame, corner_radius=0, fg_color="transparent")
+        pageButtonsFrame.grid(row=1, column=0, sticky="ew")
+        pageButtonsFrame.grid_columnconfigure(0, weight=1)
+
+        self._buildPageButton(
+            pageButtonsFrame,
+            Pages.RECORD,
+            "Record",
+            getImage("record_light", "record_dark"),
+            presenter.handleRecordButtonEvent,
         )
-
-        playImage = ctk.CTkImage(
-            light_image=Image.open(os.path.join(Constants.IMAGE_PATH, "play_light.png")),
-            dark_image=Image.open(os.path.join(Constants.IMAGE_PATH, "play_dark.png")),
-            size=(20, 20),
+        self._buildPageButton(
+            pageButtonsFrame,
+            Pages.AVAILABLE_BAGS,
+            "Available Bags",
+            getImage("play_light", "play_dark"),
+            presenter.handleAvailableBagsButtonEvent,
         )
-
-        recordButton = ctk.CTkButton(
-            sideBarFrame,
-            corner_radius=0,
-            height=40,
-            border_spacing=10,
-            text="Record",
-            fg_color="transparent",
-            text_color=("gray10", "gray90"),
-            hover_color=("gray70", "gray30"),
-            image=recordImage,
-            anchor="w",
-            command=presenter.handleRecordButtonEvent,
-        )
-        recordButton.grid(row=1, column=0, sticky="ew")
-        self.buttonWidgets["recordButton"] = recordButton
-
-        availableBagsbutton = ctk.CTkButton(
-            sideBarFrame,
-            corner_radius=0,
-            height=40,
-            border_spacing=10,
-            text="Available Bags",
-            fg_color="transparent",
-            text_color=("gray10", "gray90"),
-            hover_color=("gray70", "gray30"),
-            image=playImage,
-            anchor="w",
-            command=presenter.handleAvailableBagsButtonEvent,
+        self._buildPageButton(
+            pageButtonsFrame,
+            Pages.STORAGE,
+            "Storage",
+            None,
+            presenter.handleStorageButtonEvent,
         )
-        availableBagsbutton.grid(row=2, column=0, sticky="ew")
-        self.buttonWidgets["availableBagsbutton"] = availableBagsbutton
+        if PROFILER.enabled:
+            self._buildPageButton(
+                pageButtonsFrame,
+                Pages.PROFILER,
+                "Profiler",
+                None,
+                presenter.handleProfilerButtonEvent,
+            )
 
         ### SIDEBAR UI Scaling ###
         scalingLabel = ctk.CTkLabel(sideBarFrame, text="UI Scaling:", anchor="sw")
-        scalingLabel.grid(row=3, column=0, padx=20, pady=(10, 0), sticky="s")
+        scalingLabel.grid(row=2, column=0, padx=20, pady=(10, 0), sticky="s")
         scalingOptionemenu = ctk.CTkOptionMenu(
             sideBarFrame,
             values=["80%", "90%", "100%", "105%", "110%"],
             command=self._changeScalingEvent,
         )
-        scalingOptionemenu.grid(row=4, column=0, padx=20, pady=(10, 20))
+        scalingOptionemenu.grid(row=3, column=0, padx=20, pady=(10, 20))
         scalingOptionemenu.set("105%")
 
         ### SIDEBAR APPEARANCE MODE ###
         appearanceModeLabel = ctk.CTkLabel(sideBarFrame, text="Appearance Mode:", anchor="w")
-        appearanceModeLabel.grid(row=5, column=0, padx=20, pady=(10, 0))
+        appearanceModeLabel.grid(row=4, column=0, padx=20, pady=(10, 0))
         appearanceModeOptioneMenu = ctk.CTkOptionMenu(
             sideBarFrame,
             values=["Light", "Dark", "System"],
             command=self._changeAppearanceModeEvent,
         )
-        appearanceModeOptioneMenu.grid(row=6, column=0, padx=20, pady=(10, 30))
+        appearanceModeOptioneMenu.grid(row=5, column=0, padx=20, pady=(10, 30))
 
         appearanceModeOptioneMenu.set("Dark")
 
-    def selectPage(self, name: Pages) -> None:
+    def _buildPageButton(
+        self,
+        master: ctk.CTkFrame,
+        page: Pages,
+        text: str,
+        image: Optional[ctk.CTkImage],
+        command: Callable[..., None],
+    ) -> None:
         """
-        Select a frame to be displayed in the main area of the application
+        Build a sidebar button that selects a page
         """
 
-        self.buttonWidgets["recordButton"].configure(
-            fg_color=("gray75", "gray25") if name == Pages.RECORD else "transparent"
-        )
-        self.buttonWidgets["availableBagsbutton"].configure(
-            fg_color=("gray75", "gray25") if name == Pages.AVAILABLE_BAGS else "transparent"
+        button = ctk.CTkButton(
+            master,
+            corner_radius=0,
+            height=40,
+            border_spacing=10,
+            text=text,
+            fg_color="transparent",
+            text_color=("gray10", "gray90"),
+            hover_color=("gray70", "gray30"),
+            image=image,
+            anchor="w",
+            command=command,
         )
+        button.grid(row=len(self.pageButtons), column=0, sticky="ew")
+        self.pageButtons[page] = button
 
-        if name == Pages.RECORD:
-            self.pages[Pages.RECORD].grid(row=0, column=1, sticky="nsew")
-        else:
-            self.pages[Pages.RECORD].grid_forget()
+    def showError(self, title: str, message: str) -> None:
+        """
+        Show an error in a dialog
+        """
+        messagebox.showerror(title, message, parent=self)
 
-        if name == Pages.AVAILABLE_BAGS:
-            self.pages[Pages.AVAILABLE_BAGS].grid(row=0, column=1, sticky="nsew")
-        else:
-            self.pages[Pages.AVAILABLE_BAGS].grid_forget()
+    def selectPage(self, name: Pages) -> None:
+        """
+        Select a frame to be displayed in the main area of the application
+        """
+
+        for page, button in self.pageButtons.items():
+            button.configure(fg_color=("gray75", "gray25") if page == name else "transparent")
+
+        for page, frame in self.pages.items():
+            if page == name:
+                frame.grid(row=0, column=1, sticky="nsew")
+            else:
+                frame.grid_forget()
 
     def _changeAppearanceModeEvent(self, appearanceMode: str) -> None:
         """